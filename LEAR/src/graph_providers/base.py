@@ -1,5 +1,6 @@
 from abc import abstractmethod
 import os
+import asyncio
 import gin
 import re
 from typing import Optional, List
@@ -31,9 +32,45 @@ class GraphProviderBase(BaseCodeGenerator):
         # Retry Prompts
         self.retry_prompt = retry_prompt
         
+    def settings_key(self) -> tuple:
+        """Settings that determine the provider's output."""
+        return (type(self).__name__, self.prompt_type, self.prompt_name, self.retry_prompt, self.evolution_strategy)
+
+    def metrics_labels(self) -> dict:
+        """Labels the graph metrics of this provider's runs are aggregated by."""
+        return {"provider": type(self).__name__, "model": None,
+                "prompt_type": self.prompt_type, "prompt_name": self.prompt_name}
+
     @abstractmethod
     def initialize_model(self):
         """Initialize and return provider-specific model."""
         pass
 
-    
\ No newline at end of file
+    async def agenerate_code_from_state(self, state: dict) -> str:
+        """Async version of generate_code_from_state; providers without a native one run it in a worker thread."""
+        return await asyncio.to_thread(self.generate_code_from_state, state)
+
+    
+
+    def generate_samples_from_state(self, state: dict, n: int) -> Optional[List[str]]:
+        """
+        `n` candidate codes from a single request, or None when the provider cannot
+        sample several answers per request (callers then send `n` requests instead).
+        """
+        return None
+
+    async def agenerate_samples_from_state(self, state: dict, n: int) -> Optional[List[str]]:
+        """Async version of generate_samples_from_state."""
+        return None
+
+    def generate_codes_from_states(self, states: List[dict]) -> Optional[List[Optional[str]]]:
+        """
+        Codes for several agents from a single request (None entries for agents
+        missing from the answer), or None when the provider only answers one agent
+        per request.
+        """
+        return None
+
+    async def agenerate_codes_from_states(self, states: List[dict]) -> Optional[List[Optional[str]]]:
+        """Async version of generate_codes_from_states."""
+        return None
@@ -0,0 +1,59 @@
+"""
+Batched multi-agent prompts.
+
+A single-agent prompt (code generation, pseudocode evolution) is mostly static
+text around one agent's code or pseudocode. `batch_prompt` sends that text once
+for several agents: the per-agent fields are replaced by a placeholder and the
+agents follow in indexed sections, and the model is asked to answer with one
+indexed section per agent. `parse_sections` splits such an answer again.
+"""
+
+import re
+from typing import List, Optional
+
+from src.utils.storeprompts import prompts
+
+SECTION_PATTERN = re.compile(r'<agent index="(\d+)">(.*?)(?=<agent index="\d+">|\Z)', re.DOTALL)
+FENCED_BLOCK_PATTERN = re.compile(r"```(?:netlogo)?\s*(.*?)\s*```", re.DOTALL | re.IGNORECASE)
+
+
+class _Placeholders(dict):
+    """Format mapping that fills every field of a single-agent prompt with the batch placeholder."""
+
+    def __missing__(self, key: str) -> str:
+        return prompts["batch_prompts"]["placeholder"]
+
+
+def batch_prompt(template: str, subject: str, contents: List[str]) -> str:
+    """
+    One prompt for several agents.
+
+    Args:
+        template: Single-agent prompt with its per-agent fields ({original_code}, {pseudocode}, ...)
+        subject: What each agent contributes, e.g. "code" or "pseudocode"
+        contents: Each agent's code or pseudocode
+
+    Returns:
+        The template with placeholders, followed by the indexed agent sections
+    """
+    batch = prompts["batch_prompts"]
+    agents = "\n".join(batch["agent_section"].format(index=index, subject=subject, content=content.strip())
+                       for index, content in enumerate(contents))
+    return (template.format_map(_Placeholders())
+            + batch["batch_suffix"].format(count=len(contents), subject=subject, agents=agents.strip()))
+
+
+def parse_sections(response: str, count: int) -> List[Optional[str]]:
+    """
+    The fenced block of each of `count` indexed sections in a batched answer,
+    None for agents whose section or block is missing, empty or a placeholder.
+    """
+    answers: List[Optional[str]] = [None] * count
+    for match in SECTION_PATTERN.finditer(response):
+        index = int(match.group(1))
+        block = FENCED_BLOCK_PATTERN.search(match.group(2))
+        if index < count and answers[index] is None and block:
+            text = block.group(1).strip()
+            if text and not text.startswith("["):
+                answers[index] = text
+    return answers
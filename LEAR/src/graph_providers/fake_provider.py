@@ -0,0 +1,426 @@
+"""
+Offline stand-in chat model for load testing the code generation pipeline.
+
+FakeChatModel is a LangChain chat model that answers the prompts of
+GraphUnifiedProvider and TextBasedEvolution without network access or API
+keys. It is selected with model name "fake" (SupportedModels.FAKE):
+
+- code prompts get a ```netlogo block: a template mutation of the first code
+  block in the prompt (numbers perturbed, turns swapped, a command appended or
+  the rule wrapped in a sensor check) or a canned rule when there is none
+- pseudocode prompts get a ``` block with the initial pseudocode plus or minus
+  one step
+- batched prompts get one indexed section per agent with such an answer
+
+Each answer waits for a sampled latency (optionally streamed at a fixed token
+rate), fails with FakeLLMError at `failure_rate` and is deliberately malformed
+(no code block, unbalanced brackets, forbidden primitives, out of range
+values, empty block) at `malformed_rate`, so mutations/sec, retries and
+concurrency scaling can be measured on an offline machine. With
+`requests_per_second`, requests above that rate are rejected at once with a
+429 FakeRateLimitError carrying a retry-after header, like a provider's rate
+limit. Answers are
+deterministic per seed, prompt and (at temperature > 0) number of times the
+prompt has been sent.
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import gin
+from pydantic import PrivateAttr
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.utils.storeprompts import prompts
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+# Error messages of the simulated provider failures
+FAILURES = ("429 rate limit exceeded", "500 internal server error", "503 service unavailable", "504 gateway timeout")
+
+# Characters per token, for usage metadata, max_tokens and streaming rate
+CHARS_PER_TOKEN = 4
+
+# Fenced blocks of a prompt; placeholders like "[Your evolved NetLogo code here]" are skipped
+FENCED_BLOCK_PATTERN = re.compile(r"```(?:netlogo)?\s*(.*?)\s*```", re.DOTALL | re.IGNORECASE)
+# Batched prompts (see batching.py): the agents' sections follow the "BATCH OF" header
+BATCH_PATTERN = re.compile(r"BATCH OF \d+ AGENTS:")
+AGENT_SECTION_PATTERN = re.compile(r'<agent index="(\d+)">.*?```\s*(.*?)\s*```', re.DOTALL)
+# Numeric literals that are not item indices
+NUMBER_PATTERN = re.compile(r"(?<![\w.-])(?<!item )\d+(?:\.\d+)?(?![\w.])")
+
+CANNED_RULES = {
+    "input": [
+        "fd 1 rt random 30 lt random 30",
+        "ifelse item 0 input != 0 [ fd 1 ] [ rt random 45 fd 2 ]",
+        "ifelse item 1 input > 2 [ lt 15 fd 1 ] [ rt random 90 fd 3 ]",
+    ],
+    "input-resource-distances": [
+        "fd 1 rt random 30 lt random 30",
+        "ifelse item 0 input-resource-distances != 0 [ fd 1 ] [ rt random 45 fd 2 ]",
+        "ifelse item 1 input-resource-types = \"gold\" [ rt 20 fd 1 ] [ lt random 30 fd 2 ]",
+    ],
+}
+APPENDED_COMMANDS = ["fd 1", "rt 10", "lt 10", "rt random 20", "lt random 20", "fd random-float 2"]
+PSEUDOCODE_STEPS = [
+    "If food is sensed straight ahead, move forward one step",
+    "Otherwise turn by a random angle up to 45 degrees",
+    "Move two steps when nothing is sensed",
+    "Turn towards the closest sensed food",
+    "Occasionally make a large random turn to explore",
+]
+EXPLANATIONS = [
+    "This version turns more often when nothing is sensed.",
+    "The changes keep the movement simple while exploring more of the world.",
+    "This keeps the original structure and adjusts the step sizes.",
+]
+
+
+class FakeLLMError(RuntimeError):
+    """Simulated provider failure (rate limit, server error, timeout)."""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        # HTTP status like the provider SDKs' errors, e.g. 429 for "429 rate limit exceeded"
+        self.status_code = int(message.split()[0])
+
+
+class FakeRateLimitError(FakeLLMError):
+    """Simulated 429 of the `requests_per_second` limit, with the seconds to wait in a retry-after header."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"429 rate limit exceeded, retry after {retry_after:.3f}s")
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": f"{retry_after:.3f}"})
+
+
+class FakeResponder:
+    """
+    Prompt -> (delay, text) of the fake model, shared by its sync, async and
+    streaming paths. Thread-safe; counts calls, failures and malformed answers.
+    """
+
+    def __init__(self, latency: float = 0.5, latency_distribution: str = "lognormal",
+                 latency_sigma: float = 0.5, failure_rate: float = 0.0,
+                 malformed_rate: float = 0.0, seed: int = 0, vary_repeats: bool = True,
+                 max_chars: Optional[int] = None, requests_per_second: float = 0.0):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_distribution} "
+                             f"(expected {', '.join(LATENCY_DISTRIBUTIONS)})")
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.latency_sigma = latency_sigma
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self.vary_repeats = vary_repeats
+        self.max_chars = max_chars
+        self.requests_per_second = requests_per_second
+        self.stats = {"calls": 0, "failures": 0, "malformed": 0, "rate_limited": 0}
+        self._accepted = deque()  # Times of the requests accepted within the last second
+        self._occurrences: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def respond(self, prompt: str) -> Tuple[float, str, Optional[FakeLLMError]]:
+        """Latency, answer text and the error to raise after the latency (if any)."""
+        rejected = self._rate_limit()
+        if rejected is not None:
+            return 0.0, "", rejected
+        rng = self._rng(prompt)
+        delay = self.sample_latency(rng)
+        with self._lock:
+            self.stats["calls"] += 1
+        if rng.random() < self.failure_rate:
+            with self._lock:
+                self.stats["failures"] += 1
+            return delay, "", FakeLLMError(rng.choice(FAILURES))
+
+        batch = BATCH_PATTERN.search(prompt)
+        if batch:
+            # One answer section per agent section of a batched prompt
+            prefix = prompt[:batch.start()]
+            sections = [(index, content) for index, content in AGENT_SECTION_PATTERN.findall(prompt[batch.start():])
+                        if not content.startswith("[")]
+            text = "\n".join(f'<agent index="{index}">\n{self._answer(self._agent_prompt(prefix, content), rng)}\n</agent>'
+                             for index, content in sections)
+        else:
+            text = self._answer(prompt, rng)
+        if self.max_chars is not None:
+            text = text[:self.max_chars]
+        return delay, text, None
+
+    def _rate_limit(self) -> Optional[FakeRateLimitError]:
+        """The 429 of a request above `requests_per_second` (over a sliding one-second window)."""
+        if self.requests_per_second <= 0:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            while self._accepted and self._accepted[0] <= now - 1.0:
+                self._accepted.popleft()
+            if len(self._accepted) >= max(1, int(self.requests_per_second)):
+                self.stats["rate_limited"] += 1
+                return FakeRateLimitError(self._accepted[0] + 1.0 - now)
+            self._accepted.append(now)
+        return None
+
+    @staticmethod
+    def _agent_prompt(prefix: str, content: str) -> str:
+        """The single-agent prompt of one agent of a batched prompt."""
+        placeholder = prompts["batch_prompts"]["placeholder"]
+        if placeholder in prefix:
+            return prefix.replace(placeholder, content)
+        return f"{prefix}```\n{content}\n```"
+
+    def _answer(self, prompt: str, rng: random.Random) -> str:
+        malformed = rng.random() < self.malformed_rate
+        if malformed:
+            with self._lock:
+                self.stats["malformed"] += 1
+        if re.search(r"pseudocode here\]", prompt):
+            return self._pseudocode_answer(prompt, rng)
+        return self._code_answer(prompt, rng, malformed)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        if self.latency <= 0:
+            return 0.0
+        if self.latency_distribution == "fixed":
+            return self.latency
+        if self.latency_distribution == "uniform":
+            return rng.uniform(0, 2 * self.latency)
+        if self.latency_distribution == "exponential":
+            return rng.expovariate(1 / self.latency)
+        # Lognormal with mean `latency`
+        return rng.lognormvariate(math.log(self.latency) - self.latency_sigma ** 2 / 2, self.latency_sigma)
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        occurrence = 0
+        if self.vary_repeats:
+            with self._lock:
+                occurrence = self._occurrences.get(digest, 0)
+                self._occurrences[digest] = occurrence + 1
+        return random.Random(f"{self.seed}:{digest}:{occurrence}")
+
+    # --- NetLogo code ---
+
+    def _code_answer(self, prompt: str, rng: random.Random, malformed: bool) -> str:
+        sensor = "input-resource-distances" if "input-resource-distances" in prompt else "input"
+        parent = next((block for block in FENCED_BLOCK_PATTERN.findall(prompt)
+                       if block and not block.startswith("[")), None)
+        code = self.mutate_rule(parent, sensor, rng) if parent else rng.choice(CANNED_RULES[sensor])
+        if malformed:
+            return self._malformed_answer(code, rng)
+        return f"Here is the improved code:\n\n```netlogo\n{code}\n```\n\n{rng.choice(EXPLANATIONS)}"
+
+    @staticmethod
+    def mutate_rule(code: str, sensor: str, rng: random.Random) -> str:
+        """Apply one template mutation to a NetLogo rule."""
+        numbers = list(NUMBER_PATTERN.finditer(code))
+        turns = list(re.finditer(r"\b(rt|lt)\b", code))
+        operations = []
+        if numbers:
+            operations += ["perturb", "perturb"]
+        if turns:
+            operations.append("swap")
+        # Rules only grow while they are short
+        if len(code) < 300 or not operations:
+            operations += ["append", "wrap"]
+
+        operation = rng.choice(operations)
+        if operation == "perturb":
+            match = rng.choice(numbers)
+            if "." in match.group():
+                value = max(0.1, round(float(match.group()) * rng.uniform(0.5, 1.5), 1))
+            else:
+                value = max(1, round(int(match.group()) * rng.uniform(0.5, 1.5) + rng.choice([-1, 1])))
+            if str(value) == match.group():
+                value += 1
+            return f"{code[:match.start()]}{value}{code[match.end():]}"
+        if operation == "swap":
+            match = rng.choice(turns)
+            return f"{code[:match.start()]}{'lt' if match.group() == 'rt' else 'rt'}{code[match.end():]}"
+        if operation == "wrap":
+            return f"ifelse item {rng.randrange(3)} {sensor} != 0 [ {code} ] [ rt random {rng.choice([30, 45, 90])} fd 1 ]"
+        return f"{code} {rng.choice(APPENDED_COMMANDS)}"
+
+    @staticmethod
+    def _malformed_answer(code: str, rng: random.Random) -> str:
+        kind = rng.choice(["prose", "unbalanced", "dangerous", "out_of_range", "empty"])
+        if kind == "prose":
+            return "The turtle should move forward when it senses food and turn randomly otherwise."
+        if kind == "unbalanced":
+            code = f"{code} ifelse item 0 input != 0 [ fd 1"
+        elif kind == "dangerous":
+            code = f"ask turtles [ die ] {code}"
+        elif kind == "out_of_range":
+            code = f"fd 5000 {code}"
+        else:
+            code = ""
+        return f"```netlogo\n{code}\n```"
+
+    # --- Pseudocode ---
+
+    @staticmethod
+    def _pseudocode_answer(prompt: str, rng: random.Random) -> str:
+        match = re.search(r"<initial_pseudocode>\s*(.*?)\s*</initial_pseudocode>", prompt, re.DOTALL)
+        current = match.group(1) if match else next(
+            (block for block in FENCED_BLOCK_PATTERN.findall(prompt) if block and not block.startswith("[")), "")
+        steps = [line for line in current.splitlines() if line.strip()]
+        if len(steps) > 1 and (len(steps) >= 8 or rng.random() < 0.3):
+            steps.pop(rng.randrange(len(steps)))
+        else:
+            steps.insert(rng.randint(0, len(steps)), f"- {rng.choice(PSEUDOCODE_STEPS)}")
+        return "```\n" + "\n".join(steps) + "\n```"
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    LangChain chat model backed by FakeResponder. Works with `invoke`,
+    `ainvoke`, `stream` and `astream`; messages carry usage metadata estimated
+    at CHARS_PER_TOKEN characters per token.
+    """
+
+    temperature: float = 0.7
+    max_tokens: Optional[int] = None
+    latency: float = 0.5
+    latency_distribution: str = "lognormal"
+    latency_sigma: float = 0.5
+    tokens_per_second: float = 0.0  # Streaming rate after the first token, 0 sends the answer at once
+    failure_rate: float = 0.0
+    malformed_rate: float = 0.0
+    seed: int = 0
+    requests_per_second: float = 0.0  # Simulated server rate limit, 0 for none
+
+    _responder: Optional[FakeResponder] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def responder(self) -> FakeResponder:
+        if self._responder is None:
+            self._responder = FakeResponder(
+                latency=self.latency, latency_distribution=self.latency_distribution,
+                latency_sigma=self.latency_sigma, failure_rate=self.failure_rate,
+                malformed_rate=self.malformed_rate, seed=self.seed,
+                # At temperature 0 a repeated prompt gets the same answer
+                vary_repeats=self.temperature > 0,
+                max_chars=self.max_tokens * CHARS_PER_TOKEN if self.max_tokens else None,
+                requests_per_second=self.requests_per_second)
+        return self._responder
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self.responder.stats)
+
+    @staticmethod
+    def _prompt(messages: List[BaseMessage]) -> str:
+        return "\n".join(message.content if isinstance(message.content, str) else str(message.content)
+                         for message in messages)
+
+    @staticmethod
+    def _usage(prompt: str, text: str) -> Dict[str, int]:
+        input_tokens = len(prompt) // CHARS_PER_TOKEN + 1
+        output_tokens = len(text) // CHARS_PER_TOKEN
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _chunks(self, text: str) -> List[Tuple[str, float]]:
+        """The answer in chunks of about 4 tokens, with the seconds to wait before each."""
+        size = 4 * CHARS_PER_TOKEN
+        pause = size / CHARS_PER_TOKEN / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return [(text[start:start + size], pause) for start in range(0, len(text), size)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        prompt = self._prompt(messages)
+        delay, text, error = self.responder.respond(prompt)
+        time.sleep(delay + sum(pause for _, pause in self._chunks(text)))
+        if error:
+            raise error
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                         **kwargs: Any) -> ChatResult:
+        prompt = self._prompt(messages)
+        delay, text, error = self.responder.respond(prompt)
+        await asyncio.sleep(delay + sum(pause for _, pause in self._chunks(text)))
+        if error:
+            raise error
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        prompt = self._prompt(messages)
+        delay, text, error = self.responder.respond(prompt)
+        time.sleep(delay)
+        if error:
+            raise error
+        for content, pause in self._chunks(text):
+            time.sleep(pause)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=content))
+            if run_manager:
+                run_manager.on_llm_new_token(content, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(prompt, text)))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        prompt = self._prompt(messages)
+        delay, text, error = self.responder.respond(prompt)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        for content, pause in self._chunks(text):
+            await asyncio.sleep(pause)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=content))
+            if run_manager:
+                await run_manager.on_llm_new_token(content, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(prompt, text)))
+
+
+@gin.configurable
+def create_fake_model(temperature: float = 0.7, max_tokens: Optional[int] = None,
+                      latency: float = 0.5, latency_distribution: str = "lognormal",
+                      latency_sigma: float = 0.5, tokens_per_second: float = 0.0,
+                      failure_rate: float = 0.0, malformed_rate: float = 0.0,
+                      seed: int = 0, requests_per_second: float = 0.0) -> FakeChatModel:
+    """
+    Factory of the offline model used for SupportedModels.FAKE.
+
+    Args:
+        temperature: 0 answers a repeated prompt identically, otherwise every repeat differs
+        max_tokens: Answers are cut after about this many tokens
+        latency: Mean seconds before the first token
+        latency_distribution: "fixed", "uniform" (0 .. 2 * latency), "exponential" or "lognormal"
+        latency_sigma: Shape of the lognormal distribution
+        tokens_per_second: Generation rate after the first token (0: no extra time)
+        failure_rate: Fraction of requests that raise FakeLLMError
+        malformed_rate: Fraction of answers meant to fail extraction or verification
+        seed: Seed of every random choice
+        requests_per_second: Simulated server rate limit; requests above it get a 429 (0: no limit)
+
+    Returns:
+        FakeChatModel instance
+    """
+    return FakeChatModel(temperature=temperature, max_tokens=max_tokens, latency=latency,
+                         latency_distribution=latency_distribution, latency_sigma=latency_sigma,
+                         tokens_per_second=tokens_per_second, failure_rate=failure_rate,
+                         malformed_rate=malformed_rate, seed=seed, requests_per_second=requests_per_second)
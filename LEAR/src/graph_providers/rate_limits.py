@@ -0,0 +1,89 @@
+"""
+Rate-limit primitives shared by LEAR's RequestScheduler (scheduler.py) and
+the Gridarians RateLimiter (rate_limiter.py at the repository root): token
+buckets, the retry-after header, and which errors are rate limits (429, and
+Anthropic's 529 "overloaded") or transient server errors worth retrying.
+Standard library only, so the scripts can import it without LEAR's
+LangChain dependencies.
+"""
+
+import random
+import time
+from typing import Optional
+
+# Characters per token, for estimating the tokens of a request before it is sent
+CHARS_PER_TOKEN = 4
+
+RATE_LIMIT_STATUS = (429, 529)
+TRANSIENT_STATUS = (408, 409, 500, 502, 503, 504)
+
+MAX_BACKOFF = 60.0
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked to wait before the next request (retry-after header), if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except (TypeError, ValueError):
+            continue  # An HTTP date; fall back to backoff
+    return None
+
+
+def backoff_delay(backoff: float, attempt: int) -> float:
+    """Jittered exponential backoff: `backoff` doubled per attempt (from 0), capped at MAX_BACKOFF."""
+    return min(MAX_BACKOFF, backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    return _status_code(error) in RATE_LIMIT_STATUS or "RateLimit" in type(error).__name__
+
+
+def is_transient(error: BaseException) -> bool:
+    status = _status_code(error)
+    if status is not None:
+        return status in TRANSIENT_STATUS
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+class TokenBucket:
+    """
+    Budget of `per_minute` units, refilled continuously, holding at most
+    `burst_seconds` worth of refill (and at least the largest single cost).
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 5.0):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` (at most the capacity) is available."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        """Settle a reservation: positive returns unused units, negative charges extra ones."""
+        self.level = min(self.capacity, self.level + amount)
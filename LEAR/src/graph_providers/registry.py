@@ -0,0 +1,65 @@
+"""
+Process-level registry of graph providers, compiled graphs and chat-model clients.
+
+mutate_code runs once per agent per generation. Building a provider, a model
+client and a compiled LangGraph for each call costs more than the bookkeeping
+around the LLM request itself, so they are built once and reused while the
+gin configuration they were built from is in effect. `invalidate()` drops
+everything; write_prompt_config calls it after rebinding gin parameters.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+_lock = threading.RLock()
+_providers: Dict[Hashable, Any] = {}
+_graphs: Dict[Hashable, Any] = {}
+_chat_models: Dict[Hashable, Any] = {}
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _get_or_build(entries: Dict[Hashable, Any], key: Hashable, build: Callable[[], Any]) -> Any:
+    with _lock:
+        value = entries.get(key)
+        if value is not None:
+            _stats["hits"] += 1
+            return value
+        _stats["misses"] += 1
+        value = build()
+        entries[key] = value
+        return value
+
+
+def get_provider(key: Hashable, build: Callable[[], Any]) -> Any:
+    """Provider registered under `key` (e.g. model name and verifier), built on first use."""
+    return _get_or_build(_providers, key, build)
+
+
+def get_compiled_graph(key: Hashable, build: Callable[[], Any]) -> Any:
+    """Compiled graph registered under `key` (its node structure), built on first use."""
+    return _get_or_build(_graphs, key, build)
+
+
+def get_chat_model(key: Hashable, build: Callable[[], Any]) -> Any:
+    """Chat-model client registered under `key` (model, temperature, max tokens), built on first use."""
+    return _get_or_build(_chat_models, key, build)
+
+
+def invalidate() -> None:
+    """Forget every provider, graph and client, e.g. after gin bindings changed."""
+    with _lock:
+        _providers.clear()
+        _graphs.clear()
+        _chat_models.clear()
+        _stats["invalidations"] += 1
+
+
+def registry_stats() -> Dict:
+    """Entry counts and lookup counters of the registry."""
+    with _lock:
+        return {
+            "providers": len(_providers),
+            "graphs": len(_graphs),
+            "chat_models": len(_chat_models),
+            **_stats,
+        }
@@ -0,0 +1,121 @@
+"""
+Persistent cache of LLM responses.
+
+Re-running an experiment, or resuming one after a crash, sends thousands of
+prompts that were already answered. CachedChatModel answers them from a
+ResponseCache, the SQLite store in response_store.py (see there for the
+sampling and eviction rules), and create_response_cache configures the
+process-wide store from gin.
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import gin
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.graph_providers.response_store import ResponseCache
+from src.utils import logging
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+class CachedChatModel(BaseChatModel):
+    """
+    Chat model that answers from a ResponseCache and asks `model` on a miss.
+    Failed requests are not cached, and a streamed answer only once the stream
+    was read to the end (a stream cancelled by the verifier is incomplete).
+    """
+
+    model: BaseChatModel
+    response_cache: Any
+    model_id: str
+    temperature: float
+    max_tokens: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.model._llm_type}"
+
+    def _key(self, messages: List[BaseMessage]) -> str:
+        system = "\n".join(str(message.content) for message in messages if message.type == "system")
+        user = "\n".join(f"{message.type}: {message.content}" for message in messages if message.type != "system")
+        return self.response_cache.key(system, user, self.model_id, self.temperature, self.max_tokens)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        key = self._key(messages)
+        response = self.response_cache.lookup(key, self.temperature)
+        if response is None:
+            response = self.model.invoke(messages, stop=stop, **kwargs).content
+            self.response_cache.store(key, self.model_id, self.temperature, response)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = self._key(messages)
+        response = self.response_cache.lookup(key, self.temperature)
+        if response is None:
+            response = (await self.model.ainvoke(messages, stop=stop, **kwargs)).content
+            self.response_cache.store(key, self.model_id, self.temperature, response)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        key = self._key(messages)
+        response = self.response_cache.lookup(key, self.temperature)
+        if response is not None:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=response))
+            return
+        parts = []
+        chunks = self.model.stream(messages, stop=stop, **kwargs)
+        try:
+            for chunk in chunks:
+                parts.append(str(chunk.content))
+                yield ChatGenerationChunk(message=AIMessageChunk(content=chunk.content))
+        except GeneratorExit:
+            # Cancelled by the consumer: an early stop after a complete code block is
+            # a usable answer, a verifier cancellation mid-block is not
+            response = "".join(parts)
+            if response.count("```") >= 2:
+                self.response_cache.store(key, self.model_id, self.temperature, response)
+            raise
+        finally:
+            chunks.close()
+        self.response_cache.store(key, self.model_id, self.temperature, "".join(parts))
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+@gin.configurable
+def create_response_cache(enabled: bool = False, path: str = "Cache/responses.sqlite",
+                          samples_per_key: int = 0, max_megabytes: float = 256) -> Optional[ResponseCache]:
+    """
+    The process-wide response cache at `path` (relative paths start at the LEAR
+    directory), or None when caching is disabled.
+
+    Args:
+        enabled: Cache LLM responses
+        path: SQLite database file
+        samples_per_key: 0 caches temperature-0 answers only, N > 0 keeps up to N answers per prompt
+        max_megabytes: Stored response text above which least recently used answers are evicted
+    """
+    if not enabled:
+        return None
+    path = str(PROJECT_ROOT / path)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = ResponseCache(path, samples_per_key, int(max_megabytes * 1024 * 1024), logging.get_logger())
+            _caches[path] = cache
+        else:
+            cache.samples_per_key = samples_per_key
+            cache.max_bytes = int(max_megabytes * 1024 * 1024)
+        return cache
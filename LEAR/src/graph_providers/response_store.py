@@ -0,0 +1,156 @@
+"""
+SQLite store of LLM responses, shared by LEAR's CachedChatModel
+(response_cache.py) and the Gridarians scripts (response_cache.py at the
+repository root). It only uses the standard library, so the scripts can
+import it without LEAR's LangChain dependencies.
+
+Answers are keyed by the messages and the model settings that produced them,
+in a database with a WAL journal (concurrent readers never block the writer).
+
+Determinism is controlled with `samples_per_key`:
+- 0: only temperature-0 answers are cached, each prompt has one answer
+- N: answers at any temperature are cached, up to N per prompt. The k-th
+  request of a prompt in a process gets the k-th stored answer (k mod N once
+  all N exist), so a replayed run sees the answers of the original run in the
+  same order
+
+Least recently used answers are evicted once the stored text exceeds
+`max_bytes`.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT NOT NULL,
+    sample INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (key, sample)
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+class ResponseCache:
+    """
+    SQLite store of LLM responses, shared by every thread of the process.
+
+    Public Methods:
+    - key(system, user, model, temperature, max_tokens) -> str: Cache key of a request
+    - lookup(key, temperature) -> Optional[str]: Stored answer for the next request of a key
+    - store(key, model, temperature, response): Keep a fresh answer
+    - stats() -> Dict: Entry count, stored bytes and hit/miss counters
+    """
+
+    def __init__(self, path: str, samples_per_key: int = 0, max_bytes: int = 256 * 1024 * 1024,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            path: SQLite database file (created with its directory if missing)
+            samples_per_key: 0 caches temperature-0 answers only, N > 0 keeps up to N answers per key
+            max_bytes: Stored response text above which least recently used answers are evicted
+            logger: Logger for evictions (defaults to this module's)
+        """
+        self.path = path
+        self.samples_per_key = samples_per_key
+        self.max_bytes = max_bytes
+        self.logger = logger or logging.getLogger(__name__)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+        self._bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        # Requests per key in this process, to hand out the stored samples in order
+        self._requests: Dict[str, int] = {}
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+
+    @staticmethod
+    def key(system: str, user: str, model: str, temperature: float, max_tokens: Optional[int]) -> str:
+        payload = json.dumps([system, user, model, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def samples(self, temperature: float) -> int:
+        """Answers kept per key at this temperature (0: not cached)."""
+        return 1 if temperature == 0 else self.samples_per_key
+
+    def lookup(self, key: str, temperature: float) -> Optional[str]:
+        """
+        The stored answer for the next request of `key`, or None when a new
+        answer has to be generated (and then passed to `store`).
+        """
+        samples = self.samples(temperature)
+        with self._lock:
+            if samples <= 0:
+                self._stats["bypassed"] += 1
+                return None
+            request = self._requests.get(key, 0)
+            self._requests[key] = request + 1
+            row = self._connection.execute(
+                "SELECT response FROM responses WHERE key = ? AND sample = ?",
+                (key, request % samples)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._connection.execute("UPDATE responses SET last_used = ? WHERE key = ? AND sample = ?",
+                                     (time.time(), key, request % samples))
+            return row[0]
+
+    def store(self, key: str, model: str, temperature: float, response: str) -> None:
+        """Keep a generated answer as the next free sample of `key` (ignored once all samples exist)."""
+        samples = self.samples(temperature)
+        if samples <= 0:
+            return
+        size = len(response.encode())
+        now = time.time()
+        with self._lock:
+            stored = {row[0] for row in self._connection.execute(
+                "SELECT sample FROM responses WHERE key = ?", (key,))}
+            free = [sample for sample in range(samples) if sample not in stored]
+            if not free:
+                return
+            self._connection.execute(
+                "INSERT INTO responses (key, sample, model, response, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (key, free[0], model, response, size, now, now))
+            self._bytes += size
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used answers until the cache is back under 90% of max_bytes."""
+        target = self.max_bytes * 0.9
+        rows = self._connection.execute("SELECT key, sample, size FROM responses ORDER BY last_used")
+        doomed = []
+        for key, sample, size in rows:
+            if self._bytes <= target:
+                break
+            doomed.append((key, sample))
+            self._bytes -= size
+        rows.close()
+        self._connection.execute("BEGIN")
+        self._connection.executemany("DELETE FROM responses WHERE key = ? AND sample = ?", doomed)
+        self._connection.execute("COMMIT")
+        self._stats["evictions"] += len(doomed)
+        self.logger.info(f"Evicted {len(doomed)} cached responses from {self.path}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {"entries": entries, "bytes": self._bytes, **self._stats}
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
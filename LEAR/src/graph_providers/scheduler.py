@@ -0,0 +1,479 @@
+"""
+Rate-limit-aware scheduling of LLM requests.
+
+Groq, Anthropic, DeepSeek and OpenAI each limit requests and tokens per
+minute. Without coordination, a population mutated concurrently sends bursts
+that come back as 429s, which the provider turns into failed attempts.
+RequestScheduler keeps every request of one provider within its limits:
+
+- token buckets: requests and tokens per minute, refilled continuously and
+  holding at most `burst_seconds` worth of budget. A request reserves its
+  estimated tokens (prompt plus max_tokens) and the bucket is settled with the
+  usage reported by the provider afterwards
+- retry-after: a rate-limited request (429, or Anthropic's 529 "overloaded")
+  pauses the whole provider for the server's retry-after (exponential backoff
+  without one) and is sent again. Server errors and timeouts are retried with
+  backoff. The clients' own retries are turned off, so these are not hidden
+- adaptive concurrency (AIMD): the number of requests in flight grows by one
+  per window of successful requests up to `max_concurrency`, and is multiplied
+  by `decrease_factor` on a rate limit or a request slower than `latency_target`
+- priority lanes: retries of a mutation in flight (call site "retry", and
+  requests re-sent after a rate limit) are granted before new mutations, first
+  come first served within a lane
+
+ScheduledChatModel wraps a chat model with a scheduler; GraphUnifiedProvider
+adds it when `create_request_scheduler.enabled` is set, one scheduler per
+provider shared by every model of that provider.
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import gin
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from src.graph_providers.rate_limits import (CHARS_PER_TOKEN, TokenBucket, backoff_delay, is_rate_limit,
+                                             is_transient, retry_after)
+from src.graph_providers.transcript import current_call_site
+from src.utils import logging
+
+# Lanes, granted in this order
+RETRY_LANE = 0
+NEW_LANE = 1
+LANES = {RETRY_LANE: "retry", NEW_LANE: "new"}
+
+# Minimum seconds between two decreases of the concurrency limit, so one burst of 429s halves it once
+DECREASE_COOLDOWN = 1.0
+
+
+class _Ticket:
+    """A request waiting for, or holding, a slot of the scheduler."""
+
+    __slots__ = ("lane", "tokens", "wake", "granted", "cancelled", "queued", "started")
+
+    def __init__(self, lane: int, tokens: float, wake: Callable[[], None]):
+        self.lane = lane
+        self.tokens = tokens
+        self.wake = wake
+        self.granted = False
+        self.cancelled = False
+        self.queued = time.monotonic()
+        self.started = None
+
+
+class RequestScheduler:
+    """
+    Admission of the requests to one provider (see module docstring).
+
+    Public Methods:
+    - acquire(lane, tokens) -> ticket / aacquire(lane, tokens): Wait for a slot within the limits
+    - release(ticket, tokens_used): Free the slot of a finished request
+    - retry_delay(ticket, error, attempt) -> Optional[float]: Free the slot of a failed request and
+      return the seconds to wait before sending it again, or None when it should not be retried
+    - report() -> Dict: Requests, waits, rate limits, retries and the concurrency limit
+    """
+
+    def __init__(self, name: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, max_concurrency: int = 16,
+                 min_concurrency: int = 1, latency_target: Optional[float] = None,
+                 decrease_factor: float = 0.5, max_retries: int = 5, backoff: float = 1.0,
+                 burst_seconds: float = 5.0):
+        """
+        Args:
+            name: Provider the limits belong to (for logs and reports)
+            requests_per_minute: Request limit, None for none
+            tokens_per_minute: Token limit (input plus output), None for none
+            max_concurrency: Upper bound of the requests in flight
+            min_concurrency: Lower bound the adaptive limit never goes below
+            latency_target: Seconds above which a request counts as congestion, None to adapt on rate limits only
+            decrease_factor: Factor applied to the concurrency limit on congestion
+            max_retries: Times a rate-limited or transient failure is sent again
+            backoff: First backoff in seconds when the server sends no retry-after, doubled per attempt
+            burst_seconds: Seconds of budget the buckets hold, i.e. the largest burst sent at once
+        """
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"decrease_factor must be between 0 and 1, got {decrease_factor}")
+        self.name = name
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.logger = logging.get_logger()
+        self._requests = TokenBucket(requests_per_minute, burst_seconds) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._waiting: List[Tuple[int, int, _Ticket]] = []
+        self._sequence = itertools.count()
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._stats = {"requests": 0, "completed": 0, "rate_limited": 0, "transient_errors": 0, "retries": 0,
+                       "failed": 0, "tokens": 0, "peak_in_flight": 0, "decreases": 0}
+        self._waited = {lane: [0, 0.0] for lane in LANES}  # Granted tickets and seconds waited, per lane
+
+    @property
+    def concurrency_limit(self) -> int:
+        return int(self._limit)
+
+    # --- Admission ---
+
+    def _grant(self, now: float, wake_head: bool = False) -> None:
+        """
+        Grant waiting tickets in lane order while the limits allow. With `wake_head`
+        the first ticket left waiting is woken too, so it times its wait again (after
+        a release it may be waiting for a slot, but now waits for the buckets or a
+        pause). Caller holds the lock.
+        """
+        while self._waiting:
+            ticket = self._waiting[0][2]
+            if ticket.cancelled:
+                heapq.heappop(self._waiting)
+                continue
+            if (now < self._paused_until or self._in_flight >= int(self._limit) or
+                    (self._requests is not None and self._requests.wait_time(1, now) > 0) or
+                    (self._tokens is not None and self._tokens.wait_time(ticket.tokens, now) > 0)):
+                if wake_head:
+                    ticket.wake()
+                return
+            heapq.heappop(self._waiting)
+            if self._requests is not None:
+                self._requests.take(1, now)
+            if self._tokens is not None:
+                self._tokens.take(ticket.tokens, now)
+            self._in_flight += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+            ticket.granted = True
+            ticket.started = now
+            waited = self._waited[ticket.lane]
+            waited[0] += 1
+            waited[1] += now - ticket.queued
+            ticket.wake()
+
+    def _next_check(self, now: float) -> Optional[float]:
+        """Seconds until a waiting ticket may become grantable without a release. Caller holds the lock."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if not self._waiting or self._in_flight >= int(self._limit):
+            return None  # A release wakes the waiters
+        ticket = self._waiting[0][2]
+        waits = [bucket.wait_time(amount, now) for bucket, amount in
+                 ((self._requests, 1), (self._tokens, ticket.tokens)) if bucket is not None]
+        return max(waits, default=0.0) or None
+
+    def _enqueue(self, lane: int, tokens: float, wake: Callable[[], None]) -> _Ticket:
+        ticket = _Ticket(lane, tokens, wake)
+        with self._lock:
+            self._stats["requests"] += 1
+            heapq.heappush(self._waiting, (lane, next(self._sequence), ticket))
+            self._grant(time.monotonic())
+        return ticket
+
+    def _abandon(self, ticket: _Ticket) -> None:
+        """A waiter gave up (cancelled or interrupted): drop its ticket, or free its slot if already granted."""
+        with self._lock:
+            ticket.cancelled = True
+            if ticket.granted:
+                self._in_flight -= 1
+            self._grant(time.monotonic(), wake_head=True)
+
+    def acquire(self, lane: int = NEW_LANE, tokens: float = 0) -> _Ticket:
+        """Block until the request may be sent; returns its ticket for release/retry_delay."""
+        event = threading.Event()
+        ticket = self._enqueue(lane, tokens, event.set)
+        try:
+            while not ticket.granted:
+                with self._lock:
+                    timeout = self._next_check(time.monotonic())
+                event.wait(timeout)
+                event.clear()
+                with self._lock:
+                    self._grant(time.monotonic())
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        return ticket
+
+    async def aacquire(self, lane: int = NEW_LANE, tokens: float = 0) -> _Ticket:
+        """Async version of acquire; a cancelled waiter leaves the queue."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # The waiter's loop is closed; its ticket is abandoned
+
+        ticket = self._enqueue(lane, tokens, wake)
+        try:
+            while not ticket.granted:
+                with self._lock:
+                    timeout = self._next_check(time.monotonic())
+                try:
+                    await asyncio.wait_for(event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                with self._lock:
+                    self._grant(time.monotonic())
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        return ticket
+
+    # --- Completion ---
+
+    def _decrease(self, now: float, reason: str) -> None:
+        """Multiplicative decrease of the concurrency limit. Caller holds the lock."""
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_concurrency), self._limit * self.decrease_factor)
+        self._stats["decreases"] += 1
+        self.logger.info(f"Request scheduler {self.name}: {reason}, concurrency limit now {int(self._limit)}")
+
+    def release(self, ticket: _Ticket, tokens_used: Optional[float] = None) -> None:
+        """Free the slot of a completed request and settle its token reservation."""
+        with self._lock:
+            now = time.monotonic()
+            self._in_flight -= 1
+            self._stats["completed"] += 1
+            if tokens_used is not None:
+                self._stats["tokens"] += int(tokens_used)
+                if self._tokens is not None:
+                    self._tokens.give_back(ticket.tokens - tokens_used)
+            if self.latency_target is not None and now - ticket.started > self.latency_target:
+                self._decrease(now, f"latency {now - ticket.started:.1f}s above target")
+            else:
+                # Additive increase: about one more request in flight per window of successes
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+            self._grant(now, wake_head=True)
+
+    def retry_delay(self, ticket: _Ticket, error: BaseException, attempt: int) -> Optional[float]:
+        """
+        Free the slot of a failed request. A rate limit pauses the provider and
+        lowers the concurrency limit; the request is then queued again (in the
+        retry lane) after the returned delay.
+
+        Args:
+            ticket: Ticket of the failed request
+            error: Exception raised by the request
+            attempt: Number of the failed attempt, from 0
+
+        Returns:
+            Seconds to wait before queueing the request again, or None to give up
+        """
+        rate_limited = is_rate_limit(error)
+        transient = not rate_limited and is_transient(error)
+        retry = (rate_limited or transient) and attempt < self.max_retries
+        with self._lock:
+            now = time.monotonic()
+            self._in_flight -= 1
+            if self._tokens is not None:
+                self._tokens.give_back(ticket.tokens)  # The provider charges nothing for a rejected request
+            if rate_limited:
+                self._stats["rate_limited"] += 1
+                delay = retry_after(error)
+                if delay is None:
+                    delay = backoff_delay(self.backoff, attempt)
+                self._paused_until = max(self._paused_until, now + delay)
+                self._decrease(now, f"rate limited, paused {delay:.1f}s")
+            elif transient:
+                self._stats["transient_errors"] += 1
+            if retry:
+                self._stats["retries"] += 1
+            else:
+                self._stats["failed"] += 1
+            self._grant(now, wake_head=True)
+        if not retry:
+            return None
+        if rate_limited:
+            return 0.0  # The pause holds the request back
+        return backoff_delay(self.backoff, attempt)
+
+    def report(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "in_flight": self._in_flight,
+                "waiting": sum(1 for _, _, ticket in self._waiting if not ticket.cancelled),
+                "concurrency_limit": int(self._limit),
+                "mean_wait_seconds": {LANES[lane]: round(seconds / granted, 4) if granted else None
+                                      for lane, (granted, seconds) in self._waited.items()},
+            }
+
+
+def request_lane() -> int:
+    """Lane of the request made now: retries of a mutation in flight before new mutations."""
+    return RETRY_LANE if current_call_site() == "retry" else NEW_LANE
+
+
+def _estimate_tokens(messages: List[BaseMessage], max_tokens: Optional[int], samples: int = 1) -> int:
+    prompt = sum(len(str(message.content)) for message in messages) // CHARS_PER_TOKEN + 1
+    return prompt + (max_tokens or 0) * samples
+
+
+def _used_tokens(messages: List[BaseMessage], result: ChatResult) -> int:
+    """Tokens the provider reported for a request, or an estimate from the text."""
+    usage = getattr(result.generations[0].message, "usage_metadata", None) if result.generations else None
+    if usage and usage.get("total_tokens"):
+        return usage["total_tokens"]
+    output = sum(len(generation.text) for generation in result.generations) // CHARS_PER_TOKEN
+    return _estimate_tokens(messages, 0) + output
+
+
+class ScheduledChatModel(BaseChatModel):
+    """
+    Chat model that sends every request to `model` through a RequestScheduler.
+    A streamed request is retried only until its first chunk arrived.
+    """
+
+    model: BaseChatModel
+    scheduler: Any
+    max_tokens: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.model._llm_type}"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        lane = request_lane()
+        tokens = _estimate_tokens(messages, self.max_tokens, kwargs.get("n", 1))
+        for attempt in itertools.count():
+            ticket = self.scheduler.acquire(lane, tokens)
+            try:
+                result = self.model.generate([messages], stop=stop, **kwargs)
+            except Exception as e:
+                delay = self.scheduler.retry_delay(ticket, e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                lane = RETRY_LANE
+                continue
+            except BaseException:
+                self.scheduler.release(ticket)
+                raise
+            chat_result = ChatResult(generations=result.generations[0], llm_output=result.llm_output)
+            self.scheduler.release(ticket, _used_tokens(messages, chat_result))
+            return chat_result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        lane = request_lane()
+        tokens = _estimate_tokens(messages, self.max_tokens, kwargs.get("n", 1))
+        for attempt in itertools.count():
+            ticket = await self.scheduler.aacquire(lane, tokens)
+            try:
+                result = await self.model.agenerate([messages], stop=stop, **kwargs)
+            except Exception as e:
+                delay = self.scheduler.retry_delay(ticket, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                lane = RETRY_LANE
+                continue
+            except BaseException:
+                # Cancelled, e.g. a speculative candidate that lost
+                self.scheduler.release(ticket)
+                raise
+            chat_result = ChatResult(generations=result.generations[0], llm_output=result.llm_output)
+            self.scheduler.release(ticket, _used_tokens(messages, chat_result))
+            return chat_result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        lane = request_lane()
+        tokens = _estimate_tokens(messages, self.max_tokens)
+        for attempt in itertools.count():
+            ticket = self.scheduler.acquire(lane, tokens)
+            chunks = self.model.stream(messages, stop=stop, **kwargs)
+            try:
+                first = next(chunks, None)
+            except Exception as e:
+                chunks.close()
+                delay = self.scheduler.retry_delay(ticket, e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                lane = RETRY_LANE
+                continue
+            except BaseException:
+                chunks.close()
+                self.scheduler.release(ticket)
+                raise
+            break
+
+        text = []
+        usage = None
+        try:
+            for chunk in itertools.chain([first] if first is not None else [], chunks):
+                text.append(str(chunk.content))
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                yield ChatGenerationChunk(message=AIMessageChunk(content=chunk.content,
+                                                                 usage_metadata=chunk.usage_metadata))
+        finally:
+            # Also when the consumer closed the stream early (streaming verification, early stop)
+            chunks.close()
+            used = usage["total_tokens"] if usage and usage.get("total_tokens") else \
+                _estimate_tokens(messages, 0) + len("".join(text)) // CHARS_PER_TOKEN
+            self.scheduler.release(ticket, used)
+
+
+_schedulers: Dict[Tuple, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+@gin.configurable
+def create_request_scheduler(provider: str, enabled: bool = False, limits: Optional[Dict[str, Dict]] = None,
+                             max_concurrency: int = 16, min_concurrency: int = 1,
+                             latency_target: Optional[float] = None, decrease_factor: float = 0.5,
+                             max_retries: int = 5, backoff: float = 1.0,
+                             burst_seconds: float = 5.0) -> Optional[RequestScheduler]:
+    """
+    The process-wide scheduler of `provider`, or None when scheduling is disabled.
+
+    Args:
+        provider: Model name of the provider ("groq", "claude", ...)
+        enabled: Schedule LLM requests
+        limits: Per provider, `requests_per_minute` and `tokens_per_minute`, optionally
+                overriding any of the arguments below; providers without an entry are unlimited
+        max_concurrency: Upper bound of the requests in flight per provider
+        min_concurrency: Lower bound of the adaptive concurrency limit
+        latency_target: Seconds above which a request lowers the concurrency limit (None: rate limits only)
+        decrease_factor: Factor applied to the concurrency limit on a rate limit or slow request
+        max_retries: Times a rate-limited or transient failure is sent again
+        backoff: First backoff in seconds without a retry-after header, doubled per attempt
+        burst_seconds: Seconds of budget the token buckets hold
+    """
+    if not enabled:
+        return None
+    settings = {"max_concurrency": max_concurrency, "min_concurrency": min_concurrency,
+                "latency_target": latency_target, "decrease_factor": decrease_factor,
+                "max_retries": max_retries, "backoff": backoff, "burst_seconds": burst_seconds,
+                **(limits or {}).get(provider, {})}
+    key = (provider, tuple(sorted(settings.items())))
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = RequestScheduler(provider, **settings)
+            _schedulers[key] = scheduler
+        return scheduler
+
+
+def scheduler_stats() -> Dict[str, Dict]:
+    """Report of every scheduler created so far, by provider."""
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return {scheduler.name: scheduler.report() for scheduler in schedulers}
@@ -0,0 +1,81 @@
+import importlib.util
+import sys
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+HAS_GRAPH_DEPS = all(importlib.util.find_spec(name) is not None
+                     for name in ("langgraph", "langchain_core", "langchain_anthropic", "langchain_deepseek",
+                                  "langchain_groq", "langchain_openai", "gin", "dotenv", "pydantic", "yaml"))
+
+if HAS_GRAPH_DEPS:
+    import gin
+    from src.graph_providers.batching import batch_prompt, parse_sections
+    from src.graph_providers.registry import invalidate
+    from src.graph_providers.unified_provider import GraphUnifiedProvider
+    from src.netlogo_code_generator.graph import NetLogoCodeGenerator
+    from src.utils.storeprompts import prompts
+    from src.verification.verify_netlogo import NetLogoVerifier
+
+
+@unittest.skipUnless(HAS_GRAPH_DEPS, "LangGraph/LangChain are not installed")
+class TestBatching(unittest.TestCase):
+
+    def setUp(self):
+        invalidate()
+        self.verifier = NetLogoVerifier()
+        self.agent_infos = [[f"fd {index} rt 10", [], "rt 1", 0, 0, f"- Move {index}"] for index in range(12)]
+        self.texts = [info[5] for info in self.agent_infos]
+        gin.bind_parameter("create_fake_model.latency", 0)
+        gin.bind_parameter("TextBasedEvolution.evolution_strategy", "complex")
+
+    def tearDown(self):
+        gin.clear_config()
+        invalidate()
+
+    def generate(self, use_text_evolution, batch_size=4):
+        invalidate()
+        provider = GraphUnifiedProvider("fake", self.verifier)
+        generator = NetLogoCodeGenerator(provider, self.verifier, batch_size=batch_size)
+        results = generator.generate_many(self.agent_infos, self.texts, use_text_evolution)
+        return results, provider.initialize_model().stats
+
+    def test_batch_prompt_and_sections(self):
+        prompt = batch_prompt("Improve this rule:\n```\n{original_code}\n```\n", "code", ["fd 1", "rt 2"])
+        self.assertIn(prompts["batch_prompts"]["placeholder"], prompt)
+        self.assertIn("BATCH OF 2 AGENTS", prompt)
+        self.assertEqual(prompt.count('<agent index="1">'), 2)  # The agent and the answer format
+
+        response = ('<agent index="0">\n```netlogo\nfd 2\n```\n</agent>\n'
+                    '<agent index="2">\n```\n[Answer for agent 2]\n```\n'
+                    '<agent index="3">\nNo code\n'
+                    '<agent index="9">\n```\nfd 9\n```')
+        self.assertEqual(parse_sections(response, 4), ["fd 2", None, None, None])
+
+    def test_batched_first_attempts(self):
+        single, single_stats = self.generate(use_text_evolution=False, batch_size=1)
+        for use_text_evolution, requests in ((False, 3), (True, 6)):
+            with self.subTest(use_text_evolution=use_text_evolution):
+                results, stats = self.generate(use_text_evolution)
+                self.assertEqual(stats["calls"], requests)
+                for (code, text), info in zip(results, self.agent_infos):
+                    self.assertNotEqual(code, info[0])
+                    self.assertTrue(self.verifier.is_safe(code)[0])
+                    self.assertNotEqual(text, info[5]) if use_text_evolution else self.assertEqual(text, info[5])
+        self.assertEqual(single_stats["calls"], 12)
+
+    def test_failures_are_requeued(self):
+        gin.bind_parameter("create_fake_model.malformed_rate", 0.4)
+        results, stats = self.generate(use_text_evolution=False)
+        # Three batched requests, then one graph run per agent whose answer failed
+        self.assertGreater(stats["calls"], 3)
+        self.assertGreater(stats["malformed"], 0)
+        for code, _ in results:
+            self.assertTrue(self.verifier.is_safe(code)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
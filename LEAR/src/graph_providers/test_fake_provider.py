@@ -0,0 +1,119 @@
+import asyncio
+import importlib.util
+import os
+import re
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+HAS_PROVIDER_DEPS = all(importlib.util.find_spec(name) is not None
+                        for name in ("langchain_core", "langchain_anthropic", "langchain_deepseek",
+                                     "langchain_groq", "langchain_openai", "gin", "dotenv", "pydantic", "yaml"))
+
+if HAS_PROVIDER_DEPS:
+    from langchain_core.messages import HumanMessage
+    from src.graph_providers.fake_provider import FakeChatModel, FakeLLMError
+    from src.graph_providers.registry import invalidate
+    from src.graph_providers.unified_provider import GraphUnifiedProvider
+    from src.verification.verify_netlogo import NetLogoVerifier
+
+PARENT_PROMPT = "Improve this rule:\n```netlogo\nifelse item 0 input != 0 [ fd 1 ] [ rt random 45 fd 2 ]\n```"
+
+
+def extract_code(text):
+    match = re.search(r"```(?:netlogo)?\s*(.*?)\s*```", text, re.DOTALL)
+    return match.group(1) if match else None
+
+
+@unittest.skipUnless(HAS_PROVIDER_DEPS, "LangChain provider packages are not installed")
+class TestFakeProvider(unittest.TestCase):
+
+    def setUp(self):
+        invalidate()
+        self.verifier = NetLogoVerifier()
+
+    def ask(self, model, prompt=PARENT_PROMPT):
+        return model.invoke([HumanMessage(content=prompt)]).content
+
+    def test_answers_are_deterministic(self):
+        first, second = FakeChatModel(latency=0, seed=3), FakeChatModel(latency=0, seed=3)
+        answers = [self.ask(first) for _ in range(5)]
+        self.assertEqual(answers, [self.ask(second) for _ in range(5)])
+        self.assertGreater(len(set(answers)), 1)
+
+        greedy = FakeChatModel(latency=0, seed=3, temperature=0)
+        self.assertEqual(len({self.ask(greedy) for _ in range(5)}), 1)
+
+    def test_mutated_rules_pass_verification(self):
+        model = FakeChatModel(latency=0, seed=1)
+        code = "fd 1 rt random 30"
+        for _ in range(100):
+            mutated = extract_code(self.ask(model, f"```netlogo\n{code}\n```"))
+            self.assertNotEqual(mutated, code)
+            self.assertTrue(self.verifier.is_safe(mutated)[0], mutated)
+            code = mutated
+        self.assertLess(len(code), 800)
+
+    def test_failure_and_malformed_rates(self):
+        with self.assertRaises(FakeLLMError):
+            self.ask(FakeChatModel(latency=0, failure_rate=1.0))
+
+        model = FakeChatModel(latency=0, malformed_rate=1.0)
+        for _ in range(50):
+            code = extract_code(self.ask(model))
+            self.assertFalse(code and self.verifier.is_safe(code)[0], code)
+        self.assertEqual(model.stats["malformed"], 50)
+
+    def test_pseudocode_answers(self):
+        prompt = ("<initial_pseudocode>\n- Move forward\n</initial_pseudocode>\n"
+                  "```\n[Your evolved pseudocode here]\n```")
+        pseudocode = extract_code(self.ask(FakeChatModel(latency=0), prompt))
+        self.assertIn("- Move forward", pseudocode)
+        self.assertEqual(len(pseudocode.splitlines()), 2)
+
+    def test_latency_overlaps_when_awaited_concurrently(self):
+        model = FakeChatModel(latency=0.1, latency_distribution="fixed")
+        start = time.perf_counter()
+        asyncio.run(model.abatch([[HumanMessage(content=f"{PARENT_PROMPT} {index}")] for index in range(16)]))
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_provider_needs_no_api_key(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            for stream_verification in (False, True):
+                provider = GraphUnifiedProvider("fake", self.verifier, stream_verification=stream_verification)
+                code = provider.generate_code_from_state({"original_code": "fd 1 rt 30"})
+                self.assertNotEqual(code, "fd 1 rt 30")
+                self.assertTrue(self.verifier.is_safe(code)[0], code)
+        self.assertEqual(provider.model_id, "fake")
+
+    def test_early_stop_after_code_block(self):
+        streamed = []
+
+        def chunks():
+            for chunk in ("Here:\n```netlogo\nfd 1", "\n``", "`\n\nThis turns", " more often."):
+                streamed.append(chunk)
+                yield chunk
+
+        provider = GraphUnifiedProvider("fake", self.verifier, stream_early_stop=True)
+        chain = mock.Mock()
+        chain.stream.return_value = chunks()
+        self.assertEqual(provider._stream_response(chain, {}), "Here:\n```netlogo\nfd 1\n```")
+        self.assertEqual(len(streamed), 3)
+
+        for run in ("sync", "async"):
+            state = {"original_code": "fd 1 rt 30"}
+            if run == "sync":
+                code = provider.generate_code_from_state(state)
+            else:
+                code = asyncio.run(provider.agenerate_code_from_state(state))
+            self.assertTrue(self.verifier.is_safe(code)[0], code)
+
+
+if __name__ == '__main__':
+    unittest.main()
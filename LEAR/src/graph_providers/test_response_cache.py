@@ -0,0 +1,106 @@
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+HAS_CACHE_DEPS = all(importlib.util.find_spec(name) is not None
+                     for name in ("langchain_core", "gin", "pydantic", "yaml"))
+
+if HAS_CACHE_DEPS:
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from src.graph_providers.fake_provider import FakeChatModel, FakeLLMError
+    from src.graph_providers.response_cache import CachedChatModel, ResponseCache
+
+MESSAGES = [("system", "You are a NetLogo programming assistant."),
+            ("user", "Improve this rule:\n```netlogo\nfd 1 rt random 30\n```")]
+
+
+@unittest.skipUnless(HAS_CACHE_DEPS, "LangChain is not installed")
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "responses.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def cached(self, temperature=0.0, samples_per_key=0, max_bytes=1024 * 1024, **fake_options):
+        fake = FakeChatModel(latency=0, temperature=temperature, **fake_options)
+        cache = ResponseCache(self.path, samples_per_key, max_bytes)
+        self.addCleanup(cache.close)
+        model = CachedChatModel(model=fake, response_cache=cache, model_id="fake/fake", temperature=temperature)
+        return model, fake, cache
+
+    def ask(self, model, user=None):
+        return model.invoke([SystemMessage(content=MESSAGES[0][1]),
+                             HumanMessage(content=user or MESSAGES[1][1])]).content
+
+    def test_temperature_zero_answers_persist(self):
+        model, fake, cache = self.cached()
+        answer = self.ask(model)
+        self.assertEqual(self.ask(model), answer)
+        self.assertEqual(fake.stats["calls"], 1)
+
+        replay, fake, cache = self.cached()
+        self.assertEqual(self.ask(replay), answer)
+        self.assertEqual(fake.stats["calls"], 0)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+        # Other settings are other keys
+        self.assertNotEqual(ResponseCache.key("s", "u", "fake/fake", 0.0, 100),
+                            ResponseCache.key("s", "u", "fake/fake", 0.0, 200))
+
+    def test_samples_per_key(self):
+        model, fake, cache = self.cached(temperature=0.7)
+        self.ask(model)
+        self.ask(model)
+        self.assertEqual(cache.stats()["bypassed"], 2)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+        model, fake, cache = self.cached(temperature=0.7, samples_per_key=2)
+        answers = [self.ask(model) for _ in range(4)]
+        self.assertEqual(fake.stats["calls"], 2)
+        self.assertNotEqual(answers[0], answers[1])
+        self.assertEqual(answers[2:], answers[:2])
+
+        replay, fake, cache = self.cached(temperature=0.7, samples_per_key=2)
+        self.assertEqual([self.ask(replay) for _ in range(4)], answers)
+        self.assertEqual(fake.stats["calls"], 0)
+
+    def test_eviction(self):
+        model, fake, cache = self.cached(max_bytes=400)
+        for index in range(20):
+            self.ask(model, f"```netlogo\nfd {index}\n```")
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], 400)
+        self.assertGreater(stats["evictions"], 0)
+        self.assertEqual(stats["entries"], 20 - stats["evictions"])
+        # The most recent answer is still cached
+        self.ask(model, "```netlogo\nfd 19\n```")
+        self.assertEqual(fake.stats["calls"], 20)
+
+    def test_failures_and_cancelled_streams_are_not_cached(self):
+        model, fake, cache = self.cached(failure_rate=1.0)
+        with self.assertRaises(FakeLLMError):
+            self.ask(model)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+        model, fake, cache = self.cached()
+        stream = model.stream(MESSAGES)
+        next(stream)
+        stream.close()
+        self.assertEqual(cache.stats()["entries"], 0)
+        streamed = "".join(chunk.content for chunk in model.stream(MESSAGES))
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(self.ask(model), streamed)
+
+
+if __name__ == '__main__':
+    unittest.main()
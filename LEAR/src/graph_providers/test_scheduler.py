@@ -0,0 +1,168 @@
+import asyncio
+import importlib.util
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+HAS_GRAPH_DEPS = all(importlib.util.find_spec(name) is not None
+                     for name in ("langgraph", "langchain_core", "langchain_anthropic", "langchain_deepseek",
+                                  "langchain_groq", "langchain_openai", "gin", "dotenv", "pydantic", "yaml"))
+
+if HAS_GRAPH_DEPS:
+    import gin
+    from src.graph_providers.fake_provider import FakeChatModel, FakeLLMError, FakeRateLimitError
+    from src.graph_providers.registry import invalidate
+    from src.graph_providers.scheduler import (NEW_LANE, RETRY_LANE, RequestScheduler, ScheduledChatModel,
+                                               TokenBucket, retry_after)
+    from src.graph_providers.transcript import call_site
+    from src.graph_providers.unified_provider import GraphUnifiedProvider
+    from src.netlogo_code_generator.graph import NetLogoCodeGenerator
+    from src.verification.verify_netlogo import NetLogoVerifier
+
+
+@unittest.skipUnless(HAS_GRAPH_DEPS, "LangGraph/LangChain are not installed")
+class TestRequestScheduler(unittest.TestCase):
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(per_minute=600, burst_seconds=1.0)  # 10 per second, bursts of 10
+        now = time.monotonic()
+        self.assertEqual(bucket.wait_time(10, now), 0.0)
+        bucket.take(10, now)
+        self.assertAlmostEqual(bucket.wait_time(1, now), 0.1, places=2)
+        self.assertAlmostEqual(bucket.wait_time(50, now), 1.0, places=2)  # Capped at the capacity
+        bucket.give_back(4)
+        self.assertEqual(bucket.wait_time(4, now), 0.0)
+
+    def test_retries_are_granted_before_new_requests(self):
+        scheduler = RequestScheduler("test", max_concurrency=1)
+        holder = scheduler.acquire()
+        order = []
+
+        def request(name, lane):
+            ticket = scheduler.acquire(lane)
+            order.append(name)
+            scheduler.release(ticket)
+
+        threads = []
+        for name, lane in (("new 1", NEW_LANE), ("new 2", NEW_LANE), ("retry", RETRY_LANE)):
+            threads.append(threading.Thread(target=request, args=(name, lane)))
+            threads[-1].start()
+            time.sleep(0.05)
+        scheduler.release(holder)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, ["retry", "new 1", "new 2"])
+        report = scheduler.report()
+        self.assertEqual((report["requests"], report["completed"], report["peak_in_flight"]), (4, 4, 1))
+
+    def test_rate_limit_pauses_and_decreases_concurrency(self):
+        scheduler = RequestScheduler("test", max_concurrency=8, backoff=0.05)
+        error = FakeRateLimitError(0.3)
+        self.assertAlmostEqual(retry_after(error), 0.3)
+        ticket = scheduler.acquire()
+        self.assertEqual(scheduler.retry_delay(ticket, error, attempt=0), 0.0)
+        self.assertEqual(scheduler.concurrency_limit, 4)
+        start = time.monotonic()
+        scheduler.release(scheduler.acquire(RETRY_LANE))
+        self.assertGreaterEqual(time.monotonic() - start, 0.25)
+        for _ in range(8):
+            scheduler.release(scheduler.acquire())
+        self.assertEqual(scheduler.concurrency_limit, 5)  # Additive increase, about +1 per window
+
+        # Server errors are retried with backoff, other errors and exhausted retries are not
+        ticket = scheduler.acquire()
+        self.assertIsNotNone(scheduler.retry_delay(ticket, FakeLLMError("503 service unavailable"), attempt=0))
+        ticket = scheduler.acquire()
+        self.assertIsNone(scheduler.retry_delay(ticket, ValueError("bad request"), attempt=0))
+        ticket = scheduler.acquire()
+        self.assertIsNone(scheduler.retry_delay(ticket, error, attempt=scheduler.max_retries))
+        report = scheduler.report()
+        self.assertEqual((report["rate_limited"], report["transient_errors"], report["retries"], report["failed"]),
+                         (2, 1, 2, 2))
+
+    def test_cancelled_waiter_leaves_the_queue(self):
+        scheduler = RequestScheduler("test", max_concurrency=1)
+
+        async def main():
+            holder = await scheduler.aacquire()
+            waiter = asyncio.create_task(scheduler.aacquire())
+            await asyncio.sleep(0.05)
+            self.assertEqual(scheduler.report()["waiting"], 1)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            scheduler.release(holder)
+            scheduler.release(await asyncio.wait_for(scheduler.aacquire(), 1))
+
+        asyncio.run(main())
+        self.assertEqual(scheduler.report()["in_flight"], 0)
+
+    def test_scheduled_model_stays_within_server_limit(self):
+        fake = FakeChatModel(latency=0.02, latency_distribution="fixed", requests_per_second=20)
+        scheduler = RequestScheduler("fake", requests_per_minute=1200, tokens_per_minute=600000, burst_seconds=1.0)
+        model = ScheduledChatModel(model=fake, scheduler=scheduler, max_tokens=100)
+
+        async def main():
+            with call_site("retry", "fd 1"):
+                streamed = "".join([chunk.content async for chunk in model.astream("```\nfd 1\n```")])
+            answers = await asyncio.gather(*[model.ainvoke(f"```\nfd {index}\n```") for index in range(50)])
+            return streamed, answers
+
+        streamed, answers = asyncio.run(main())
+        self.assertIn("```netlogo", streamed)
+        self.assertTrue(all("```netlogo" in answer.content for answer in answers))
+        report = scheduler.report()
+        # Rejected requests were sent again after the retry-after instead of failing
+        self.assertEqual(fake.stats["calls"], 51)
+        self.assertEqual((report["completed"], report["failed"]), (51, 0))
+        self.assertEqual(report["retries"], fake.stats["rate_limited"])
+        self.assertGreater(report["tokens"], 0)
+
+        unscheduled = FakeChatModel(latency=0.02, latency_distribution="fixed", requests_per_second=20)
+
+        async def burst():
+            return await asyncio.gather(*[unscheduled.ainvoke(f"```\nfd {index}\n```") for index in range(50)],
+                                        return_exceptions=True)
+
+        self.assertEqual(sum(isinstance(answer, FakeRateLimitError) for answer in asyncio.run(burst())), 30)
+
+
+@unittest.skipUnless(HAS_GRAPH_DEPS, "LangGraph/LangChain are not installed")
+class TestScheduledProvider(unittest.TestCase):
+
+    def setUp(self):
+        invalidate()
+        self.verifier = NetLogoVerifier()
+        self.agent_infos = [[f"fd {index} rt 10", [], "rt 1", 0, 0, f"- Move {index}"] for index in range(24)]
+        gin.bind_parameter("create_fake_model.latency", 0.01)
+        gin.bind_parameter("create_fake_model.requests_per_second", 15)
+        gin.bind_parameter("TextBasedEvolution.evolution_strategy", "complex")
+
+    def tearDown(self):
+        gin.clear_config()
+        invalidate()
+
+    def test_population_mutation_without_failed_requests(self):
+        gin.bind_parameter("create_request_scheduler.enabled", True)
+        gin.bind_parameter("create_request_scheduler.limits", {"fake": {"requests_per_minute": 900}})
+        gin.bind_parameter("create_request_scheduler.burst_seconds", 1.0)
+        provider = GraphUnifiedProvider("fake", self.verifier)
+        model = provider.initialize_model()
+        self.assertIsInstance(model, ScheduledChatModel)
+        results = NetLogoCodeGenerator(provider, self.verifier).generate_many(
+            self.agent_infos, [info[5] for info in self.agent_infos], max_concurrency=24)
+        for (code, _), info in zip(results, self.agent_infos):
+            self.assertNotEqual(code, info[0])
+        report = model.scheduler.report()
+        self.assertEqual(report["failed"], 0)
+        self.assertEqual(report["completed"], model.model.stats["calls"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+HAS_GRAPH_DEPS = all(importlib.util.find_spec(name) is not None
+                     for name in ("langgraph", "langchain_core", "langchain_anthropic", "langchain_deepseek",
+                                  "langchain_groq", "langchain_openai", "gin", "dotenv", "pydantic", "yaml"))
+
+if HAS_GRAPH_DEPS:
+    import gin
+    from src.graph_providers.registry import invalidate
+    from src.graph_providers.transcript import Transcript, TranscriptMismatchError
+    from src.graph_providers.unified_provider import GraphUnifiedProvider
+    from src.netlogo_code_generator.graph import NetLogoCodeGenerator
+    from src.verification.verify_netlogo import NetLogoVerifier
+
+
+@unittest.skipUnless(HAS_GRAPH_DEPS, "LangGraph/LangChain are not installed")
+class TestTranscript(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.verifier = NetLogoVerifier()
+        self.agent_infos = [[f"fd {index} rt 10", [], "rt 1", 0, 0, f"- Move {index}"] for index in range(12)]
+        self.texts = [info[5] for info in self.agent_infos]
+        gin.bind_parameter("create_fake_model.latency", 0)
+        gin.bind_parameter("create_fake_model.malformed_rate", 0.4)
+        gin.bind_parameter("create_fake_model.failure_rate", 0.1)
+        gin.bind_parameter("TextBasedEvolution.evolution_strategy", "complex")
+
+    def tearDown(self):
+        gin.clear_config()
+        invalidate()
+        self.directory.cleanup()
+
+    def run_generation(self, model_name, stream_verification=False):
+        invalidate()
+        provider = GraphUnifiedProvider(model_name, self.verifier, stream_verification=stream_verification)
+        generator = NetLogoCodeGenerator(provider, self.verifier)
+        batch = generator.generate_many(self.agent_infos, self.texts, use_text_evolution=True, max_concurrency=6)
+        single = [generator.generate_code(info, text) for info, text in zip(self.agent_infos[:3], self.texts[:3])]
+        return batch + single
+
+    def record(self, name, stream_verification=False):
+        self.path = os.path.join(self.directory.name, f"{name}.jsonl")
+        gin.bind_parameter("create_transcript_recorder.enabled", True)
+        gin.bind_parameter("create_transcript_recorder.path", self.path)
+        results = self.run_generation("fake", stream_verification)
+        gin.bind_parameter("create_transcript_recorder.enabled", False)
+        with open(self.path) as f:
+            return results, [json.loads(line) for line in f]
+
+    def test_replay_reproduces_the_run(self):
+        for stream_verification in (False, True):
+            with self.subTest(stream_verification=stream_verification):
+                results, records = self.record(f"stream-{stream_verification}", stream_verification)
+                self.assertEqual({record["site"] for record in records}, {"pseudocode", "code", "retry"})
+                self.assertTrue(any(record["error"] for record in records))
+
+                gin.bind_parameter("create_replay_model.path", self.path)
+                gin.bind_parameter("create_replay_model.strict", True)
+                self.assertEqual(self.run_generation("replay", stream_verification), results)
+
+    def test_diverged_runs_fall_back_to_sequence(self):
+        _, records = self.record("diverged")
+        transcript = Transcript(self.path)
+        record = transcript.next("code", "code:unknown", "unknown prompt")
+        self.assertEqual(record["site"], "code")
+        self.assertEqual(transcript.stats()["fallbacks"], 1)
+
+        strict = Transcript(self.path, strict=True)
+        with self.assertRaises(TranscriptMismatchError):
+            strict.next("code", "code:unknown", "unknown prompt")
+        for record in records:
+            strict.next(record["site"], record["call_key"], record["prompt_key"])
+        self.assertEqual(strict.stats()["remaining"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,309 @@
+"""
+Structured LLM transcripts: record every request of a run, replay them offline.
+
+TranscriptRecorder appends one JSON line per chat-model request, in the order
+the requests finish: the messages, the model settings, the response (or the
+error, or the partial text of a cancelled stream), the latency and the call
+site. The call site is set by the caller around the request (see `call_site`): which LLM
+step made the request ("code", "retry", "pseudocode") for which parent rule.
+
+ReplayChatModel (model name "replay") answers from a recorded transcript
+without network access, so a whole evolution run can be re-executed at CPU
+speed. Requests are matched to recorded ones by
+- "prompt": identical call site and messages, in recorded order
+- "call_site": same call site and parent rule, in recorded order
+- "sequence": the next unused response of the same LLM step
+Unless `strict`, a request without a "prompt" or "call_site" match falls back
+to "sequence", so runs that diverge (e.g. after a simulation change) keep going.
+"""
+
+import contextlib
+import contextvars
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import gin
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.utils import logging
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+MATCH_MODES = ("prompt", "call_site", "sequence")
+
+
+class TranscriptMismatchError(LookupError):
+    """A replayed request has no recorded response left."""
+
+
+class ReplayedLLMError(RuntimeError):
+    """A request that failed in the recorded run fails again on replay."""
+
+
+# Call site of the request being made in the current thread or asyncio task.
+# A context variable rather than LangChain config metadata: chat models only see
+# the run metadata in _generate, not in _stream.
+_call_site_var: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar(
+    "transcript_call_site", default={"site": "unknown", "call_key": "unknown"})
+
+
+@contextlib.contextmanager
+def call_site(site: str, original_code: str):
+    """Name the call site of the requests made inside the block, for transcripts."""
+    digest = hashlib.sha256(original_code.encode()).hexdigest()[:16]
+    token = _call_site_var.set({"site": site, "call_key": f"{site}:{digest}"})
+    try:
+        yield
+    finally:
+        _call_site_var.reset(token)
+
+
+def current_call_site() -> str:
+    """Call site of the requests made now (`code`, `retry`, `pseudocode`, ... or `unknown`)."""
+    return _call_site_var.get()["site"]
+
+
+def _messages(messages: List[BaseMessage]) -> List[List[str]]:
+    return [[message.type, str(message.content)] for message in messages]
+
+
+def _prompt_key(site: str, messages: List[List[str]]) -> str:
+    return hashlib.sha256(json.dumps([site, messages], ensure_ascii=False).encode()).hexdigest()
+
+
+class TranscriptRecorder:
+    """
+    Appends request records to a JSONL file, shared by every thread of the process.
+
+    Public Methods:
+    - record(entry: Dict): Write one request record
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        self._index = 0
+
+    def record(self, entry: Dict) -> None:
+        with self._lock:
+            entry = {"index": self._index, "time": time.time(), **entry}
+            self._index += 1
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Transcript:
+    """
+    Recorded requests of a run, handed out once each.
+
+    Public Methods:
+    - next(site, call_key, prompt_key) -> Dict: The record answering a request
+    - stats() -> Dict: Served, fallback and remaining record counts
+    """
+
+    def __init__(self, path: str, match: str = "prompt", strict: bool = False):
+        if match not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode: {match} (expected {', '.join(MATCH_MODES)})")
+        self.path = path
+        self.match = match
+        self.strict = strict
+        with open(path, encoding="utf-8") as f:
+            self.records = [json.loads(line) for line in f if line.strip()]
+        self._used = [False] * len(self.records)
+        # Record indices in recorded order, by prompt, by call site and by LLM step
+        self._queues: Dict[str, Dict[str, List[int]]] = {mode: defaultdict(list) for mode in MATCH_MODES}
+        for index, record in enumerate(self.records):
+            self._queues["prompt"][record["prompt_key"]].append(index)
+            self._queues["call_site"][record["call_key"]].append(index)
+            self._queues["sequence"][record["site"]].append(index)
+        self._positions = {mode: defaultdict(int) for mode in MATCH_MODES}
+        self._lock = threading.Lock()
+        self._stats = {"served": 0, "fallbacks": 0}
+
+    def _take(self, mode: str, key: str) -> Optional[Dict]:
+        queue, positions = self._queues[mode].get(key, []), self._positions[mode]
+        while positions[key] < len(queue):
+            index = queue[positions[key]]
+            positions[key] += 1
+            if not self._used[index]:
+                self._used[index] = True
+                return self.records[index]
+        return None
+
+    def next(self, site: str, call_key: str, prompt_key: str) -> Dict:
+        key = {"prompt": prompt_key, "call_site": call_key, "sequence": site}[self.match]
+        with self._lock:
+            record = self._take(self.match, key)
+            if record is None and not self.strict and self.match != "sequence":
+                record = self._take("sequence", site)
+                if record is not None:
+                    self._stats["fallbacks"] += 1
+            if record is None:
+                raise TranscriptMismatchError(
+                    f"No recorded response left for {self.match} match of {call_key} in {self.path}")
+            self._stats["served"] += 1
+            return record
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"records": len(self.records), "remaining": self._used.count(False), **self._stats}
+
+
+class RecordingChatModel(BaseChatModel):
+    """Chat model that passes requests to `model` and records each one with a TranscriptRecorder."""
+
+    model: BaseChatModel
+    recorder: Any
+    model_id: str
+    temperature: float
+    max_tokens: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"recorded-{self.model._llm_type}"
+
+    def _record(self, messages: List[BaseMessage], started: float, **outcome: Any) -> None:
+        call_site = _call_site_var.get()
+        recorded = _messages(messages)
+        self.recorder.record({
+            **call_site, "prompt_key": _prompt_key(call_site["site"], recorded),
+            "model": self.model_id, "temperature": self.temperature, "max_tokens": self.max_tokens,
+            "messages": recorded, "latency": round(time.perf_counter() - started, 4), **outcome})
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        started = time.perf_counter()
+        try:
+            response = self.model.invoke(messages, stop=stop, **kwargs).content
+        except Exception as e:
+            self._record(messages, started, response=None, error=f"{type(e).__name__}: {e}")
+            raise
+        self._record(messages, started, response=response, error=None)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        started = time.perf_counter()
+        try:
+            response = (await self.model.ainvoke(messages, stop=stop, **kwargs)).content
+        except Exception as e:
+            self._record(messages, started, response=None, error=f"{type(e).__name__}: {e}")
+            raise
+        self._record(messages, started, response=response, error=None)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        started = time.perf_counter()
+        parts = []
+        chunks = self.model.stream(messages, stop=stop, **kwargs)
+        try:
+            for chunk in chunks:
+                parts.append(str(chunk.content))
+                yield ChatGenerationChunk(message=AIMessageChunk(content=chunk.content))
+        except GeneratorExit:
+            # Cancelled by the consumer (streaming verification): replay the same partial text
+            self._record(messages, started, response="".join(parts), error=None, cancelled=True)
+            raise
+        except Exception as e:
+            self._record(messages, started, response=None, error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            chunks.close()
+        self._record(messages, started, response="".join(parts), error=None)
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that answers from a recorded Transcript, without network access."""
+
+    transcript: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _replay(self, messages: List[BaseMessage]) -> str:
+        call_site = _call_site_var.get()
+        record = self.transcript.next(call_site["site"], call_site["call_key"],
+                                      _prompt_key(call_site["site"], _messages(messages)))
+        if record.get("error"):
+            raise ReplayedLLMError(record["error"])
+        return record["response"]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        response = self._replay(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return self._generate(messages, stop, run_manager, **kwargs)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        response = self._replay(messages)
+        for start in range(0, len(response), 16):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=response[start:start + 16]))
+
+
+_recorders: Dict[str, TranscriptRecorder] = {}
+_transcripts: Dict[tuple, Transcript] = {}
+_lock = threading.Lock()
+
+
+@gin.configurable
+def create_transcript_recorder(enabled: bool = False,
+                               path: str = "Transcripts/{timestamp}.jsonl") -> Optional[TranscriptRecorder]:
+    """
+    The process-wide recorder writing to `path` (relative paths start at the LEAR
+    directory, `{timestamp}` is the time of the first request), or None when
+    recording is disabled.
+    """
+    if not enabled:
+        return None
+    with _lock:
+        if path not in _recorders:
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            _recorders[path] = TranscriptRecorder(str(PROJECT_ROOT / path.format(timestamp=timestamp)))
+            logging.get_logger().info(f"Recording LLM transcript to {_recorders[path].path}")
+        return _recorders[path]
+
+
+@gin.configurable
+def create_replay_model(path: str = None, match: str = "prompt", strict: bool = False) -> ReplayChatModel:
+    """
+    Chat model replaying the transcript at `path` (model name "replay").
+
+    Args:
+        path: Recorded JSONL transcript (relative paths start at the LEAR directory)
+        match: "prompt", "call_site" or "sequence" (see module docstring)
+        strict: Raise TranscriptMismatchError instead of falling back to "sequence"
+    """
+    if not path:
+        raise ValueError("create_replay_model.path must name a recorded transcript")
+    path = str(PROJECT_ROOT / path)
+    with _lock:
+        # One transcript per run: every provider and graph consumes the same records
+        transcript = _transcripts.get((path, match, strict))
+        if transcript is None:
+            transcript = Transcript(path, match, strict)
+            _transcripts[(path, match, strict)] = transcript
+    return ReplayChatModel(transcript=transcript)
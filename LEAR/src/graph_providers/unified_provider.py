@@ -1,4 +1,5 @@
 import os
+import asyncio
 from src.utils import logging
 import gin, re
 from typing import Optional, List, Any
@@ -12,15 +13,29 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 from src.graph_providers.base import GraphProviderBase
+from src.graph_providers.batching import batch_prompt, parse_sections
+from src.graph_providers.fake_provider import create_fake_model
+from src.graph_providers.response_cache import CachedChatModel, create_response_cache
+from src.graph_providers.transcript import RecordingChatModel, call_site, create_replay_model, create_transcript_recorder
+from src.graph_providers.scheduler import ScheduledChatModel, create_request_scheduler
+from src.graph_providers.registry import get_chat_model
 from src.verification.verify_netlogo import NetLogoVerifier
 from src.utils.storeprompts import prompts
 
+# Opening fence of the code block we stream into the verifier (needs the whitespace after it)
+CODE_FENCE_OPEN_PATTERN = re.compile(r"```(?:netlogo)?\s", re.IGNORECASE)
+
+# Code prompt when prompt_type/prompt_name name no prompt
+DEFAULT_CODE_ONLY_TEMPLATE = "Evolve or generate code based on the following NetLogo code:\n```netlogo\n{original_code}\n```"
+
 # Define supported models
 class SupportedModels(Enum):
     CLAUDE = "claude"
     DEEPSEEK = "deepseek"
     GROQ = "groq"
     OPENAI = "openai"
+    FAKE = "fake"  # Offline stand-in for load testing, see fake_provider.py
+    REPLAY = "replay"  # Answers from a recorded transcript, see transcript.py
 
 @gin.configurable
 class GraphUnifiedProvider(GraphProviderBase):
@@ -36,7 +51,9 @@ class GraphUnifiedProvider(GraphProviderBase):
                  claude_model_name: str = "claude-3-5-sonnet-20240229",
                  deepseek_model_name: str = "deepseek-chat",
                  groq_model_name: str = "llama-3.3-70b-versatile",
-                 openai_model_name: str = "gpt-4o"):
+                 openai_model_name: str = "gpt-4o",
+                 stream_verification: bool = False,
+                 stream_early_stop: bool = False):
         """
         Initialize with model name and verifier instance.
         
@@ -51,6 +68,10 @@ class GraphUnifiedProvider(GraphProviderBase):
             deepseek_model_name: Model name for DeepSeek
             groq_model_name: Model name for Groq
             openai_model_name: Model name for OpenAI
+            stream_verification: Stream the response and cancel it as soon as the
+                                 code block contains a fatal verifier error
+            stream_early_stop: Stream the response and cancel it once the first code
+                               block is complete, skipping the explanation after it
         """
         super().__init__(verifier)
         self.model_name = model_name
@@ -63,6 +84,8 @@ class GraphUnifiedProvider(GraphProviderBase):
         self.deepseek_model_name = deepseek_model_name
         self.groq_model_name = groq_model_name
         self.openai_model_name = openai_model_name
+        self.stream_verification = stream_verification
+        self.stream_early_stop = stream_early_stop
         # Store prompt config explicitly
         self.prompt_type = prompt_type
         self.prompt_name = prompt_name
@@ -84,40 +107,105 @@ class GraphUnifiedProvider(GraphProviderBase):
             self.api_key = os.getenv('OPENAI_API_KEY')
             if not self.api_key:
                 raise ValueError("OPENAI_API_KEY environment variable is required")
+        elif self.model_name in (SupportedModels.FAKE.value, SupportedModels.REPLAY.value):
+            pass  # No API key needed
         else:
             raise ValueError(f"Unsupported model name: {self.model_name}")
             
+    @property
+    def model_id(self) -> str:
+        """Provider-specific name of the configured model."""
+        return {
+            SupportedModels.CLAUDE.value: self.claude_model_name,
+            SupportedModels.DEEPSEEK.value: self.deepseek_model_name,
+            SupportedModels.GROQ.value: self.groq_model_name,
+            SupportedModels.OPENAI.value: self.openai_model_name,
+            SupportedModels.FAKE.value: SupportedModels.FAKE.value,
+            SupportedModels.REPLAY.value: SupportedModels.REPLAY.value,
+        }[self.model_name]
+
+    def settings_key(self) -> tuple:
+        return super().settings_key() + (self.model_name, self.model_id, self.temperature,
+                                         self.max_tokens, self.stream_verification, self.stream_early_stop)
+
+    def metrics_labels(self) -> dict:
+        return {**super().metrics_labels(), "provider": self.model_name, "model": self.model_id}
+
     def initialize_model(self):
-        """Initialize and return provider-specific model based on model name."""
+        """Return the provider-specific chat model, shared by providers with the same model settings."""
+        key = (self.model_name, self.model_id, self.temperature, self.max_tokens)
+        return get_chat_model(key, self._create_cached_model)
+
+    def _create_cached_model(self):
+        """
+        The chat model, answering from the response cache and recording a
+        transcript when they are enabled in gin (a replayed run needs neither).
+        Requests that reach the provider go through its request scheduler when
+        one is enabled, so cache hits cost no rate limit budget.
+        """
+        if self.model_name == SupportedModels.REPLAY.value:
+            return self._create_model()
+        scheduler = create_request_scheduler(self.model_name)
+        # The scheduler retries rate limits and server errors itself, so the client must not
+        model = self._create_model(max_retries=0 if scheduler is not None else None)
+        if scheduler is not None:
+            model = ScheduledChatModel(model=model, scheduler=scheduler, max_tokens=self.max_tokens)
+        model_id = f"{self.model_name}/{self.model_id}"
+        cache = create_response_cache()
+        if cache is not None:
+            model = CachedChatModel(model=model, response_cache=cache, model_id=model_id,
+                                    temperature=self.temperature, max_tokens=self.max_tokens)
+        recorder = create_transcript_recorder()
+        if recorder is not None:
+            model = RecordingChatModel(model=model, recorder=recorder, model_id=model_id,
+                                       temperature=self.temperature, max_tokens=self.max_tokens)
+        return model
+
+    def _create_model(self, max_retries: Optional[int] = None):
+        """Create a provider-specific chat model client (with the client's default retries unless given)."""
+        retries = {"max_retries": max_retries} if max_retries is not None else {}
         try:
             if self.model_name == SupportedModels.CLAUDE.value:
                 model = ChatAnthropic(
                     model=self.claude_model_name,
                     anthropic_api_key=self.api_key,
                     temperature=self.temperature,
-                    max_tokens=self.max_tokens
+                    max_tokens=self.max_tokens,
+                    **retries
                 )
             elif self.model_name == SupportedModels.DEEPSEEK.value:
                 model = ChatDeepSeek(
                     model_name=self.deepseek_model_name,
                     api_key=self.api_key,
                     temperature=self.temperature,
-                    max_tokens=self.max_tokens
+                    max_tokens=self.max_tokens,
+                    **retries
                 )
             elif self.model_name == SupportedModels.GROQ.value:
                 model = ChatGroq(
                     model_name=self.groq_model_name,
                     groq_api_key=self.api_key,
                     temperature=self.temperature,
-                    max_tokens=self.max_tokens
+                    max_tokens=self.max_tokens,
+                    **retries
                 )
             elif self.model_name == SupportedModels.OPENAI.value:
                 model = ChatOpenAI(
                     model=self.openai_model_name,
                     openai_api_key=self.api_key,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    **retries
+                )
+            elif self.model_name == SupportedModels.FAKE.value:
+                # Latency, failure and malformed-output rates come from create_fake_model's gin bindings
+                model = create_fake_model(
                     temperature=self.temperature,
                     max_tokens=self.max_tokens
                 )
+            elif self.model_name == SupportedModels.REPLAY.value:
+                # Transcript path and matching come from create_replay_model's gin bindings
+                model = create_replay_model()
             else:
                 raise ValueError(f"Unsupported model name: {self.model_name}")
             return model
@@ -141,103 +229,304 @@ class GraphUnifiedProvider(GraphProviderBase):
         """
         self.logger.info(f"Generating code from state using {self.model_name} provider")
         try:
-            # Ensure model is initialized
-            if not self.model:
-                self.model = self.initialize_model()
-
-            # Extract relevant info from state
-            original_code = state.get("original_code", "")
-            error_message = state.get("error_message", None)
-            modified_pseudocode = state.get("modified_pseudocode", None)
-            initial_pseudocode = state.get("initial_pseudocode", "") # Fallback if no modified
-
-            # --- Determine Prompt and Input ---
-            user_content = ""
-
-            system_message = prompts.get("langchain", {}).get("cot_system", "You are a NetLogo programming assistant.")
-            invoke_input = {} # Initialize empty invoke input
-
-            if error_message and modified_pseudocode:
-                self.logger.info(f"Using retry prompt '{self.retry_prompt}' with pseudocode due to error: {error_message[:100]}...")
-                
-                prompt_template = prompts.get("retry_prompts", {}).get(self.retry_prompt, "")
-                if not prompt_template:
-                    prompt_template = prompts.get("retry_prompts", {}).get("generate_code_with_pseudocode_and_error")
-                
-                # Format the prompt with all required fields
-                user_content = prompt_template.format(
-                    original_code=original_code, # Match prompt variable name
-                    error_message=error_message, # Match prompt variable name
-                    pseudocode=modified_pseudocode
-                )
-                # Update invoke_input for the chain
-                invoke_input["original_code"] = original_code
-                invoke_input["error"] = error_message
-                invoke_input["pseudocode"] = modified_pseudocode
-
-            elif error_message:
-                # Case 2: Only Error is present - Use error-only retry prompt
-                self.logger.info(f"Using retry prompt '{self.retry_prompt}' without pseudocode due to error: {error_message[:100]}...")
-                
-                prompt_template = prompts.get("retry_prompts", {}).get(self.retry_prompt, "")
-                if not prompt_template:
-                    prompt_template = prompts.get("retry_prompts", {}).get("generate_code_with_error")
-                
-                user_content = prompt_template.format(original_code=original_code, error_message=error_message)
-                
-                # Update invoke_input
-                #invoke_input["original_code"] = original_code
-                invoke_input["error_message"] = error_message
-
-            elif modified_pseudocode:
-                # Use code generation prompt with modified pseudocode
-                self.logger.info(f"Using {self.evolution_strategy} for Code Generation with modified pseudocode.")
-                prompt_template = prompts.get("evolution_strategies", {}).get(self.evolution_strategy, "Generate NetLogo code based on this pseudocode:\n{pseudocode}\n\nOriginal code for context:\n```netlogo\n{original_code}\n```").get("code_prompt") # Default template
-                user_content = prompt_template.format(pseudocode=modified_pseudocode)
-                
-                # Add necessary inputs for the prompt template
-                invoke_input["initial_pseudocode"] = modified_pseudocode
-
-            else:
-                self.logger.info(f"Using code generation/evolution prompt '{self.prompt_type}/{self.prompt_name}' with original code only.")
-                default_code_only_template = "Evolve or generate code based on the following NetLogo code:\n```netlogo\n{original_code}\n```"
-                prompt_template = prompts.get(self.prompt_type, {}).get(self.prompt_name, default_code_only_template) 
-                user_content = prompt_template.format(original_code=original_code)
-                
-                invoke_input = {"original_code": original_code}
-
-            # --- Construct Prompt & Chain ---
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_message),
-                ("user", user_content)
-            ])
-            self.logger.info(f"Final prompt created. User content: {user_content}")
-
-            chain = prompt | self.model | StrOutputParser()
+            chain, invoke_input = self._code_chain(state)
 
             # --- Invoke LLM ---
             self.logger.info(f"Invoking LLM chain with input keys: {list(invoke_input.keys())}")
-            response = chain.invoke(invoke_input) # Pass the dictionary matching prompt variables
+            with self._call_site(state):
+                if self.stream_verification or self.stream_early_stop:
+                    response = self._stream_response(chain, invoke_input)
+                else:
+                    response = chain.invoke(invoke_input) # Pass the dictionary matching prompt variables
             self.logger.info("LLM chain invocation complete.")
 
-            # --- Extract Code ---
-            match = re.search(r"```(?:netlogo)?\s*(.*?)\s*```", response, re.DOTALL | re.IGNORECASE)
-            if match:
-                code = match.group(1).strip()
-                if code:
-                    self.logger.info(f"Code extracted successfully. Code: {code}")
-                    return code
+            return self._extract_code(response, state.get("original_code", ""))
+
+        except Exception as e:
+            self.logger.error(f"Error during code generation from state: {str(e)}", exc_info=True)
+            return state.get("original_code", "") # Fallback
+
+    async def agenerate_code_from_state(self, state: dict) -> str:
+        """
+        Async version of generate_code_from_state, used when many graph runs are
+        awaited concurrently (see NetLogoCodeGenerator.agenerate_many).
+        """
+        self.logger.info(f"Generating code from state using {self.model_name} provider (async)")
+        try:
+            chain, invoke_input = self._code_chain(state)
+
+            self.logger.info(f"Awaiting LLM chain with input keys: {list(invoke_input.keys())}")
+            with self._call_site(state):
+                if self.stream_verification or self.stream_early_stop:
+                    # The streaming verifier and the cache/transcript wrappers stream
+                    # synchronously; keep them off the event loop
+                    response = await asyncio.to_thread(self._stream_response, chain, invoke_input)
                 else:
-                    self.logger.warning("Extracted code block was empty. Falling back.")
-                    return original_code
-            else:
-                 self.logger.warning(f"Could not extract NetLogo code block from response: {response[:500]}... Falling back.")
-                 return original_code # Fallback
+                    response = await chain.ainvoke(invoke_input)
+            self.logger.info("LLM chain invocation complete.")
+
+            return self._extract_code(response, state.get("original_code", ""))
 
         except Exception as e:
             self.logger.error(f"Error during code generation from state: {str(e)}", exc_info=True)
             return state.get("original_code", "") # Fallback
 
+    def generate_samples_from_state(self, state: dict, n: int) -> Optional[List[str]]:
+        """
+        `n` candidate codes from one request (OpenAI's `n` parameter), or None for
+        models that return one answer per request. Cached or recorded models count
+        as those: the cache and the transcript keep one answer per request. An empty
+        list when the request failed.
+        """
+        try:
+            chain, invoke_input = self._code_chain(state)
+            if not self._samples_supported():
+                return None
+            messages = chain.first.invoke(invoke_input).to_messages()
+            self.logger.info(f"Requesting {n} samples in one request")
+            with self._call_site(state):
+                result = self.model.generate([messages], n=n)
+            return [self._extract_code(generation.text, state.get("original_code", ""))
+                    for generation in result.generations[0]]
+        except Exception as e:
+            self.logger.error(f"Error during sampled code generation from state: {str(e)}", exc_info=True)
+            return []  # The request failed, no candidates
+
+    async def agenerate_samples_from_state(self, state: dict, n: int) -> Optional[List[str]]:
+        """Async version of generate_samples_from_state."""
+        try:
+            chain, invoke_input = self._code_chain(state)
+            if not self._samples_supported():
+                return None
+            messages = chain.first.invoke(invoke_input).to_messages()
+            self.logger.info(f"Requesting {n} samples in one request (async)")
+            with self._call_site(state):
+                result = await self.model.agenerate([messages], n=n)
+            return [self._extract_code(generation.text, state.get("original_code", ""))
+                    for generation in result.generations[0]]
+        except Exception as e:
+            self.logger.error(f"Error during sampled code generation from state: {str(e)}", exc_info=True)
+            return []  # The request failed, no candidates
+
+    def generate_codes_from_states(self, states: List[dict]) -> Optional[List[Optional[str]]]:
+        """
+        First attempts of several agents in one request (see batching.py).
+
+        Returns:
+            One code per state, None for agents whose section is missing from the answer
+        """
+        try:
+            chain = self._batch_code_chain(states)
+            self.logger.info(f"Invoking batched LLM chain for {len(states)} agents")
+            with self._batch_call_site(states):
+                response = chain.invoke({})
+            return parse_sections(response, len(states))
+        except Exception as e:
+            self.logger.error(f"Error during batched code generation: {str(e)}", exc_info=True)
+            return [None] * len(states)
+
+    async def agenerate_codes_from_states(self, states: List[dict]) -> Optional[List[Optional[str]]]:
+        """Async version of generate_codes_from_states."""
+        try:
+            chain = self._batch_code_chain(states)
+            self.logger.info(f"Awaiting batched LLM chain for {len(states)} agents")
+            with self._batch_call_site(states):
+                response = await chain.ainvoke({})
+            return parse_sections(response, len(states))
+        except Exception as e:
+            self.logger.error(f"Error during batched code generation: {str(e)}", exc_info=True)
+            return [None] * len(states)
+
+    def _batch_code_chain(self, states: List[dict]):
+        """The prompt | model | parser chain asking for the code of every state, one indexed section each."""
+        if not self.model:
+            self.model = self.initialize_model()
+
+        system_message = prompts.get("langchain", {}).get("cot_system", "You are a NetLogo programming assistant.")
+        if all(state.get("modified_pseudocode") for state in states):
+            # Code from each agent's evolved pseudocode
+            template = prompts["evolution_strategies"][self.evolution_strategy]["code_prompt"]
+            user_content = batch_prompt(template, "pseudocode", [state["modified_pseudocode"] for state in states])
+        else:
+            template = prompts.get(self.prompt_type, {}).get(self.prompt_name, DEFAULT_CODE_ONLY_TEMPLATE)
+            user_content = batch_prompt(template, "code", [state["original_code"] for state in states])
+        self.logger.info(f"Batched prompt created for {len(states)} agents. User content: {user_content}")
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system_message),
+            ("user", user_content)
+        ])
+        return prompt | self.model | StrOutputParser()
+
+    @staticmethod
+    def _batch_call_site(states: List[dict]):
+        """Call site of a batched code request, for transcripts."""
+        return call_site("code_batch", "\n".join(state.get("original_code", "") for state in states))
+
+    def _samples_supported(self) -> bool:
+        """Whether the (initialized) model can return several answers per request."""
+        model = self.model.model if isinstance(self.model, ScheduledChatModel) else self.model
+        return isinstance(model, ChatOpenAI) and not (self.stream_verification or self.stream_early_stop)
+
+    @staticmethod
+    def _call_site(state: dict):
+        """Call site of a code request (first attempt or retry of a parent rule), for transcripts."""
+        return call_site("retry" if state.get("error_message") else "code", state.get("original_code", ""))
+
+    def _code_chain(self, state: dict):
+        """Build the prompt | model | parser chain and its input for the current generation state."""
+        # Ensure model is initialized
+        if not self.model:
+            self.model = self.initialize_model()
+
+        # Extract relevant info from state
+        original_code = state.get("original_code", "")
+        error_message = state.get("error_message", None)
+        modified_pseudocode = state.get("modified_pseudocode", None)
+        initial_pseudocode = state.get("initial_pseudocode", "") # Fallback if no modified
+
+        # --- Determine Prompt and Input ---
+        user_content = ""
+
+        system_message = prompts.get("langchain", {}).get("cot_system", "You are a NetLogo programming assistant.")
+        invoke_input = {} # Initialize empty invoke input
+
+        if error_message and modified_pseudocode:
+            self.logger.info(f"Using retry prompt '{self.retry_prompt}' with pseudocode due to error: {error_message[:100]}...")
+            
+            prompt_template = prompts.get("retry_prompts", {}).get(self.retry_prompt, "")
+            if not prompt_template:
+                prompt_template = prompts.get("retry_prompts", {}).get("generate_code_with_pseudocode_and_error")
+            
+            # Format the prompt with all required fields
+            user_content = prompt_template.format(
+                original_code=original_code, # Match prompt variable name
+                error_message=error_message, # Match prompt variable name
+                pseudocode=modified_pseudocode
+            )
+            # Update invoke_input for the chain
+            invoke_input["original_code"] = original_code
+            invoke_input["error"] = error_message
+            invoke_input["pseudocode"] = modified_pseudocode
+
+        elif error_message:
+            # Case 2: Only Error is present - Use error-only retry prompt
+            self.logger.info(f"Using retry prompt '{self.retry_prompt}' without pseudocode due to error: {error_message[:100]}...")
+            
+            prompt_template = prompts.get("retry_prompts", {}).get(self.retry_prompt, "")
+            if not prompt_template:
+                prompt_template = prompts.get("retry_prompts", {}).get("generate_code_with_error")
+            
+            user_content = prompt_template.format(original_code=original_code, error_message=error_message)
+            
+            # Update invoke_input
+            #invoke_input["original_code"] = original_code
+            invoke_input["error_message"] = error_message
+
+        elif modified_pseudocode:
+            # Use code generation prompt with modified pseudocode
+            self.logger.info(f"Using {self.evolution_strategy} for Code Generation with modified pseudocode.")
+            prompt_template = prompts.get("evolution_strategies", {}).get(self.evolution_strategy, "Generate NetLogo code based on this pseudocode:\n{pseudocode}\n\nOriginal code for context:\n```netlogo\n{original_code}\n```").get("code_prompt") # Default template
+            user_content = prompt_template.format(pseudocode=modified_pseudocode)
+            
+            # Add necessary inputs for the prompt template
+            invoke_input["initial_pseudocode"] = modified_pseudocode
+
+        else:
+            self.logger.info(f"Using code generation/evolution prompt '{self.prompt_type}/{self.prompt_name}' with original code only.")
+            prompt_template = prompts.get(self.prompt_type, {}).get(self.prompt_name, DEFAULT_CODE_ONLY_TEMPLATE)
+            user_content = prompt_template.format(original_code=original_code)
+            
+            invoke_input = {"original_code": original_code}
+
+        # --- Construct Prompt & Chain ---
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system_message),
+            ("user", user_content)
+        ])
+        self.logger.info(f"Final prompt created. User content: {user_content}")
+
+        chain = prompt | self.model | StrOutputParser()
+        return chain, invoke_input
+
+    def _extract_code(self, response: str, original_code: str) -> str:
+        """Extract the first code block from a response, falling back to the original code."""
+        match = re.search(r"```(?:netlogo)?\s*(.*?)\s*```", response, re.DOTALL | re.IGNORECASE)
+        if match:
+            code = match.group(1).strip()
+            if code:
+                self.logger.info(f"Code extracted successfully. Code: {code}")
+                return code
+            else:
+                self.logger.warning("Extracted code block was empty. Falling back.")
+                return original_code
+        else:
+             self.logger.warning(f"Could not extract NetLogo code block from response: {response[:500]}... Falling back.")
+             return original_code # Fallback
+
+
+    def _stream_response(self, chain, invoke_input: dict) -> str:
+        """
+        Stream the LLM response. With stream_verification the code block is fed
+        to a StreamingVerification as it arrives; if the verifier finds a fatal
+        error the stream is closed (cancelling the request) and the partial code
+        block is returned, so the verify_code node reports the error and the
+        retry starts right away. With stream_early_stop the stream is closed as
+        soon as the code block is complete.
+
+        Args:
+            chain: Prompt | model | StrOutputParser chain
+            invoke_input: Input dictionary for the chain
+
+        Returns:
+            The (possibly truncated) response text
+        """
+        stream = self.verifier.start_stream() if self.stream_verification else None
+        response = ""
+        code_start = None  # Offset of the code inside `response` once the fence opened
+        fed_upto = None
+        block_closed = False
+
+        chunks = chain.stream(invoke_input)
+        try:
+            for chunk in chunks:
+                response += chunk
+                if block_closed:
+                    continue
+
+                if code_start is None:
+                    opening = CODE_FENCE_OPEN_PATTERN.search(response)
+                    if not opening:
+                        continue
+                    code_start = fed_upto = opening.end()
+
+                closing = response.find("```", code_start)
+                if closing != -1:
+                    feed_end = closing
+                    block_closed = True
+                else:
+                    # Hold back trailing backticks that may be the start of the closing fence
+                    feed_end = len(response.rstrip("`"))
+
+                if stream is not None:
+                    if feed_end > fed_upto:
+                        stream.feed(response[fed_upto:feed_end])
+                        fed_upto = feed_end
+
+                    if stream.aborted:
+                        self.logger.warning(f"Cancelling generation early, streamed code failed verification: {stream.fatal_error}")
+                        return f"```netlogo\n{stream.text}\n```"
+
+                if block_closed and self.stream_early_stop:
+                    self.logger.info("Code block complete, cancelling the rest of the response")
+                    return response[:closing + 3]
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+
+        return response
+
 
 @gin.configurable
 def create_graph_provider(model_name: str = "groq", verifier: NetLogoVerifier = None,
@@ -247,7 +536,7 @@ def create_graph_provider(model_name: str = "groq", verifier: NetLogoVerifier =
     Factory method to create a graph provider based on model name.
 
     Args:
-        model_name: Type of model to use ("groq", "claude", "openai", or "deepseek")
+        model_name: Type of model to use ("groq", "claude", "openai", "deepseek", "fake", or "replay")
         verifier: NetLogoVerifier instance for code validation
         prompt_type: Type of prompt to use for code generation (configured by Gin)
         prompt_name: Name of prompt to use for code generation (configured by Gin)
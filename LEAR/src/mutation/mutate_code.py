@@ -17,19 +17,34 @@ print("Current working directory:", os.getcwd())
 
 from src.utils.config import load_config
 from src.verification.verify_netlogo import NetLogoVerifier
+from src.verification.rule_canonicalizer import DuplicateTracker, RuleCanonicalizer
 from src.utils import logging
+from src.utils.retry import create_prescreen, create_rule_repair
 from src.netlogo_code_generator.graph import NetLogoCodeGenerator
 from src.graph_providers.unified_provider import create_graph_provider
+from src.graph_providers.registry import get_provider, registry_stats
+from src.graph_providers.response_cache import create_response_cache
+from src.graph_providers.scheduler import scheduler_stats
+from src.netlogo_code_generator.speculation import speculation_stats
+from src.netlogo_code_generator.metrics import create_graph_metrics
+from src.verification.rule_repair import repair_stats
 
 config = load_config()
 logger = logging.get_logger()
 logger.info("Loading NetLogoVerifier...")
-verifier = NetLogoVerifier()
+# Parent rules and fallbacks are re-verified every generation, so keep a result cache
+verifier = NetLogoVerifier({"cache_size": 4096})
 logger.info("NetLogoVerifier loaded.")
+# Dry-runs verified rules on sampled sensor inputs (configured in default.gin)
+prescreen = create_prescreen(verifier)
+# Fixes mechanical verifier errors locally before another LLM retry (configured in default.gin)
+repair = create_rule_repair(verifier)
+# Structural duplicates among the rules produced in this run (see dedup_report)
+rule_tracker = DuplicateTracker(RuleCanonicalizer(verifier))
 
 def get_graph_provider(model_type: str):
-    """Get the appropriate Graph provider based on model type."""
-    return create_graph_provider(model_type, verifier)
+    """Get the appropriate Graph provider based on model type (one per model type until gin bindings change)."""
+    return get_provider((model_type, id(verifier)), lambda: create_graph_provider(model_type, verifier))
 
 def mutate_code(agent_info: list, model_type: str = "groq", use_text_evolution: bool = False) -> tuple:
     """
@@ -47,7 +62,7 @@ def mutate_code(agent_info: list, model_type: str = "groq", use_text_evolution:
         current_text = agent_info[5]
     
     provider = get_graph_provider(model_type)
-    graph_generator = NetLogoCodeGenerator(provider, verifier)
+    graph_generator = NetLogoCodeGenerator(provider, verifier, prescreen, repair=repair)
     result = graph_generator.generate_code(agent_info, current_text, use_text_evolution)
     
     # Check if result is a tuple (new_rule, modified_pseudocode)
@@ -59,10 +74,99 @@ def mutate_code(agent_info: list, model_type: str = "groq", use_text_evolution:
     
     logger.info(f"Graph-based code generation complete. Result code: {new_rule}")
     logger.info(f"Text: {text}")
-    
+    logger.info(f"Verifier cache stats: {verifier.cache_stats()}")
+    logger.info(f"Provider registry stats: {registry_stats()}")
+    response_cache = create_response_cache()
+    if response_cache is not None:
+        logger.info(f"Response cache stats: {response_cache.stats()}")
+    if graph_generator.candidates > 1:
+        logger.info(f"Speculative generation stats: {speculation_stats()}")
+    if repair is not None:
+        logger.info(f"Rule repair stats: {repair_stats()}")
+    if scheduler_stats():
+        logger.info(f"Request scheduler stats: {scheduler_stats()}")
+    _write_graph_metrics()
+    _track_mutation(agent_info, new_rule)
+
     return (new_rule, text)
 
 
+def mutate_population(agent_infos: list, model_type: str = "groq", use_text_evolution: bool = False,
+                      max_concurrency: int = 8) -> list:
+    """
+    Mutate a whole generation at once: the graph runs for all agents concurrently
+    (at most `max_concurrency` LLM requests in flight), so a generation costs about
+    one LLM latency instead of one per agent.
+
+    Args:
+        agent_infos: One agent_info list per agent, as passed to mutate_code
+        model_type: Type of model to use
+        use_text_evolution: Whether to use text-based evolution approach
+        max_concurrency: Maximum number of concurrent graph runs
+
+    Returns:
+        list: One (new_rule, text) tuple per agent, in input order
+    """
+    logger.info(f"Starting population mutation of {len(agent_infos)} agents with model type: {model_type}, "
+                f"use_text_evolution: {use_text_evolution}, max_concurrency: {max_concurrency}")
+    current_texts = [agent_info[5] if len(agent_info) > 5 else "" for agent_info in agent_infos]
+
+    provider = get_graph_provider(model_type)
+    graph_generator = NetLogoCodeGenerator(provider, verifier, prescreen, repair=repair)
+    results = graph_generator.generate_many(agent_infos, current_texts, use_text_evolution, max_concurrency)
+
+    logger.info(f"Population mutation complete for {len(results)} agents")
+    logger.info(f"Verifier cache stats: {verifier.cache_stats()}")
+    logger.info(f"Provider registry stats: {registry_stats()}")
+    if graph_generator.candidates > 1:
+        logger.info(f"Speculative generation stats: {speculation_stats()}")
+    if repair is not None:
+        logger.info(f"Rule repair stats: {repair_stats()}")
+    if scheduler_stats():
+        logger.info(f"Request scheduler stats: {scheduler_stats()}")
+    _write_graph_metrics()
+    duplicates = sum(_track_mutation(agent_info, new_rule) for agent_info, (new_rule, _) in zip(agent_infos, results))
+    report = rule_tracker.report(top=0)
+    logger.info(f"{duplicates} of {len(results)} mutations repeat their parent or an earlier rule; "
+                f"{report['duplicates']} of {report['rules']} rules so far are structural duplicates")
+
+    return results
+
+
+def _write_graph_metrics() -> None:
+    """Rewrite the graph metrics report (when create_graph_metrics is enabled in the gin config)."""
+    graph_metrics = create_graph_metrics()
+    if graph_metrics is not None:
+        logger.info(f"Graph metrics written to {graph_metrics.write()}")
+
+
+def _track_mutation(agent_info: list, new_rule: str) -> bool:
+    """
+    Record a mutation in the duplicate tracker, logging structural duplicates at
+    debug level. Returns True for a duplicate of the parent or an earlier rule.
+    """
+    try:
+        canonical = rule_tracker.canonicalizer.canonicalize(new_rule)
+        is_duplicate = rule_tracker.observe_canonical(canonical)
+        is_parent = bool(agent_info) and rule_tracker.canonicalizer.structural_hash(agent_info[0]) == canonical.hash
+    except Exception as e:
+        # Deduplication statistics never cost a mutation
+        logger.error(f"Could not track mutation {new_rule!r}: {e}", exc_info=True)
+        return False
+    if is_parent:
+        logger.debug(f"Mutation is structurally identical to the parent rule: {canonical.text}")
+    elif is_duplicate:
+        logger.debug(f"Mutation duplicates an earlier rule: {canonical.text}")
+    return is_parent or is_duplicate
+
+
+def dedup_report() -> dict:
+    """Duplicate report for the rules produced so far (callable from NetLogo via py:runresult)."""
+    report = rule_tracker.report()
+    logger.info(f"Rule dedup report: {report}")
+    return report
+
+
 
 if __name__ == "__main__":
     # Example usage
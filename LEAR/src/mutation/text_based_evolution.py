@@ -9,6 +9,8 @@ import gin
 
 from src.utils.storeprompts import prompts
 from src.graph_providers.base import GraphProviderBase
+from src.graph_providers.batching import batch_prompt, parse_sections
+from src.graph_providers.transcript import call_site
 
 
 # Removed unused EnvironmentContext dataclass
@@ -48,45 +50,124 @@ class TextBasedEvolution:
         Returns:
             Modified pseudocode
         """
-        if not self.provider:
-            self.logger.warning("No LLM provider available, using current text")
-            return current_text
-            
-        try:            
-            # Check if the evolution strategy exists
-            if "evolution_strategies" not in prompts or self.evolution_strategy not in prompts["evolution_strategies"]:
-                self.logger.warning(f"Evolution strategy '{self.evolution_strategy}' not found, falling back to simple strategy")
-                # Fall back to text_evolution for backward compatibility
-                if "text_evolution" in prompts:
-                    user_prompt = prompts["text_evolution"]["pseudocode_prompt"].format(current_text)
-                    self.logger.info("Using legacy text_evolution.pseudo_gen_prompt")
-                else:
-                    self.logger.error("No valid prompt found for pseudocode generation")
-                    return current_text
-            else:
-                # Use the configured evolution strategy
-                self.logger.info(f"Using evolution strategy: {self.evolution_strategy} for pseudocode generation")
-                user_prompt = prompts["evolution_strategies"][self.evolution_strategy]["pseudocode_prompt"].format(pseudocode=current_text)
-            
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", ""),
-                ("user", user_prompt)
-            ])
-                        
-            chain = prompt | self.provider.initialize_model() | StrOutputParser()
-            pseudocode_response = chain.invoke({"input": ""})
-            
-            if pseudocode_response:
-                # Parse the response to extract the pseudocode
-                match = re.search(r'```(.*?)```', pseudocode_response, re.DOTALL)
-                if match:
-                    pseudocode_response = match.group(1).strip()
-                else:
-                    self.logger.warning("No pseudocode found in response, using current text.")
-                    return current_text
-            
-            return pseudocode_response
+        try:
+            chain = self._pseudocode_chain(current_text)
+            if chain is None:
+                return current_text
+            with call_site("pseudocode", original_code):
+                response = chain.invoke({"input": ""})
+            return self._parse_pseudocode(response, current_text)
             
         except Exception as e:
             self.logger.error(f"Error generating pseudocode: {str(e)}")
             return current_text
+
+    async def agenerate_pseudocode(self, agent_info: list, current_text: str, original_code: str) -> str:
+        """Async version of generate_pseudocode, for concurrent graph runs."""
+        try:
+            chain = self._pseudocode_chain(current_text)
+            if chain is None:
+                return current_text
+            with call_site("pseudocode", original_code):
+                response = await chain.ainvoke({"input": ""})
+            return self._parse_pseudocode(response, current_text)
+
+        except Exception as e:
+            self.logger.error(f"Error generating pseudocode: {str(e)}")
+            return current_text
+
+    def generate_pseudocode_batch(self, current_texts: List[str], original_codes: List[str]) -> List[str]:
+        """
+        Modified pseudocode for several agents from one request (see batching.py).
+        Agents missing from the answer keep their current text.
+        """
+        try:
+            chain = self._batch_pseudocode_chain(current_texts)
+            if chain is None:
+                return list(current_texts)
+            with call_site("pseudocode_batch", "\n".join(original_codes)):
+                response = chain.invoke({"input": ""})
+            return self._parse_pseudocode_batch(response, current_texts)
+
+        except Exception as e:
+            self.logger.error(f"Error generating batched pseudocode: {str(e)}")
+            return list(current_texts)
+
+    async def agenerate_pseudocode_batch(self, current_texts: List[str], original_codes: List[str]) -> List[str]:
+        """Async version of generate_pseudocode_batch."""
+        try:
+            chain = self._batch_pseudocode_chain(current_texts)
+            if chain is None:
+                return list(current_texts)
+            with call_site("pseudocode_batch", "\n".join(original_codes)):
+                response = await chain.ainvoke({"input": ""})
+            return self._parse_pseudocode_batch(response, current_texts)
+
+        except Exception as e:
+            self.logger.error(f"Error generating batched pseudocode: {str(e)}")
+            return list(current_texts)
+
+    def _batch_pseudocode_chain(self, current_texts: List[str]):
+        """The pseudocode chain for several agents, or None when no provider or strategy prompt is available."""
+        if not self.provider:
+            self.logger.warning("No LLM provider available, using current text")
+            return None
+        strategy = prompts.get("evolution_strategies", {}).get(self.evolution_strategy)
+        if strategy is None:
+            self.logger.error(f"Evolution strategy '{self.evolution_strategy}' not found for batched pseudocode generation")
+            return None
+
+        self.logger.info(f"Using evolution strategy: {self.evolution_strategy} for batched pseudocode generation of {len(current_texts)} agents")
+        user_prompt = batch_prompt(strategy["pseudocode_prompt"], "pseudocode", current_texts)
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", ""),
+            ("user", user_prompt)
+        ])
+        return prompt | self.provider.initialize_model() | StrOutputParser()
+
+    def _parse_pseudocode_batch(self, response: str, current_texts: List[str]) -> List[str]:
+        sections = parse_sections(response, len(current_texts))
+        missing = sections.count(None)
+        if missing:
+            self.logger.warning(f"No pseudocode found for {missing} of {len(current_texts)} agents, using their current text.")
+        return [section if section is not None else text for section, text in zip(sections, current_texts)]
+
+    def _pseudocode_chain(self, current_text: str):
+        """The pseudocode prompt | model | parser chain, or None when no provider or prompt is available."""
+        if not self.provider:
+            self.logger.warning("No LLM provider available, using current text")
+            return None
+
+        # Check if the evolution strategy exists
+        if "evolution_strategies" not in prompts or self.evolution_strategy not in prompts["evolution_strategies"]:
+            self.logger.warning(f"Evolution strategy '{self.evolution_strategy}' not found, falling back to simple strategy")
+            # Fall back to text_evolution for backward compatibility
+            if "text_evolution" in prompts:
+                user_prompt = prompts["text_evolution"]["pseudocode_prompt"].format(current_text)
+                self.logger.info("Using legacy text_evolution.pseudo_gen_prompt")
+            else:
+                self.logger.error("No valid prompt found for pseudocode generation")
+                return None
+        else:
+            # Use the configured evolution strategy
+            self.logger.info(f"Using evolution strategy: {self.evolution_strategy} for pseudocode generation")
+            user_prompt = prompts["evolution_strategies"][self.evolution_strategy]["pseudocode_prompt"].format(pseudocode=current_text)
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", ""),
+            ("user", user_prompt)
+        ])
+        return prompt | self.provider.initialize_model() | StrOutputParser()
+
+    def _parse_pseudocode(self, pseudocode_response: str, current_text: str) -> str:
+        """Extract the pseudocode block from a response, keeping the current text when there is none."""
+        if pseudocode_response:
+            # Parse the response to extract the pseudocode
+            match = re.search(r'```(.*?)```', pseudocode_response, re.DOTALL)
+            if match:
+                pseudocode_response = match.group(1).strip()
+            else:
+                self.logger.warning("No pseudocode found in response, using current text.")
+                return current_text
+
+        return pseudocode_response
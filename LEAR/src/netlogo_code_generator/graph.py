@@ -2,35 +2,71 @@
 Main graph implementation for NetLogo code generation.
 """
 
-from typing import List
+import asyncio
+import gin
+from typing import List, Optional
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import StateGraph, END, START
 
 from src.generators.base import BaseCodeGenerator
 from src.verification.verify_netlogo import NetLogoVerifier
+from src.verification.rule_prescreen import RulePrescreen
+from src.verification.rule_repair import RuleRepair
 from src.utils.logging import get_logger
 from src.graph_providers.base import GraphProviderBase
+from src.graph_providers.registry import get_compiled_graph
+from src.netlogo_code_generator.metrics import create_graph_metrics
 from src.netlogo_code_generator.state import GenerationState
+from src.mutation.text_based_evolution import TextBasedEvolution
 from src.netlogo_code_generator.nodes import (
     evolve_pseudocode,
+    aevolve_pseudocode,
     generate_code,
+    agenerate_code,
     verify_code,
+    generate_candidates,
+    agenerate_candidates,
+    check_code,
+    record_verification,
+    repair_code,
     should_retry)
 
+
+def _generator(config: RunnableConfig) -> "NetLogoCodeGenerator":
+    """The generator running the graph, from the run config."""
+    return config["configurable"]["generator"]
+
+
+@gin.configurable
 class NetLogoCodeGenerator(BaseCodeGenerator):
     """
     NetLogo code generator using LangGraph for structured generation flow.
     """
     
-    def __init__(self, provider: GraphProviderBase, verifier: NetLogoVerifier):
+    def __init__(self, provider: GraphProviderBase, verifier: NetLogoVerifier,
+                 prescreen: Optional[RulePrescreen] = None, candidates: int = 1, batch_size: int = 1,
+                 repair: Optional[RuleRepair] = None):
         """
         Initialize with graph provider and verifier.
         
         Args:
             provider: GraphProviderBase implementation
             verifier: NetLogoVerifier instance for code validation
+            prescreen: Optional RulePrescreen that dry-runs verified code for runtime errors
+            candidates: Candidate rules requested in parallel per attempt; above 1 the first
+                        one that passes verification wins (see speculation.py)
+            batch_size: Agents per request in the first attempt of generate_many; above 1
+                        several agents share one prompt (see batching.py)
+            repair: Optional RuleRepair that fixes mechanical verifier errors locally
+                    before another LLM retry is spent
         """
         super().__init__(verifier)
         self.provider = provider
+        self.prescreen = prescreen
+        self.candidates = max(1, candidates)
+        self.batch_size = max(1, batch_size)
+        self.repair = repair
+        self.metrics = create_graph_metrics()
         self.logger = get_logger()
         
     def _build_graph(self) -> StateGraph:
@@ -42,28 +78,85 @@ class NetLogoCodeGenerator(BaseCodeGenerator):
         """
         # Create the graph
         workflow = StateGraph(GenerationState)
-        
-        # Add nodes with bound parameters
+
+        # Compiled graphs are shared by generators with the same structure, so the nodes
+        # take the provider, verifier, prescreen and repair of the generator running
+        # them from the run config (see _run_config), never from this instance
+        async def aevolve(state: GenerationState, config: RunnableConfig) -> GenerationState:
+            return await aevolve_pseudocode(state, _generator(config).provider)
+
+        async def agenerate(state: GenerationState, config: RunnableConfig) -> GenerationState:
+            return await agenerate_code(state, _generator(config).provider)
+
+        def verify(state: GenerationState, config: RunnableConfig) -> GenerationState:
+            generator = _generator(config)
+            return verify_code(state, generator.verifier, generator.prescreen)
+
+        async def averify(state: GenerationState, config: RunnableConfig) -> GenerationState:
+            # Verification is quick and CPU-bound: run it on the event loop, not in worker threads
+            generator = _generator(config)
+            return verify_code(state, generator.verifier, generator.prescreen)
+
+        def generate_verified(state: GenerationState, config: RunnableConfig) -> GenerationState:
+            generator = _generator(config)
+            return generate_candidates(state, generator.provider, generator.verifier, generator.prescreen,
+                                       generator.candidates)
+
+        async def agenerate_verified(state: GenerationState, config: RunnableConfig) -> GenerationState:
+            generator = _generator(config)
+            return await agenerate_candidates(state, generator.provider, generator.verifier, generator.prescreen,
+                                              generator.candidates)
+
+        def repair(state: GenerationState, config: RunnableConfig) -> GenerationState:
+            generator = _generator(config)
+            return repair_code(state, generator.repair, generator.verifier, generator.prescreen)
+
+        async def arepair(state: GenerationState, config: RunnableConfig) -> GenerationState:
+            generator = _generator(config)
+            return repair_code(state, generator.repair, generator.verifier, generator.prescreen)
+
+        # Add nodes with bound parameters. Each node also has an async version, used by
+        # `ainvoke`/`abatch` so concurrent runs overlap their LLM requests
         workflow.add_node(
             "evolve_pseudocode", 
-            lambda state: evolve_pseudocode(state, self.provider)
-        )
-        workflow.add_node(
-            "generate_code", 
-            lambda state: generate_code(state, self.provider)
+            RunnableLambda(lambda state, config: evolve_pseudocode(state, _generator(config).provider),
+                           afunc=aevolve)
         )
-        workflow.add_node(
-            "verify_code", 
-            lambda state: verify_code(state, self.verifier)
-        )
-        
-        # Define edges
-        # workflow.add_edge(START, "evolve_pseudocode")
-        workflow.add_edge("evolve_pseudocode", "generate_code")
-        workflow.add_edge("generate_code", "verify_code")
-        
-        workflow.add_conditional_edges("verify_code", should_retry, {"retry": "generate_code", "end": END})
-                
+        if self.candidates > 1:
+            # Speculative generation verifies its candidates itself and only retries when all fail
+            workflow.add_node(
+                "generate_candidates",
+                RunnableLambda(generate_verified, afunc=agenerate_verified)
+            )
+            workflow.add_edge("evolve_pseudocode", "generate_candidates")
+            verified, retry = "generate_candidates", "generate_candidates"
+        else:
+            workflow.add_node(
+                "generate_code", 
+                RunnableLambda(lambda state, config: generate_code(state, _generator(config).provider),
+                               afunc=agenerate)
+            )
+            workflow.add_node(
+                "verify_code", 
+                RunnableLambda(verify, afunc=averify)
+            )
+
+            # Define edges
+            # workflow.add_edge(START, "evolve_pseudocode")
+            workflow.add_edge("evolve_pseudocode", "generate_code")
+            workflow.add_edge("generate_code", "verify_code")
+            verified, retry = "verify_code", "generate_code"
+
+        if self.repair is not None:
+            # Mechanical errors are fixed locally; only the rest go back to the LLM
+            workflow.add_node(
+                "repair_code",
+                RunnableLambda(repair, afunc=arepair)
+            )
+            workflow.add_edge(verified, "repair_code")
+            verified = "repair_code"
+        workflow.add_conditional_edges(verified, should_retry, {"retry": retry, "end": END})
+
         workflow.set_entry_point("evolve_pseudocode")
         
         self.logger.info("Compiling the graph...")
@@ -96,9 +189,144 @@ class NetLogoCodeGenerator(BaseCodeGenerator):
         self.logger.info(f"Original code: {agent_info[0]}")
         self.logger.info(f"Initial text: {initial_pseudocode}")
 
-        # Initial state
-        self.logger.info("Creating initial state")
-        initial_state = {
+        # Run the graph
+        self.logger.info("Invoking the graph with initial state")
+        final_state = self._graph().invoke(self._initial_state(agent_info, initial_pseudocode, use_text_evolution),
+                                           config=self._run_config("graph_run"))
+        return self._result(final_state, agent_info, initial_pseudocode)
+
+    async def agenerate_many(self, agent_infos: List[List], initial_pseudocodes: List[str],
+                             use_text_evolution: bool = False, max_concurrency: int = 8) -> List[tuple]:
+        """
+        Run the graph for many agents concurrently (`abatch`), at most
+        `max_concurrency` runs at a time. With `batch_size` above 1 the first
+        attempt is batched (see _afirst_attempts) and only the agents it did not
+        settle run the graph.
+
+        Args:
+            agent_infos: One agent_info list per agent
+            initial_pseudocodes: The agents' current pseudocode, in the same order
+            use_text_evolution: Whether to use text-based evolution approach
+            max_concurrency: Maximum number of graph runs in flight
+
+        Returns:
+            One (generated_code, text) tuple per agent, in input order. Agents whose
+            input is invalid or whose run fails keep their original code and text.
+        """
+        self.logger.info(f"Starting concurrent code generation for {len(agent_infos)} agents, max_concurrency: {max_concurrency}")
+        results = []
+        pending = []
+        for index, (agent_info, initial_pseudocode) in enumerate(zip(agent_infos, initial_pseudocodes)):
+            is_valid, error_msg = self.validate_input(agent_info)
+            if not is_valid:
+                self.logger.error(f"Invalid input for agent {index}: {error_msg}")
+                results.append((agent_info[0], initial_pseudocode))
+            else:
+                results.append(None)
+                pending.append(index)
+
+        states = [self._initial_state(agent_infos[i], initial_pseudocodes[i], use_text_evolution) for i in pending]
+        final_states = [None] * len(states)
+        if self.batch_size > 1:
+            for position, (state, settled) in enumerate(await self._afirst_attempts(states, max_concurrency)):
+                states[position] = state
+                if settled:
+                    final_states[position] = state
+
+        requeued = [position for position, final_state in enumerate(final_states) if final_state is None]
+        if requeued:
+            graph_states = await self._graph().abatch([states[position] for position in requeued],
+                                                      config={**self._run_config("graph_run"),
+                                                              "max_concurrency": max_concurrency},
+                                                      return_exceptions=True)
+            for position, final_state in zip(requeued, graph_states):
+                final_states[position] = final_state
+        for index, final_state in zip(pending, final_states):
+            if isinstance(final_state, Exception):
+                self.logger.error(f"Graph execution failed for agent {index}: {final_state}")
+                results[index] = (agent_infos[index][0], initial_pseudocodes[index])
+            else:
+                results[index] = self._result(final_state, agent_infos[index], initial_pseudocodes[index])
+        return results
+
+    def generate_many(self, agent_infos: List[List], initial_pseudocodes: List[str],
+                      use_text_evolution: bool = False, max_concurrency: int = 8) -> List[tuple]:
+        """
+        Blocking wrapper around agenerate_many for synchronous callers (e.g. NetLogo's
+        py extension). Must not be called from a running event loop; await
+        agenerate_many there instead.
+        """
+        return asyncio.run(self.agenerate_many(agent_infos, initial_pseudocodes, use_text_evolution, max_concurrency))
+
+    async def _afirst_attempts(self, states: List[GenerationState], max_concurrency: int) -> List[tuple]:
+        """
+        First attempt of every agent, `batch_size` agents per request: one request
+        evolves their pseudocode, one generates their code, and every code is
+        verified on its own.
+
+        Returns:
+            (state, settled) per agent: settled states passed verification; the others
+            re-queue into the graph, with the verifier's error when their code failed
+            (error-guided retry) or unchanged when the answer had no code for them
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        first_attempt = RunnableLambda(self._afirst_attempt)
+        config = self._run_config("first_attempt_batch")
+
+        async def attempt(batch: List[GenerationState]) -> List[tuple]:
+            async with semaphore:
+                return await first_attempt.ainvoke(batch, config=config)
+
+        batches = [states[start:start + self.batch_size] for start in range(0, len(states), self.batch_size)]
+        results = await asyncio.gather(*(attempt(batch) for batch in batches))
+        attempts = [result for batch_results in results for result in batch_results]
+        settled = sum(1 for _, is_settled in attempts if is_settled)
+        self.logger.info(f"Batched first attempt: {len(batches)} requests for {len(states)} agents, "
+                         f"{settled} settled, {len(states) - settled} re-queued")
+        return attempts
+
+    async def _afirst_attempt(self, states: List[GenerationState]) -> List[tuple]:
+        if states[0]["use_text_evolution"]:
+            texts = await TextBasedEvolution(self.provider).agenerate_pseudocode_batch(
+                [state["initial_pseudocode"] for state in states], [state["original_code"] for state in states])
+            # The pseudocode is evolved now; re-queued runs go straight to code generation
+            states = [{**state, "modified_pseudocode": text, "use_text_evolution": False}
+                      for state, text in zip(states, texts)]
+
+        codes = await self.provider.agenerate_codes_from_states(states)
+        if codes is None:
+            return [(state, False) for state in states]
+
+        attempts = []
+        for state, code in zip(states, codes):
+            if code is None:
+                attempts.append((state, False))
+                continue
+            is_safe, error_message = check_code(code, self.verifier, self.prescreen)
+            verified = record_verification({**state, "current_code": code}, is_safe, error_message)
+            if not is_safe and self.repair is not None:
+                verified = repair_code(verified, self.repair, self.verifier, self.prescreen)
+            attempts.append((verified, verified["error_message"] is None))
+        return attempts
+
+    def _graph(self):
+        """The compiled graph, shared by every generator with the same nodes (speculative or not, with or without repair)."""
+        graph_key = ("netlogo_code_generator", self.candidates > 1, self.repair is not None)
+        return get_compiled_graph(graph_key, self._build_graph)
+
+    def _run_config(self, run_name: str) -> dict:
+        """
+        Invocation config of a run: this generator, whose collaborators the graph
+        nodes use, and the metrics callback handler when graph metrics are enabled.
+        """
+        config = {"configurable": {"generator": self}}
+        if self.metrics is None:
+            return config
+        return {**config, "run_name": run_name, "callbacks": [self.metrics.handler(self.provider.metrics_labels())]}
+
+    def _initial_state(self, agent_info: List, initial_pseudocode: str, use_text_evolution: bool) -> GenerationState:
+        return {
             "original_code": agent_info[0],
             "current_code": agent_info[0],
             "agent_info": agent_info,
@@ -109,16 +337,9 @@ class NetLogoCodeGenerator(BaseCodeGenerator):
             "initial_pseudocode": initial_pseudocode
         }
 
-        # Build and compile the graph
-        self.logger.info("Building and compiling the graph")
-        app = self._build_graph()
-
-        # Run the graph
-        self.logger.info("Invoking the graph with initial state")
-        final_state = app.invoke(initial_state)
+    def _result(self, final_state: GenerationState, agent_info: List, initial_pseudocode: str) -> tuple:
+        """The (code, text) result of a finished graph run, or the original code and text if it failed."""
         self.logger.info(f"Graph execution complete, error_message: {final_state['error_message']}, retry_count: {final_state['retry_count']}")
-
-        # Return the result or original code if failed
         if final_state["error_message"] is None:
             self.logger.info("Code generation successful, returning new code and text")
             # Get the final text - either the modified pseudocode or the initial one if no modification was done
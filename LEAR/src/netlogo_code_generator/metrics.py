@@ -0,0 +1,434 @@
+"""
+Per-node latency, token and retry metrics of the code generation graph.
+
+With `create_graph_metrics.enabled = True`, NetLogoCodeGenerator attaches a
+GraphRunMetrics callback handler to every graph run (and to every batched first
+attempt). From the LangChain callbacks of the run it records:
+- wall time of the run and of each node
+- per LLM request: node, total time, time to the first streamed token, and the
+  input/output tokens of the provider's usage metadata
+- retry count and outcome of the run
+- verifier (and prescreen) time, reported by check_code as a custom event
+
+GraphMetrics aggregates the runs per provider, model, prompt_type, prompt_name
+and kind (graph run or batched first attempt): p50/p95/p99 over the latest
+`max_samples` runs, token totals over all of them. `write()` writes the
+aggregates to a JSONL or Prometheus text file; `runs_path` additionally
+appends every run record as a JSON line.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import gin
+from langchain_core.callbacks import BaseCallbackHandler, dispatch_custom_event
+from langchain_core.runnables.config import var_child_runnable_config
+
+from src.utils.logging import get_logger
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+FORMATS = ("jsonl", "prometheus")
+VERIFICATION_EVENT = "lear_verification"
+QUANTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+PROVIDER_LABELS = ("provider", "model", "prompt_type", "prompt_name")
+# Graph runs and batched first attempts ("kind") are aggregated separately
+LABELS = PROVIDER_LABELS + ("kind",)
+
+logger = get_logger()
+
+
+def record_verifier_time(seconds: float) -> None:
+    """Report verifier time to the metrics handler of the graph run this is called from, if any."""
+    config = var_child_runnable_config.get()
+    if not config or not config.get("callbacks"):
+        return
+    try:
+        dispatch_custom_event(VERIFICATION_EVENT, {"seconds": seconds})
+    except RuntimeError:
+        pass  # Not inside a run
+
+
+def _percentiles(values) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50/p95/p99 of `values`."""
+    values = sorted(values)
+    if not values:
+        return {name: None for name, _ in QUANTILES}
+    return {name: round(values[min(len(values) - 1, int(q * len(values)))], 4) for name, q in QUANTILES}
+
+
+class GraphRunMetrics(BaseCallbackHandler):
+    """
+    LangChain callback handler recording the runs it is attached to.
+
+    One handler can watch many concurrent runs (`abatch`): every callback is
+    traced back to its root run. A chat model wrapping another one (response
+    cache, transcript recorder) counts as one request, with the usage metadata
+    of the inner model when the outer one has none.
+    """
+
+    run_inline = True  # Keep callbacks in order and on the calling thread
+
+    def __init__(self, collector: "GraphMetrics", labels: Dict[str, str]):
+        self.collector = collector
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+        self._root_of: Dict[UUID, UUID] = {}
+        self._nodes: Dict[UUID, tuple] = {}
+        self._requests: Dict[UUID, Dict[str, Any]] = {}
+        self._outer_request: Dict[UUID, UUID] = {}
+
+    # --- Runs and nodes ---
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                       **kwargs: Any) -> None:
+        name = kwargs.get("name")
+        with self._lock:
+            if parent_run_id is None:
+                self._runs[run_id] = {"kind": name, "started": time.perf_counter(), "nodes": defaultdict(float),
+                                      "node_calls": defaultdict(int), "requests": [], "verifier_seconds": 0.0}
+                self._root_of[run_id] = run_id
+                return
+            root = self._root_of.get(parent_run_id)
+            if root is None:
+                return
+            self._root_of[run_id] = root
+            if parent_run_id == root and (metadata or {}).get("langgraph_node") == name:
+                self._nodes[run_id] = (root, name, time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_chain(run_id, outputs, None)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_chain(run_id, None, error)
+
+    def _end_chain(self, run_id: UUID, outputs: Any, error: Optional[BaseException]) -> None:
+        with self._lock:
+            root = self._root_of.pop(run_id, None)
+            node = self._nodes.pop(run_id, None)
+            if node is not None and node[0] in self._runs:
+                run = self._runs[node[0]]
+                run["nodes"][node[1]] += time.perf_counter() - node[2]
+                run["node_calls"][node[1]] += 1
+            if root != run_id:
+                return
+            run = self._runs.pop(run_id)
+            # Requests still in flight (cancelled candidates) are not counted
+            self._root_of = {child: parent for child, parent in self._root_of.items() if parent != run_id}
+        self.collector.record(self._run_record(run, outputs, error))
+
+    def _run_record(self, run: Dict[str, Any], outputs: Any, error: Optional[BaseException]) -> Dict[str, Any]:
+        if isinstance(outputs, dict):
+            agents, retries = 1, outputs.get("retry_count", 0)
+            success = error is None and outputs.get("error_message") is None
+        elif isinstance(outputs, list):
+            # Batched first attempt: (state, settled) per agent
+            agents, retries = len(outputs), 0
+            success = error is None and all(settled for _, settled in outputs)
+        else:
+            agents, retries, success = 1, 0, False
+        requests = run["requests"]
+        return {
+            **self.labels,
+            "kind": run["kind"],
+            "agents": agents,
+            "success": success,
+            "retries": retries,
+            "wall_seconds": round(time.perf_counter() - run["started"], 4),
+            "nodes": {name: round(seconds, 4) for name, seconds in run["nodes"].items()},
+            "node_calls": dict(run["node_calls"]),
+            "verifier_seconds": round(run["verifier_seconds"], 4),
+            "input_tokens": sum(request["input_tokens"] for request in requests),
+            "output_tokens": sum(request["output_tokens"] for request in requests),
+            "requests": requests,
+        }
+
+    # --- LLM requests ---
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                            **kwargs: Any) -> None:
+        with self._lock:
+            root = self._root_of.get(parent_run_id)
+            if root is None:
+                return
+            self._root_of[run_id] = root
+            if parent_run_id in self._requests or parent_run_id in self._outer_request:
+                # A wrapped model (cache, transcript): part of the outermost request
+                self._outer_request[run_id] = self._outer_request.get(parent_run_id, parent_run_id)
+                return
+            self._requests[run_id] = {"root": root, "started": time.perf_counter(), "first_token": None,
+                                      "node": (metadata or {}).get("langgraph_node") or self._runs[root]["kind"],
+                                      "usage": None}
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            request = self._requests.get(self._outer_request.get(run_id, run_id))
+            if request is not None and request["first_token"] is None:
+                request["first_token"] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        usage = None
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or usage
+        self._end_request(run_id, usage, "ok")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # Streams closed by the consumer (early stop, streaming verification) end here too
+        status = "cancelled" if isinstance(error, (GeneratorExit, asyncio.CancelledError)) else "error"
+        self._end_request(run_id, None, status)
+
+    def _end_request(self, run_id: UUID, usage: Optional[Dict[str, int]], status: str) -> None:
+        with self._lock:
+            self._root_of.pop(run_id, None)
+            outer = self._outer_request.pop(run_id, None)
+            if outer is not None:
+                if usage and outer in self._requests and self._requests[outer]["usage"] is None:
+                    self._requests[outer]["usage"] = usage
+                return
+            request = self._requests.pop(run_id, None)
+            if request is None or request["root"] not in self._runs:
+                return
+            usage = usage or request["usage"] or {}
+            now = time.perf_counter()
+            self._runs[request["root"]]["requests"].append({
+                "node": request["node"],
+                "status": status,
+                "seconds": round(now - request["started"], 4),
+                "first_token_seconds": round(request["first_token"] - request["started"], 4)
+                if request["first_token"] is not None else None,
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+            })
+
+    # --- Verifier ---
+
+    def on_custom_event(self, name: str, data: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        if name != VERIFICATION_EVENT:
+            return
+        with self._lock:
+            run = self._runs.get(self._root_of.get(run_id))
+            if run is not None:
+                run["verifier_seconds"] += data["seconds"]
+
+
+class GraphMetrics:
+    """
+    Aggregated graph run metrics, per provider, model, prompt_type, prompt_name and kind.
+
+    Public Methods:
+    - handler(labels) -> GraphRunMetrics: Callback handler recording runs with these labels
+    - record(run: Dict): Count one finished run
+    - report() -> List[Dict]: Per-label percentiles and totals
+    - write() -> str: Write the report to `path`, returning the path
+    - reset(): Forget all runs
+    """
+
+    def __init__(self, path: str, format: str = "jsonl", runs_path: Optional[str] = None,
+                 max_samples: int = 10000):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown metrics format: {format} (expected {', '.join(FORMATS)})")
+        self.path = path
+        self.format = format
+        self.runs_path = runs_path
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._groups: Dict[tuple, Dict[str, Any]] = {}
+
+    def handler(self, labels: Dict[str, str]) -> GraphRunMetrics:
+        return GraphRunMetrics(self, {label: str(labels.get(label)) for label in PROVIDER_LABELS})
+
+    def _group(self, key: tuple) -> Dict[str, Any]:
+        group = self._groups.get(key)
+        if group is None:
+            samples = lambda: deque(maxlen=self.max_samples)
+            group = {"counters": defaultdict(float), "samples": defaultdict(samples),
+                     "nodes": defaultdict(samples)}
+            self._groups[key] = group
+        return group
+
+    def record(self, run: Dict[str, Any]) -> None:
+        with self._lock:
+            group = self._group(tuple(run[label] for label in LABELS))
+            counters, samples = group["counters"], group["samples"]
+            counters["runs"] += 1
+            counters["agents"] += run["agents"]
+            counters["successes"] += int(run["success"])
+            counters["retries"] += run["retries"]
+            counters["wall_seconds"] += run["wall_seconds"]
+            counters["verifier_seconds"] += run["verifier_seconds"]
+            counters["input_tokens"] += run["input_tokens"]
+            counters["output_tokens"] += run["output_tokens"]
+            samples["wall_seconds"].append(run["wall_seconds"])
+            samples["verifier_seconds"].append(run["verifier_seconds"])
+            samples["retries"].append(run["retries"])
+            for node, seconds in run["nodes"].items():
+                group["nodes"][node].append(seconds)
+            for request in run["requests"]:
+                counters["requests"] += 1
+                counters[f"requests_{request['status']}"] += 1
+                counters["request_seconds"] += request["seconds"]
+                samples["request_seconds"].append(request["seconds"])
+                if request["first_token_seconds"] is not None:
+                    samples["first_token_seconds"].append(request["first_token_seconds"])
+            if self.runs_path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.runs_path)), exist_ok=True)
+                with open(self.runs_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"time": time.time(), **run}) + "\n")
+
+    def report(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            report = []
+            for key, group in sorted(self._groups.items()):
+                counters, samples = group["counters"], group["samples"]
+                runs, requests = int(counters["runs"]), int(counters["requests"])
+                report.append({
+                    **dict(zip(LABELS, key)),
+                    "runs": runs,
+                    "agents": int(counters["agents"]),
+                    "success_rate": round(counters["successes"] / runs, 4),
+                    "mean_retries": round(counters["retries"] / runs, 4),
+                    "retries": _percentiles(samples["retries"]),
+                    "wall_seconds": _percentiles(samples["wall_seconds"]),
+                    "nodes": {node: _percentiles(values) for node, values in sorted(group["nodes"].items())},
+                    "verifier_seconds": _percentiles(samples["verifier_seconds"]),
+                    "requests": requests,
+                    "cancelled_requests": int(counters["requests_cancelled"]),
+                    "failed_requests": int(counters["requests_error"]),
+                    "request_seconds": _percentiles(samples["request_seconds"]),
+                    "first_token_seconds": _percentiles(samples["first_token_seconds"]),
+                    "input_tokens": int(counters["input_tokens"]),
+                    "output_tokens": int(counters["output_tokens"]),
+                    "output_tokens_per_second": round(counters["output_tokens"] / counters["request_seconds"], 2)
+                    if counters["request_seconds"] else None,
+                    # Sums over all runs, for rates (the percentiles cover the latest max_samples runs)
+                    "totals": {name: round(counters[name], 4) for name in
+                               ("wall_seconds", "verifier_seconds", "request_seconds", "retries")},
+                })
+            return report
+
+    def write(self) -> str:
+        """Write the report to `path` (replacing it), as JSON lines or Prometheus text."""
+        report = self.report()
+        if self.format == "jsonl":
+            text = "".join(json.dumps(group) + "\n" for group in report)
+        else:
+            text = _prometheus(report)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temporary, self.path)
+        return self.path
+
+    def reset(self) -> None:
+        with self._lock:
+            self._groups.clear()
+
+
+def _prometheus(report: List[Dict[str, Any]]) -> str:
+    """The report in the Prometheus text exposition format."""
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP lear_{name} {help_text}")
+        lines.append(f"# TYPE lear_{name} {kind}")
+
+    def labels(group: Dict[str, Any], **extra: str) -> str:
+        pairs = [(label, group[label]) for label in LABELS] + list(extra.items())
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def summary(name: str, group: Dict[str, Any], quantiles: Dict[str, Optional[float]],
+                total: float, count: int, **extra: str) -> None:
+        for quantile_name, quantile in QUANTILES:
+            if quantiles[quantile_name] is not None:
+                lines.append(f"lear_{name}{labels(group, **extra, quantile=str(quantile))} {quantiles[quantile_name]}")
+        lines.append(f"lear_{name}_sum{labels(group, **extra)} {round(total, 4)}")
+        lines.append(f"lear_{name}_count{labels(group, **extra)} {count}")
+
+    metric("graph_runs_total", "counter", "Finished graph runs")
+    for group in report:
+        lines.append(f"lear_graph_runs_total{labels(group)} {group['runs']}")
+    metric("graph_run_success_ratio", "gauge", "Fraction of runs that ended with verified code")
+    for group in report:
+        lines.append(f"lear_graph_run_success_ratio{labels(group)} {group['success_rate']}")
+    metric("graph_run_seconds", "summary", "Wall time of a graph run")
+    for group in report:
+        summary("graph_run_seconds", group, group["wall_seconds"], group["totals"]["wall_seconds"], group["runs"])
+    metric("graph_node_seconds", "summary", "Wall time of a node execution (quantiles only)")
+    for group in report:
+        for node, quantiles in group["nodes"].items():
+            for quantile_name, quantile in QUANTILES:
+                if quantiles[quantile_name] is not None:
+                    lines.append(f"lear_graph_node_seconds{labels(group, node=node, quantile=str(quantile))} "
+                                 f"{quantiles[quantile_name]}")
+    metric("graph_retries", "summary", "Error-guided retries per graph run")
+    for group in report:
+        summary("graph_retries", group, group["retries"], group["totals"]["retries"], group["runs"])
+    metric("verifier_seconds", "summary", "Verifier and prescreen time per graph run")
+    for group in report:
+        summary("verifier_seconds", group, group["verifier_seconds"], group["totals"]["verifier_seconds"],
+                group["runs"])
+    metric("llm_request_seconds", "summary", "Total time of an LLM request")
+    for group in report:
+        summary("llm_request_seconds", group, group["request_seconds"], group["totals"]["request_seconds"],
+                group["requests"])
+    metric("llm_first_token_seconds", "summary", "Time to the first streamed token (quantiles only)")
+    for group in report:
+        for quantile_name, quantile in QUANTILES:
+            if group["first_token_seconds"][quantile_name] is not None:
+                lines.append(f"lear_llm_first_token_seconds{labels(group, quantile=str(quantile))} "
+                             f"{group['first_token_seconds'][quantile_name]}")
+    metric("llm_requests_total", "counter", "LLM requests by outcome")
+    for group in report:
+        cancelled, failed = group["cancelled_requests"], group["failed_requests"]
+        for status, count in (("ok", group["requests"] - cancelled - failed), ("cancelled", cancelled),
+                              ("error", failed)):
+            lines.append(f"lear_llm_requests_total{labels(group, status=status)} {count}")
+    metric("llm_tokens_total", "counter", "Tokens from the providers' usage metadata")
+    for group in report:
+        for direction in ("input", "output"):
+            lines.append(f"lear_llm_tokens_total{labels(group, direction=direction)} {group[f'{direction}_tokens']}")
+    return "\n".join(lines) + "\n"
+
+
+_metrics: Dict[str, GraphMetrics] = {}
+_metrics_lock = threading.Lock()
+
+
+@gin.configurable
+def create_graph_metrics(enabled: bool = False, path: str = "Metrics/graph_metrics.jsonl",
+                         format: str = "jsonl", runs_path: Optional[str] = None,
+                         max_samples: int = 10000) -> Optional[GraphMetrics]:
+    """
+    The process-wide graph metrics written to `path` (relative paths start at the
+    LEAR directory), or None when metrics are disabled.
+
+    Args:
+        enabled: Record graph run metrics
+        path: Aggregate report file, rewritten by `write()`
+        format: "jsonl" (one line per label set) or "prometheus" (text exposition format)
+        runs_path: Optional JSONL file every run record is appended to
+        max_samples: Latest runs per label set the percentiles are computed over
+    """
+    if not enabled:
+        return None
+    path = str(PROJECT_ROOT / path)
+    with _metrics_lock:
+        metrics = _metrics.get(path)
+        if metrics is None:
+            metrics = GraphMetrics(path, format, str(PROJECT_ROOT / runs_path) if runs_path else None, max_samples)
+            _metrics[path] = metrics
+            logger.info(f"Recording graph metrics to {path}")
+        return metrics
@@ -2,13 +2,21 @@
 Node implementations for the NetLogo code generation graph.
 """
 
+import asyncio
+import contextvars
 import logging
-from typing import Dict, Any
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional, Tuple
 
 from src.netlogo_code_generator.state import GenerationState
 from src.mutation.text_based_evolution import TextBasedEvolution
 from src.graph_providers.base import GraphProviderBase
 from src.verification.verify_netlogo import NetLogoVerifier
+from src.verification.rule_prescreen import RulePrescreen
+from src.verification.rule_repair import RuleRepair
+from src.netlogo_code_generator.metrics import record_verifier_time
+from src.netlogo_code_generator.speculation import CandidateRound
 from src.utils.logging import get_logger
 
 # Get the global logger instance
@@ -99,9 +107,67 @@ def generate_code(
     logger.info(f"Generated new code (sample): {code_sample}")
     return {**state, "current_code": new_code}
 
+async def aevolve_pseudocode(
+    state: GenerationState,
+    provider: GraphProviderBase,
+) -> GenerationState:
+    """
+    Async version of evolve_pseudocode, used when many graph runs are awaited concurrently.
+    """
+    logger.info(f"NODE: evolve_pseudocode (async), use_text_evolution: {state.get('use_text_evolution', False)}")
+    if not state["use_text_evolution"]:
+        return state
+
+    text_evolution = TextBasedEvolution(provider)
+    modified_pseudocode = await text_evolution.agenerate_pseudocode(
+        state["agent_info"],
+        state["initial_pseudocode"],
+        state["original_code"]
+    )
+    logger.info(f"Generated modified pseudocode (sample): \n{modified_pseudocode}")
+    return {**state, "modified_pseudocode": modified_pseudocode}
+
+async def agenerate_code(
+    state: GenerationState,
+    provider: GraphProviderBase
+) -> GenerationState:
+    """
+    Async version of generate_code, used when many graph runs are awaited concurrently.
+    """
+    logger.info(f"NODE: generate_code (async) - retry_count: {state.get('retry_count', 0)}, error_message: {state.get('error_message', None)}")
+    try:
+        new_code = await provider.agenerate_code_from_state(state)
+    except Exception as e:
+        logger.error(f"Error generating code: {str(e)}")
+        new_code = state["current_code"]
+
+    logger.info(f"Generated new code (sample): {new_code}")
+    return {**state, "current_code": new_code}
+
+def check_code(
+    code: str,
+    verifier: NetLogoVerifier,
+    prescreen: Optional[RulePrescreen] = None
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a rule, then dry-run it with the prescreen if one is given.
+
+    Returns:
+        (is_safe, error_message)
+    """
+    started = time.perf_counter()
+    # Report every independent error so one retry can fix them all
+    is_safe, error_message = verifier.is_safe(code, report_all=True)
+    if is_safe and prescreen is not None:
+        # Dry-run on sampled sensor inputs so runtime errors are retried instead of logged by NetLogo
+        is_safe, error_message = prescreen.is_safe(code)
+    record_verifier_time(time.perf_counter() - started)
+    return is_safe, error_message
+
 def verify_code(
     state: GenerationState, 
-    verifier: NetLogoVerifier
+    verifier: NetLogoVerifier,
+    prescreen: Optional[RulePrescreen] = None
 ) -> GenerationState:
     """
     Verify the generated code.
@@ -109,13 +175,18 @@ def verify_code(
     Args:
         state: Current generation state
         verifier: NetLogo verifier for code validation
+        prescreen: Optional runtime prescreen, run on code that passes the verifier
         
     Returns:
         Updated generation state with verification results
     """
     logger.info(f"NODE: verify_code - current retry count: {state.get('retry_count', 0)}")
     
-    is_safe, error_message = verifier.is_safe(state["current_code"])
+    is_safe, error_message = check_code(state["current_code"], verifier, prescreen)
+    return record_verification(state, is_safe, error_message)
+
+def record_verification(state: GenerationState, is_safe: bool, error_message: Optional[str]) -> GenerationState:
+    """State after verifying its current code: the error and retry count for should_retry."""
     error_msg_sample = error_message if error_message else None
     logger.info(f"Verification result: is_safe={is_safe}, error_message={error_msg_sample}")
     
@@ -140,6 +211,40 @@ def verify_code(
     
     return result
 
+def repair_code(
+    state: GenerationState,
+    repair: RuleRepair,
+    verifier: NetLogoVerifier,
+    prescreen: Optional[RulePrescreen] = None
+) -> GenerationState:
+    """
+    Repair code that failed verification locally (see rule_repair.py), so
+    should_retry only asks the LLM again when the repair fails.
+
+    Args:
+        state: Generation state after verification
+        repair: RuleRepair for the mechanical fixes
+        verifier: NetLogo verifier for code validation
+        prescreen: Optional runtime prescreen the repaired code must pass too
+
+    Returns:
+        The state with the repaired code and no error, or the state unchanged
+    """
+    if not state["error_message"]:
+        return state
+    logger.info(f"NODE: repair_code - error_message: {state['error_message']}")
+    try:
+        repaired = repair.repair(state["current_code"], lambda code: check_code(code, verifier, prescreen))
+    except Exception as e:
+        # The repair is an optimization: a rule it trips over still gets its LLM retry
+        logger.error(f"Local repair raised {type(e).__name__}: {e}", exc_info=True)
+        repaired = None
+    if repaired is None:
+        logger.info("Local repair failed, leaving the error to the LLM retry")
+        return state
+    # The failed attempt no longer counts as a retry
+    return {**state, "current_code": repaired.code, "error_message": None, "retry_count": state["retry_count"] - 1}
+
 def should_retry(state: GenerationState, max_attempts: int = 5) -> str:
     logger.info(f"Checking if should retry, retry_count: {state['retry_count']}, max_attempts: {max_attempts}, error_message: {state['error_message']}")
     """
@@ -156,3 +261,98 @@ def should_retry(state: GenerationState, max_attempts: int = 5) -> str:
     logger.info(f"Should retry decision: {should_retry_value}")
     return should_retry_value
 
+def generate_candidates(
+    state: GenerationState,
+    provider: GraphProviderBase,
+    verifier: NetLogoVerifier,
+    prescreen: Optional[RulePrescreen] = None,
+    candidates: int = 2
+) -> GenerationState:
+    """
+    Speculative generate_code + verify_code: request `candidates` rules in
+    parallel and keep the first one that passes verification. The state's
+    error (and retry count) is only set when every candidate failed.
+
+    Requests run in worker threads; the ones still waiting for a thread are
+    cancelled, the ones already sent finish in the background and are ignored.
+    """
+    logger.info(f"NODE: generate_candidates - candidates: {candidates}, retry_count: {state.get('retry_count', 0)}")
+    speculation = CandidateRound(state["original_code"], lambda code: check_code(code, verifier, prescreen), candidates)
+
+    codes = provider.generate_samples_from_state(state, candidates)
+    if codes is not None:
+        # One request returned all samples (none when it failed)
+        if not codes:
+            speculation.fail(candidates)
+        for code in codes:
+            if speculation.offer(code):
+                break
+    else:
+        pool = ThreadPoolExecutor(max_workers=candidates)
+        # Each request runs in a copy of this context, so the run's callbacks (metrics) see it
+        futures = [pool.submit(contextvars.copy_context().run, _generate_or_none, state, provider)
+                   for _ in range(candidates)]
+        try:
+            for future in as_completed(futures):
+                code = future.result()
+                if code is None:
+                    speculation.fail()
+                elif speculation.offer(code):
+                    break
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    code, is_safe, error_message = speculation.result()
+    return record_verification({**state, "current_code": code}, is_safe, error_message)
+
+async def agenerate_candidates(
+    state: GenerationState,
+    provider: GraphProviderBase,
+    verifier: NetLogoVerifier,
+    prescreen: Optional[RulePrescreen] = None,
+    candidates: int = 2
+) -> GenerationState:
+    """
+    Async version of generate_candidates: the requests are tasks, and the ones
+    still in flight when a candidate passes are cancelled.
+    """
+    logger.info(f"NODE: generate_candidates (async) - candidates: {candidates}, retry_count: {state.get('retry_count', 0)}")
+    speculation = CandidateRound(state["original_code"], lambda code: check_code(code, verifier, prescreen), candidates)
+
+    codes = await provider.agenerate_samples_from_state(state, candidates)
+    if codes is not None:
+        if not codes:
+            speculation.fail(candidates)
+        for code in codes:
+            if speculation.offer(code):
+                break
+    else:
+        tasks = [asyncio.ensure_future(_agenerate_or_none(state, provider)) for _ in range(candidates)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                code = await next_done
+                if code is None:
+                    speculation.fail()
+                elif speculation.offer(code):
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    code, is_safe, error_message = speculation.result()
+    return record_verification({**state, "current_code": code}, is_safe, error_message)
+
+def _generate_or_none(state: GenerationState, provider: GraphProviderBase) -> Optional[str]:
+    """A candidate, or None when its request failed."""
+    try:
+        return provider.generate_code_from_state(state)
+    except Exception as e:
+        logger.error(f"Error generating candidate code: {str(e)}")
+        return None
+
+async def _agenerate_or_none(state: GenerationState, provider: GraphProviderBase) -> Optional[str]:
+    try:
+        return await provider.agenerate_code_from_state(state)
+    except Exception as e:
+        logger.error(f"Error generating candidate code: {str(e)}")
+        return None
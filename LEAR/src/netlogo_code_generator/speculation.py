@@ -0,0 +1,150 @@
+"""
+Speculative multi-candidate code generation.
+
+With `NetLogoCodeGenerator(candidates=k)` every generation round requests k
+candidate rules at once instead of one, verifies them as they arrive and keeps
+the first one that passes; the requests still in flight are cancelled. Only a
+round in which all k candidates fail goes through the error-guided retry, so
+the latency tail shrinks from several sequential LLM round trips to about one,
+at up to k times the request cost.
+
+SpeculationStats keeps the acceptance counters per k (see speculation_stats),
+to tune k against cost.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.utils.logging import get_logger
+
+logger = get_logger()
+
+
+class CandidateRound:
+    """
+    One speculative round: candidates are offered in arrival order until one is accepted.
+
+    A candidate equal to the original code (what providers fall back to when a
+    request fails) is only used when no new candidate passes, so the fastest
+    failed request does not win the round. Requests that raised, or a samples
+    request that returned nothing, are counted with `fail` instead.
+    """
+
+    def __init__(self, original_code: str, check: Callable[[str], Tuple[bool, Optional[str]]], candidates: int):
+        """
+        Args:
+            original_code: The parent rule
+            check: Verification of a candidate, returning (is_safe, error_message)
+            candidates: Number of candidates requested in this round
+        """
+        self.original_code = original_code
+        self.check = check
+        self.candidates = candidates
+        self.started = time.perf_counter()
+        self.received = 0
+        self.failed = 0
+        self.valid = 0
+        self.winner: Optional[str] = None
+        self.winner_rank: Optional[int] = None
+        self.unchanged = False
+        self.failures: List[Tuple[str, Optional[str]]] = []
+
+    def offer(self, code: str) -> bool:
+        """Verify the next arriving candidate; True once the round is decided."""
+        self.received += 1
+        if code.strip() == self.original_code.strip():
+            self.unchanged = True
+            return False
+        is_safe, error_message = self.check(code)
+        if not is_safe:
+            self.failures.append((code, error_message))
+            return False
+        self.valid += 1
+        self.winner, self.winner_rank = code, self.received
+        return True
+
+    def fail(self, requests: int = 1) -> None:
+        """Count candidates lost to failed requests (neither received nor cancelled)."""
+        self.failed += requests
+
+    def result(self) -> Tuple[str, bool, Optional[str]]:
+        """(code, is_safe, error_message) of the round, recorded in the speculation stats."""
+        if self.winner is not None:
+            outcome = (self.winner, True, None)
+        elif self.unchanged or not self.failures:
+            outcome = (self.original_code, *self.check(self.original_code))
+        else:
+            # The first failure feeds the error-guided retry
+            code, error_message = self.failures[0]
+            outcome = (code, False, error_message)
+        _stats.record(self.candidates, accepted=self.winner is not None, received=self.received,
+                      valid=self.valid, rank=self.winner_rank, latency=time.perf_counter() - self.started,
+                      failed=self.failed)
+        logger.info(f"Speculative round with {self.candidates} candidates: {self.received} received, "
+                    f"{self.failed} failed, {self.valid} accepted, winner rank: {self.winner_rank}")
+        return outcome
+
+
+class SpeculationStats:
+    """
+    Acceptance counters of speculative rounds, per number of candidates k.
+
+    Public Methods:
+    - record(candidates, accepted, received, valid, rank, latency, failed): Count one round
+    - report() -> Dict: Per-k rounds, acceptance rate, candidate pass rate, failed and cancelled requests, latency
+    - reset(): Forget all rounds
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rounds: Dict[int, Dict[str, float]] = defaultdict(
+            lambda: {"rounds": 0, "accepted": 0, "received": 0, "failed": 0, "valid": 0, "rank": 0, "latency": 0.0})
+
+    def record(self, candidates: int, accepted: bool, received: int, valid: int,
+               rank: Optional[int], latency: float, failed: int = 0) -> None:
+        with self._lock:
+            counters = self._rounds[candidates]
+            counters["rounds"] += 1
+            counters["accepted"] += int(accepted)
+            counters["received"] += received
+            counters["failed"] += failed
+            counters["valid"] += valid
+            counters["rank"] += rank or 0
+            counters["latency"] += latency
+
+    def report(self) -> Dict[int, Dict[str, float]]:
+        with self._lock:
+            report = {}
+            for candidates, counters in sorted(self._rounds.items()):
+                rounds, accepted = counters["rounds"], counters["accepted"]
+                report[candidates] = {
+                    "rounds": rounds,
+                    "acceptance_rate": round(accepted / rounds, 4),
+                    # Candidates are verified until one passes, so this counts the verified ones only
+                    "candidate_pass_rate": round(counters["valid"] / counters["received"], 4)
+                    if counters["received"] else 0.0,
+                    "mean_winner_rank": round(counters["rank"] / accepted, 2) if accepted else None,
+                    "failed": counters["failed"],
+                    "cancelled": rounds * candidates - counters["received"] - counters["failed"],
+                    "mean_latency": round(counters["latency"] / rounds, 4),
+                }
+            return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rounds.clear()
+
+
+_stats = SpeculationStats()
+
+
+def speculation_stats() -> Dict[int, Dict[str, float]]:
+    """Acceptance statistics of the speculative rounds so far, keyed by number of candidates."""
+    return _stats.report()
+
+
+def reset_speculation_stats() -> None:
+    """Forget the speculative rounds counted so far."""
+    _stats.reset()
@@ -0,0 +1,92 @@
+import asyncio
+import importlib.util
+import sys
+import time
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+HAS_GRAPH_DEPS = all(importlib.util.find_spec(name) is not None
+                     for name in ("langgraph", "langchain_core", "gin", "dotenv", "pydantic", "yaml"))
+
+if HAS_GRAPH_DEPS:
+    from src.graph_providers.base import GraphProviderBase
+    from src.graph_providers.registry import invalidate
+    from src.netlogo_code_generator.graph import NetLogoCodeGenerator
+    from src.verification.verify_netlogo import NetLogoVerifier
+
+    class StandInProvider(GraphProviderBase):
+        """Local provider that answers after a fixed latency with `fd <agent index>`."""
+
+        def __init__(self, verifier, latency=0.1, command="fd"):
+            super().__init__(verifier)
+            self.latency = latency
+            self.command = command
+            self.in_flight = 0
+            self.peak_in_flight = 0
+
+        def initialize_model(self):
+            return None
+
+        def generate_code_from_state(self, state):
+            time.sleep(self.latency)
+            return f"{self.command} {state['agent_info'][1]}"
+
+        async def agenerate_code_from_state(self, state):
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            await asyncio.sleep(self.latency)
+            self.in_flight -= 1
+            return f"{self.command} {state['agent_info'][1]}"
+
+
+@unittest.skipUnless(HAS_GRAPH_DEPS, "LangGraph/LangChain are not installed")
+class TestBatchGeneration(unittest.TestCase):
+
+    def setUp(self):
+        invalidate()
+        self.provider = StandInProvider(NetLogoVerifier())
+        self.generator = NetLogoCodeGenerator(self.provider, self.provider.verifier)
+        self.agent_infos = [["rt 1", index, "rt 1", 0, 0, f"text {index}"] for index in range(16)]
+        self.texts = [info[5] for info in self.agent_infos]
+
+    def test_results_keep_input_order(self):
+        results = self.generator.generate_many(self.agent_infos, self.texts, max_concurrency=16)
+        self.assertEqual(results, [(f"fd {index}", f"text {index}") for index in range(16)])
+
+    def test_concurrent_batch_is_faster_than_sequential_calls(self):
+        start = time.perf_counter()
+        for info, text in zip(self.agent_infos[:4], self.texts[:4]):
+            self.generator.generate_code(info, text)
+        sequential = (time.perf_counter() - start) / 4 * len(self.agent_infos)
+
+        start = time.perf_counter()
+        self.generator.generate_many(self.agent_infos, self.texts, max_concurrency=16)
+        concurrent = time.perf_counter() - start
+        self.assertLess(concurrent, sequential / 4)
+
+    def test_concurrency_limit(self):
+        self.generator.generate_many(self.agent_infos, self.texts, max_concurrency=4)
+        self.assertEqual(self.provider.peak_in_flight, 4)
+
+    def test_invalid_input_keeps_original(self):
+        results = self.generator.generate_many([["rt 1"]] + self.agent_infos[:2], ["old", "a", "b"])
+        self.assertEqual(results, [("rt 1", "old"), ("fd 0", "a"), ("fd 1", "b")])
+
+    def test_shared_graph_runs_each_generators_provider(self):
+        # Both generators use the same compiled graph, but each one its own provider
+        self.generator.generate_many(self.agent_infos[:2], self.texts[:2])
+        other = NetLogoCodeGenerator(StandInProvider(self.provider.verifier, latency=0.01, command="rt"),
+                                     self.provider.verifier)
+        self.assertIs(other._graph(), self.generator._graph())
+        self.assertEqual(other.generate_code(self.agent_infos[3], "text 3"), ("rt 3", "text 3"))
+        self.assertEqual(other.generate_many(self.agent_infos[:2], self.texts[:2]),
+                         [("rt 0", "text 0"), ("rt 1", "text 1")])
+        self.assertEqual(self.generator.generate_code(self.agent_infos[3], "text 3"), ("fd 3", "text 3"))
+
+
+if __name__ == '__main__':
+    unittest.main()
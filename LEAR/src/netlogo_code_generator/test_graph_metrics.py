@@ -0,0 +1,96 @@
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+HAS_GRAPH_DEPS = all(importlib.util.find_spec(name) is not None
+                     for name in ("langgraph", "langchain_core", "langchain_anthropic", "langchain_deepseek",
+                                  "langchain_groq", "langchain_openai", "gin", "dotenv", "pydantic", "yaml"))
+
+if HAS_GRAPH_DEPS:
+    import gin
+    from src.graph_providers.registry import invalidate
+    from src.graph_providers.unified_provider import GraphUnifiedProvider
+    from src.netlogo_code_generator.graph import NetLogoCodeGenerator
+    from src.netlogo_code_generator.metrics import GraphMetrics, _percentiles
+    from src.verification.verify_netlogo import NetLogoVerifier
+
+
+@unittest.skipUnless(HAS_GRAPH_DEPS, "LangGraph/LangChain are not installed")
+class TestGraphMetrics(unittest.TestCase):
+
+    def setUp(self):
+        invalidate()
+        self.directory = tempfile.TemporaryDirectory()
+        self.verifier = NetLogoVerifier()
+        self.agent_infos = [[f"fd {index} rt 10", [], "rt 1", 0, 0, f"- Move {index}"] for index in range(6)]
+        self.texts = [info[5] for info in self.agent_infos]
+        gin.bind_parameter("create_fake_model.latency", 0.01)
+        gin.bind_parameter("create_fake_model.tokens_per_second", 5000)
+        gin.bind_parameter("TextBasedEvolution.evolution_strategy", "complex")
+
+    def tearDown(self):
+        gin.clear_config()
+        invalidate()
+        self.directory.cleanup()
+
+    def generate(self, format="jsonl", **generator_options):
+        path = os.path.join(self.directory.name, f"metrics-{format}.txt")
+        gin.bind_parameter("create_graph_metrics.enabled", True)
+        gin.bind_parameter("create_graph_metrics.path", path)
+        gin.bind_parameter("create_graph_metrics.format", format)
+        gin.bind_parameter("create_graph_metrics.runs_path", os.path.join(self.directory.name, f"runs-{format}.jsonl"))
+        provider = GraphUnifiedProvider("fake", self.verifier, stream_verification=True)
+        generator = NetLogoCodeGenerator(provider, self.verifier, **generator_options)
+        generator.generate_many(self.agent_infos, self.texts, use_text_evolution=True)
+        generator.generate_code(self.agent_infos[0], self.texts[0], use_text_evolution=True)
+        with open(generator.metrics.write()) as f:
+            return generator.metrics, f.read()
+
+    def test_runs_are_recorded_per_node(self):
+        metrics, text = self.generate()
+        [group] = [json.loads(line) for line in text.splitlines()]
+        self.assertEqual((group["provider"], group["model"], group["kind"]), ("fake", "fake", "graph_run"))
+        self.assertEqual(group["runs"], 7)
+        self.assertEqual(set(group["nodes"]), {"evolve_pseudocode", "generate_code", "verify_code"})
+        # One pseudocode and one (streamed) code request per run, plus one per retry
+        self.assertEqual(group["requests"], 14 + int(group["totals"]["retries"]))
+        self.assertIsNotNone(group["first_token_seconds"]["p50"])
+        self.assertGreater(group["input_tokens"], group["output_tokens"])
+        self.assertGreater(group["output_tokens"], 0)
+        self.assertGreater(group["verifier_seconds"]["p50"], 0)
+        self.assertLessEqual(group["wall_seconds"]["p50"], group["wall_seconds"]["p99"])
+
+        with open(metrics.runs_path) as f:
+            runs = [json.loads(line) for line in f]
+        self.assertEqual(len(runs), 7)
+        self.assertEqual({request["node"] for request in runs[0]["requests"]}, {"evolve_pseudocode", "generate_code"})
+        self.assertEqual(runs[0]["input_tokens"], sum(request["input_tokens"] for request in runs[0]["requests"]))
+
+    def test_batches_and_prometheus_text(self):
+        _, text = self.generate("prometheus", batch_size=3)
+        self.assertIn('kind="first_attempt_batch"', text)
+        self.assertIn('lear_graph_runs_total{provider="fake",model="fake",prompt_type="default_type",'
+                      'prompt_name="default_name",kind="graph_run"}', text)
+        samples = [line for line in text.splitlines() if not line.startswith("#")]
+        for line in samples:
+            float(line.rsplit(" ", 1)[1])
+        self.assertTrue(any(line.startswith("lear_graph_node_seconds{") and 'node="verify_code"' in line
+                            for line in samples))
+
+    def test_percentiles(self):
+        self.assertEqual(_percentiles(range(1, 101)), {"p50": 51, "p95": 96, "p99": 100})
+        self.assertEqual(_percentiles([]), {"p50": None, "p95": None, "p99": None})
+        with self.assertRaises(ValueError):
+            GraphMetrics("metrics.txt", format="csv")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import asyncio
+import importlib.util
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+HAS_GRAPH_DEPS = all(importlib.util.find_spec(name) is not None
+                     for name in ("langgraph", "langchain_core", "gin", "dotenv", "pydantic", "yaml"))
+
+if HAS_GRAPH_DEPS:
+    from src.graph_providers.base import GraphProviderBase
+    from src.graph_providers.registry import invalidate
+    from src.netlogo_code_generator.graph import NetLogoCodeGenerator
+    from src.netlogo_code_generator.speculation import reset_speculation_stats, speculation_stats
+    from src.verification.verify_netlogo import NetLogoVerifier
+
+    class ScriptedProvider(GraphProviderBase):
+        """Local provider whose n-th request answers `script[n]` = (latency, code)."""
+
+        def __init__(self, verifier, script, samples=False):
+            super().__init__(verifier)
+            self.script = script
+            self.samples = samples
+            self.states = []
+            self.finished = 0
+            self._lock = threading.Lock()
+
+        def initialize_model(self):
+            return None
+
+        def _next(self, state):
+            with self._lock:
+                self.states.append(state)
+                return self.script[len(self.states) - 1]
+
+        def generate_code_from_state(self, state):
+            latency, code = self._next(state)
+            time.sleep(latency)
+            self.finished += 1
+            if code is None:
+                raise RuntimeError("request failed")
+            return code
+
+        async def agenerate_code_from_state(self, state):
+            latency, code = self._next(state)
+            await asyncio.sleep(latency)
+            self.finished += 1
+            if code is None:
+                raise RuntimeError("request failed")
+            return code
+
+        def generate_samples_from_state(self, state, n):
+            if not self.samples:
+                return None
+            return [self._next(state)[1] for _ in range(n)]
+
+        async def agenerate_samples_from_state(self, state, n):
+            return self.generate_samples_from_state(state, n)
+
+
+@unittest.skipUnless(HAS_GRAPH_DEPS, "LangGraph/LangChain are not installed")
+class TestSpeculativeGeneration(unittest.TestCase):
+
+    def setUp(self):
+        reset_speculation_stats()
+        self.verifier = NetLogoVerifier()
+        self.agent_info = ["rt 1", [], "rt 1", 0, 0, "text"]
+
+    def generator(self, script, candidates=3, samples=False):
+        invalidate()  # Compiled graphs are shared by providers with equal settings
+        provider = ScriptedProvider(self.verifier, script, samples)
+        return provider, NetLogoCodeGenerator(provider, self.verifier, candidates=candidates)
+
+    def test_first_valid_candidate_wins(self):
+        script = [(0.5, "fd 1"), (0.02, "fd"), (0.1, "rt 5 fd 2")]
+        for run in ("sync", "async"):
+            with self.subTest(run=run):
+                reset_speculation_stats()
+                provider, generator = self.generator(script)
+                start = time.perf_counter()
+                if run == "sync":
+                    result = generator.generate_code(self.agent_info, "text")
+                else:
+                    result = generator.generate_many([self.agent_info], ["text"])[0]
+                self.assertEqual(result, ("rt 5 fd 2", "text"))
+                self.assertLess(time.perf_counter() - start, 0.4)
+                self.assertEqual(len(provider.states), 3)
+
+                stats = speculation_stats()[3]
+                self.assertEqual(stats["rounds"], 1)
+                self.assertEqual(stats["acceptance_rate"], 1.0)
+                self.assertEqual(stats["mean_winner_rank"], 2)
+                self.assertEqual(stats["cancelled"], 1)
+        # The async request still in flight was cancelled
+        self.assertEqual(provider.finished, 2)
+
+    def test_retry_only_when_all_candidates_fail(self):
+        script = [(0.01, "fd"), (0.02, "rt"), (0.01, "fd 1"), (0.02, "fd 1 rt")]
+        provider, generator = self.generator(script, candidates=2)
+        result = generator.generate_many([self.agent_info], ["text"])[0]
+        self.assertEqual(result, ("fd 1", "text"))
+        self.assertEqual([state["retry_count"] for state in provider.states], [0, 0, 1, 1])
+        self.assertIsNone(provider.states[0]["error_message"])
+        self.assertIn("expects 1 arg", provider.states[2]["error_message"])
+        self.assertEqual(speculation_stats()[2]["acceptance_rate"], 0.5)
+
+    def test_unchanged_fallback_loses_to_a_new_rule(self):
+        # A candidate equal to the parent rule arrives first
+        provider, generator = self.generator([(0.01, "rt 1"), (0.05, "fd 3")], candidates=2)
+        self.assertEqual(generator.generate_code(self.agent_info, "text"), ("fd 3", "text"))
+
+        reset_speculation_stats()
+        provider, generator = self.generator([(0.01, "rt 1"), (0.05, "fd")], candidates=2)
+        self.assertEqual(generator.generate_code(self.agent_info, "text"), ("rt 1", "text"))
+        self.assertEqual(speculation_stats()[2]["acceptance_rate"], 0.0)
+
+    def test_samples_from_one_request(self):
+        provider, generator = self.generator([(0, "fd"), (0, "fd 4"), (0, "fd 5")], samples=True)
+        self.assertEqual(generator.generate_many([self.agent_info], ["text"])[0], ("fd 4", "text"))
+        self.assertEqual(speculation_stats()[3]["cancelled"], 1)
+
+    def test_failed_requests_are_not_candidates(self):
+        script = [(0.01, None), (0.02, "fd"), (0.05, "fd 2")]
+        for run in ("sync", "async"):
+            with self.subTest(run=run):
+                reset_speculation_stats()
+                provider, generator = self.generator(script)
+                if run == "sync":
+                    result = generator.generate_code(self.agent_info, "text")
+                else:
+                    result = generator.generate_many([self.agent_info], ["text"])[0]
+                self.assertEqual(result, ("fd 2", "text"))
+                stats = speculation_stats()[3]
+                self.assertEqual((stats["failed"], stats["cancelled"]), (1, 0))
+                self.assertEqual(stats["acceptance_rate"], 1.0)
+                self.assertEqual(stats["mean_winner_rank"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,10 +8,19 @@ import src.generators.base
 import src.graph_providers.base
 import src.graph_providers.unified_provider
 import src.netlogo_code_generator.nodes
+import src.netlogo_code_generator.graph
 
-def load_config():
-    """Load environment variables from .env file and GIN configuration"""
+def load_config(offline: bool = None):
+    """
+    Load environment variables from .env file and GIN configuration
+
+    Args:
+        offline: Start without API keys, e.g. with the "fake" model. Defaults to
+                 the LEAR_OFFLINE environment variable being set to 1/true/yes
+    """
     load_dotenv()
+    if offline is None:
+        offline = os.getenv('LEAR_OFFLINE', '').lower() in ('1', 'true', 'yes')
     
     # Required environment variables
     required_vars = {
@@ -22,7 +31,9 @@ def load_config():
     
     # Check for missing variables
     missing = [key for key, value in required_vars.items() if not value]
-    if missing:
+    if missing and offline:
+        print(f"Offline mode, missing environment variables: {', '.join(missing)}")
+    elif missing:
         raise ValueError(f"Missing required environment variables: {', '.join(missing)}")
     
     # Load configurations from gin file
@@ -1,19 +1,54 @@
-from typing import Callable
+from typing import Callable, Optional
 import logging
 import gin
 from src.verification.verify_netlogo import NetLogoVerifier
+from src.verification.netlogo_compiler import NetLogoCompiler
+from src.verification.rule_prescreen import RulePrescreen
+from src.verification.rule_repair import RuleRepair
+
+@gin.configurable
+def create_prescreen(verifier: NetLogoVerifier, enabled: bool = True, observation: str = "resources",
+                     sensors: int = 3, sample_count: int = 256) -> Optional[RulePrescreen]:
+    """Runtime prescreen for rules that pass the verifier, or None when disabled.
+
+    Args:
+        verifier: NetLogoVerifier the rules are verified with
+        enabled: Whether verified rules are dry-run before they are accepted
+        observation: Layout of `input` in the environment (pairs, distances or resources)
+        sensors: Number of sensor readings per observation
+        sample_count: Number of sampled observations each rule is run on
+    """
+    if not enabled:
+        return None
+    return RulePrescreen(NetLogoCompiler(verifier), observation=observation, sensors=sensors,
+                         sample_count=sample_count)
+
+@gin.configurable
+def create_rule_repair(verifier: NetLogoVerifier, enabled: bool = True, max_rounds: int = 3) -> Optional[RuleRepair]:
+    """Local repair of mechanical verifier errors before an LLM retry, or None when disabled.
+
+    Args:
+        verifier: NetLogoVerifier the rules are verified with
+        enabled: Whether failed rules are repaired locally first
+        max_rounds: Maximum number of repair and re-verify rounds per rule
+    """
+    if not enabled:
+        return None
+    return RuleRepair(verifier, max_rounds=max_rounds)
 
 @gin.configurable
 class CodeRetryHandler:
-    def __init__(self, verifier: NetLogoVerifier, max_attempts: int = 5):
+    def __init__(self, verifier: NetLogoVerifier, max_attempts: int = 5, prescreen: Optional[RulePrescreen] = None):
         """Initialize the retry handler.
         
         Args:
             verifier: NetLogoVerifier instance for code validation
             max_attempts: Maximum number of retry attempts before reverting
+            prescreen: Optional RulePrescreen that dry-runs verified code for runtime errors
         """
         self.verifier = verifier
         self.max_attempts = max_attempts
+        self.prescreen = prescreen
         self.error_prompt = """
             The generated NetLogo code has an error:
             Code: {original_code}
@@ -65,7 +100,9 @@ class CodeRetryHandler:
                     current_code = generate_fn(agent_info=agent_info, use_text_evolution=use_text_evolution, error_prompt=error_prompt)
 
                 # Verify the generated/fixed code
-                is_safe, error_message = self.verifier.is_safe(current_code)
+                is_safe, error_message = self.verifier.is_safe(current_code, report_all=True)
+                if is_safe and self.prescreen is not None:
+                    is_safe, error_message = self.prescreen.is_safe(current_code)
                 
                 if is_safe:
                     logging.info(f"Successfully generated valid code after {attempts + 1} attempts")
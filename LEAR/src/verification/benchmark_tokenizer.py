@@ -0,0 +1,100 @@
+"""
+Micro-benchmark for the NetLogo tokenizer.
+
+Compares the compact token list used by NetLogoVerifier.validate
+(`_tokenize_compact`, NamedTuple tokens built in one pass) with the previous
+approach (one dataclass Token per lexeme from the `_tokenize` generator, then a
+second filtered list) on the verifier_test_data corpus.
+
+Usage (from this directory):
+    python benchmark_tokenizer.py [--repeat 200]
+"""
+
+import argparse
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from verify_netlogo import NetLogoVerifier, TokenType
+from verifier_test_data import basic_test_cases, advanced_test_cases, prompt_examples
+
+
+@dataclass
+class _LegacyToken:
+    """The dataclass token the verifier used before the compact representation."""
+    type: TokenType
+    value: str
+    line: int
+    column: int
+
+
+def legacy_tokenize(verifier: NetLogoVerifier, code: str) -> tuple:
+    """
+    Dataclass tokens via the generator plus the filtered copy; `validate` used to
+    keep both lists alive for the whole validation.
+    """
+    tokens = [_LegacyToken(t.type, t.value, t.line, t.column) for t in verifier._tokenize(code)]
+    filtered = [t for t in tokens if t.type not in {TokenType.WHITESPACE, TokenType.COMMENT, TokenType.NEWLINE} or t.type == TokenType.EOF]
+    return tokens, filtered
+
+
+def compact_tokenize(verifier: NetLogoVerifier, code: str) -> tuple:
+    tokens = verifier._tokenize_compact(code)
+    return tokens, tokens
+
+
+def load_corpus() -> list:
+    return [code for code, _ in basic_test_cases + advanced_test_cases[0]] + list(prompt_examples)
+
+
+def measure(tokenize, verifier, corpus, repeat):
+    """Return tokens/sec, live blocks and bytes per rule, and peak KiB for one tokenizer."""
+    # Count significant tokens so both tokenizers are credited for the same work
+    token_count = sum(len(tokenize(verifier, code)[1]) for code in corpus) * repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for code in corpus:
+            tokenize(verifier, code)
+    elapsed = time.perf_counter() - start
+
+    # Keep every token list alive so the snapshot counts what one pass allocates
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [tokenize(verifier, code) for code in corpus]
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    diff = after.compare_to(before, 'filename')
+    blocks = sum(stat.count_diff for stat in diff)
+    size = sum(stat.size_diff for stat in diff)
+    del kept
+
+    return {
+        "tokens_per_sec": token_count / elapsed,
+        "blocks_per_rule": blocks / len(corpus),
+        "bytes_per_rule": size / len(corpus),
+        "peak_kib": peak / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokenizer micro-benchmark")
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the corpus for timing")
+    args = parser.parse_args()
+
+    verifier = NetLogoVerifier()
+    corpus = load_corpus()
+    print(f"Corpus: {len(corpus)} rules, {args.repeat} passes\n")
+
+    results = {
+        "legacy (dataclass + filtered copy)": measure(legacy_tokenize, verifier, corpus, args.repeat),
+        "compact (_tokenize_compact)": measure(compact_tokenize, verifier, corpus, args.repeat),
+    }
+    for name, r in results.items():
+        print(f"{name:36s} {r['tokens_per_sec']:>12,.0f} tokens/s  {r['blocks_per_rule']:>7.1f} blocks/rule  "
+              f"{r['bytes_per_rule']:>8.0f} B/rule  {r['peak_kib']:>7.1f} KiB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Benchmark suite and regression gate for the NetLogo verifier.
+
+Measures throughput (rules/sec and tokens/sec), per-call latency percentiles
+and peak memory of `validate`, `is_safe` and `measure_complexity` on the
+verifier_test_data corpus and on synthetic corpora of 10k, 100k and 1M rules.
+Results are written as JSON; `--compare` checks them against a previous run
+and exits non-zero when throughput regresses by more than `--threshold`.
+
+Usage (from this directory):
+    python benchmark_verifier.py --output bench.json
+    python benchmark_verifier.py --corpus fixtures,10k,100k,1m --output bench.json
+    python benchmark_verifier.py --compare baseline.json --threshold 0.10
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+from verify_netlogo import NetLogoVerifier
+from verifier_test_data import basic_test_cases, advanced_test_cases, prompt_examples
+
+OPERATIONS = {
+    "validate": lambda verifier, code: verifier.validate(code),
+    "is_safe": lambda verifier, code: verifier.is_safe(code),
+    "measure_complexity": lambda verifier, code: verifier.measure_complexity(code),
+}
+
+SYNTHETIC_SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# Rules kept alive per tracemalloc pass; enough for a stable peak without tracing the whole corpus
+MEMORY_SAMPLE = 500
+
+
+def fixture_corpus() -> List[str]:
+    return [code for code, _ in basic_test_cases + advanced_test_cases[0]] + list(prompt_examples)
+
+
+def _synthetic_expression(rng: random.Random, depth: int = 0) -> str:
+    """A numeric argument in the style of generated rules."""
+    choice = rng.random()
+    if choice < 0.35 or depth > 1:
+        return str(rng.choice([1, 2, 5, 10, 15, 30, 45, 90]))
+    if choice < 0.55:
+        return f"random {rng.choice([10, 20, 45, 90, 180])}"
+    if choice < 0.7:
+        return f"random-float {rng.choice([0.5, 1, 2])}"
+    if choice < 0.85:
+        return f"(item {rng.randrange(4)} input / {rng.choice([2, 4, 10])})"
+    return f"({_synthetic_expression(rng, depth + 1)} + {_synthetic_expression(rng, depth + 1)})"
+
+
+def _synthetic_commands(rng: random.Random, depth: int = 0) -> str:
+    """A command sequence with up to two levels of nested conditionals."""
+    commands = []
+    for _ in range(rng.randint(1, 3)):
+        roll = rng.random()
+        if roll < 0.2 and depth < 2:
+            condition = f"item {rng.randrange(4)} input {rng.choice(['>', '<', '=', '!='])} {rng.choice([0, 1, 5, 45])}"
+            if rng.random() < 0.5:
+                commands.append(f"if {condition} [ {_synthetic_commands(rng, depth + 1)} ]")
+            else:
+                commands.append(f"ifelse {condition} [ {_synthetic_commands(rng, depth + 1)} ] [ {_synthetic_commands(rng, depth + 1)} ]")
+        else:
+            commands.append(f"{rng.choice(['fd', 'fd', 'rt', 'lt', 'bk'])} {_synthetic_expression(rng)}")
+    return " ".join(commands)
+
+
+def synthetic_corpus(size: int, seed: int = 0) -> Iterator[str]:
+    """
+    Deterministic stream of `size` rules resembling LLM output. About one in ten
+    is invalid (dangerous primitive, unbalanced bracket, out-of-range value) so
+    the rejection paths are measured too. Streamed so a 1M-rule run does not
+    hold the corpus in memory.
+    """
+    rng = random.Random(seed)
+    for _ in range(size):
+        rule = _synthetic_commands(rng)
+        roll = rng.random()
+        if roll < 0.04:
+            rule += " ask turtles [ die ]"
+        elif roll < 0.07:
+            rule = rule.rstrip("]")
+        elif roll < 0.10:
+            rule += " fd 5000"
+        yield rule
+
+
+def load_corpus(name: str, seed: int):
+    """Return (number of rules, factory yielding the rules) for a corpus name."""
+    if name == "fixtures":
+        corpus = fixture_corpus()
+        return len(corpus), lambda: iter(corpus)
+    if name not in SYNTHETIC_SIZES:
+        raise ValueError(f"Unknown corpus: {name} (expected fixtures, {', '.join(SYNTHETIC_SIZES)})")
+    size = SYNTHETIC_SIZES[name]
+    return size, lambda: synthetic_corpus(size, seed)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def measure(operation, verifier: NetLogoVerifier, rules, repeat: int, token_count: int) -> Dict:
+    """Time one operation over the corpus and sample its peak memory."""
+    call = OPERATIONS[operation]
+    latencies = []
+    clock = time.perf_counter
+    calls = 0
+    start = clock()
+    for _ in range(repeat):
+        for code in rules():
+            call_start = clock()
+            call(verifier, code)
+            latencies.append(clock() - call_start)
+            calls += 1
+    elapsed = clock() - start
+    latencies.sort()
+
+    tracemalloc.start()
+    kept = []
+    for index, code in enumerate(rules()):
+        if index == MEMORY_SAMPLE:
+            break
+        kept.append(call(verifier, code))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    return {
+        "rules": calls,
+        "seconds": elapsed,
+        "rules_per_sec": calls / elapsed,
+        "tokens_per_sec": token_count * repeat / elapsed,
+        "latency_us": {
+            "p50": percentile(latencies, 0.50) * 1e6,
+            "p90": percentile(latencies, 0.90) * 1e6,
+            "p99": percentile(latencies, 0.99) * 1e6,
+            "max": latencies[-1] * 1e6 if latencies else 0.0,
+        },
+        "peak_kib": peak / 1024,
+    }
+
+
+def run_benchmarks(corpora: List[str], operations: List[str], repeat: int, seed: int) -> Dict:
+    # No result cache: every call exercises the full pipeline
+    verifier = NetLogoVerifier()
+    results = {}
+    for name in corpora:
+        size, rules = load_corpus(name, seed)
+        # Fixture passes are repeated for stable timings; synthetic corpora are large enough on their own
+        passes = repeat if name == "fixtures" else 1
+        token_count = sum(len(verifier._tokenize_compact(code)) - 1 for code in rules())
+        results[name] = {}
+        for operation in operations:
+            results[name][operation] = measure(operation, verifier, rules, passes, token_count)
+            r = results[name][operation]
+            print(f"{name:>8s} {operation:20s} {r['rules_per_sec']:>10,.0f} rules/s {r['tokens_per_sec']:>12,.0f} tokens/s  "
+                  f"p50 {r['latency_us']['p50']:>7.1f}us  p99 {r['latency_us']['p99']:>7.1f}us  {r['peak_kib']:>8.1f} KiB peak")
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Return a description of every corpus/operation whose rules/sec dropped by
+    more than `threshold` (a fraction) relative to the baseline. Entries present
+    in only one of the two runs are ignored.
+    """
+    regressions = []
+    for corpus, operations in current["results"].items():
+        for operation, metrics in operations.items():
+            reference = baseline.get("results", {}).get(corpus, {}).get(operation)
+            if reference is None:
+                continue
+            change = metrics["rules_per_sec"] / reference["rules_per_sec"] - 1
+            if change < -threshold:
+                regressions.append(
+                    f"{corpus}/{operation}: {metrics['rules_per_sec']:,.0f} rules/s vs "
+                    f"{reference['rules_per_sec']:,.0f} baseline ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NetLogo verifier benchmark and regression gate")
+    parser.add_argument("--corpus", default="fixtures,10k",
+                        help="Comma-separated corpora: fixtures, 10k, 100k, 1m")
+    parser.add_argument("--ops", default=",".join(OPERATIONS), help="Comma-separated operations to time")
+    parser.add_argument("--repeat", type=int, default=50, help="Passes over the fixture corpus")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpora")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from a previous run")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Allowed throughput drop before --compare fails (fraction, default 0.10)")
+    args = parser.parse_args()
+
+    operations = [op for op in args.ops.split(",") if op]
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"Unknown operations: {', '.join(sorted(unknown))}")
+
+    report = run_benchmarks([c for c in args.corpus.split(",") if c], operations, args.repeat, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\nThroughput regressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo throughput regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
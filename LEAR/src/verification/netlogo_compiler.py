@@ -0,0 +1,364 @@
+"""
+NetLogo Rule Compiler Module
+
+Transpiles verified NetLogo movement rules into Python functions over an
+AgentState, so rules can be stepped in a headless Python simulator instead of
+round-tripping into NetLogo for every agent on every tick.
+
+Rules are verified with NetLogoVerifier, parsed into its AST and emitted as
+Python source, which is compiled once and cached by a hash of the rule.
+"""
+
+import math
+import hashlib
+import random
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from src.verification.verify_netlogo import (
+    NetLogoVerifier, AstNode, ProgramNode, BlockNode, CommandNode, ConditionalNode,
+    ReporterNode, BinaryOpNode, UnaryOpNode, NumberNode, StringNode, VariableNode,
+)
+
+
+class RuleCompilationError(ValueError):
+    """Raised when a rule fails verification or uses a construct the compiler cannot run in Python."""
+
+
+@dataclass
+class AgentState:
+    """
+    State of one agent as seen by a compiled rule.
+
+    `heading` follows NetLogo's convention (degrees, 0 = north, clockwise). Sensor
+    and turtle variables (`input`, `energy`, `food-observations`, ...) live in
+    `variables` under their NetLogo names. World wrapping is left to the simulator.
+    """
+    xcor: float = 0.0
+    ycor: float = 0.0
+    heading: float = 0.0
+    variables: Dict[str, Any] = field(default_factory=dict)
+    rng: random.Random = field(default_factory=random.Random)
+
+
+@dataclass
+class CompiledRule:
+    """A compiled rule. Call it with an AgentState, or use `function` directly in hot loops."""
+    code: str
+    python_source: str
+    function: Callable[[AgentState], None]
+
+    def __call__(self, state: AgentState) -> None:
+        self.function(state)
+
+
+# --- Runtime helpers (globals of every compiled rule) ---
+
+def _forward(state: AgentState, distance: float) -> None:
+    radians = math.radians(state.heading)
+    state.xcor += distance * math.sin(radians)
+    state.ycor += distance * math.cos(radians)
+
+def _turn(state: AgentState, degrees: float) -> None:
+    state.heading = (state.heading + degrees) % 360
+
+def _random(state: AgentState, limit: float) -> int:
+    # NetLogo: integer in [0, n) for positive n, in (n, 0] for negative n
+    limit = int(limit)
+    if limit == 0:
+        return 0
+    if limit > 0:
+        return state.rng.randrange(limit)
+    return -state.rng.randrange(-limit)
+
+def _sin(degrees: float) -> float:
+    return math.sin(math.radians(degrees))
+
+def _cos(degrees: float) -> float:
+    return math.cos(math.radians(degrees))
+
+def _tan(degrees: float) -> float:
+    return math.tan(math.radians(degrees))
+
+def _item(index: Any, items: Any) -> Any:
+    # NetLogo rejects negative indices instead of counting from the end
+    index = int(index)
+    if index < 0:
+        raise IndexError(f"{index} isn't greater than or equal to zero")
+    return items[index]
+
+def _position(value: Any, items: Any) -> Any:
+    # NetLogo reports false when the item is absent
+    if isinstance(items, str):
+        index = items.find(value)
+        return index if index >= 0 else False
+    for index, item in enumerate(items):
+        if item == value:
+            return index
+    return False
+
+def _to_string(value: Any) -> str:
+    """Format a value the way NetLogo's `word` does."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, list):
+        return '[' + ' '.join(_to_string(item) for item in value) + ']'
+    return str(value)
+
+def _word(*values: Any) -> str:
+    return ''.join(_to_string(value) for value in values)
+
+_RUNTIME_GLOBALS = {
+    '__builtins__': {'len': len, 'abs': abs, 'min': min, 'max': max, 'int': int},
+    '_forward': _forward, '_turn': _turn, '_random': _random,
+    '_sin': _sin, '_cos': _cos, '_tan': _tan,
+    '_item': _item, '_position': _position, '_word': _word,
+}
+
+
+class _PythonEmitter:
+    """Emits the Python source of one rule from its AST."""
+    FORWARD_COMMANDS = {'fd': 1, 'forward': 1, 'bk': -1, 'back': -1}
+    TURN_COMMANDS = {'rt': 1, 'right': 1, 'lt': -1, 'left': -1}
+    STATE_ATTRIBUTES = {'xcor', 'ycor', 'heading'}
+    OPERATORS = {'^': '**', '=': '==', '++': '+'}
+    # Reporters over agents/agentsets have no meaning for a single AgentState
+    UNSUPPORTED_REPORTERS = {'any?', 'count', 'in-radius', 'distance', 'towards'}
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.locals: Set[str] = set()
+
+    def emit_function(self, program: ProgramNode) -> str:
+        self.lines = ['def rule(state):']
+        self._emit_body(program.body, 1)
+        return '\n'.join(self.lines) + '\n'
+
+    def _fail(self, node: AstNode, message: str) -> None:
+        raise RuleCompilationError(f"Line {node.line}: {message}")
+
+    def _local_name(self, name: str) -> str:
+        return '_v_' + ''.join(char if char.isalnum() else '_' for char in name)
+
+    def _emit_body(self, statements: List[AstNode], depth: int) -> None:
+        start = len(self.lines)
+        for statement in statements:
+            self._emit_statement(statement, depth)
+        if len(self.lines) == start:
+            self.lines.append('    ' * depth + 'pass')
+
+    def _emit_statement(self, node: AstNode, depth: int) -> None:
+        indent = '    ' * depth
+        if isinstance(node, CommandNode):
+            name = node.name
+            if name in self.FORWARD_COMMANDS or name in self.TURN_COMMANDS:
+                if len(node.args) != 1:
+                    self._fail(node, f"'{name}' expects 1 argument")
+                amount = self._expression(node.args[0])
+                if name in self.FORWARD_COMMANDS:
+                    sign = '' if self.FORWARD_COMMANDS[name] > 0 else '-'
+                    self.lines.append(f"{indent}_forward(state, {sign}({amount}))")
+                else:
+                    sign = '' if self.TURN_COMMANDS[name] > 0 else '-'
+                    self.lines.append(f"{indent}_turn(state, {sign}({amount}))")
+            elif name == 'stop':
+                self.lines.append(f"{indent}return")
+            elif name in {'set', 'let'}:
+                self._emit_assignment(node, indent)
+            else:
+                self._fail(node, f"Unsupported command '{name}'")
+        elif isinstance(node, ConditionalNode) and node.kind != 'ifelse-value':
+            for index, (condition, block) in enumerate(node.clauses):
+                if block is None:
+                    self._fail(node, f"'{node.kind}' is missing a command block")
+                keyword = 'if' if index == 0 else 'elif'
+                self.lines.append(f"{indent}{keyword} {self._expression(condition)}:")
+                self._emit_body(block.body, depth + 1)
+            if node.else_block is not None:
+                self.lines.append(f"{indent}else:")
+                self._emit_body(node.else_block.body, depth + 1)
+        else:
+            # A bare reporter (the verifier accepts one as a whole rule): evaluate for its side effects on the RNG
+            self.lines.append(f"{indent}{self._expression(node)}")
+
+    def _emit_assignment(self, node: CommandNode, indent: str) -> None:
+        if len(node.args) != 2 or not isinstance(node.args[0], VariableNode):
+            self._fail(node, f"'{node.name}' expects a variable name and a value")
+        target = node.args[0].name
+        value = self._expression(node.args[1])
+        if node.name == 'let':
+            self.locals.add(target)
+        if target in self.locals:
+            self.lines.append(f"{indent}{self._local_name(target)} = {value}")
+        elif target == 'heading':
+            self.lines.append(f"{indent}state.heading = ({value}) % 360")
+        elif target in self.STATE_ATTRIBUTES:
+            self.lines.append(f"{indent}state.{target} = {value}")
+        else:
+            self.lines.append(f"{indent}state.variables[{target!r}] = {value}")
+
+    def _expression(self, node: AstNode) -> str:
+        if isinstance(node, NumberNode):
+            return repr(node.value)
+        if isinstance(node, StringNode):
+            return repr(node.value)
+        if isinstance(node, VariableNode):
+            name = node.name
+            if name in self.locals:
+                return self._local_name(name)
+            if name in {'true', 'false'}:
+                return 'True' if name == 'true' else 'False'
+            if name in self.STATE_ATTRIBUTES:
+                return f"state.{name}"
+            return f"state.variables[{name!r}]"
+        if isinstance(node, UnaryOpNode):
+            operator = 'not ' if node.op == 'not' else node.op
+            return f"({operator}{self._expression(node.operand)})"
+        if isinstance(node, BinaryOpNode):
+            operator = self.OPERATORS.get(node.op, node.op)
+            left, right = self._expression(node.left), self._expression(node.right)
+            if node.op == '++':
+                return f"_word({left}, {right})"
+            return f"({left} {operator} {right})"
+        if isinstance(node, ReporterNode):
+            return self._reporter(node)
+        if isinstance(node, ConditionalNode) and node.kind == 'ifelse-value':
+            return self._ifelse_value(node)
+        if isinstance(node, BlockNode):
+            # A bracketed list literal such as [1 2 3]
+            return '[' + ', '.join(self._expression(item) for item in node.body) + ']'
+        self._fail(node, f"Unexpected {type(node).__name__} in expression")
+
+    def _ifelse_value(self, node: ConditionalNode) -> str:
+        def block_value(block: Optional[BlockNode]) -> str:
+            if block is None or len(block.body) != 1:
+                self._fail(node, "'ifelse-value' blocks must contain exactly one reporter")
+            return self._expression(block.body[0])
+
+        if node.else_block is None:
+            self._fail(node, "'ifelse-value' is missing its else block")
+        expression = block_value(node.else_block)
+        for condition, block in reversed(node.clauses):
+            expression = f"({block_value(block)} if {self._expression(condition)} else {expression})"
+        return expression
+
+    def _reporter(self, node: ReporterNode) -> str:
+        name = node.name
+        if name in self.UNSUPPORTED_REPORTERS:
+            self._fail(node, f"Reporter '{name}' needs other agents and cannot be compiled")
+        args = [self._expression(arg) for arg in node.args]
+
+        if name in self.STATE_ATTRIBUTES:
+            return f"state.{name}"
+        if name == 'list':
+            return '[' + ', '.join(args) + ']'
+        if name == 'word':
+            return f"_word({', '.join(args)})"
+        if name in {'min', 'max'}:
+            # NetLogo's form takes one list; the verifier also accepts two numbers
+            return f"{name}({', '.join(args)})"
+        expected = {'random': 1, 'random-float': 1, 'sin': 1, 'cos': 1, 'tan': 1,
+                    'abs': 1, 'length': 1, 'item': 2, 'position': 2}
+        if name not in expected:
+            self._fail(node, f"Unsupported reporter '{name}'")
+        if len(args) != expected[name]:
+            self._fail(node, f"'{name}' expects {expected[name]} argument(s)")
+        if name == 'random':
+            return f"_random(state, {args[0]})"
+        if name == 'random-float':
+            return f"state.rng.uniform(0, {args[0]})"
+        if name in {'sin', 'cos', 'tan'}:
+            return f"_{name}({args[0]})"
+        if name == 'abs':
+            return f"abs({args[0]})"
+        if name == 'length':
+            return f"len({args[0]})"
+        if name == 'item':
+            index = node.args[0]
+            if isinstance(index, NumberNode) and index.value.is_integer() and index.value >= 0:
+                return f"{args[1]}[{int(index.value)}]"
+            return f"_item({args[0]}, {args[1]})"
+        return f"_position({args[0]}, {args[1]})"
+
+
+class NetLogoCompiler:
+    """
+    Compiles verified NetLogo rules into Python callables over an AgentState.
+
+    Compiled rules are cached (LRU, `cache_size` entries) by a SHA-256 of the
+    rule and the verifier configuration.
+
+    Public Methods:
+    - compile(code: str) -> CompiledRule: Verify, translate and compile a rule
+    - translate(code: str) -> str: The Python source for a rule (without verifying it)
+    - cache_stats() -> Dict: Compiled-rule cache counters
+    """
+    def __init__(self, verifier: Optional[NetLogoVerifier] = None, cache_size: int = 1024):
+        self.verifier = verifier or NetLogoVerifier()
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, CompiledRule]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_key(self, code: str) -> str:
+        return hashlib.sha256(f"{self.verifier._config_key}\0{code}".encode("utf-8")).hexdigest()
+
+    def translate(self, code: str) -> str:
+        """
+        Translate a rule into the source of a Python function `rule(state)`.
+
+        Raises:
+            RuleCompilationError: If the rule uses a construct that cannot run in Python
+        """
+        return _PythonEmitter().emit_function(self.verifier.parse(code))
+
+    def compile(self, code: str) -> CompiledRule:
+        """
+        Verify a rule and compile it into a Python callable.
+
+        Args:
+            code: The NetLogo rule
+
+        Returns:
+            CompiledRule: Callable that applies one step of the rule to an AgentState
+
+        Raises:
+            RuleCompilationError: If the rule fails verification or cannot be compiled
+        """
+        key = self._cache_key(code)
+        compiled = self._cache.get(key)
+        if compiled is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return compiled
+        self.misses += 1
+
+        is_safe, message = self.verifier.is_safe(code)
+        if not is_safe:
+            raise RuleCompilationError(f"Rule failed verification:\n{message}")
+
+        python_source = self.translate(code)
+        namespace = dict(_RUNTIME_GLOBALS)
+        exec(compile(python_source, f"<netlogo-rule {key[:12]}>", "exec"), namespace)
+        compiled = CompiledRule(code, python_source, namespace['rule'])
+
+        if self.cache_size > 0:
+            self._cache[key] = compiled
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return compiled
+
+    def cache_stats(self) -> Dict:
+        """Counters for the compiled-rule cache."""
+        return {
+            "size": len(self._cache),
+            "max_size": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
@@ -0,0 +1,260 @@
+"""
+NetLogo Rule Canonicalization Module
+
+Normalizes NetLogo rules so that mutations differing only in whitespace,
+comments, keyword case, command synonyms (`forward` vs `fd`) or parentheses
+around a single name or number map to the same text and structural hash.
+DuplicateTracker uses the hash to report how many rules in a population are
+structural duplicates, i.e. how many simulations and LLM calls deduplication
+saves.
+"""
+
+import hashlib
+import heapq
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.verification.verify_netlogo import (
+    NetLogoVerifier, NodeVisitor, Token, TokenType, AstNode, ProgramNode, BlockNode, CommandNode,
+    ConditionalNode, ReporterNode, BinaryOpNode, UnaryOpNode, NumberNode, StringNode,
+    VariableNode, ErrorNode,
+)
+
+
+@dataclass(frozen=True)
+class CanonicalRule:
+    """Normalized rule text and its SHA-256 structural hash."""
+    text: str
+    hash: str
+
+
+class _ErrorFinder(NodeVisitor):
+    def __init__(self):
+        self.found = False
+
+    def visit_ErrorNode(self, node: ErrorNode) -> None:
+        self.found = True
+
+
+class _NotCanonical(Exception):
+    """A node without a canonical rendering; the rule falls back to its token stream."""
+
+
+class RuleCanonicalizer:
+    """
+    Builds the canonical form of a rule from the verifier's AST.
+
+    The canonical text lowercases names, uses the short command forms, puts one
+    space between tokens and writes numbers in a single format (`1.0` -> `1`).
+    Grouping parentheses are kept as written, except around a single name,
+    string or number: the verifier's grammar needs some that NetLogo's
+    precedence does not (`if (sin x) = 1 [..]`), so dropping them could change
+    its verdict. A single-clause `(ifelse c [..] [..])` becomes `ifelse c [..] [..]`.
+    Rules the parser cannot fully place (ErrorNodes, unbalanced brackets) fall
+    back to their normalized token stream. Canonicalizing a canonical text
+    returns it unchanged.
+    """
+    COMMAND_SYNONYMS = {'forward': 'fd', 'back': 'bk', 'right': 'rt', 'left': 'lt'}
+    SEPARATE_TOKENS = {TokenType.WHITESPACE, TokenType.COMMENT, TokenType.NEWLINE, TokenType.EOF}
+    CLOSING = {TokenType.RBRACKET: TokenType.LBRACKET, TokenType.RPAREN: TokenType.LPAREN}
+
+    def __init__(self, verifier: Optional[NetLogoVerifier] = None):
+        self.verifier = verifier or NetLogoVerifier()
+        self.precedence = self.verifier.OPERATOR_PRECEDENCE
+        self.prefix_precedence = 6  # Binding power of reporter arguments and unary operators
+
+    def canonicalize(self, code: str) -> CanonicalRule:
+        """Return the canonical text and structural hash of `code`."""
+        text = self.canonical_text(code)
+        return CanonicalRule(text, hashlib.sha256(text.encode("utf-8")).hexdigest())
+
+    def structural_hash(self, code: str) -> str:
+        return self.canonicalize(code).hash
+
+    def canonical_text(self, code: str) -> str:
+        tokens = self.verifier._tokenize_compact(code)
+        if not self._balanced(tokens):
+            return self._token_text(tokens)
+        program = self.verifier.parse(code)
+        finder = _ErrorFinder()
+        finder.visit(program)
+        if finder.found:
+            return self._token_text(tokens)
+        try:
+            return self._statements(program.body, program.grouped)
+        except _NotCanonical:
+            return self._token_text(tokens)
+
+    def _balanced(self, tokens: List[Token]) -> bool:
+        """Whether every bracket and parenthesis is closed by its own kind, in order."""
+        opened = []
+        for token in tokens:
+            if token.type in (TokenType.LBRACKET, TokenType.LPAREN):
+                opened.append(token.type)
+            elif token.type in self.CLOSING:
+                if not opened or opened.pop() is not self.CLOSING[token.type]:
+                    return False
+        return not opened
+
+    def _token_text(self, tokens: List[Token]) -> str:
+        words = []
+        for token in tokens:
+            if token.type in self.SEPARATE_TOKENS:
+                continue
+            value = token.value if token.type == TokenType.STRING_LITERAL else token.value.lower()
+            if token.type == TokenType.NUMBER:
+                value = self._number(float(token.value), token.value)
+            words.append(self.COMMAND_SYNONYMS.get(value, value) if token.type == TokenType.COMMAND else value)
+        return " ".join(words)
+
+    @staticmethod
+    def _number(value: float, text: str) -> str:
+        if not math.isfinite(value):
+            return text.lower()
+        return str(int(value)) if value.is_integer() else repr(value)
+
+    def _statements(self, nodes: List[AstNode], grouped: Set[int]) -> str:
+        return " ".join(self._statement(node, grouped) for node in nodes)
+
+    def _block(self, block: BlockNode, grouped: Set[int]) -> str:
+        if not block.body:
+            return "[ ]"
+        return f"[ {self._statements(block.body, grouped)} ]"
+
+    def _statement(self, node: AstNode, grouped: Set[int]) -> str:
+        if isinstance(node, CommandNode):
+            name = self.COMMAND_SYNONYMS.get(node.name, node.name)
+            return " ".join([name] + [self._expression(arg, -1, grouped) for arg in node.args])
+        if isinstance(node, ConditionalNode):
+            return self._conditional(node, grouped)
+        return self._expression(node, -1, grouped)
+
+    def _conditional(self, node: ConditionalNode, grouped: Set[int]) -> str:
+        if node.multi and (len(node.clauses) != 1 or node.else_block is None):
+            parts = [f"({node.kind}"]
+            for condition, block in node.clauses:
+                parts.append(self._expression(condition, -1, grouped))
+                if block is not None:
+                    parts.append(self._block(block, grouped))
+            if node.else_block is not None:
+                parts.append(self._block(node.else_block, grouped))
+            return " ".join(parts) + ")"
+        condition, block = node.clauses[0]
+        if block is None:
+            # Parenthesizing an incomplete conditional would make it read as `(ifelse ...)`
+            raise _NotCanonical(node)
+        parts = [node.kind, self._expression(condition, -1, grouped), self._block(block, grouped)]
+        if node.else_block is not None:
+            parts.append(self._block(node.else_block, grouped))
+        return " ".join(parts)
+
+    def _expression(self, node: AstNode, min_precedence: int, grouped: Set[int]) -> str:
+        """Render an expression parsed at `min_precedence`, in its grouping parentheses if it had any."""
+        text, needs_parentheses = self._bare_expression(node, min_precedence, grouped)
+        # A grouped conditional is a one-clause `(ifelse-value ..)`, already rendered without them
+        if id(node) in grouped and not self._is_atom(node) and not isinstance(node, ConditionalNode):
+            needs_parentheses = True
+        return f"({text})" if needs_parentheses else text
+
+    def _bare_expression(self, node: AstNode, min_precedence: int, grouped: Set[int]) -> Tuple[str, bool]:
+        """The text of an expression and whether precedence needs it parenthesized."""
+        if isinstance(node, NumberNode):
+            return self._number(node.value, node.text), False
+        if isinstance(node, StringNode):
+            return f'"{node.value}"', False
+        if isinstance(node, VariableNode):
+            return node.name, False
+        if isinstance(node, UnaryOpNode):
+            operand = self._expression(node.operand, self.prefix_precedence, grouped)
+            # `-x` would read as one number token when x is a number
+            return f"{node.op} {operand}", False
+        if isinstance(node, BinaryOpNode):
+            precedence = self.precedence[node.op]
+            if node.op == '^':
+                # Right-associative
+                left = self._expression(node.left, precedence + 1, grouped)
+                right = self._expression(node.right, precedence, grouped)
+            else:
+                left = self._expression(node.left, precedence, grouped)
+                right = self._expression(node.right, precedence + 1, grouped)
+            return f"{left} {node.op} {right}", precedence < min_precedence
+        if isinstance(node, ReporterNode):
+            if node.variadic:
+                args = [self._expression(arg, -1, grouped) for arg in node.args]
+                return "(" + " ".join([node.name] + args) + ")", False
+            args = [self._expression(arg, self.prefix_precedence, grouped) for arg in node.args]
+            return " ".join([node.name] + args), False
+        if isinstance(node, ConditionalNode):
+            # ifelse-value in expression position
+            text = self._conditional(node, grouped)
+            return text, min_precedence > -1 and not text.startswith("(")
+        if isinstance(node, BlockNode):
+            return self._block(node, grouped), False
+        if isinstance(node, CommandNode):
+            # A command in expression position, parsed as a statement
+            return self._statement(node, grouped), False
+        # An ErrorNode, or a node this canonicalizer does not know
+        raise _NotCanonical(node)
+
+    @staticmethod
+    def _is_atom(node: AstNode) -> bool:
+        """A name, string or non-negative number, which reads the same with or without parentheses."""
+        if isinstance(node, NumberNode):
+            return node.value >= 0
+        return isinstance(node, (VariableNode, StringNode))
+
+
+@dataclass
+class DuplicateTracker:
+    """
+    Counts structural duplicates in a population (or across generations).
+
+    `observe(code)` returns True when a structurally identical rule was seen
+    before; `report()` summarizes the savings from skipping those rules. Each
+    structure keeps only a count and its canonical text, so memory grows with
+    the number of distinct structures rather than the number of rules seen.
+    """
+    canonicalizer: RuleCanonicalizer = field(default_factory=RuleCanonicalizer)
+    counts: Dict[str, int] = field(default_factory=dict)
+    examples: Dict[str, str] = field(default_factory=dict)
+    total: int = 0
+
+    def observe(self, code: str) -> bool:
+        return self.observe_canonical(self.canonicalizer.canonicalize(code))
+
+    def observe_canonical(self, canonical: CanonicalRule) -> bool:
+        """`observe` for a rule the caller already canonicalized."""
+        self.total += 1
+        count = self.counts.get(canonical.hash, 0) + 1
+        self.counts[canonical.hash] = count
+        if count == 1:
+            self.examples[canonical.hash] = canonical.text
+        return count > 1
+
+    def observe_many(self, rules: Iterable[str]) -> List[bool]:
+        return [self.observe(code) for code in rules]
+
+    def report(self, top: int = 5) -> Dict:
+        """
+        Population-level duplicate report: rules observed, distinct structures,
+        duplicates (rules whose simulation or mutation could be skipped), the
+        duplicate ratio and the largest duplicate groups.
+        """
+        duplicates = self.total - len(self.counts)
+        largest = heapq.nlargest(top, (key for key, count in self.counts.items() if count > 1),
+                                 key=self.counts.__getitem__)
+        return {
+            "rules": self.total,
+            "unique": len(self.counts),
+            "duplicates": duplicates,
+            "duplicate_ratio": duplicates / self.total if self.total else 0.0,
+            "largest_groups": [{"canonical": self.examples[key], "count": self.counts[key]} for key in largest],
+        }
+
+
+def duplicate_report(rules: Iterable[str], canonicalizer: Optional[RuleCanonicalizer] = None, top: int = 5) -> Dict:
+    """Duplicate report for one population of rules (see DuplicateTracker.report)."""
+    tracker = DuplicateTracker(canonicalizer or RuleCanonicalizer())
+    tracker.observe_many(rules)
+    return tracker.report(top)
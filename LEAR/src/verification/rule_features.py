@@ -0,0 +1,165 @@
+"""
+NetLogo Rule Feature Extraction Module
+
+Numeric feature vectors for whole archives of NetLogo rules (experiment logs,
+populations), for analysis and selection. Each rule is tokenized and parsed
+once; counts come from the verifier's token stream and RuleAnalysis, and the
+`netlogo_length` character/word counts are derived from the same tokens.
+
+NumPy and pandas are only imported by `feature_matrix` and `feature_frame`.
+"""
+
+import os
+import re
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.verification.verify_netlogo import NetLogoVerifier, TokenType
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = [
+    # Size (chars/words match nlogo_string_count.netlogo_length with comments removed)
+    "chars", "words", "tokens",
+    # Commands
+    "commands", "movement_commands", "forward_commands", "turn_commands", "assignments", "stop_commands",
+    # Control flow
+    "conditionals", "if_count", "ifelse_count", "ifelse_value_count", "max_conditional_depth", "max_block_depth",
+    # Sensing and reporters
+    "sensor_references", "item_reporters", "random_reporters", "trig_reporters", "agent_reporters",
+    # Literals and problems
+    "numbers", "dangerous_primitives", "unknown_tokens",
+    # CodeComplexity score (0-8) behind measure_complexity
+    "complexity_score",
+]
+
+# The comments netlogo_length strips (`;` up to and including the newline), applied
+# to the text between two tokens
+_COMMENT_PATTERN = re.compile(r';[^\n]*\n?')
+
+
+class RuleFeatureExtractor:
+    """
+    Computes FEATURE_NAMES for NetLogo rules.
+
+    Public Methods:
+    - features(code: str) -> Tuple[int, ...]: One feature row
+    - feature_rows(codes, max_workers=None) -> List[Tuple[int, ...]]: Rows for many rules
+    - feature_matrix(codes, max_workers=None) -> numpy.ndarray
+    - feature_frame(codes, max_workers=None) -> pandas.DataFrame
+    """
+    FORWARD_COMMANDS = ('fd', 'forward', 'bk', 'back')
+    TURN_COMMANDS = ('rt', 'right', 'lt', 'left')
+
+    def __init__(self, verifier: Optional[NetLogoVerifier] = None, parallel_threshold: int = 2048):
+        self.verifier = verifier or NetLogoVerifier()
+        self.parallel_threshold = parallel_threshold
+
+    def features(self, code: str) -> Tuple[int, ...]:
+        """Feature row for one rule, in FEATURE_NAMES order."""
+        verifier = self.verifier
+        tokens = verifier._tokenize_compact(code)
+
+        # Size counts from token offsets: adjacent tokens form one word unless
+        # whitespace (after removing comments, as netlogo_length does) separates them
+        chars = words = numbers = unknown = 0
+        previous_end = None
+        for token in tokens:
+            token_type = token.type
+            if token_type is TokenType.EOF:
+                break
+            value = token.value
+            chars += len(value)
+            if token_type is TokenType.NUMBER:
+                numbers += 1
+            elif token_type is TokenType.UNKNOWN:
+                unknown += 1
+            elif token_type is TokenType.STRING_LITERAL:
+                # Whitespace inside a string literal is not counted and splits words
+                pieces = value.split()
+                if len(pieces) > 1:
+                    chars -= len(value) - sum(len(piece) for piece in pieces)
+                    words += len(pieces) - 1
+
+            if previous_end is None:
+                words += 1
+            elif previous_end != token.start:
+                gap = code[previous_end:token.start]
+                if ';' in gap:
+                    gap = _COMMENT_PATTERN.sub('', gap)
+                if gap:
+                    words += 1
+            previous_end = token.start + len(value)
+
+        analysis = verifier._analyze_tokens(tokens)
+        commands = analysis.command_counts
+        forward = sum(commands.get(name, 0) for name in self.FORWARD_COMMANDS)
+        turn = sum(commands.get(name, 0) for name in self.TURN_COMMANDS)
+
+        return (
+            chars, words, len(tokens) - 1,
+            sum(commands.values()), analysis.movement_commands, forward, turn,
+            analysis.assignments, commands.get('stop', 0),
+            analysis.conditional_count, analysis.if_count, analysis.ifelse_count, analysis.ifelse_value_count,
+            analysis.max_conditional_depth, analysis.max_block_depth,
+            analysis.sensor_references, analysis.reporters_used({'item'}),
+            analysis.reporters_used({'random', 'random-float'}), analysis.reporters_used({'sin', 'cos', 'tan'}),
+            analysis.reporters_used({'towards', 'distance', 'in-radius', 'any?', 'count'}),
+            numbers, len(analysis.dangerous), unknown,
+            analysis.complexity_score,
+        )
+
+    def feature_rows(self, codes: Sequence[str], max_workers: Optional[int] = None,
+                     chunk_size: Optional[int] = None) -> List[Tuple[int, ...]]:
+        """
+        Feature rows for many rules, in input order. Duplicates are computed once.
+        From `parallel_threshold` distinct rules on, the work is spread over a
+        process pool (`max_workers`, default os.cpu_count(); 1 forces serial).
+        """
+        unique_codes = list(dict.fromkeys(codes))
+        workers = max_workers or os.cpu_count() or 1
+
+        if workers <= 1 or len(unique_codes) < self.parallel_threshold:
+            rows = [self.features(code) for code in unique_codes]
+        else:
+            if chunk_size is None:
+                chunk_size = max(1, -(-len(unique_codes) // (workers * 4)))
+            chunks = [unique_codes[i:i + chunk_size] for i in range(0, len(unique_codes), chunk_size)]
+            logger.info(f"Extracting features for {len(unique_codes)} rules on {workers} workers ({len(chunks)} chunks)")
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_feature_worker,
+                                     initargs=(self.verifier._worker_state(),)) as executor:
+                rows = [row for chunk_rows in executor.map(_feature_chunk, chunks) for row in chunk_rows]
+
+        by_code = dict(zip(unique_codes, rows))
+        return [by_code[code] for code in codes]
+
+    def feature_matrix(self, codes: Sequence[str], max_workers: Optional[int] = None):
+        """Features as a (len(codes), len(FEATURE_NAMES)) NumPy array of int64."""
+        import numpy as np
+        rows = self.feature_rows(codes, max_workers)
+        return np.array(rows, dtype=np.int64).reshape(len(rows), len(FEATURE_NAMES))
+
+    def feature_frame(self, codes: Sequence[str], max_workers: Optional[int] = None):
+        """Features as a pandas DataFrame with one column per feature and a `rule` column."""
+        import pandas as pd
+        frame = pd.DataFrame(self.feature_rows(codes, max_workers), columns=FEATURE_NAMES)
+        frame.insert(0, "rule", list(codes))
+        return frame
+
+
+_worker_extractor: Optional[RuleFeatureExtractor] = None
+
+def _init_feature_worker(state: Dict) -> None:
+    """Build the per-process extractor once, with the caller's primitive sets and limits."""
+    global _worker_extractor
+    verifier = NetLogoVerifier(state["config"])
+    verifier.allowed_commands = state["allowed_commands"]
+    verifier.allowed_reporters = state["allowed_reporters"]
+    verifier.dangerous_primitives = state["dangerous_primitives"]
+    verifier.allowed_variables = state["allowed_variables"]
+    _worker_extractor = RuleFeatureExtractor(verifier)
+
+def _feature_chunk(codes: List[str]) -> List[Tuple[int, ...]]:
+    """Feature rows for one chunk of rules in a worker process."""
+    return [_worker_extractor.features(code) for code in codes]
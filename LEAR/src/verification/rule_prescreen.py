@@ -0,0 +1,195 @@
+"""
+NetLogo Rule Runtime Prescreen Module
+
+Verified rules can still fail when NetLogo runs them: `item 3 input` on a body
+with two sensors, a division by a sensor distance of zero, comparing a list
+with a number. NetLogo only reports these in `error-log` after a tick has been
+spent on the rule. RulePrescreen compiles a verified rule with NetLogoCompiler
+and dry-runs it on a fixed batch of sampled observations, returning every
+distinct runtime fault as a ValidationError so the retry loop can send it back
+to the model with the verifier's errors.
+
+The sample batch is drawn once per prescreen (seeded) and shared by every rule.
+"""
+
+import re
+import random
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.verification.verify_netlogo import NetLogoVerifier, ValidationError, ValidationResult
+from src.verification.netlogo_compiler import NetLogoCompiler, AgentState, RuleCompilationError, _to_string
+
+logger = logging.getLogger(__name__)
+
+# NetLogo names of the Python types a compiled rule works with, for type mismatch messages
+_TYPE_NAMES = {"int": "number", "float": "number", "str": "string", "list": "list", "bool": "boolean"}
+_OPERAND_TYPES = re.compile(r"'([^']+)' not supported between instances of '(\w+)' and '(\w+)'"
+                            r"|unsupported operand type\(s\) for ([^:]+): '(\w+)' and '(\w+)'"
+                            r"|can only (concatenate) (\w+) \(not \"(\w+)\"\)")
+
+# Observation layouts of `input`, by the reporter that fills it:
+#   pairs      Gridarians get-observation-vector: one [dist type] pair per sensor,
+#              dist 1..sensing-distance, type 0 (nothing) .. 5
+#   distances  simple-collection get-observation: one distance per cone, 0 when nothing is seen
+#   resources  resources get-observation: (list distances types), also split into
+#              input-resource-distances and input-resource-types
+OBSERVATIONS = {
+    "pairs": {"min_distance": 1, "sensing_distance": 30, "types": [0, 1, 2, 3, 4, 5]},
+    "distances": {"min_distance": 0, "sensing_distance": 7, "types": None},
+    "resources": {"min_distance": 0, "sensing_distance": 7, "types": ["none", "silver", "gold", "crystal"]},
+}
+
+
+class RulePrescreen:
+    """
+    Dry-runs verified NetLogo rules on sampled observations to find runtime errors.
+
+    Rules the compiler cannot translate, or that read a variable the samples do
+    not provide, cannot be prescreened and pass unchanged.
+
+    Public Methods:
+    - prescreen(code: str) -> ValidationResult: Runtime faults of a verified rule
+    - is_safe(code: str) -> Tuple[bool, str]: (passed, message), like NetLogoVerifier.is_safe
+    - samples() -> List[Dict]: The sampled variables, one dict per observation
+    """
+    # Python errors that correspond to NetLogo runtime errors of the rule
+    RUNTIME_ERRORS = (ArithmeticError, IndexError, TypeError, ValueError)
+
+    def __init__(self, compiler: Optional[NetLogoCompiler] = None, observation: str = "pairs",
+                 sensors: int = 3, sensing_distance: Optional[float] = None,
+                 sample_count: int = 256, seed: int = 0):
+        if observation not in OBSERVATIONS:
+            raise ValueError(f"Unknown observation layout: {observation} (expected {', '.join(OBSERVATIONS)})")
+        self.compiler = compiler or NetLogoCompiler()
+        self.observation = observation
+        self.sensors = sensors
+        layout = OBSERVATIONS[observation]
+        self.min_distance = layout["min_distance"]
+        self.sensing_distance = sensing_distance if sensing_distance is not None else layout["sensing_distance"]
+        self.types = layout["types"]
+        self.sample_count = sample_count
+        self.seed = seed
+        self._samples = self._draw_samples()
+
+    @property
+    def verifier(self) -> NetLogoVerifier:
+        return self.compiler.verifier
+
+    def samples(self) -> List[Dict[str, Any]]:
+        return [dict(variables) for _, variables in self._samples]
+
+    def _observation(self, distances: List[float], types: List[Any]) -> Dict[str, Any]:
+        if self.observation == "pairs":
+            return {"input": [[distance, kind] for distance, kind in zip(distances, types)]}
+        if self.observation == "distances":
+            return {"input": distances}
+        return {"input": [distances, types], "input-resource-distances": distances,
+                "input-resource-types": types}
+
+    def _draw_samples(self) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        (heading, variables) pairs. The first two are the edges every sensor can
+        report at once (nearest and farthest reading, on a freshly created agent
+        with zero energy); the rest are random, with each reading at an edge one
+        time in eight.
+        """
+        rng = random.Random(self.seed)
+        low, high = self.min_distance, self.sensing_distance
+        integral = self.observation == "pairs"
+        types = self.types or [None]
+        samples = []
+        for index in range(self.sample_count):
+            if index < 2:
+                distance = low if index == 0 else high
+                distances = [distance] * self.sensors
+                kinds = [types[-index]] * self.sensors
+                heading, energy, lifetime, food = 0, 0, 0, 0
+            else:
+                distances = []
+                for _ in range(self.sensors):
+                    roll = rng.random()
+                    if roll < 0.125:
+                        distances.append(low if roll < 0.0625 else high)
+                    elif integral:
+                        distances.append(rng.randint(low, int(high)))
+                    else:
+                        distances.append(round(rng.uniform(low, high), 3))
+                kinds = [rng.choice(types) for _ in range(self.sensors)]
+                heading = rng.randrange(360)
+                energy = rng.choice([0, rng.randint(-50, 100)])
+                lifetime, food = rng.randrange(50), rng.randrange(20)
+            variables = self._observation(distances, kinds)
+            variables.update({"energy": energy, "lifetime": lifetime, "food-collected": food, "who": index})
+            samples.append((heading, variables))
+        return samples
+
+    def prescreen(self, code: str) -> ValidationResult:
+        """
+        Run a verified rule on every sample and report each distinct runtime fault
+        (with the number of samples it occurred on and the first one's readings).
+
+        Args:
+            code: A rule that already passed NetLogoVerifier
+
+        Returns:
+            ValidationResult: Valid when no sample raised a runtime error
+        """
+        try:
+            function = self.compiler.compile(code).function
+        except RuleCompilationError as e:
+            logger.debug(f"Skipping prescreen, rule cannot be compiled: {e}")
+            return ValidationResult(True)
+
+        rng = random.Random(self.seed)
+        faults: Dict[str, List] = {}
+        for heading, variables in self._samples:
+            state = AgentState(heading=heading, variables=dict(variables), rng=rng)
+            try:
+                function(state)
+            except KeyError as e:
+                logger.debug(f"Skipping prescreen, samples do not provide variable {e}")
+                return ValidationResult(True)
+            except self.RUNTIME_ERRORS as e:
+                description = self._describe(e)
+                fault = faults.get(description)
+                if fault is None:
+                    faults[description] = [1, heading, variables]
+                else:
+                    fault[0] += 1
+
+        result = ValidationResult(True)
+        for description, (count, heading, variables) in faults.items():
+            result.add_error(ValidationError(
+                f"Runtime error: {description} on {count} of {len(self._samples)} sampled inputs "
+                f"(e.g. {self._readings(code, heading, variables)})"))
+        return result
+
+    def is_safe(self, code: str) -> Tuple[bool, str]:
+        return NetLogoVerifier._summarize(self.prescreen(code))
+
+    @staticmethod
+    def _describe(error: Exception) -> str:
+        if isinstance(error, IndexError):
+            return "item index out of range"
+        if isinstance(error, ZeroDivisionError):
+            return "division by zero"
+        if isinstance(error, OverflowError):
+            return "number too large"
+        if isinstance(error, TypeError):
+            match = _OPERAND_TYPES.search(str(error))
+            if match is None:
+                return f"type mismatch ({error})"
+            operator, left, right = [group for group in match.groups() if group is not None]
+            operator = {"**": "^", "==": "=", "concatenate": "+"}.get(operator.strip(), operator.strip())
+            return (f"type mismatch: '{operator}' between a {_TYPE_NAMES.get(left, left)} "
+                    f"and a {_TYPE_NAMES.get(right, right)}")
+        return str(error)
+
+    @staticmethod
+    def _readings(code: str, heading: float, variables: Dict[str, Any]) -> str:
+        """The sampled values of the variables the rule mentions."""
+        values = {"heading": heading, **variables} if "heading" in code else variables
+        shown = [f"{name} = {_to_string(value)}" for name, value in values.items()
+                 if re.search(rf"(?<![\w-]){re.escape(name)}(?![\w?-])", code, re.IGNORECASE)]
+        return ", ".join(shown) or f"input = {_to_string(variables['input'])}"
@@ -0,0 +1,292 @@
+"""
+NetLogo Rule Repair Module
+
+Many rules fail verification for mechanical reasons: a stray `]`, a missing
+closing bracket, a literal outside the allowed range, a dangerous primitive in
+one branch, a sentence of prose before or after the code. RuleRepair fixes
+these deterministically, driven by the errors of `NetLogoVerifier.validate_all`,
+so the graph only spends another LLM round trip on rules it cannot repair.
+
+Each round plans one edit per error it knows how to fix, applies the
+non-overlapping ones and re-verifies; after `max_rounds` rounds, or a round
+without a fix, the repair gives up. Fixes (by the error they answer):
+- prose:     leading/trailing lines that are not code (unexpected top-level identifiers)
+- unknown:   delete an unknown token
+- unmatched: delete an unmatched closing bracket/parenthesis
+- mismatch:  replace a mismatched closing bracket with the expected one
+- unclosed:  append the missing closing bracket/parenthesis
+- literal:   clamp an out-of-range number literal to the limit
+- dangerous: remove the statement using a dangerous primitive, with its bare arguments
+- orphan:    remove a bare reporter or number that is not part of any statement
+- if_else:   turn `if` with two blocks into `ifelse`
+
+RepairStats counts the attempts, successes and fixes used (see repair_stats).
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from src.verification.verify_netlogo import (NetLogoVerifier, ValidationError, AstNode, BlockNode, CommandNode,
+                                             ConditionalNode, ProgramNode, TokenType)
+from src.utils.logging import get_logger
+
+logger = get_logger()
+
+_LITERAL_RANGE = re.compile(r"Value too (large|small): [-\d.e+]+ \((?:maximum|minimum) allowed")
+_UNEXPECTED = re.compile(r"Unexpected token (?:at top level|in command block)")
+_CLOSERS = {"[": "]", "(": ")"}
+
+
+class Edit(NamedTuple):
+    """Replace source offsets [start, end) with `text`; `fix` names the repair."""
+    start: int
+    end: int
+    text: str
+    fix: str
+
+
+class RepairResult(NamedTuple):
+    code: str
+    fixes: List[str]
+    rounds: int
+
+
+class RuleRepair:
+    """
+    Deterministic repair of rules that failed verification.
+
+    Public Methods:
+    - repair(code: str, check=None) -> Optional[RepairResult]: The repaired rule, or None
+    """
+
+    def __init__(self, verifier: NetLogoVerifier, max_rounds: int = 3):
+        self.verifier = verifier
+        self.max_rounds = max_rounds
+
+    def repair(self, code: str,
+               check: Optional[Callable[[str], Tuple[bool, Optional[str]]]] = None) -> Optional[RepairResult]:
+        """
+        Repair `code` until it verifies, within `max_rounds` rounds.
+
+        Args:
+            code: A rule that failed verification
+            check: Final acceptance of the repaired rule, returning (is_safe, error_message);
+                   defaults to the verifier (pass the prescreen check here too)
+
+        Returns:
+            The repaired rule with the fixes applied, or None when it cannot be repaired
+        """
+        fixes = []
+        current = code
+        result = None
+        for round_number in range(1, self.max_rounds + 1):
+            edits = self._plan(current, self.verifier.validate_all(current).errors)
+            repaired = self._apply(current, edits)
+            if repaired == current.strip() or not repaired:
+                break
+            current = repaired
+            fixes.extend(edit.fix for edit in edits)
+            if self.verifier.validate(current).is_valid:
+                is_safe = check(current)[0] if check is not None else True
+                if is_safe:
+                    result = RepairResult(current, fixes, round_number)
+                break
+        _stats.record(result)
+        if result is not None:
+            logger.info(f"Repaired rule locally with {', '.join(result.fixes)}: {result.code}")
+        return result
+
+    # --- Planning ---
+
+    def _plan(self, code: str, errors: List[ValidationError]) -> List[Edit]:
+        """One edit per error the repair knows how to fix."""
+        tokens = self.verifier._tokenize_compact(code)
+        program = self.verifier.parse(code)
+        statements = _statement_spans(program, tokens, len(code))
+
+        edits = self._prose(code, errors)
+        if edits:
+            # Strip prose first: its words would be planned as orphans one by one
+            return edits
+
+        unclosed = []
+        for error in errors:
+            message = error.message
+            if error.start is None:
+                continue
+            if message.startswith("Unknown token"):
+                edits.append(Edit(error.start, error.end, "", "unknown"))
+            elif message.startswith("Unmatched closing bracket"):
+                edits.append(Edit(error.start, error.end, "", "unmatched"))
+            elif message.startswith("Mismatched bracket"):
+                opening = code[error.start]
+                edits.append(Edit(error.end - 1, error.end, _CLOSERS.get(opening, code[error.end - 1]), "mismatch"))
+            elif message.startswith("Unclosed bracket/parenthesis"):
+                unclosed.append(error.start)
+            elif _LITERAL_RANGE.match(message):
+                limit = self.verifier.max_value if "large" in message else self.verifier.min_value
+                edits.append(Edit(error.start, error.end, f"{limit:g}", "literal"))
+            elif message.startswith("Dangerous primitive found"):
+                span = _enclosing_statement(statements, error.start, with_arguments=True)
+                if span is not None:
+                    edits.append(Edit(span[0], span[1], "", "dangerous"))
+            elif _UNEXPECTED.match(message):
+                edits.extend(self._orphan(statements, error.start))
+        # Close the innermost bracket first
+        for start in sorted(unclosed, reverse=True):
+            edits.append(Edit(len(code), len(code), f" {_CLOSERS[code[start]]}", "unclosed"))
+        return edits
+
+    @staticmethod
+    def _orphan(statements, offset: int) -> List[Edit]:
+        """Remove a bare statement; a second block after `if` makes it an `ifelse` instead."""
+        for body, _, end, starts in statements:
+            if offset not in starts:
+                continue
+            position = starts.index(offset)
+            node = body[position]
+            previous = body[position - 1] if position else None
+            if isinstance(node, BlockNode):
+                if isinstance(previous, ConditionalNode) and previous.kind == "if" and not previous.multi:
+                    return [Edit(previous.start, previous.start + 2, "ifelse", "if_else")]
+                return []  # A bare block holds code the model meant to run somewhere
+            stop = starts[position + 1] if position + 1 < len(starts) else end
+            return [Edit(offset, stop, "", "orphan")]
+        return []
+
+    def _prose(self, code: str, errors: List[ValidationError]) -> List[Edit]:
+        """Drop a first or last line that starts with an unexpected identifier (prose around the code)."""
+        lines = [(match.start(), match.end()) for match in re.finditer(r"[^\n]*\S[^\n]*", code)]
+        if len(lines) < 2:
+            return []
+        prose_starts = {error.start for error in errors
+                        if _UNEXPECTED.match(error.message) and "IDENTIFIER" in error.message}
+        edits = []
+        for start, end in (lines[0], lines[-1]):
+            first_word = start + len(code[start:end]) - len(code[start:end].lstrip())
+            if first_word in prose_starts:
+                edits.append(Edit(start, end, "", "prose"))
+        return edits
+
+    @staticmethod
+    def _apply(code: str, edits: List[Edit]) -> str:
+        """Apply the non-overlapping edits (the first planned wins), back to front."""
+        chosen = []
+        for edit in edits:
+            if all(edit.end <= other.start or edit.start >= other.end or
+                   edit.start == edit.end == other.end == len(code) for other in chosen):
+                chosen.append(edit)
+        edits[:] = chosen
+        for edit in sorted(chosen, key=lambda edit: (edit.start, edit.end), reverse=True):
+            # A later deletion may have taken the spaces this edit ends on along
+            start, end = min(edit.start, len(code)), min(edit.end, len(code))
+            if not edit.text and (start == 0 or code[start - 1].isspace()):
+                # Take the spaces around a deletion along, so no double or trailing spaces are left
+                while end < len(code) and code[end] in " \t":
+                    end += 1
+                if end == len(code) or code[end] == "\n":
+                    while start > 0 and code[start - 1] in " \t":
+                        start -= 1
+            code = code[:start] + edit.text + code[end:]
+        return code.strip()
+
+
+def _statement_spans(program: ProgramNode, tokens, code_length: int) -> List[Tuple[List[AstNode], int, int, List[int]]]:
+    """
+    Every statement list of the rule: (body, depth, end of the list, start offset per
+    statement), where a statement runs to the start of the next one.
+    """
+    closing = {}
+    stack = []
+    for token in tokens:
+        if token.type is TokenType.LBRACKET:
+            stack.append(token.start)
+        elif token.type is TokenType.RBRACKET and stack:
+            closing[stack.pop()] = token.start
+
+    spans = []
+
+    def visit(node: AstNode, depth: int) -> None:
+        if isinstance(node, (ProgramNode, BlockNode)) and node.body:
+            end = code_length if isinstance(node, ProgramNode) else closing.get(node.start, code_length)
+            spans.append((node.body, depth, end, [statement.start for statement in node.body]))
+        for child in node.children():
+            visit(child, depth + 1)
+
+    visit(program, 0)
+    return spans
+
+
+def _enclosing_statement(spans, offset: int, with_arguments: bool) -> Optional[Tuple[int, int]]:
+    """
+    Source span of the innermost statement containing `offset`. With `with_arguments`
+    the bare reporters and blocks after it (e.g. `turtles [ die ]` after `ask`) are
+    included, up to the next command or conditional.
+    """
+    best = None
+    for body, depth, end, starts in spans:
+        for position, start in enumerate(starts):
+            stop = starts[position + 1] if position + 1 < len(starts) else end
+            if start <= offset < stop and (best is None or depth > best[0]):
+                if with_arguments:
+                    following = position + 1
+                    while following < len(body) and not isinstance(body[following], (CommandNode, ConditionalNode)):
+                        following += 1
+                    stop = starts[following] if following < len(starts) else end
+                best = (depth, start, stop)
+    return (best[1], best[2]) if best is not None else None
+
+
+class RepairStats:
+    """
+    Counters of local repairs.
+
+    Public Methods:
+    - record(result): Count one repair attempt (None when it failed)
+    - report() -> Dict: Attempts, repaired, success rate, mean rounds and fixes used
+    - reset(): Forget all attempts
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record(self, result: Optional[RepairResult]) -> None:
+        with self._lock:
+            self._attempts += 1
+            if result is not None:
+                self._repaired += 1
+                self._rounds += result.rounds
+                self._fixes.update(result.fixes)
+
+    def report(self) -> Dict:
+        with self._lock:
+            return {
+                "attempts": self._attempts,
+                "repaired": self._repaired,
+                "success_rate": round(self._repaired / self._attempts, 4) if self._attempts else 0.0,
+                "mean_rounds": round(self._rounds / self._repaired, 2) if self._repaired else None,
+                "fixes": dict(self._fixes.most_common()),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._attempts = 0
+            self._repaired = 0
+            self._rounds = 0
+            self._fixes: Counter = Counter()
+
+
+_stats = RepairStats()
+
+
+def repair_stats() -> Dict:
+    """Local repair statistics so far; each successful repair saved an LLM retry."""
+    return _stats.report()
+
+
+def reset_repair_stats() -> None:
+    """Forget the repairs counted so far."""
+    _stats.reset()
@@ -0,0 +1,35 @@
+import unittest
+
+from verify_netlogo import NetLogoVerifier
+from verifier_test_data import basic_test_cases
+
+
+class TestBatchVerification(unittest.TestCase):
+
+    def setUp(self):
+        self.codes = [code for code, _ in basic_test_cases]
+        self.expected = [expected for _, expected in basic_test_cases]
+
+    def test_serial_matches_single_calls(self):
+        verifier = NetLogoVerifier()
+        results = verifier.validate_many(self.codes + self.codes, max_workers=1)
+        self.assertEqual([r.is_valid for r in results], self.expected + self.expected)
+        self.assertIsNot(results[0], results[len(self.codes)])
+
+    def test_process_pool_preserves_order(self):
+        verifier = NetLogoVerifier({"parallel_threshold": 1})
+        verifier.dangerous_primitives.add('bk')
+        codes = self.codes + ['fd 1 bk 1']
+        results = verifier.is_safe_many(codes, max_workers=2, chunk_size=3)
+        self.assertEqual([ok for ok, _ in results], self.expected + [False])
+        self.assertEqual(results, [verifier.is_safe(code) for code in codes])
+
+    def test_uses_cache(self):
+        verifier = NetLogoVerifier({"cache_size": 64})
+        verifier.validate_many(self.codes, max_workers=1)
+        verifier.validate_many(self.codes, max_workers=1)
+        self.assertEqual(verifier.cache_stats()["hits"], len(self.codes))
+
+
+if __name__ == '__main__':
+    unittest.main()
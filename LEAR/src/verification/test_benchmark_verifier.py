@@ -0,0 +1,34 @@
+import unittest
+from itertools import islice
+
+from benchmark_verifier import compare, percentile, synthetic_corpus
+
+
+def report(rules_per_sec):
+    return {"results": {"fixtures": {"validate": {"rules_per_sec": rules_per_sec}}}}
+
+
+class TestBenchmarkVerifier(unittest.TestCase):
+
+    def test_compare_flags_regressions_past_threshold(self):
+        self.assertEqual(compare(report(950), report(1000), 0.10), [])
+        regressions = compare(report(850), report(1000), 0.10)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("fixtures/validate", regressions[0])
+
+    def test_compare_ignores_entries_missing_from_baseline(self):
+        self.assertEqual(compare(report(10), {"results": {}}, 0.10), [])
+
+    def test_synthetic_corpus_is_deterministic(self):
+        first = list(islice(synthetic_corpus(1_000_000, seed=3), 50))
+        second = list(synthetic_corpus(50, seed=3))
+        self.assertEqual(first, second)
+
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 0.5), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
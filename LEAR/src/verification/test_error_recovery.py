@@ -0,0 +1,52 @@
+import unittest
+
+from verify_netlogo import NetLogoVerifier
+from verifier_test_data import basic_test_cases, advanced_test_cases
+
+
+class TestErrorRecovery(unittest.TestCase):
+
+    def setUp(self):
+        self.verifier = NetLogoVerifier()
+
+    def test_reports_errors_from_every_stage(self):
+        code = "fd 1 $ rt 2 ask turtles [ die ] lt 5000"
+        self.assertEqual(len(self.verifier.validate(code).errors), 1)
+        messages = [error.message for error in self.verifier.validate_all(code).errors]
+        self.assertEqual(messages, [
+            "Dangerous primitive found: ask",
+            "Dangerous primitive found: die",
+            "Unknown token: '$'",
+            "Value too large: 5000.0 (maximum allowed: 1000)",
+        ])
+
+    def test_syntax_errors_do_not_cascade_across_statements(self):
+        code = "ifelse item 0 input > 0 [ fd ] [ rt 2 2 ] lt (1 +"
+        errors = self.verifier.validate_all(code).errors
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(errors[0].message, "Unclosed bracket/parenthesis: '('")
+        self.assertEqual(code[errors[1].start:errors[1].end], "fd")
+        self.assertEqual(code[errors[2].start:errors[2].end], "2")
+
+    def test_errors_carry_token_spans(self):
+        code = "fd 1\nrt 90 ]"
+        error = self.verifier.validate_all(code).errors[0]
+        self.assertEqual(code[error.start:error.end], "]")
+        self.assertEqual(error.line_number, 2)
+
+    def test_validity_matches_validate(self):
+        for code, _ in basic_test_cases + advanced_test_cases[0]:
+            result = self.verifier.validate_all(code)
+            self.assertEqual(result.is_valid, self.verifier.validate(code).is_valid, code)
+            if not result.is_valid:
+                self.assertGreaterEqual(len(result.errors), 1)
+
+    def test_is_safe_report_all(self):
+        is_safe, message = self.verifier.is_safe("fd $ ask turtles", report_all=True)
+        self.assertFalse(is_safe)
+        self.assertIn("ask", message)
+        self.assertIn("$", message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+from unittest import mock
+
+from verify_netlogo import (NetLogoVerifier, NodeVisitor, BinaryOpNode, CodeComplexity,
+                            CommandNode, ConditionalNode, ErrorNode, ReporterNode, _AstBuilder)
+from verifier_test_data import basic_test_cases, advanced_test_cases, prompt_examples
+
+
+class NodeCollector(NodeVisitor):
+
+    def __init__(self):
+        self.nodes = []
+
+    def generic_visit(self, node):
+        self.nodes.append(node)
+        super().generic_visit(node)
+
+
+class TestNetLogoAst(unittest.TestCase):
+
+    def setUp(self):
+        self.verifier = NetLogoVerifier()
+
+    def test_reporter_arguments_bind_tighter_than_operators(self):
+        program = self.verifier.parse("if item 0 input > 0 [ fd random 10 + 5 ]")
+        conditional = program.body[0]
+        self.assertIsInstance(conditional, ConditionalNode)
+        condition, block = conditional.clauses[0]
+        self.assertIsInstance(condition, BinaryOpNode)
+        self.assertEqual(condition.op, '>')
+        self.assertIsInstance(condition.left, ReporterNode)
+        self.assertEqual(condition.left.name, 'item')
+        forward = block.body[0]
+        self.assertIsInstance(forward, CommandNode)
+        self.assertEqual(forward.args[0].op, '+')
+        self.assertEqual(forward.args[0].left.name, 'random')
+
+    def test_multi_conditional_and_variadic_forms(self):
+        program = self.verifier.parse("(ifelse item 0 input > 1 [ fd 1 ] item 1 input > 1 [ rt 90 ] [ lt (word 1 2 3) ])")
+        conditional = program.body[0]
+        self.assertTrue(conditional.multi)
+        self.assertEqual(len(conditional.clauses), 2)
+        word = conditional.else_block.body[0].args[0]
+        self.assertTrue(word.variadic)
+        self.assertEqual(len(word.args), 3)
+
+    def test_parse_is_tolerant_and_keeps_source_offsets(self):
+        code = "fd 1 ] rt 90"
+        program = self.verifier.parse(code)
+        self.assertIsInstance(program.body[1], ErrorNode)
+        collector = NodeCollector()
+        collector.visit(program)
+        for node in collector.nodes[1:]:
+            self.assertEqual(code[node.start:node.start + 1], code[node.start:].split()[0][0])
+
+    def test_analysis_counts(self):
+        analysis = self.verifier.analyze(
+            "let d item 0 input ifelse d > 1 [ if d > 5 [ fd 1 ] ] [ rt random 20 ask turtles [ die ] ]")
+        self.assertEqual(analysis.assignments, 1)
+        self.assertEqual(analysis.if_count, 1)
+        self.assertEqual(analysis.ifelse_count, 1)
+        self.assertEqual(analysis.max_conditional_depth, 2)
+        self.assertEqual(analysis.movement_commands, 2)
+        self.assertEqual(analysis.sensor_references, 1)
+        self.assertEqual([flagged.name for flagged in analysis.dangerous], ['ask', 'die'])
+
+    def test_nested_conditionals_across_lines(self):
+        code = "ifelse item 0 input > 0 [\n  ifelse item 1 input > 0 [ fd 1 ] [ rt 90 ]\n] [ bk 1 ]"
+        self.assertEqual(self.verifier.measure_complexity(code), CodeComplexity.MODERATE)
+
+    def test_value_ranges_of_expressions(self):
+        cases = {
+            "fd 500 * 3": "500 * 3",
+            "rt (random 900) + 900": "(random 900) + 900",
+            "fd (500 * 3) / 10": "500 * 3",
+            "rt 2 ^ 11": "2 ^ 11",
+            "fd 10 / 0": "10 / 0",
+        }
+        for code, snippet in cases.items():
+            result = self.verifier.validate(code)
+            self.assertFalse(result.is_valid, code)
+            self.assertEqual(len(result.errors), 1, code)
+            self.assertEqual(code[result.errors[0].start:result.errors[0].end], snippet)
+        for code in ["rt random 900 + 100", "fd sin 90 * 999", "fd item 0 input * 500", "rt random-float 2 * 400"]:
+            self.assertTrue(self.verifier.validate(code).is_valid, code)
+
+        bounded = NetLogoVerifier({"input_range": [0, 10]})
+        self.assertFalse(bounded.validate("fd item 0 input * 500").is_valid)
+        self.assertTrue(bounded.validate("fd item 0 input * 50").is_valid)
+
+    def test_validate_and_measure_matches_separate_calls(self):
+        cases = [code for code, _ in basic_test_cases] + [code for code, _ in advanced_test_cases[0]] + prompt_examples
+        for code in cases:
+            result, complexity = self.verifier.validate_and_measure(code)
+            self.assertEqual(result.is_valid, self.verifier.validate(code).is_valid, code)
+            self.assertEqual([str(e) for e in result.errors],
+                             [str(e) for e in self.verifier.validate(code).errors], code)
+            self.assertEqual(complexity, self.verifier.measure_complexity(code), code)
+
+    def test_syntax_is_checked_on_the_ast(self):
+        self.assertTrue(self.verifier.validate("ifelse item 0 input > 0 [ fd (1 + random 10) ] [ rt 90 ]").is_valid)
+        cases = {
+            "fd (random 10 > 0.5)": "Command 'fd' expects arg 1 to be number, but got boolean",
+            "fd (1 2)": "Invalid arg 1 for 'fd': Expected ')' to close parenthesis opened on line 1",
+            "fd 1 + \"a\"": "Invalid arg 1 for 'fd': Operator '+' expects numeric operands, but got number and string",
+            "if energy > 5 [ fd ]": "Invalid command sequence in if branch (line ~1): Command 'fd' expects 1 arg(s), found end of input",
+            "(ifelse input > 0 [ fd 1 ] [ fd 2 ] rt 3)": "Expected ')' after final else branch in ifelse",
+        }
+        for code, message in cases.items():
+            result = self.verifier.validate(code)
+            self.assertFalse(result.is_valid, code)
+            self.assertEqual(result.errors[0].message, message, code)
+
+    def test_validation_parses_once(self):
+        verifier = NetLogoVerifier({"cache_size": 16})
+        code = "ifelse item 0 input > 0 [ fd (1 + 2) ] [ rt 90 ]"
+        with mock.patch.object(_AstBuilder, 'parse_program', autospec=True,
+                               side_effect=_AstBuilder.parse_program) as parse_program:
+            result, complexity = verifier.validate_and_measure(code)
+            self.assertEqual(parse_program.call_count, 1)
+            # A cache hit returns the stored complexity without parsing again
+            self.assertEqual(verifier.validate_and_measure(code), (result, complexity))
+            self.assertEqual(parse_program.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import random
+import sys
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.verification.netlogo_compiler import NetLogoCompiler, AgentState, RuleCompilationError
+
+
+class TestNetLogoCompiler(unittest.TestCase):
+
+    def setUp(self):
+        self.compiler = NetLogoCompiler()
+
+    def test_movement_follows_netlogo_heading(self):
+        rule = self.compiler.compile("rt 90 fd 2 lt 90 bk 1")
+        state = AgentState()
+        rule(state)
+        self.assertAlmostEqual(state.xcor, 2)
+        self.assertAlmostEqual(state.ycor, -1)
+        self.assertAlmostEqual(state.heading, 0)
+
+    def test_conditionals_read_sensor_variables(self):
+        rule = self.compiler.compile(
+            "(ifelse item 0 input > 5 [ fd 1 ] item 1 input > 5 [ rt 90 ] item 2 input = 1 [ lt 45 ] [ lt 90 ])")
+        cases = [([6, 0, 0], (0, 1, 0)), ([0, 6, 0], (0, 0, 90)), ([0, 0, 1], (0, 0, 315)), ([0, 0, 0], (0, 0, 270))]
+        for observations, (x, y, heading) in cases:
+            state = AgentState(variables={'input': observations})
+            rule(state)
+            self.assertAlmostEqual(state.xcor, x)
+            self.assertAlmostEqual(state.ycor, y)
+            self.assertAlmostEqual(state.heading, heading)
+
+    def test_random_is_drawn_from_agent_rng(self):
+        rule = self.compiler.compile("rt random 360 fd random-float 2")
+        first, second = AgentState(rng=random.Random(7)), AgentState(rng=random.Random(7))
+        rule(first)
+        rule(second)
+        self.assertEqual((first.xcor, first.ycor, first.heading), (second.xcor, second.ycor, second.heading))
+        self.assertEqual(first.heading, int(first.heading))
+
+    def test_set_and_stop(self):
+        rule = self.compiler.compile("set energy energy - 1 if energy < 5 [ stop ] fd 1")
+        state = AgentState(variables={'energy': 6})
+        rule(state)
+        self.assertEqual(state.variables['energy'], 5)
+        self.assertAlmostEqual(state.ycor, 1)
+        rule(state)
+        self.assertEqual(state.variables['energy'], 4)
+        self.assertAlmostEqual(state.ycor, 1)
+
+    def test_rejects_invalid_and_unsupported_rules(self):
+        with self.assertRaises(RuleCompilationError):
+            self.compiler.compile("ask turtles [ die ]")
+        with self.assertRaises(RuleCompilationError):
+            self.compiler.compile("fd 1 lt towards [0 0]")
+
+    def test_compiled_rules_are_cached(self):
+        first = self.compiler.compile("fd 1 rt 45")
+        second = self.compiler.compile("fd 1 rt 45")
+        self.assertIs(first, second)
+        self.assertEqual(self.compiler.cache_stats()['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import random
+import sys
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.verification.rule_canonicalizer import RuleCanonicalizer, DuplicateTracker, duplicate_report
+from src.verification.verifier_test_data import basic_test_cases, advanced_test_cases, prompt_examples
+
+
+class TestRuleCanonicalizer(unittest.TestCase):
+
+    def setUp(self):
+        self.canonicalizer = RuleCanonicalizer()
+
+    def test_surface_variations_share_a_hash(self):
+        variants = [
+            "fd 1 rt (random 10) + 5",
+            "FORWARD 1.0   ; move\n  RIGHT (random 10) + 5",
+            "forward (1) right ((random 10)) + (5)",
+        ]
+        hashes = {self.canonicalizer.structural_hash(code) for code in variants}
+        self.assertEqual(len(hashes), 1)
+        self.assertEqual(self.canonicalizer.canonical_text(variants[1]), "fd 1 rt (random 10) + 5")
+
+    def test_grouping_parentheses_are_kept(self):
+        self.assertNotEqual(self.canonicalizer.structural_hash("fd random (10 + 5)"),
+                            self.canonicalizer.structural_hash("fd random 10 + 5"))
+        self.assertEqual(self.canonicalizer.canonical_text("fd (2 * (1 + 3))"), "fd (2 * (1 + 3))")
+        # The verifier reads `sin item 1 input = 1` as `sin (item 1 input = 1)`
+        code = "if (sin item 1 input) = 1 [ fd 1 ]"
+        self.assertEqual(self.canonicalizer.canonical_text(code), code)
+        self.assertEqual(self.canonicalizer.canonical_text("set heading (- item 1 input) fd 1"),
+                         "set heading (- item 1 input) fd 1")
+
+    def test_canonical_form_is_idempotent_and_keeps_the_verdict(self):
+        verifier = self.canonicalizer.verifier
+        pieces = ["fd", "rt", "set", "let", "x", "heading", "1", "2.0", "-1", "-x", "1e400", "(", ")", "[", "]",
+                  "(ifelse", "(ifelse-value", "if", "ifelse", "ifelse-value", "item", "0", "input", "sin", "random",
+                  "max", "list", "(list", "word", '"a"', ">", "=", "+", "-", "*", "^", "and", "not", "stop", "turtles"]
+        rng = random.Random(0)
+        for _ in range(3000):
+            code = " ".join(rng.choice(pieces) for _ in range(rng.randint(1, 12)))
+            canonical = self.canonicalizer.canonicalize(code)
+            self.assertEqual(self.canonicalizer.canonicalize(canonical.text), canonical, code)
+            self.assertEqual(verifier.is_safe(canonical.text)[0], verifier.is_safe(code)[0], code)
+
+    def test_malformed_rules_fall_back_to_tokens(self):
+        # A command in expression position, an unclosed block and an incomplete conditional
+        for code in ("+ stop input item list max list + word", "[ word fd", "not ifelse-value x and turtles 1"):
+            with self.subTest(code=code):
+                text = self.canonicalizer.canonical_text(code)
+                self.assertEqual(self.canonicalizer.canonical_text(text), text)
+        self.assertEqual(self.canonicalizer.canonical_text("[ WORD fd"), "[ word fd")
+
+    def test_canonical_text_is_stable_and_keeps_validity(self):
+        verifier = self.canonicalizer.verifier
+        cases = [code for code, _ in basic_test_cases + advanced_test_cases[0]] + prompt_examples
+        for code in cases:
+            text = self.canonicalizer.canonical_text(code)
+            self.assertEqual(self.canonicalizer.canonical_text(text), text, code)
+            self.assertEqual(verifier.validate(text).is_valid, verifier.validate(code).is_valid, code)
+
+    def test_duplicate_report(self):
+        report = duplicate_report(["fd 1 rt 90", "FD 1  RIGHT 90", "fd 1 rt 90 ; same", "lt 45"])
+        self.assertEqual(report["rules"], 4)
+        self.assertEqual(report["unique"], 2)
+        self.assertEqual(report["duplicates"], 2)
+        self.assertEqual(report["largest_groups"], [{"canonical": "fd 1 rt 90", "count": 3}])
+
+    def test_tracker_flags_repeats(self):
+        tracker = DuplicateTracker(self.canonicalizer)
+        self.assertEqual(tracker.observe_many(["fd 1", "bk 1", "forward 1"]), [False, False, True])
+        # One count and one canonical text per structure, not every rule seen
+        self.assertEqual(tracker.counts, {self.canonicalizer.structural_hash("fd 1"): 2,
+                                          self.canonicalizer.structural_hash("bk 1"): 1})
+        self.assertEqual(sorted(tracker.examples.values()), ["bk 1", "fd 1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import importlib.util
+import sys
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.nlogo_string_count.netlogo_str_func import netlogo_length
+from src.verification.rule_features import RuleFeatureExtractor, FEATURE_NAMES
+from src.verification.verifier_test_data import basic_test_cases, advanced_test_cases, prompt_examples
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+HAS_PANDAS = importlib.util.find_spec("pandas") is not None
+
+
+class TestRuleFeatures(unittest.TestCase):
+
+    def setUp(self):
+        self.extractor = RuleFeatureExtractor()
+        self.cases = [code for code, _ in basic_test_cases + advanced_test_cases[0]] + prompt_examples
+
+    def features(self, code):
+        return dict(zip(FEATURE_NAMES, self.extractor.features(code)))
+
+    def test_counts(self):
+        row = self.features("ifelse item 0 input > 5 [ fd 1 rt random 45 ] [ if item 1 input < 2 [ bk 1 ] ]")
+        self.assertEqual(len(self.extractor.features("fd 1")), len(FEATURE_NAMES))
+        self.assertEqual(row["movement_commands"], 3)
+        self.assertEqual(row["forward_commands"], 2)
+        self.assertEqual(row["turn_commands"], 1)
+        self.assertEqual(row["conditionals"], 2)
+        self.assertEqual(row["ifelse_count"], 1)
+        self.assertEqual(row["if_count"], 1)
+        self.assertEqual(row["max_conditional_depth"], 2)
+        self.assertEqual(row["item_reporters"], 2)
+        self.assertEqual(row["random_reporters"], 1)
+        self.assertEqual(self.features("ask turtles [ die ]")["dangerous_primitives"], 2)
+
+    def test_size_matches_netlogo_length(self):
+        extra = ["fd 1;c\nrt 2", 'fd 1 ; note\n rt "a b"', "fd   1\n\n;x\nrt 2 ;y"]
+        for code in self.cases + extra:
+            row = self.features(code)
+            self.assertEqual(row["chars"], netlogo_length(code), code)
+            self.assertEqual(row["words"], netlogo_length(code, count_words=True), code)
+
+    def test_feature_rows_keep_order_and_duplicates(self):
+        codes = self.cases + self.cases[:5]
+        rows = self.extractor.feature_rows(codes, max_workers=1)
+        self.assertEqual(rows, [self.extractor.features(code) for code in codes])
+
+    def test_parallel_rows_match_serial(self):
+        parallel = RuleFeatureExtractor(parallel_threshold=1)
+        self.assertEqual(parallel.feature_rows(self.cases, max_workers=2, chunk_size=16),
+                         self.extractor.feature_rows(self.cases, max_workers=1))
+
+    @unittest.skipUnless(HAS_NUMPY and HAS_PANDAS, "numpy and pandas are required")
+    def test_matrix_and_frame(self):
+        matrix = self.extractor.feature_matrix(self.cases)
+        self.assertEqual(matrix.shape, (len(self.cases), len(FEATURE_NAMES)))
+        frame = self.extractor.feature_frame(self.cases)
+        self.assertEqual(list(frame.columns), ["rule"] + FEATURE_NAMES)
+        self.assertEqual(frame["tokens"].tolist(), matrix[:, FEATURE_NAMES.index("tokens")].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.verification.rule_prescreen import RulePrescreen
+from src.verification.verifier_test_data import basic_test_cases
+
+
+class TestRulePrescreen(unittest.TestCase):
+
+    def setUp(self):
+        self.pairs = RulePrescreen(observation="pairs", sensors=2)
+        self.distances = RulePrescreen(observation="distances")
+
+    def test_samples_follow_observation_layout(self):
+        samples = self.pairs.samples()
+        self.assertEqual(len(samples), 256)
+        for sample in samples:
+            self.assertEqual(len(sample["input"]), 2)
+            for distance, kind in sample["input"]:
+                self.assertTrue(1 <= distance <= 30)
+                self.assertIn(kind, range(6))
+        self.assertIn(0, [reading for sample in self.distances.samples() for reading in sample["input"]])
+        resources = RulePrescreen(observation="resources").samples()[5]
+        self.assertEqual(resources["input"], [resources["input-resource-distances"], resources["input-resource-types"]])
+        self.assertEqual(samples, RulePrescreen(observation="pairs", sensors=2).samples())
+
+    def test_reports_runtime_errors(self):
+        result = self.pairs.prescreen("fd 1 rt item 0 item 3 input")
+        self.assertFalse(result.is_valid)
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn("item index out of range on 256 of 256", result.errors[0].message)
+
+        result = self.distances.prescreen("fd 10 / item 1 input")
+        self.assertFalse(result.is_valid)
+        self.assertIn("division by zero", result.errors[0].message)
+        self.assertIn("input = [0 0 0]", result.errors[0].message)
+
+        is_safe, message = self.pairs.is_safe("if item 0 input > 5 [ fd 1 ]")
+        self.assertFalse(is_safe)
+        self.assertIn("type mismatch: '>' between a list and a number", message)
+
+        # Negative indices fail in NetLogo instead of counting from the end
+        self.assertFalse(self.distances.prescreen("fd item (0 - 1) input").is_valid)
+
+    def test_distinct_faults_are_reported_once(self):
+        result = self.distances.prescreen("ifelse item 0 input > 3 [ fd 1 / item 1 input ] [ rt item 5 input ]")
+        self.assertEqual(len(result.errors), 2)
+        self.assertIn("division by zero", result.errors[0].message + result.errors[1].message)
+        self.assertIn("item index out of range", result.errors[0].message + result.errors[1].message)
+        counts = [int(error.message.split(" on ")[1].split()[0]) for error in result.errors]
+        self.assertTrue(all(0 < count < 256 for count in counts))
+
+    def test_passes_rules_that_run_everywhere(self):
+        for code in ["fd 1 rt random 30", "if item 1 input > 0 [ fd 10 / item 1 input ]",
+                     "fd item 0 item 1 input", "set energy energy - 1"]:
+            with self.subTest(code=code):
+                prescreen = self.pairs if "item 0 item" in code else self.distances
+                self.assertEqual(prescreen.is_safe(code), (True, "Code appears safe"))
+
+    def test_unsupported_rules_pass(self):
+        # Reporters over other agents cannot be compiled, unsampled variables cannot be read
+        self.assertTrue(self.distances.prescreen("fd 1 lt towards [0 0]").is_valid)
+        self.assertTrue(self.distances.prescreen("if item 0 food-observations > 1 [ fd 1 ]").is_valid)
+
+    def test_verified_fixtures_do_not_crash(self):
+        for code, expected in basic_test_cases:
+            if expected:
+                self.distances.prescreen(code)
+
+
+if __name__ == '__main__':
+    unittest.main()
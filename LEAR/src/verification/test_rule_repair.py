@@ -0,0 +1,151 @@
+import importlib.util
+import random
+import sys
+import unittest
+from pathlib import Path
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.verification.rule_prescreen import RulePrescreen
+from src.verification.rule_repair import RuleRepair, repair_stats, reset_repair_stats
+from src.verification.verify_netlogo import NetLogoVerifier
+
+HAS_GRAPH_DEPS = all(importlib.util.find_spec(name) is not None
+                     for name in ("langgraph", "langchain_core", "gin", "dotenv", "pydantic", "yaml"))
+
+if HAS_GRAPH_DEPS:
+    from src.graph_providers.base import GraphProviderBase
+    from src.graph_providers.registry import invalidate
+    from src.netlogo_code_generator.graph import NetLogoCodeGenerator
+
+    class StrayBracketProvider(GraphProviderBase):
+        """Local provider whose rules always end with a stray `]`."""
+
+        def __init__(self, verifier):
+            super().__init__(verifier)
+            self.calls = 0
+
+        def initialize_model(self):
+            return None
+
+        def generate_code_from_state(self, state):
+            self.calls += 1
+            return f"fd {state['agent_info'][1]} ]"
+
+        async def agenerate_code_from_state(self, state):
+            return self.generate_code_from_state(state)
+
+
+class TestRuleRepair(unittest.TestCase):
+
+    def setUp(self):
+        reset_repair_stats()
+        self.verifier = NetLogoVerifier()
+        self.repair = RuleRepair(self.verifier)
+
+    def tearDown(self):
+        reset_repair_stats()
+
+    def test_repairs_mechanical_errors(self):
+        cases = [
+            ("fd 1 ] rt 90", "fd 1 rt 90", ["unmatched"]),
+            ("fd 1 rt $ 90", "fd 1 rt 90", ["unknown"]),
+            ("if item 0 input > 2 [ fd 1", "if item 0 input > 2 [ fd 1 ]", ["unclosed"]),
+            ("if item 0 input > 2 [ fd (1 + 2 ]", "if item 0 input > 2 [ fd (1 + 2 ) ]", ["mismatch", "unclosed"]),
+            ("fd 5000 rt -5000", "fd 1000 rt -1000", ["literal", "literal"]),
+            ("fd 1 ask turtles [ die ] rt 3", "fd 1 rt 3", ["dangerous"]),
+            ("if item 0 input > 2 [ fd 1 ] [ rt 90 ]", "ifelse item 0 input > 2 [ fd 1 ] [ rt 90 ]", ["if_else"]),
+            ("Here is the rule:\nfd 1 rt 10\nIt turns right.", "fd 1 rt 10", ["prose", "prose"]),
+        ]
+        for code, expected, fixes in cases:
+            with self.subTest(code=code):
+                result = self.repair.repair(code)
+                self.assertIsNotNone(result)
+                self.assertEqual(result.code, expected)
+                self.assertEqual(result.fixes, fixes)
+                self.assertTrue(self.verifier.is_safe(result.code)[0])
+
+    def test_unrepairable_rules(self):
+        # Repairing these would change what the rule means
+        for code in ("fd count turtles", "fd 1 [ rt 2 ]", "ask turtles [ die ]"):
+            with self.subTest(code=code):
+                self.assertIsNone(self.repair.repair(code))
+        self.assertIsNone(RuleRepair(self.verifier, max_rounds=1).repair("Here is the rule:\nfd 1 ]\nDone."))
+
+    def test_check_rejects_repaired_rule(self):
+        prescreen = RulePrescreen(observation="pairs", sensors=2)
+        self.assertIsNone(self.repair.repair("fd item 0 item 3 input ]", prescreen.is_safe))
+        self.assertEqual(self.repair.repair("fd item 0 item 1 input ]", prescreen.is_safe).code,
+                         "fd item 0 item 1 input")
+
+    def test_fuzzed_rules_do_not_raise(self):
+        # Regression: a deletion taking spaces along left the edit before it past the end of the rule
+        self.assertIsNone(self.repair.repair("+ is not x"))
+        pieces = ["fd", "rt", "1", "5000", "[", "]", "(", ")", "if", "ifelse", "item", "0", "input", ">", "+",
+                  "ask", "turtles", "die", "$", "Here", "is", "\n", "not", "and", "let", "x", "repeat", "  "]
+        rng = random.Random(0)
+        for _ in range(2000):
+            code = " ".join(rng.choice(pieces) for _ in range(rng.randint(1, 12)))
+            result = self.repair.repair(code)
+            if result is not None:
+                self.assertTrue(self.verifier.is_safe(result.code)[0], code)
+
+    def test_stats(self):
+        self.repair.repair("fd 1 ] rt 90")
+        self.repair.repair("Here is the rule\nfd 5000 ]\nIt moves")
+        self.repair.repair("fd count turtles")
+        stats = repair_stats()
+        self.assertEqual((stats["attempts"], stats["repaired"]), (3, 2))
+        self.assertEqual(stats["success_rate"], round(2 / 3, 4))
+        self.assertEqual(stats["mean_rounds"], 2.0)  # Trailing prose only shows once the `]` is gone
+        self.assertEqual(stats["fixes"], {"unmatched": 2, "prose": 2, "literal": 1})
+        reset_repair_stats()
+        self.assertEqual(repair_stats()["attempts"], 0)
+
+
+@unittest.skipUnless(HAS_GRAPH_DEPS, "LangGraph/LangChain are not installed")
+class TestRepairNode(unittest.TestCase):
+
+    def setUp(self):
+        invalidate()
+        reset_repair_stats()
+        self.verifier = NetLogoVerifier()
+        self.agent_infos = [["rt 1", index + 1, "rt 1", 0, 0, f"text {index}"] for index in range(4)]
+
+    def tearDown(self):
+        invalidate()
+        reset_repair_stats()
+
+    def test_repaired_rule_needs_no_retry(self):
+        provider = StrayBracketProvider(self.verifier)
+        generator = NetLogoCodeGenerator(provider, self.verifier, repair=RuleRepair(self.verifier))
+        self.assertEqual(generator.generate_code(self.agent_infos[0], "text 0"), ("fd 1", "text 0"))
+        self.assertEqual(provider.calls, 1)
+        results = generator.generate_many(self.agent_infos, [info[5] for info in self.agent_infos])
+        self.assertEqual([code for code, _ in results], ["fd 1", "fd 2", "fd 3", "fd 4"])
+        self.assertEqual(provider.calls, 5)
+        self.assertEqual(repair_stats()["repaired"], 5)
+
+    def test_failing_repair_falls_back_to_retry(self):
+        class BrokenRepair(RuleRepair):
+            def repair(self, code, check=None):
+                raise IndexError("string index out of range")
+
+        provider = StrayBracketProvider(self.verifier)
+        generator = NetLogoCodeGenerator(provider, self.verifier, repair=BrokenRepair(self.verifier))
+        results = generator.generate_many(self.agent_infos, [info[5] for info in self.agent_infos])
+        self.assertEqual([code for code, _ in results], ["rt 1"] * 4)  # Retried, then the parent rule is kept
+        self.assertGreater(provider.calls, 4)
+
+    def test_without_repair_retries(self):
+        provider = StrayBracketProvider(self.verifier)
+        generator = NetLogoCodeGenerator(provider, self.verifier)
+        code, _ = generator.generate_code(self.agent_infos[0], "text 0")
+        self.assertEqual(code, "rt 1")  # Every retry fails, so the parent rule is kept
+        self.assertGreater(provider.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from verify_netlogo import NetLogoVerifier
+from verifier_test_data import basic_test_cases, advanced_test_cases
+
+
+def feed_in_chunks(stream, code, size):
+    for i in range(0, len(code), size):
+        if stream.feed(code[i:i + size]):
+            break
+
+
+class TestStreamingVerification(unittest.TestCase):
+
+    def setUp(self):
+        self.verifier = NetLogoVerifier()
+
+    def test_split_tokens_are_not_flagged(self):
+        stream = self.verifier.start_stream()
+        for chunk in ('lt rand', 'om-fl', 'oat 1', '.', '5 fo', 'rward 2'):
+            self.assertIsNone(stream.feed(chunk))
+        self.assertTrue(stream.finish().is_valid)
+
+    def test_aborts_on_dangerous_primitive(self):
+        stream = self.verifier.start_stream()
+        self.assertIsNone(stream.feed('fd 1 ask'))
+        error = stream.feed(' turtles [ fd 1 ]')
+        self.assertIn('Dangerous primitive found: ask', error.message)
+        self.assertTrue(stream.aborted)
+
+    def test_aborts_on_unmatched_closing_bracket(self):
+        stream = self.verifier.start_stream()
+        self.assertIsNotNone(stream.feed('fd 1 ] rt 90 '))
+
+    def test_pending_string_literal_is_not_unknown(self):
+        stream = self.verifier.start_stream()
+        self.assertIsNone(stream.feed('fd 1 if "go'))
+        self.assertIsNone(stream.feed('ld" = "gold" [ fd 1 ] '))
+
+    def test_matches_full_validation(self):
+        cases = basic_test_cases + advanced_test_cases[0]
+        for code, _ in cases:
+            for size in (1, 4, 16):
+                stream = self.verifier.start_stream()
+                feed_in_chunks(stream, code, size)
+                result = stream.finish()
+                if stream.aborted:
+                    self.assertFalse(self.verifier.validate(code).is_valid, code)
+                else:
+                    self.assertEqual(result.to_dict(), self.verifier.validate(code).to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
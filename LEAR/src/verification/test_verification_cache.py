@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import verify_netlogo
+from verify_netlogo import NetLogoVerifier, VerificationCache
+
+
+class TestVerificationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.verifier = NetLogoVerifier({"cache_size": 2})
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(NetLogoVerifier().cache_stats())
+
+    def test_hit_returns_equal_result(self):
+        first = self.verifier.validate("fd 1 die")
+        second = self.verifier.validate("fd 1 die")
+        self.assertEqual(first.is_valid, second.is_valid)
+        self.assertEqual([str(e) for e in first.errors], [str(e) for e in second.errors])
+        stats = self.verifier.cache_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_hit_is_a_copy(self):
+        result = self.verifier.validate("fd 1 die")
+        result.errors[0].message = "tampered"
+        self.assertNotEqual(self.verifier.validate("fd 1 die").errors[0].message, "tampered")
+
+    def test_lru_eviction(self):
+        for code in ("fd 1", "rt 90", "lt 45"):
+            self.verifier.is_safe(code)
+        stats = self.verifier.cache_stats()
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["evictions"], 1)
+
+    def test_config_changes_key(self):
+        other = NetLogoVerifier({"cache_size": 2, "max_value": 10})
+        self.assertNotEqual(self.verifier._cache_key("fd 100"), other._cache_key("fd 100"))
+
+    def test_verifier_version_changes_key(self):
+        with mock.patch.object(verify_netlogo, "VERIFIER_VERSION", verify_netlogo.VERIFIER_VERSION + 1):
+            newer = NetLogoVerifier({"cache_size": 2})
+        self.assertNotEqual(self.verifier._cache_key("fd 100"), newer._cache_key("fd 100"))
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            NetLogoVerifier({"cache_dir": cache_dir}).validate("fd 2000")
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            fresh = NetLogoVerifier({"cache_size": 8, "cache_dir": cache_dir})
+            result = fresh.validate("fd 2000")
+            self.assertFalse(result.is_valid)
+            self.assertEqual(fresh.cache_stats()["disk_hits"], 1)
+
+    def test_cache_without_memory_tier(self):
+        cache = VerificationCache(max_size=0)
+        cache.put("k", NetLogoVerifier().validate("fd 1"))
+        self.assertIsNone(cache.get("k"))
+
+
+if __name__ == '__main__':
+    unittest.main()
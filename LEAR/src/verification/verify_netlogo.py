@@ -7,17 +7,30 @@ for movement rules that agents use to explore the environment.
 
 Dependencies:
 - Python 3.8+
-- Standard library modules: re, typing
+- Standard library modules: re, math, typing, hashlib, json, concurrent.futures
 """
 
 import re
+import os
+import json
+import math
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Tuple, Set, Dict, Optional, Union, Pattern, Iterator, NamedTuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, auto
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Version of the validation semantics. Part of every cache key, so verdicts cached
+# on disk by an older verifier are never reused; bump it whenever a change alters
+# which rules are accepted or what is reported for them
+# (2: recovery-mode errors with spans, 3: value ranges, 4: grouping parentheses,
+# 5: syntax checked on the AST, with NetLogo's argument binding).
+VERIFIER_VERSION = 5
+
 
 # --- Simple Type Representation ---
 # Using constants for simplicity instead of a full Enum for now
@@ -58,12 +71,20 @@ class TokenType(Enum):
     UNKNOWN = auto()         # Unrecognized token
     EOF = auto()             # End of File/Input
 
-@dataclass
-class Token:
+    # Members are singletons compared by identity, so identity hashing is consistent
+    # with equality and avoids Enum.__hash__ (a Python-level call) on every set lookup.
+    __hash__ = object.__hash__
+
+class Token(NamedTuple):
+    """
+    One lexeme. A NamedTuple rather than a dataclass: tokens are immutable, carry
+    no per-instance __dict__, and `value` is the matched slice of the source.
+    """
     type: TokenType
     value: str
     line: int
     column: int
+    start: int = -1  # Offset of the lexeme in the source string
 
 # --- End Tokenizer Components ---
 
@@ -79,6 +100,9 @@ class ValidationError:
     line_number: Optional[int] = None
     code_snippet: Optional[str] = None
     severity: ErrorSeverity = ErrorSeverity.ERROR
+    # Source offsets [start, end) of the offending tokens, when known
+    start: Optional[int] = None
+    end: Optional[int] = None
 
     def __str__(self) -> str:
         """String representation of the validation error."""
@@ -86,6 +110,29 @@ class ValidationError:
         snippet = f"\n  Code: '{self.code_snippet}'" if self.code_snippet else ""
         return f"{self.severity.value.upper()}{location}: {self.message}{snippet}"
 
+    def to_dict(self) -> Dict:
+        """JSON-serializable representation (used by the result cache)."""
+        return {
+            "message": self.message,
+            "line_number": self.line_number,
+            "code_snippet": self.code_snippet,
+            "severity": self.severity.value,
+            "start": self.start,
+            "end": self.end,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ValidationError':
+        """Rebuild an error from its `to_dict` representation."""
+        return cls(
+            message=data["message"],
+            line_number=data.get("line_number"),
+            code_snippet=data.get("code_snippet"),
+            severity=ErrorSeverity(data.get("severity", ErrorSeverity.ERROR.value)),
+            start=data.get("start"),
+            end=data.get("end"),
+        )
+
 @dataclass
 class ValidationResult:
     """Result of a validation check."""
@@ -106,6 +153,128 @@ class ValidationResult:
         self.is_valid = self.is_valid and other.is_valid
         self.errors.extend(other.errors)
 
+    def to_dict(self) -> Dict:
+        """JSON-serializable representation (used by the result cache)."""
+        return {"is_valid": self.is_valid, "errors": [e.to_dict() for e in self.errors]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ValidationResult':
+        """Rebuild a result from its `to_dict` representation."""
+        return cls(data["is_valid"], [ValidationError.from_dict(e) for e in data["errors"]])
+
+
+class VerificationCache:
+    """
+    Content-addressed cache of validation results.
+
+    Results are stored in their `to_dict` form and a fresh `ValidationResult`
+    is built on every hit, so callers can mutate what they get back without
+    corrupting the cache. The in-memory tier is a bounded LRU; the optional
+    on-disk tier keeps one JSON file per key so results survive across runs.
+    """
+    def __init__(self, max_size: int = 4096, cache_dir: Optional[str] = None):
+        """
+        Args:
+            max_size: Maximum number of entries kept in memory (0 disables the memory tier)
+            cache_dir: Optional directory for the persistent tier
+        """
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.disk_writes = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[ValidationResult]:
+        """Return a copy of the cached result for `key`, or None on a miss."""
+        data = self._lookup(key)
+        return ValidationResult.from_dict(data) if data is not None else None
+
+    def get_with_complexity(self, key: str) -> Optional[Tuple[ValidationResult, Optional['CodeComplexity']]]:
+        """
+        Like `get`, plus the rule's complexity when it was stored with the result
+        (None otherwise).
+        """
+        data = self._lookup(key)
+        if data is None:
+            return None
+        complexity = data.get("complexity")
+        return ValidationResult.from_dict(data), CodeComplexity(complexity) if complexity is not None else None
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+            if data is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._store(key, data)
+                return data
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, result: ValidationResult, complexity: Optional['CodeComplexity'] = None) -> None:
+        """Store `result` (and the rule's complexity, if given) under `key` in every enabled tier."""
+        data = result.to_dict()
+        if complexity is not None:
+            data["complexity"] = complexity.value
+        self._store(key, data)
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), "w") as f:
+                    json.dump(data, f)
+                self.disk_writes += 1
+            except OSError as e:
+                logger.warning(f"Could not write verifier cache entry {key}: {e}")
+
+    def _store(self, key: str, data: Dict) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[key] = data
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (the on-disk tier is left untouched)."""
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters for the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_hits": self.disk_hits,
+            "disk_writes": self.disk_writes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
 class CodeComplexity(Enum):
     """Complexity levels for NetLogo code."""
     SIMPLE = 1      # Basic movement without conditions
@@ -116,6 +285,749 @@ class CodeComplexity(Enum):
     SOPHISTICATED = 6  # Multiple strategies, adaptation
     EXPERT = 7      # Optimal pathfinding, complex decision making
 
+# --- AST Components ---
+# Built once per rule by NetLogoVerifier.parse (see _AstBuilder) and shared by the
+# safety, range, movement and complexity checks through a single NodeVisitor pass.
+
+@dataclass
+class AstNode:
+    """Base class for AST nodes. `start` is the source offset of the node's first token."""
+    line: int
+    start: int
+
+    def children(self) -> List['AstNode']:
+        """Child nodes in source order."""
+        return []
+
+@dataclass
+class ProgramNode(AstNode):
+    """
+    `grouped` holds the ids of the nodes written inside grouping parentheses, e.g.
+    `(a + b)`; `unclosed` those of parenthesized expressions and multi-conditionals
+    whose closing `)` is missing.
+    """
+    body: List[AstNode]
+    grouped: Set[int] = field(default_factory=set, repr=False, compare=False)
+    unclosed: Set[int] = field(default_factory=set, repr=False, compare=False)
+
+    def children(self) -> List[AstNode]:
+        return self.body
+
+@dataclass
+class BlockNode(AstNode):
+    """A bracketed block: commands for if/ifelse, a single expression for ifelse-value."""
+    body: List[AstNode]
+
+    def children(self) -> List[AstNode]:
+        return self.body
+
+@dataclass
+class CommandNode(AstNode):
+    """A command such as fd/rt/set/let/stop; `name` is lowercased as written."""
+    name: str
+    args: List[AstNode]
+
+    def children(self) -> List[AstNode]:
+        return self.args
+
+@dataclass
+class ConditionalNode(AstNode):
+    """
+    if/ifelse/ifelse-value, including the multi-conditional `(ifelse c1 [..] c2 [..] [..])`
+    form (`multi=True`). `clauses` pairs each condition with its block.
+    """
+    kind: str
+    clauses: List[Tuple[AstNode, Optional[BlockNode]]]
+    else_block: Optional[BlockNode] = None
+    multi: bool = False
+
+    def children(self) -> List[AstNode]:
+        nodes = []
+        for condition, block in self.clauses:
+            nodes.append(condition)
+            if block is not None:
+                nodes.append(block)
+        if self.else_block is not None:
+            nodes.append(self.else_block)
+        return nodes
+
+@dataclass
+class ReporterNode(AstNode):
+    """A reporter call; `variadic` marks the parenthesized `(list ...)`/`(word ...)` form."""
+    name: str
+    args: List[AstNode]
+    variadic: bool = False
+
+    def children(self) -> List[AstNode]:
+        return self.args
+
+@dataclass
+class BinaryOpNode(AstNode):
+    op: str
+    left: AstNode
+    right: AstNode
+
+    def children(self) -> List[AstNode]:
+        return [self.left, self.right]
+
+@dataclass
+class UnaryOpNode(AstNode):
+    """Unary +, - or `not`."""
+    op: str
+    operand: AstNode
+
+    def children(self) -> List[AstNode]:
+        return [self.operand]
+
+@dataclass
+class NumberNode(AstNode):
+    value: float
+    text: str
+
+@dataclass
+class StringNode(AstNode):
+    value: str
+
+@dataclass
+class VariableNode(AstNode):
+    """Any other identifier (sensor/agent variable, local, or a disallowed word)."""
+    name: str
+
+@dataclass
+class ErrorNode(AstNode):
+    """A token the parser could not place; kept so every token belongs to some node."""
+    token: Token
+
+class NodeVisitor:
+    """
+    Base class for AST traversals, in the style of `ast.NodeVisitor`: `visit`
+    dispatches to `visit_<ClassName>` if defined, otherwise to `generic_visit`,
+    which visits the node's children. The method lookup is cached per
+    (visitor class, node class) pair.
+    """
+    _dispatch: Dict[Tuple[type, type], object] = {}
+
+    def visit(self, node: AstNode):
+        key = (type(self), type(node))
+        method = NodeVisitor._dispatch.get(key)
+        if method is None:
+            method = getattr(type(self), 'visit_' + type(node).__name__, type(self).generic_visit)
+            NodeVisitor._dispatch[key] = method
+        return method(self, node)
+
+    def generic_visit(self, node: AstNode) -> None:
+        for child in node.children():
+            self.visit(child)
+
+class _AstBuilder:
+    """
+    Error-tolerant recursive-descent parser from the significant token list to an AST.
+
+    It follows NetLogo's evaluation rules rather than the validator's diagnostics
+    grammar: arguments of prefix reporters bind tighter than infix operators, so
+    `item 0 input > 0` is `(item 0 input) > 0` and `random 10 + 5` is
+    `(random 10) + 5`. It never raises: tokens it cannot place become ErrorNodes.
+
+    The token list always ends with EOF and the parser never advances past it, so
+    the current token is simply `tokens[pos]`. Token types are compared by identity
+    (tuples rather than sets) to avoid hashing Enum members on the hot path.
+    """
+    # Binding power used for reporter arguments and unary operators (above every infix operator)
+    PREFIX_PRECEDENCE = 6
+    # Arity of reporters the validator does not list in REPORTER_ARITY
+    EXTRA_REPORTER_ARITY = {'abs': 1, 'max': 2}
+    COMMAND_ARITY = {
+        'fd': 1, 'forward': 1, 'bk': 1, 'back': 1,
+        'rt': 1, 'right': 1, 'lt': 1, 'left': 1,
+        'set': 2, 'let': 2, 'stop': 0,
+    }
+    CONDITIONALS = ('if', 'ifelse', 'ifelse-value')
+    CLOSING_TYPES = (TokenType.RBRACKET, TokenType.RPAREN)
+    STOP_TYPES = (TokenType.EOF, TokenType.RBRACKET, TokenType.RPAREN)
+    INFIX_TYPES = (TokenType.OPERATOR, TokenType.COMPARISON, TokenType.STRING_CONCAT, TokenType.LOGICAL)
+
+    def __init__(self, verifier: 'NetLogoVerifier', tokens: List[Token]):
+        self.tokens = tokens
+        self.pos = 0
+        self.grouped: Set[int] = set()
+        self.unclosed: Set[int] = set()
+        self.reporter_arity = {**self.EXTRA_REPORTER_ARITY, **verifier.REPORTER_ARITY}
+        self.infix_precedence = {op: precedence for op, precedence in verifier.OPERATOR_PRECEDENCE.items() if op != 'not'}
+
+    def parse_program(self) -> ProgramNode:
+        tokens = self.tokens
+        first = tokens[0]
+        body = []
+        while True:
+            token = tokens[self.pos]
+            token_type = token.type
+            if token_type is TokenType.EOF:
+                break
+            if token_type in self.CLOSING_TYPES:
+                # Stray closing token at the top level
+                self.pos += 1
+                body.append(ErrorNode(token.line, token.start, token))
+                continue
+            body.append(self._parse_statement())
+        return ProgramNode(first.line, first.start, body, self.grouped, self.unclosed)
+
+    def _parse_block(self) -> BlockNode:
+        """Parse `[ ... ]`, starting at the LBRACKET."""
+        tokens = self.tokens
+        opening = tokens[self.pos]
+        self.pos += 1
+        body = []
+        while True:
+            token = tokens[self.pos]
+            token_type = token.type
+            if token_type is TokenType.RBRACKET:
+                self.pos += 1
+                break
+            if token_type is TokenType.EOF:
+                break
+            if token_type is TokenType.RPAREN:
+                self.pos += 1
+                body.append(ErrorNode(token.line, token.start, token))
+                continue
+            body.append(self._parse_statement())
+        return BlockNode(opening.line, opening.start, body)
+
+    def _parse_statement(self) -> AstNode:
+        token = self.tokens[self.pos]
+        if token.type is TokenType.COMMAND:
+            if token.value.lower() in self.CONDITIONALS:
+                return self._parse_conditional()
+            return self._parse_command()
+        if token.type is TokenType.LPAREN and self._is_multi_conditional():
+            return self._parse_multi_conditional()
+        return self._parse_expression(-1)
+
+    def _is_multi_conditional(self) -> bool:
+        # Only called at an LPAREN, so pos + 1 is at most the EOF index
+        following = self.tokens[self.pos + 1]
+        return following.type is TokenType.COMMAND and following.value.lower() in {'ifelse', 'ifelse-value'}
+
+    def _parse_command(self) -> CommandNode:
+        tokens = self.tokens
+        token = tokens[self.pos]
+        name = token.value.lower()
+        self.pos += 1
+        args = []
+        for arg_num in range(self.COMMAND_ARITY.get(name, 0)):
+            target = tokens[self.pos]
+            if target.type in self.STOP_TYPES:
+                break
+            if arg_num == 0 and target.type is TokenType.IDENTIFIER and name in {'set', 'let'}:
+                self.pos += 1
+                args.append(VariableNode(target.line, target.start, target.value.lower()))
+            else:
+                args.append(self._parse_expression(-1))
+        return CommandNode(token.line, token.start, name, args)
+
+    def _parse_conditional(self) -> ConditionalNode:
+        token = self.tokens[self.pos]
+        kind = token.value.lower()
+        self.pos += 1
+        condition = self._parse_expression(-1)
+        blocks = []
+        for _ in range(1 if kind == 'if' else 2):
+            if self.tokens[self.pos].type is not TokenType.LBRACKET:
+                break
+            blocks.append(self._parse_block())
+        first_block = blocks[0] if blocks else None
+        else_block = blocks[1] if len(blocks) > 1 else None
+        return ConditionalNode(token.line, token.start, kind, [(condition, first_block)], else_block)
+
+    def _parse_multi_conditional(self) -> ConditionalNode:
+        tokens = self.tokens
+        paren = tokens[self.pos]
+        kind = tokens[self.pos + 1].value.lower()
+        self.pos += 2
+        clauses = []
+        else_block = None
+        closed = False
+        while True:
+            token_type = tokens[self.pos].type
+            if token_type is TokenType.RPAREN:
+                self.pos += 1
+                closed = True
+                break
+            if token_type is TokenType.LBRACKET:
+                else_block = self._parse_block()
+                if tokens[self.pos].type is TokenType.RPAREN:
+                    self.pos += 1
+                    closed = True
+                break
+            if token_type is TokenType.RBRACKET or token_type is TokenType.EOF:
+                break
+            condition = self._parse_expression(-1)
+            if tokens[self.pos].type is not TokenType.LBRACKET:
+                clauses.append((condition, None))
+                break
+            clauses.append((condition, self._parse_block()))
+        node = ConditionalNode(paren.line, paren.start, kind, clauses, else_block, multi=True)
+        if not closed:
+            self.unclosed.add(id(node))
+        return node
+
+    def _parse_expression(self, min_precedence: int) -> AstNode:
+        tokens = self.tokens
+        left = self._parse_prefix()
+        while True:
+            token = tokens[self.pos]
+            if token.type not in self.INFIX_TYPES:
+                return left
+            op = token.value.lower() if token.type is TokenType.LOGICAL else token.value
+            precedence = self.infix_precedence.get(op)
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.pos += 1
+            if tokens[self.pos].type is TokenType.EOF:
+                return BinaryOpNode(token.line, left.start, op, left, ErrorNode(token.line, token.start, tokens[self.pos]))
+            # '^' is right-associative, everything else left-associative
+            right = self._parse_expression(precedence if op == '^' else precedence + 1)
+            left = BinaryOpNode(token.line, left.start, op, left, right)
+
+    def _parse_prefix(self) -> AstNode:
+        token = self.tokens[self.pos]
+        token_type = token.type
+
+        if token_type is TokenType.NUMBER:
+            self.pos += 1
+            return NumberNode(token.line, token.start, float(token.value), token.value)
+        if token_type is TokenType.IDENTIFIER:
+            self.pos += 1
+            return VariableNode(token.line, token.start, token.value.lower())
+        if token_type is TokenType.REPORTER:
+            return self._parse_reporter()
+        if token_type is TokenType.LPAREN:
+            return self._parse_parenthesized()
+        if token_type is TokenType.LBRACKET:
+            return self._parse_block()
+        if token_type is TokenType.STRING_LITERAL:
+            self.pos += 1
+            return StringNode(token.line, token.start, token.value[1:-1])
+        if token_type is TokenType.OPERATOR and token.value in {'+', '-'} or \
+           token_type is TokenType.LOGICAL and token.value.lower() == 'not':
+            self.pos += 1
+            operand = self._parse_expression(self.PREFIX_PRECEDENCE)
+            return UnaryOpNode(token.line, token.start, token.value.lower(), operand)
+        if token_type is TokenType.COMMAND:
+            # Commands in expression position (e.g. ifelse-value used as a reporter)
+            return self._parse_statement()
+
+        # EOF, closing tokens, stray operators: an ErrorNode (consuming the token unless it closes a block)
+        if token_type not in self.STOP_TYPES:
+            self.pos += 1
+        return ErrorNode(token.line, token.start, token)
+
+    def _parse_reporter(self) -> ReporterNode:
+        tokens = self.tokens
+        token = tokens[self.pos]
+        name = token.value.lower()
+        self.pos += 1
+        args = []
+        for _ in range(max(self.reporter_arity.get(name, 1), 0)):
+            if tokens[self.pos].type in self.STOP_TYPES:
+                break
+            args.append(self._parse_expression(self.PREFIX_PRECEDENCE))
+        return ReporterNode(token.line, token.start, name, args)
+
+    def _parse_parenthesized(self) -> AstNode:
+        tokens = self.tokens
+        paren = tokens[self.pos]
+        following = tokens[self.pos + 1]
+        if following.type is TokenType.REPORTER and self.reporter_arity.get(following.value.lower()) == -1:
+            # (list a b c) / (word a b c)
+            self.pos += 2
+            args = []
+            while tokens[self.pos].type not in self.STOP_TYPES:
+                args.append(self._parse_expression(-1))
+            if tokens[self.pos].type is TokenType.RPAREN:
+                self.pos += 1
+            return ReporterNode(paren.line, paren.start, following.value.lower(), args, variadic=True)
+        if self._is_multi_conditional():
+            return self._parse_multi_conditional()
+
+        self.pos += 1
+        inner = self._parse_expression(-1)
+        if tokens[self.pos].type is TokenType.RPAREN:
+            self.pos += 1
+            self.grouped.add(id(inner))
+        else:
+            self.unclosed.add(id(inner))
+        return inner
+
+class FlaggedName(NamedTuple):
+    """A disallowed name found in the AST, as written in the source."""
+    name: str
+    line: int
+    start: int
+
+class Interval(NamedTuple):
+    """Closed range of values an expression can take; unbounded sides are +/-inf."""
+    low: float
+    high: float
+
+UNBOUNDED = Interval(-math.inf, math.inf)
+
+class RangeViolation(NamedTuple):
+    """
+    An expression whose reachable values leave [min_value, max_value], or that
+    divides by zero. `bound` is the reachable extreme beyond the limit; `text`
+    is the expression as written, spanning source offsets [start, end).
+    """
+    kind: str  # 'too_large', 'too_small' or 'division_by_zero'
+    bound: float
+    text: str
+    line: int
+    start: int
+    end: int
+
+@dataclass
+class RuleAnalysis:
+    """
+    Everything the verifier derives from one traversal of a rule's AST: the facts
+    behind the safety, movement and range checks plus the complexity metrics.
+    """
+    dangerous: List[FlaggedName] = field(default_factory=list)
+    out_of_range: List[NumberNode] = field(default_factory=list)
+    range_violations: List[RangeViolation] = field(default_factory=list)
+    command_counts: Dict[str, int] = field(default_factory=dict)
+    reporter_counts: Dict[str, int] = field(default_factory=dict)
+    movement_commands: int = 0
+    if_count: int = 0
+    ifelse_count: int = 0
+    ifelse_value_count: int = 0
+    assignments: int = 0
+    sensor_references: int = 0
+    max_conditional_depth: int = 0
+    max_block_depth: int = 0
+
+    @property
+    def conditional_count(self) -> int:
+        return self.if_count + self.ifelse_count + self.ifelse_value_count
+
+    def reporters_used(self, names: Set[str]) -> int:
+        return sum(self.reporter_counts.get(name, 0) for name in names)
+
+    @property
+    def complexity_score(self) -> int:
+        """One point per feature present (see measure_complexity)."""
+        return sum([
+            self.movement_commands > 0,
+            self.if_count > 0,
+            self.ifelse_count + self.ifelse_value_count > 0,
+            self.assignments > 0,
+            self.reporters_used({'towards', 'distance', 'in-radius'}) > 0,
+            self.reporters_used({'random', 'random-float'}) > 0,
+            self.reporters_used({'sin', 'cos', 'tan'}) > 0,
+            self.max_conditional_depth > 1,
+        ])
+
+    @property
+    def complexity(self) -> CodeComplexity:
+        """Map the score to a complexity level, capping at the highest level."""
+        return CodeComplexity(min(max(self.complexity_score, 1), CodeComplexity.EXPERT.value))
+
+class _RangeEvaluator:
+    """
+    Interval arithmetic over expression subtrees. `evaluate` returns the range of
+    values a numeric expression can reach (None for non-numeric expressions) and
+    records (kind, bound, node) for the innermost expressions whose range provably
+    leaves the verifier's limits. Literals are left to the NumberNode check.
+
+    Unknown quantities (variables, agent sensing, sensor readings without a
+    configured `input_range`) are unbounded and never cause a violation.
+    """
+    ARITHMETIC = ('+', '-', '*', '/', '^')
+    # Reporters with a fixed numeric range whatever their arguments
+    FIXED_RANGES = {
+        'sin': Interval(-1.0, 1.0), 'cos': Interval(-1.0, 1.0),
+        'heading': Interval(0.0, 360.0), 'towards': Interval(0.0, 360.0),
+        'distance': Interval(0.0, math.inf), 'count': Interval(0.0, math.inf),
+        'length': Interval(0.0, math.inf), 'xcor': UNBOUNDED, 'ycor': UNBOUNDED, 'tan': UNBOUNDED,
+    }
+    NUMERIC_VARIABLES = {'heading': Interval(0.0, 360.0)}
+
+    def __init__(self, verifier: 'NetLogoVerifier', sensor_variables: Set[str], violations: List[Tuple[str, float, AstNode]]):
+        self.low_limit = verifier.min_value
+        self.high_limit = verifier.max_value
+        self.input_range = Interval(*verifier.input_range) if verifier.input_range else UNBOUNDED
+        self.sensor_variables = sensor_variables
+        self.violations = violations
+
+    def evaluate(self, node: AstNode) -> Optional[Interval]:
+        return self._evaluate(node)[0]
+
+    def _evaluate(self, node: AstNode) -> Tuple[Optional[Interval], bool]:
+        """(range of `node`, whether a violation was already reported inside it)."""
+        node_type = type(node)
+        if node_type is NumberNode:
+            value = node.value
+            return Interval(value, value), not (self.low_limit <= value <= self.high_limit)
+        if node_type is VariableNode:
+            return self.NUMERIC_VARIABLES.get(node.name, UNBOUNDED), False
+        if node_type is BinaryOpNode:
+            left, left_reported = self._evaluate(node.left)
+            right, right_reported = self._evaluate(node.right)
+            reported = left_reported or right_reported
+            if node.op not in self.ARITHMETIC or left is None or right is None:
+                return None if node.op not in self.ARITHMETIC else UNBOUNDED, reported
+            if node.op == '/' and right.low == right.high == 0:
+                if not reported:
+                    self.violations.append(('division_by_zero', 0.0, node))
+                return UNBOUNDED, True
+            return self._check(node, self._arithmetic(node.op, left, right), reported)
+        if node_type is UnaryOpNode:
+            operand, reported = self._evaluate(node.operand)
+            if node.op == 'not' or operand is None:
+                return None, reported
+            if node.op == '-':
+                return self._check(node, Interval(-operand.high, -operand.low), reported)
+            return operand, reported
+        if node_type is ReporterNode:
+            return self._reporter(node)
+        if node_type is ConditionalNode:
+            # ifelse-value: any branch's value
+            reported = False
+            result = None
+            for condition, block in node.clauses:
+                reported |= self._evaluate(condition)[1]
+                if block is not None:
+                    value, block_reported = self._block_value(block)
+                    reported |= block_reported
+                    result = self._union(result, value)
+            if node.else_block is not None:
+                value, block_reported = self._block_value(node.else_block)
+                reported |= block_reported
+                result = self._union(result, value)
+            return result, reported
+        return None, False
+
+    def _block_value(self, block: BlockNode) -> Tuple[Optional[Interval], bool]:
+        if len(block.body) != 1:
+            return UNBOUNDED, False
+        return self._evaluate(block.body[0])
+
+    def _reporter(self, node: ReporterNode) -> Tuple[Optional[Interval], bool]:
+        name = node.name
+        values = []
+        reported = False
+        for arg in node.args:
+            value, arg_reported = self._evaluate(arg)
+            values.append(value)
+            reported |= arg_reported
+
+        if name in ('random', 'random-float') and values and values[0] is not None:
+            bound = values[0]
+            if name == 'random':
+                # random n reports an integer in [0, n) for n > 0 and (n, 0] for n < 0
+                result = Interval(min(0.0, bound.low + 1), max(0.0, bound.high - 1))
+            else:
+                result = Interval(min(0.0, bound.low), max(0.0, bound.high))
+            return self._check(node, result, reported)
+        if name == 'abs' and values and values[0] is not None:
+            low, high = values[0]
+            if low >= 0:
+                return values[0], reported
+            if high <= 0:
+                return Interval(-high, -low), reported
+            return Interval(0.0, max(-low, high)), reported
+        if name in ('min', 'max'):
+            if len(values) == 1 and node.args and type(node.args[0]) is ReporterNode and node.args[0].name == 'list':
+                values = [self._evaluate(arg)[0] for arg in node.args[0].args]
+            if not values or any(value is None for value in values):
+                return UNBOUNDED, reported
+            pick = min if name == 'min' else max
+            return Interval(pick(v.low for v in values), pick(v.high for v in values)), reported
+        if name == 'item' and len(node.args) == 2:
+            return self._item(node.args[0], values[0], node.args[1]), reported
+        if name in self.FIXED_RANGES:
+            return self.FIXED_RANGES[name], reported
+        if name in ('list', 'word', 'any?', 'in-radius'):
+            return None, reported
+        return UNBOUNDED, reported
+
+    def _item(self, index_node: AstNode, index: Optional[Interval], source: AstNode) -> Interval:
+        if type(source) is VariableNode and source.name in self.sensor_variables:
+            return self.input_range
+        if type(source) is ReporterNode and source.name == 'list' and source.args:
+            elements = source.args
+            if index is not None and index.low == index.high and 0 <= index.low < len(elements):
+                elements = [elements[int(index.low)]]
+            result = None
+            for element in elements:
+                result = self._union(result, self._evaluate(element)[0])
+            return result or UNBOUNDED
+        return UNBOUNDED
+
+    def _check(self, node: AstNode, interval: Interval, reported: bool) -> Tuple[Interval, bool]:
+        if reported:
+            return interval, True
+        if math.isfinite(interval.high) and interval.high > self.high_limit:
+            self.violations.append(('too_large', interval.high, node))
+            return interval, True
+        if math.isfinite(interval.low) and interval.low < self.low_limit:
+            self.violations.append(('too_small', interval.low, node))
+            return interval, True
+        return interval, False
+
+    @staticmethod
+    def _union(a: Optional[Interval], b: Optional[Interval]) -> Optional[Interval]:
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return Interval(min(a.low, b.low), max(a.high, b.high))
+
+    @staticmethod
+    def _arithmetic(op: str, a: Interval, b: Interval) -> Interval:
+        try:
+            if op == '+':
+                return Interval(a.low + b.low, a.high + b.high)
+            if op == '-':
+                return Interval(a.low - b.high, a.high - b.low)
+            if op == '*':
+                products = [x * y for x in (a.low, a.high) for y in (b.low, b.high)
+                            if not ((x == 0 and math.isinf(y)) or (y == 0 and math.isinf(x)))] or [0.0]
+                return Interval(min(products), max(products))
+            if op == '/':
+                if b.low <= 0 <= b.high:
+                    return UNBOUNDED
+                quotients = [x / y for x in (a.low, a.high) for y in (b.low, b.high)
+                             if not (math.isinf(x) and math.isinf(y))]
+                if len(quotients) < 4:
+                    return UNBOUNDED
+                return Interval(min(quotients), max(quotients))
+            # '^': only constant exponents are tracked
+            if b.low != b.high or not (math.isfinite(a.low) and math.isfinite(a.high)):
+                return UNBOUNDED
+            exponent = b.low
+            if exponent.is_integer():
+                corners = [a.low ** exponent, a.high ** exponent]
+                if exponent > 0 and exponent % 2 == 0 and a.low < 0 < a.high:
+                    corners.append(0.0)
+                if exponent < 0 and a.low <= 0 <= a.high:
+                    return UNBOUNDED
+                return Interval(min(corners), max(corners))
+            if a.low >= 0 and not (exponent < 0 and a.low == 0):
+                corners = [a.low ** exponent, a.high ** exponent]
+                return Interval(min(corners), max(corners))
+            return UNBOUNDED
+        except (OverflowError, ZeroDivisionError):
+            return UNBOUNDED
+
+class _RuleAnalyzer(NodeVisitor):
+    """Single traversal that fills a RuleAnalysis."""
+    MOVEMENT_COMMANDS = {'fd', 'forward', 'rt', 'right', 'lt', 'left', 'bk', 'back'}
+    SENSOR_VARIABLES = {'input', 'input-resource-distances', 'input-resource-types',
+                        'food-observations', 'poison-observations'}
+
+    def __init__(self, verifier: 'NetLogoVerifier'):
+        self.verifier = verifier
+        self.analysis = RuleAnalysis()
+        self._range_findings = []
+        self._ranges = _RangeEvaluator(verifier, self.SENSOR_VARIABLES, self._range_findings)
+        self._conditional_depth = 0
+        self._block_depth = 0
+        self._names_as_written = {}
+
+    def analyze(self, program: ProgramNode, tokens: List[Token]) -> RuleAnalysis:
+        # Dangerous names are reported as written in the source
+        self._names_as_written = {token.start: token.value for token in tokens}
+        self.visit(program)
+        if self._range_findings:
+            index = {token.start: i for i, token in enumerate(tokens)}
+            for kind, bound, node in self._range_findings:
+                self.analysis.range_violations.append(self._range_violation(kind, bound, node, tokens, index))
+        return self.analysis
+
+    @staticmethod
+    def _range_violation(kind: str, bound: float, node: AstNode, tokens: List[Token],
+                         index: Dict[int, int]) -> RangeViolation:
+        """Locate a flagged expression in the token list, including its own parentheses."""
+        starts = []
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            starts.append(current.start)
+            pending.extend(current.children())
+        first, last = index[min(starts)], index[max(starts)]
+        opens = sum(1 for token in tokens[first:last + 1] if token.type is TokenType.LPAREN)
+        closes = sum(1 for token in tokens[first:last + 1] if token.type is TokenType.RPAREN)
+        while closes > opens and first > 0 and tokens[first - 1].type is TokenType.LPAREN:
+            first -= 1
+            opens += 1
+        while opens > closes and tokens[last + 1].type is TokenType.RPAREN:
+            last += 1
+            closes += 1
+
+        parts = [tokens[first].value]
+        for previous, token in zip(tokens[first:last], tokens[first + 1:last + 1]):
+            if token.start > previous.start + len(previous.value):
+                parts.append(' ')
+            parts.append(token.value)
+        end = tokens[last].start + len(tokens[last].value)
+        return RangeViolation(kind, bound, ''.join(parts), node.line, tokens[first].start, end)
+
+    def _check_dangerous(self, node: AstNode, name: str) -> None:
+        if name in self.verifier.dangerous_primitives:
+            self.analysis.dangerous.append(FlaggedName(self._names_as_written.get(node.start, name), node.line, node.start))
+
+    def visit_CommandNode(self, node: CommandNode) -> None:
+        counts = self.analysis.command_counts
+        counts[node.name] = counts.get(node.name, 0) + 1
+        self._check_dangerous(node, node.name)
+        if node.name in self.MOVEMENT_COMMANDS:
+            self.analysis.movement_commands += 1
+        elif node.name in {'set', 'let'}:
+            self.analysis.assignments += 1
+        for arg in node.args:
+            if type(arg) is not NumberNode and type(arg) is not VariableNode:
+                self._ranges.evaluate(arg)
+        self.generic_visit(node)
+
+    def visit_ReporterNode(self, node: ReporterNode) -> None:
+        counts = self.analysis.reporter_counts
+        counts[node.name] = counts.get(node.name, 0) + 1
+        self._check_dangerous(node, node.name)
+        self.generic_visit(node)
+
+    def visit_VariableNode(self, node: VariableNode) -> None:
+        self._check_dangerous(node, node.name)
+        if node.name in self.SENSOR_VARIABLES:
+            self.analysis.sensor_references += 1
+
+    def visit_NumberNode(self, node: NumberNode) -> None:
+        if node.value > self.verifier.max_value or node.value < self.verifier.min_value:
+            self.analysis.out_of_range.append(node)
+
+    def visit_ConditionalNode(self, node: ConditionalNode) -> None:
+        if node.kind == 'if':
+            self.analysis.if_count += 1
+        elif node.kind == 'ifelse':
+            self.analysis.ifelse_count += 1
+        else:
+            self.analysis.ifelse_value_count += 1
+        if node.kind != 'ifelse-value':
+            # ifelse-value conditions are covered where the value is used
+            for condition, _ in node.clauses:
+                if type(condition) is not NumberNode and type(condition) is not VariableNode:
+                    self._ranges.evaluate(condition)
+        self._conditional_depth += 1
+        self.analysis.max_conditional_depth = max(self.analysis.max_conditional_depth, self._conditional_depth)
+        self.generic_visit(node)
+        self._conditional_depth -= 1
+
+    def visit_BlockNode(self, node: BlockNode) -> None:
+        self._block_depth += 1
+        self.analysis.max_block_depth = max(self.analysis.max_block_depth, self._block_depth)
+        self.generic_visit(node)
+        self._block_depth -= 1
+
+# --- End AST Components ---
+
 class NetLogoVerifier:
     """
     NetLogo Code Verification and Validation Class
@@ -127,6 +1039,9 @@ class NetLogoVerifier:
     - is_safe(code: str) -> Tuple[bool, str]: Main validation method
     - validate(code: str) -> ValidationResult: Detailed validation with multiple errors
     - measure_complexity(code: str) -> CodeComplexity: Measures code complexity
+    - validate_and_measure(code: str) -> Tuple[ValidationResult, CodeComplexity]: Both from one parse
+    - parse(code: str) -> ProgramNode / analyze(code: str) -> RuleAnalysis: AST access
+    - cache_stats() -> Optional[Dict]: Result cache counters (when caching is enabled)
     """
     def __init__(self, config: Optional[Dict] = None):
         """
@@ -141,6 +1056,12 @@ class NetLogoVerifier:
         self.max_code_length = self.config.get("max_code_length", 10000)
         self.max_value = self.config.get("max_value", 1000)
         self.min_value = self.config.get("min_value", -1000)
+        # Optional (low, high) of sensor readings, used by the range check for `item n input`
+        self.input_range = self.config.get("input_range")
+
+        # Optional result cache (memory LRU and/or on-disk tier)
+        self.cache_size = self.config.get("cache_size", 0)
+        self.cache_dir = self.config.get("cache_dir")
 
         # Allowed NetLogo primitives
         self.allowed_commands = {
@@ -212,6 +1133,47 @@ class NetLogoVerifier:
         # Compile tokenizer patterns
         self._compile_tokenizer_patterns()
 
+        self.cache = VerificationCache(self.cache_size, self.cache_dir) if (self.cache_size or self.cache_dir) else None
+        self._config_key = self._compute_config_key()
+
+    def _compute_config_key(self) -> str:
+        """
+        Fingerprint of everything that affects validation results. Part of every
+        cache key, so verifiers with different limits or primitive sets never
+        share entries (including through the on-disk tier).
+        """
+        config_state = {
+            "allowed_commands": sorted(self.allowed_commands),
+            "allowed_reporters": sorted(self.allowed_reporters),
+            "dangerous_primitives": sorted(self.dangerous_primitives),
+            "allowed_variables": sorted(self.allowed_variables),
+            "max_code_length": self.max_code_length,
+            "max_value": self.max_value,
+            "min_value": self.min_value,
+            "input_range": list(self.input_range) if self.input_range else None,
+            # Bump when the shape of cached results changes (2: error spans)
+            "result_format": 2,
+            "verifier_version": VERIFIER_VERSION,
+        }
+        return hashlib.sha256(json.dumps(config_state, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _cache_key(self, code: str) -> str:
+        """Content-addressed key for `code` under the current configuration."""
+        return hashlib.sha256(f"{self._config_key}\0{code}".encode("utf-8")).hexdigest()
+
+    def cache_stats(self) -> Optional[Dict]:
+        """Return result cache counters, or None if caching is disabled."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def clear_cache(self) -> None:
+        """
+        Drop cached results and refresh the configuration fingerprint. Call this
+        after modifying the allowed/dangerous primitive sets on a live verifier.
+        """
+        self._config_key = self._compute_config_key()
+        if self.cache is not None:
+            self.cache.clear()
+
     def _compile_regex_patterns(self) -> None:
         """Precompile regex patterns for validation (kept for now, may be deprecated)."""
         # Keep number pattern for value range checks (using regex temporarily)
@@ -243,6 +1205,12 @@ class NetLogoVerifier:
         self.tokenizer_regex = re.compile(
             '|'.join(f'(?P<{name}>{pattern})' for name, pattern in token_specs)
         )
+        # Regex group name -> TokenType, resolved once instead of per token
+        self._kind_types = {name: TokenType[name] for name, _ in token_specs}
+        # Shared string objects for the known vocabulary, so the value of e.g. every
+        # `item` or `input` token is one string instead of a fresh copy per token
+        vocabulary = self.allowed_commands | self.allowed_reporters | self.allowed_variables | {'and', 'or', 'not'}
+        self._lexeme_pool = {word: word for word in vocabulary}
 
     def _tokenize(self, code: str) -> Iterator[Token]:
         """
@@ -262,7 +1230,7 @@ class NetLogoVerifier:
             column = mo.start() - line_start + 1
 
             if kind == 'NEWLINE':
-                yield Token(TokenType.NEWLINE, value, line_num, column)
+                yield Token(TokenType.NEWLINE, value, line_num, column, mo.start())
                 line_num += 1
                 line_start = mo.end()
             elif kind == 'WHITESPACE':
@@ -270,100 +1238,323 @@ class NetLogoVerifier:
             elif kind == 'COMMENT':
                 pass # Ignore comments
             elif kind == 'UNKNOWN':
-                yield Token(TokenType.UNKNOWN, value, line_num, column)
+                yield Token(TokenType.UNKNOWN, value, line_num, column, mo.start())
             else:
                 token_type = TokenType[kind] # Map regex group name to Enum
                 # Further classify IDENTIFIERs based on known lists
                 if token_type == TokenType.IDENTIFIER:
-                    val_lower = value.lower()
-                    if val_lower in self.allowed_commands:
-                        token_type = TokenType.COMMAND
-                    elif val_lower in self.allowed_reporters:
-                        token_type = TokenType.REPORTER
-                    elif val_lower in {'and', 'or', 'not'}:
-                         token_type = TokenType.LOGICAL
-                    # Note: Variables remain IDENTIFIER unless matched above.
+                    token_type = self._classify_identifier(value)
 
-                yield Token(token_type, value, line_num, column)
+                yield Token(token_type, value, line_num, column, mo.start())
 
         # Yield EOF token at the end
-        yield Token(TokenType.EOF, '', line_num, len(code) - line_start + 1)
+        yield Token(TokenType.EOF, '', line_num, len(code) - line_start + 1, len(code))
+
+    def _tokenize_compact(self, code: str) -> List[Token]:
+        """
+        Tokenize straight into the list used by the checks and the parser.
+
+        Equivalent to filtering `_tokenize` output down to significant tokens plus
+        EOF, but without the generator, the intermediate list, the Enum lookup by
+        name per token or the NamedTuple constructor frame (tokens are built with
+        tuple.__new__ directly). Identifiers from the known vocabulary share one
+        string object.
+
+        Args:
+            code: The raw NetLogo code string.
 
+        Returns:
+            Significant tokens (no whitespace, comments or newlines), ending with EOF.
+        """
+        new_token = tuple.__new__
+        kind_types = self._kind_types
+        lexeme_pool = self._lexeme_pool
+        classify = self._classify_identifier
+        identifier = TokenType.IDENTIFIER
+        tokens: List[Token] = []
+        append = tokens.append
+        line_num = 1
+        line_start = 0
+        for mo in self.tokenizer_regex.finditer(code):
+            kind = mo.lastgroup
+            if kind == 'WHITESPACE' or kind == 'COMMENT':
+                continue
+            start = mo.start()
+            if kind == 'NEWLINE':
+                line_num += 1
+                line_start = start + 1
+                continue
+            value = mo.group()
+            token_type = kind_types[kind]
+            if token_type is identifier:
+                value = lexeme_pool.get(value, value)
+                token_type = classify(value)
+            append(new_token(Token, (token_type, value, line_num, start - line_start + 1, start)))
+
+        append(new_token(Token, (TokenType.EOF, '', line_num, len(code) - line_start + 1, len(code))))
+        return tokens
+
+    def _classify_identifier(self, value: str) -> TokenType:
+        """Classify an IDENTIFIER lexeme as a command, reporter or logical operator."""
+        val_lower = value.lower()
+        if val_lower in self.allowed_commands:
+            return TokenType.COMMAND
+        elif val_lower in self.allowed_reporters:
+            return TokenType.REPORTER
+        elif val_lower in {'and', 'or', 'not'}:
+            return TokenType.LOGICAL
+        # Note: Variables remain IDENTIFIER unless matched above.
+        return TokenType.IDENTIFIER
+
+    def start_stream(self) -> 'StreamingVerification':
+        """
+        Begin incremental verification of code that arrives in chunks (e.g. from
+        a streaming LLM response). See StreamingVerification.
+        """
+        return StreamingVerification(self)
 
-    def is_safe(self, code: str) -> Tuple[bool, str]:
+
+    def is_safe(self, code: str, report_all: bool = False) -> Tuple[bool, str]:
         """
         Simplified interface to validate NetLogo code for safety and correctness.
+        With `report_all`, the message lists every independent error (see validate_all).
         """
-        result = self.validate(code)
+        return self._summarize(self.validate_all(code) if report_all else self.validate(code))
+
+    @staticmethod
+    def _summarize(result: ValidationResult) -> Tuple[bool, str]:
+        """Collapse a ValidationResult into the (is_safe, message) pair returned by is_safe."""
         if not result.is_valid:
             return False, "\n".join(str(error) for error in result.errors)
         return True, "Code appears safe"
 
+    def is_safe_many(self, codes: List[str], max_workers: Optional[int] = None,
+                     chunk_size: Optional[int] = None) -> List[Tuple[bool, str]]:
+        """Batch version of is_safe; see validate_many for the parameters."""
+        return [self._summarize(r) for r in self.validate_many(codes, max_workers, chunk_size)]
+
+    def validate_many(self, codes: List[str], max_workers: Optional[int] = None,
+                      chunk_size: Optional[int] = None) -> List[ValidationResult]:
+        """
+        Validate many rules in one call, returning results in input order.
+
+        Duplicate rules are validated once and cached results are reused. When
+        the number of rules left to check reaches `parallel_threshold` (config,
+        default 256) the work is fanned out over a process pool whose workers
+        each build a verifier once, with the same primitive sets and limits.
+
+        Args:
+            codes: NetLogo rules to validate
+            max_workers: Worker processes (defaults to os.cpu_count(); 1 forces serial)
+            chunk_size: Rules per task sent to a worker (defaults to an even split)
+
+        Returns:
+            List of ValidationResult, one per input rule
+        """
+        results: List[Optional[ValidationResult]] = [None] * len(codes)
+        pending: Dict[str, List[int]] = {}
+        for idx, code in enumerate(codes):
+            if code in pending:
+                pending[code].append(idx)
+                continue
+            cached = self.cache.get(self._cache_key(code)) if self.cache is not None else None
+            if cached is not None:
+                results[idx] = cached
+            else:
+                pending[code] = [idx]
+
+        unique_codes = list(pending)
+        workers = max_workers or os.cpu_count() or 1
+        parallel_threshold = self.config.get("parallel_threshold", 256)
+
+        if workers <= 1 or len(unique_codes) < parallel_threshold:
+            fresh = [self._validate_uncached(code) for code in unique_codes]
+        else:
+            if chunk_size is None:
+                chunk_size = max(1, -(-len(unique_codes) // (workers * 4)))
+            chunks = [unique_codes[i:i + chunk_size] for i in range(0, len(unique_codes), chunk_size)]
+            logger.info(f"Validating {len(unique_codes)} rules on {workers} workers ({len(chunks)} chunks)")
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                     initargs=(self._worker_state(),)) as executor:
+                fresh = [r for chunk_results in executor.map(_validate_batch_chunk, chunks) for r in chunk_results]
+
+        for code, result in zip(unique_codes, fresh):
+            if self.cache is not None:
+                self.cache.put(self._cache_key(code), result)
+            indices = pending[code]
+            results[indices[0]] = result
+            # Hand out independent copies for duplicates so callers can mutate them safely
+            for idx in indices[1:]:
+                results[idx] = ValidationResult.from_dict(result.to_dict())
+
+        return results
+
+    def _worker_state(self) -> Dict:
+        """Configuration needed to rebuild an equivalent verifier in a worker process."""
+        worker_config = {k: v for k, v in self.config.items() if k not in {"cache_size", "cache_dir"}}
+        return {
+            "config": worker_config,
+            "allowed_commands": set(self.allowed_commands),
+            "allowed_reporters": set(self.allowed_reporters),
+            "dangerous_primitives": set(self.dangerous_primitives),
+            "allowed_variables": set(self.allowed_variables),
+        }
+
     def validate(self, code: str) -> ValidationResult:
         """
         Comprehensive validation of NetLogo code with detailed error reporting.
+        Results are served from the result cache when caching is enabled.
+        """
+        if self.cache is None:
+            return self._validate_uncached(code)
+
+        key = self._cache_key(code)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        result, analysis = self._validate_and_analyze(code)
+        self.cache.put(key, result, analysis.complexity)
+        return result
+
+    def _validate_uncached(self, code: str) -> ValidationResult:
+        """Run the full validation pipeline on `code`."""
+        return self._validate_and_analyze(code)[0]
+
+    def _validate_and_analyze(self, code: str) -> Tuple[ValidationResult, RuleAnalysis]:
+        """
+        Tokenize and parse `code` once, then run every check off the shared token
+        list and AST. Returns the validation result and the rule analysis.
         """
         result = ValidationResult(True)
 
-        # --- Step 1: Tokenization ---
-        tokens = list(self._tokenize(code))
-        filtered_tokens = [t for t in tokens if t.type not in {TokenType.WHITESPACE, TokenType.COMMENT, TokenType.NEWLINE} or t.type == TokenType.EOF]
+        # --- Step 1: Tokenization and parsing ---
+        filtered_tokens = self._tokenize_compact(code)
+        program = _AstBuilder(self, filtered_tokens).parse_program()
+        analysis = _RuleAnalyzer(self).analyze(program, filtered_tokens)
 
-        if not filtered_tokens or all(t.type == TokenType.EOF for t in filtered_tokens):
+        if len(filtered_tokens) == 1: # Only EOF
              result.add_error(ValidationError("Empty code or only comments/whitespace"))
-             return result
+             return result, analysis
 
         # Check for unknown tokens
+        code_lines = None
         for token in filtered_tokens:
             if token.type == TokenType.UNKNOWN:
+                if code_lines is None:
+                    code_lines = code.splitlines()
                 result.add_error(ValidationError(
                     f"Unknown token: '{token.value}'",
                     line_number=token.line,
-                    code_snippet=code.splitlines()[token.line-1][max(0, token.column-10):token.column+9]
+                    code_snippet=code_lines[token.line-1][max(0, token.column-10):token.column+9],
+                    start=token.start, end=token.start + len(token.value)
                 ))
         if not result.is_valid:
-             return result
+             return result, analysis
 
         # --- Step 2: Code Length Check ---
         if len(code) > self.max_code_length:
             result.add_error(ValidationError(f"Code exceeds maximum length of {self.max_code_length} characters"))
 
         # --- Step 3: Basic Structural Validation ---
-        dangerous_result = self._check_dangerous_primitives_tokenized(filtered_tokens)
+        dangerous_result = self._check_dangerous_primitives(analysis)
         result.merge(dangerous_result)
-        if not result.is_valid: return result
+        if not result.is_valid: return result, analysis
 
         balance_result = self._check_brackets_balance_tokenized(filtered_tokens)
         result.merge(balance_result)
-        if not result.is_valid: return result
+        if not result.is_valid: return result, analysis
 
         # --- Step 4: Detailed Validation ---
-        movement_result = self._check_movement_commands_tokenized(filtered_tokens)
+        movement_result = self._check_movement_commands(analysis)
         result.merge(movement_result)
 
-        syntax_result = self._check_syntax_tokenized(filtered_tokens)
+        syntax_result = self._check_syntax(program, filtered_tokens)
         result.merge(syntax_result)
         # Stop early if major syntax errors occurred before checking ranges
-        if not result.is_valid: return result
+        if not result.is_valid: return result, analysis
 
-        # Call the token-based value range check
-        range_result = self._check_value_ranges(filtered_tokens)
+        range_result = self._check_value_ranges(analysis)
         result.merge(range_result)
 
-        return result
+        return result, analysis
+
+    # --- Recovery Mode ---
+
+    # Ranking of error kinds in validate_all: safety first, then the problems that
+    # make the rest of the rule unreadable, then local ones.
+    RECOVERY_STAGES = ('dangerous', 'unknown', 'brackets', 'syntax', 'movement', 'range', 'length')
+
+    def validate_all(self, code: str) -> ValidationResult:
+        """
+        Recovery-mode validation: report every independent error in one pass.
 
-    def _check_dangerous_primitives_tokenized(self, tokens: List[Token]) -> ValidationResult:
-        """Validate against dangerous primitives using tokens."""
+        `validate` stops at the first failing stage. For invalid rules this runs
+        every stage, resynchronizing the syntax check at statement boundaries and
+        brackets so one mistake does not cascade, and ranks the errors by severity
+        and kind (see RECOVERY_STAGES), then by position. Errors carry token spans
+        (`start`/`end`). Validity is always that of `validate`.
+        """
+        result = self.validate(code)
+        if result.is_valid:
+            return result
+        recovered = self._recover_errors(code)
+        # Safeguard: never report fewer problems than the fast path found
+        return recovered if recovered.errors else result
+
+    def _recover_errors(self, code: str) -> ValidationResult:
+        tokens = self._tokenize_compact(code)
+        staged = []  # (stage, error)
+        if len(tokens) == 1:
+            return ValidationResult(False, [ValidationError("Empty code or only comments/whitespace")])
+
+        unknown = [token for token in tokens if token.type is TokenType.UNKNOWN]
+        if unknown:
+            code_lines = code.splitlines()
+            for token in unknown:
+                staged.append(('unknown', ValidationError(
+                    f"Unknown token: '{token.value}'",
+                    line_number=token.line,
+                    code_snippet=code_lines[token.line-1][max(0, token.column-10):token.column+9],
+                    start=token.start, end=token.start + len(token.value)
+                )))
+            # Resynchronize by dropping them, as if the stray characters were not there
+            tokens = [token for token in tokens if token.type is not TokenType.UNKNOWN]
+
+        if len(code) > self.max_code_length:
+            staged.append(('length', ValidationError(f"Code exceeds maximum length of {self.max_code_length} characters")))
+
+        program = _AstBuilder(self, tokens).parse_program()
+        analysis = _RuleAnalyzer(self).analyze(program, tokens)
+
+        staged.extend(('dangerous', error) for error in self._check_dangerous_primitives(analysis).errors)
+        bracket_errors = self._check_brackets_balance_tokenized(tokens).errors
+        staged.extend(('brackets', error) for error in bracket_errors)
+        staged.extend(('movement', error) for error in self._check_movement_commands(analysis).errors)
+        staged.extend(('range', error) for error in self._check_value_ranges(analysis).errors)
+
+        # Statements already explained by a dangerous primitive or a bracket error are
+        # not re-checked for syntax: their syntax errors would only be cascades.
+        explained = {flagged.start for flagged in analysis.dangerous}
+        explained.update(error.start for error in bracket_errors)
+        explained.update(error.end - 1 for error in bracket_errors)
+        recovery = _SyntaxRecovery(_SyntaxChecker(self, program, tokens), explained)
+        staged.extend(('syntax', error) for error in recovery.check_statements(program.body, len(tokens) - 1, top_level=True))
+
+        rank = {stage: index for index, stage in enumerate(self.RECOVERY_STAGES)}
+        staged.sort(key=lambda item: (item[1].severity != ErrorSeverity.ERROR, rank[item[0]],
+                                      item[1].start if item[1].start is not None else -1))
+        return ValidationResult(not staged, [error for _, error in staged])
+
+    def _check_dangerous_primitives(self, analysis: RuleAnalysis) -> ValidationResult:
+        """Validate against dangerous primitives found while analyzing the AST."""
         result = ValidationResult(True)
-        for token in tokens:
-            # Check commands, reporters, and general identifiers that might match
-            if token.type in {TokenType.COMMAND, TokenType.REPORTER, TokenType.IDENTIFIER}:
-                if token.value.lower() in self.dangerous_primitives:
-                    result.add_error(ValidationError(
-                        f"Dangerous primitive found: {token.value}",
-                        line_number=token.line,
-                        code_snippet=token.value
-                    ))
+        for flagged in analysis.dangerous:
+            result.add_error(ValidationError(
+                f"Dangerous primitive found: {flagged.name}",
+                line_number=flagged.line,
+                code_snippet=flagged.name,
+                start=flagged.start, end=flagged.start + len(flagged.name)
+            ))
         return result
 
     def _check_brackets_balance_tokenized(self, tokens: List[Token]) -> ValidationResult:
@@ -381,117 +1572,45 @@ class NetLogoVerifier:
                 if not stack:
                     result.add_error(ValidationError(
                         f"Unmatched closing bracket/parenthesis: '{token.value}'",
-                        line_number=token.line, code_snippet=token.value
+                        line_number=token.line, code_snippet=token.value,
+                        start=token.start, end=token.start + 1
                     ))
                 else:
                     expected_type, opening_token = stack.pop()
                     if token.type != expected_type:
                         result.add_error(ValidationError(
                             f"Mismatched bracket/parenthesis: Expected closing for '{opening_token.value}' (line {opening_token.line}) but found '{token.value}'",
-                            line_number=token.line, code_snippet=f"...{opening_token.value}...{token.value}..."
+                            line_number=token.line, code_snippet=f"...{opening_token.value}...{token.value}...",
+                            start=opening_token.start, end=token.start + 1
                         ))
 
         for _, opening_token in stack:
              result.add_error(ValidationError(
                  f"Unclosed bracket/parenthesis: '{opening_token.value}'",
-                 line_number=opening_token.line, code_snippet=opening_token.value
+                 line_number=opening_token.line, code_snippet=opening_token.value,
+                 start=opening_token.start, end=opening_token.start + 1
              ))
         return result
 
-    def _check_movement_commands_tokenized(self, tokens: List[Token]) -> ValidationResult:
-        """Verify presence of at least one movement command using tokens."""
+    def _check_movement_commands(self, analysis: RuleAnalysis) -> ValidationResult:
+        """Verify presence of at least one movement command."""
         result = ValidationResult(True)
-        has_ifelse_value = any(t.type == TokenType.COMMAND and t.value.lower() == 'ifelse-value' for t in tokens)
-        if has_ifelse_value:
+        if analysis.ifelse_value_count:
             return result # ifelse-value doesn't require movement commands
 
-        movement_commands = {'fd', 'forward', 'rt', 'right', 'lt', 'left', 'bk', 'back'}
-        found_movement = any(t.type == TokenType.COMMAND and t.value.lower() in movement_commands for t in tokens)
-
-        if not found_movement:
+        if not analysis.movement_commands:
             result.add_error(ValidationError(
                 "No movement commands found. Code must include at least one movement command: fd, rt, lt, or bk",
                 severity=ErrorSeverity.ERROR
             ))
         return result
 
-    def _check_syntax_tokenized(self, tokens: List[Token]) -> ValidationResult:
-        """Validate overall syntax using tokens (main entry point)."""
-        result = ValidationResult(True)
-        i = 0
-        while i < len(tokens) and tokens[i].type != TokenType.EOF:
-            token = tokens[i]
-            consumed_count = 1 # Default consumption
-
-            if token.type == TokenType.COMMAND:
-                if token.value.lower() in {'if', 'ifelse', 'ifelse-value'}:
-                    if_result, consumed_count = self._validate_if_statement(tokens, i)
-                    result.merge(if_result)
-                elif token.value.lower() in self.allowed_commands:
-                    cmd_result, consumed_count = self._validate_command(tokens, i)
-                    result.merge(cmd_result)
-                else:
-                    # Should have been caught by dangerous check, but safeguard
-                    result.add_error(ValidationError(f"Unexpected command: {token.value}", line_number=token.line))
-            elif token.type in {TokenType.RPAREN, TokenType.RBRACKET}:
-                 # Closing brackets/parens shouldn't appear at the top level
-                 result.add_error(ValidationError(f"Unexpected closing token: '{token.value}'", line_number=token.line))
-            # Handle multi-conditional ifelse starting with '('
-            elif token.type == TokenType.LPAREN:
-                 # Peek ahead: Expect 'ifelse' or 'ifelse-value' command next
-                 if i + 1 < len(tokens) and tokens[i+1].type == TokenType.COMMAND and tokens[i+1].value.lower() in {'ifelse', 'ifelse-value'}:
-                      statement_type = tokens[i+1].value.lower()
-                      # Call the multi-conditional validator starting from the LPAREN
-                      multi_cond_result, consumed_count = self._validate_multi_conditional(tokens, i, statement_type)
-                      result.merge(multi_cond_result)
-                 else:
-                      # Parenthesized expression not allowed at top level, or invalid multi-conditional start
-                      peek_token_desc = f"'{tokens[i+1].value}' ({tokens[i+1].type.name})" if i + 1 < len(tokens) else "end of input"
-                      result.add_error(ValidationError(f"Unexpected parenthesis '(' at top level, or invalid start to multi-conditional ifelse (found {peek_token_desc} after '(')", line_number=token.line))
-                      # Try to consume until matching RPAREN for basic recovery
-                      paren_level = 1
-                      consumed_count = 1
-                      temp_i = i + 1
-                      while temp_i < len(tokens):
-                           consumed_count += 1
-                           if tokens[temp_i].type == TokenType.LPAREN: paren_level += 1
-                           elif tokens[temp_i].type == TokenType.RPAREN:
-                               paren_level -= 1
-                               if paren_level == 0: break
-                           elif tokens[temp_i].type == TokenType.EOF: break
-                           temp_i += 1
-                      if paren_level != 0:
-                           result.add_error(ValidationError(f"Unclosed parenthesis starting on line {token.line}", line_number=token.line))
-
-
-            # Other tokens are unexpected at the top level
-            else:
-                 # Allow expressions at the top level ONLY if they are the entire content
-                 # (e.g., a single reporter call like `random 10`) - this is unusual but possible
-                 if i == 0:
-                      expr_result, consumed_count, _ = self._validate_expression(tokens, i, min_precedence=-1)
-                      if not expr_result.is_valid:
-                           result.merge(expr_result)
-                           # If the expression itself failed, report that
-                      elif consumed_count < len(tokens) -1: # Check if it consumed all non-EOF tokens
-                           result.add_error(ValidationError(f"Unexpected token after expression: {tokens[consumed_count].type.name} ('{tokens[consumed_count].value}')", line_number=tokens[consumed_count].line))
-                           consumed_count = 1 # Reset consumption on error
-                      # If valid and consumed all, it's okay (though maybe warn?)
-                 else:
-                      result.add_error(ValidationError(f"Unexpected token at top level: {token.type.name} ('{token.value}')", line_number=token.line))
-                      consumed_count = 1 # Consume the unexpected token
-
-            i += consumed_count # Advance by the number of tokens consumed by the validator
-            if not result.is_valid and consumed_count > 0 : # Check consumed_count > 0 to avoid infinite loop if validator returns 0
-                 # If a top-level command failed validation, stop further checks at this level
-                 # to avoid cascading errors from a single malformed command.
-                 # However, allow checking subsequent independent commands.
-                 # Consider if we should stop entirely on first error. For now, continue.
-                 pass
-
-        return result
+    def _check_syntax(self, program: ProgramNode, tokens: List[Token]) -> ValidationResult:
+        """Validate statement structure and operand types on the parsed rule."""
+        errors = _SyntaxChecker(self, program, tokens).check_statements(program.body)
+        return ValidationResult(not errors, errors)
 
-    # --- Expression Validator (Pratt Parser Style with Basic Type Inference) ---
+    # --- Operators and Reporters (shared by the parser, the syntax check and the canonicalizer) ---
 
     # Operator precedence levels (higher value = higher precedence)
     OPERATOR_PRECEDENCE = {
@@ -532,1044 +1651,641 @@ class NetLogoVerifier:
         'word': -1, # Variadic arity
     }
 
-
-    def _get_token_precedence(self, token: Optional[Token]) -> int:
-        """Returns the precedence of an infix operator token, or -2 if not an infix operator."""
-        if token is None:
-            return -2
-        op_value = token.value.lower()
-        # Check arithmetic/comparison operators first
-        if token.type in {TokenType.OPERATOR, TokenType.COMPARISON}:
-            return self.OPERATOR_PRECEDENCE.get(op_value, -2)
-        # Check logical operators (only 'and', 'or' are infix)
-        if token.type == TokenType.LOGICAL and op_value in {'and', 'or'}:
-             return self.OPERATOR_PRECEDENCE.get(op_value, -2)
-        # Check string concat
-        if token.type == TokenType.STRING_CONCAT:
-             # Use token.value directly for '++' as it's not lowercased in OPERATOR_PRECEDENCE
-             return self.OPERATOR_PRECEDENCE.get(token.value, -2)
-        return -2 # Not a recognized infix operator
-
-    def _can_start_expression(self, token: Optional[Token]) -> bool:
-        """Checks if a token type can potentially start a valid expression."""
-        if token is None:
-            return False
-        # Primary terms
-        if token.type in {TokenType.NUMBER, TokenType.IDENTIFIER, TokenType.STRING_LITERAL,
-                          TokenType.LPAREN, TokenType.REPORTER, TokenType.LBRACKET}: # Added LBRACKET
-            return True
-        # Prefix operators (unary +/-, not)
-        if token.type == TokenType.OPERATOR and token.value in {'+', '-'}:
-            return True
-        if token.type == TokenType.LOGICAL and token.value.lower() == 'not':
-            return True
-        # String concat is infix only
-        return False
-
-    def _parse_prefix_or_primary(self, tokens: List[Token], start_index: int) -> Tuple[ValidationResult, int, str]:
+    # --- Value Range Validator ---
+    def _check_value_ranges(self, analysis: RuleAnalysis) -> ValidationResult:
         """
-        Parses prefix operators (unary -, +, not) and primary expression terms
-        (numbers, variables, strings, parenthesized expressions, reporter calls, command blocks).
-        Returns the validation result, the index after the parsed term, and the inferred type string.
+        Validate numeric value ranges. Should be called after basic syntax
+        validation to ensure the parsed numbers are meaningful.
 
         Args:
-            tokens: The list of tokens.
-            start_index: The index in the token list where the prefix/primary starts.
+            analysis: The RuleAnalysis of the code.
 
         Returns:
-            A tuple containing:
-            - ValidationResult: Indicates if the parsed prefix/primary is valid.
-            - int: The index of the token immediately *after* the parsed part.
-            - str: The inferred type string (e.g., TYPE_NUMBER, TYPE_INVALID).
+            ValidationResult with any range violations.
         """
         result = ValidationResult(True)
-        i = start_index
-        inferred_type = TYPE_UNKNOWN # Default type
 
-        if i >= len(tokens) or tokens[i].type == TokenType.EOF:
-            result.add_error(ValidationError(
-                "Expected expression term or prefix operator, found end of input",
-                line_number=tokens[i-1].line if i > 0 else 1
-            ))
-            return result, i, TYPE_INVALID
-
-        current_token = tokens[i]
-        next_index = i + 1 # Default consumption is 1 token
-
-        # --- Handle Prefix Operators ---
-        # Check for unary minus/plus (distinct from binary operators)
-        if current_token.type == TokenType.OPERATOR and current_token.value in {'+', '-'}:
-            # Treat as unary prefix operator
-            op_token = current_token
-            # Recursively parse the operand that follows the unary operator.
-            # Use high precedence (e.g., 6, higher than 'not') to bind tightly.
-            # We only need the structure and index here, type check happens in _validate_expression
-            operand_result, operand_end_index, _ = self._validate_expression(tokens, i + 1, min_precedence=6) # Ignore operand type for now
-            result.merge(operand_result)
-            next_index = operand_end_index
-
-            # Assume unary +/- result in a number if the operand was structurally valid
-            # More detailed type checking will happen in the caller (_validate_expression)
-            inferred_type = TYPE_NUMBER if operand_result.is_valid else TYPE_INVALID
-
-            return result, next_index, inferred_type
-
-        # Check for logical 'not'
-        elif current_token.type == TokenType.LOGICAL and current_token.value.lower() == 'not':
-            op_token = current_token
-            not_precedence = self.OPERATOR_PRECEDENCE.get('not', 5)
-            operand_result, operand_end_index, _ = self._validate_expression(tokens, i + 1, min_precedence=not_precedence) # Ignore operand type
-            result.merge(operand_result)
-            next_index = operand_end_index
-
-            # Assume 'not' results in a boolean if the operand was structurally valid
-            inferred_type = TYPE_BOOLEAN if operand_result.is_valid else TYPE_INVALID
-
-            return result, next_index, inferred_type
-
-
-        # --- Handle Primary Terms ---
-        elif current_token.type == TokenType.NUMBER:
-            inferred_type = TYPE_NUMBER
-        elif current_token.type == TokenType.IDENTIFIER:
-            var_name = current_token.value.lower()
-            if var_name not in self.allowed_variables:
-                 # Check if it's a known 0-arity reporter like 'xcor'
-                 arity = self.REPORTER_ARITY.get(var_name)
-                 if arity == 0:
-                      # Basic type inference for known 0-arity reporters
-                      if var_name in {'xcor', 'ycor', 'heading', 'random', 'random-float'}: # Add more
-                           inferred_type = TYPE_NUMBER
-                      # elif var_name in {'any?'}: # Example boolean reporter (needs arity 1, error?) -> This logic needs refinement
-                      #      # This case should likely be handled by the REPORTER block below if arity > 0
-                      #      # If arity is 0, it must be a simple property like xcor
-                      #      result.add_error(ValidationError(f"Reporter '{var_name}' used without arguments, but expects arguments.", line_number=current_token.line))
-                      #      inferred_type = TYPE_INVALID
-                      else:
-                           inferred_type = TYPE_ANY # Assume unknown 0-arity reporters return anything
-                 elif arity is not None: # It's a known reporter but used incorrectly (without args)
-                      result.add_error(ValidationError(f"Reporter '{var_name}' used without arguments, but expects {arity} argument(s).", line_number=current_token.line))
-                      inferred_type = TYPE_INVALID
-                 else: # Not an allowed variable or known reporter
-                      result.add_error(ValidationError(
-                          f"Unknown or disallowed identifier/variable: '{current_token.value}'",
-                          line_number=current_token.line, code_snippet=current_token.value
-                      ))
-                      inferred_type = TYPE_INVALID
-            else:
-                 # Basic type inference for known variables
-                 if var_name in {'xcor', 'ycor', 'heading', 'who', 'energy', 'lifetime', 'food-collected', 'weight'}:
-                      inferred_type = TYPE_NUMBER
-                 elif var_name in {'"silver"', '"gold"', '"crystal"'}:
-                      inferred_type = TYPE_STRING
-                 elif var_name in {'input-resource-distances', 'input-resource-types', 'food-observations', 'poison-observations'}:
-                      inferred_type = TYPE_LIST
-                 else:
-                      inferred_type = TYPE_ANY # Assume unknown allowed variables can be any type
-        elif current_token.type == TokenType.STRING_LITERAL:
-             inferred_type = TYPE_STRING
-
-        # --- Handle Parentheses OR Parenthesized List/Word Constructor ---
-        elif current_token.type == TokenType.LPAREN:
-            paren_token = current_token
-            # Check for specific parenthesized reporters like (list ...) or (word ...)
-            is_special_reporter = False
-            if i + 1 < len(tokens) and tokens[i+1].type == TokenType.REPORTER:
-                 reporter_name = tokens[i+1].value.lower()
-                 arity = self.REPORTER_ARITY.get(reporter_name)
-                 # Check if it's a known variadic reporter (-1 arity)
-                 if arity == -1:
-                      is_special_reporter = True
-                      i += 2 # Consume '(' and reporter name
-                      # Loop to parse zero or more arguments
-                      while True:
-                           if i >= len(tokens) or tokens[i].type == TokenType.EOF:
-                               result.add_error(ValidationError(f"Expected ')' to close '({reporter_name} ...)' opened on line {paren_token.line}, found end of input", line_number=paren_token.line))
-                               next_index = i
-                               return result, next_index, TYPE_INVALID # Stop processing
-
-                           # Check for closing parenthesis
-                           if tokens[i].type == TokenType.RPAREN:
-                               break # End of list arguments
-
-                           # Parse the next argument expression, ignore its type for now
-                           arg_result, arg_end_index, _ = self._validate_expression(tokens, i, min_precedence=-1)
-                           result.merge(arg_result)
-
-                           if not arg_result.is_valid:
-                                # Add context if needed
-                                if result.errors and f"'({reporter_name} ...)'" not in result.errors[-1].message:
-                                     # Find last error and add context
-                                     for err in reversed(result.errors):
-                                          if f"'({reporter_name} ...)'" not in err.message:
-                                               err.message = f"Invalid argument within '({reporter_name} ...)' starting on line {paren_token.line}: {err.message}"
-                                               break
-                                # Attempt recovery
-                                temp_i = arg_end_index
-                                paren_level = 1
-                                while temp_i < len(tokens):
-                                     if tokens[temp_i].type == TokenType.LPAREN: paren_level += 1
-                                     elif tokens[temp_i].type == TokenType.RPAREN:
-                                         paren_level -= 1
-                                         if paren_level == 0: break
-                                     elif tokens[temp_i].type == TokenType.EOF: break
-                                     temp_i += 1
-                                next_index = temp_i + 1 if temp_i < len(tokens) and tokens[temp_i].type == TokenType.RPAREN else temp_i
-                                return result, next_index, TYPE_INVALID
-
-                           # Argument was valid, update index
-                           i = arg_end_index
-
-                      # Loop finished, check closing parenthesis
-                      if i < len(tokens) and tokens[i].type == TokenType.RPAREN:
-                           next_index = i + 1 # Consume ')'
-                           # Determine result type based on reporter
-                           inferred_type = TYPE_LIST if reporter_name == 'list' else TYPE_STRING if reporter_name == 'word' else TYPE_ANY
-                      else:
-                           result.add_error(ValidationError(f"Expected ')' to close '({reporter_name} ...)' opened on line {paren_token.line}", line_number=tokens[i-1].line if i > 0 else paren_token.line))
-                           next_index = i
-                           inferred_type = TYPE_INVALID
-
-            # --- Standard Parenthesized Expression ---
-            if not is_special_reporter:
-                # Parse the expression inside parentheses.
-                inner_result, inner_end_index, inner_type = self._validate_expression(tokens, i + 1, min_precedence=-1)
-                result.merge(inner_result)
-                inferred_type = inner_type # Type of parenthesized expr is type of inner expr
-
-                # Check for the closing parenthesis.
-                if inner_end_index < len(tokens) and tokens[inner_end_index].type == TokenType.RPAREN:
-                    next_index = inner_end_index + 1 # Consume the RPAREN
-                else:
-                    expected_line = tokens[inner_end_index - 1].line if inner_end_index > 0 else current_token.line
-                    result.add_error(ValidationError(
-                        f"Expected ')' to close parenthesis opened on line {current_token.line}",
-                        line_number=expected_line
-                    ))
-                    next_index = inner_end_index
-                    if inferred_type != TYPE_INVALID:
-                         inferred_type = TYPE_UNKNOWN
-
-        # --- Handle Bracketed Command Blocks ---
-        elif current_token.type == TokenType.LBRACKET:
-            bracket_token = current_token
-            # Validate structure, find matching ']'
-            bracket_level = 1
-            temp_i = i + 1
-            while temp_i < len(tokens):
-                if tokens[temp_i].type == TokenType.LBRACKET: bracket_level += 1
-                elif tokens[temp_i].type == TokenType.RBRACKET:
-                    bracket_level -= 1
-                    if bracket_level == 0: break
-                elif tokens[temp_i].type == TokenType.EOF: break
-                temp_i += 1
-
-            if bracket_level == 0:
-                next_index = temp_i + 1 # Consume ']'
-                inferred_type = TYPE_COMMAND_BLOCK
-            else:
+        for node in analysis.out_of_range:
+            if node.value > self.max_value:
+                result.add_error(ValidationError(
+                    f"Value too large: {node.value} (maximum allowed: {self.max_value})",
+                    line_number=node.line,
+                    code_snippet=node.text,
+                    start=node.start, end=node.start + len(node.text)
+                ))
+            if node.value < self.min_value:
                 result.add_error(ValidationError(
-                    f"Expected ']' to close bracket opened on line {bracket_token.line}",
-                    line_number=tokens[temp_i-1].line if temp_i > 0 else bracket_token.line
+                    f"Value too small: {node.value} (minimum allowed: {self.min_value})",
+                    line_number=node.line,
+                    code_snippet=node.text,
+                    start=node.start, end=node.start + len(node.text)
                 ))
-                next_index = temp_i
-                inferred_type = TYPE_INVALID
-
-        # --- Handle Reporters (excluding parenthesized 'list'/'word' and 0-arity handled as IDENTIFIER) ---
-        elif current_token.type == TokenType.REPORTER:
-            reporter_name = current_token.value.lower()
-            arity = self.REPORTER_ARITY.get(reporter_name)
-
-            # Disallow bare 'list' or 'word'
-            if reporter_name in {'list', 'word'}:
-                 result.add_error(ValidationError(
-                     f"Unsupported syntax: Bare '{reporter_name}' reporter found. Use parenthesized '({reporter_name} ...)' form.",
-                     line_number=current_token.line, code_snippet=current_token.value
-                 ))
-                 next_index = i + 1
-                 inferred_type = TYPE_INVALID
-            elif arity is None or arity == 0: # 0-arity handled as IDENTIFIER, None is error
-                 # This case should ideally not be reached if 0-arity reporters are handled above
-                 result.add_error(ValidationError(
-                     f"Unknown or disallowed reporter '{current_token.value}' used in expression",
-                     line_number=current_token.line, code_snippet=current_token.value
-                 ))
-                 next_index = i + 1
-                 inferred_type = TYPE_INVALID
+
+        # Expressions whose reachable range leaves the limits (interval analysis)
+        for violation in analysis.range_violations:
+            if violation.kind == 'division_by_zero':
+                message = f"Division by zero: {violation.text}"
+            elif violation.kind == 'too_large':
+                message = f"Value too large: {violation.text} can reach {violation.bound:g} (maximum allowed: {self.max_value})"
             else:
-                 # Consume the reporter token itself
-                 current_arg_index = i + 1
-                 # Parse the expected number of arguments
-                 for arg_num in range(arity):
-                     if current_arg_index >= len(tokens) or tokens[current_arg_index].type == TokenType.EOF:
-                         result.add_error(ValidationError(
-                             f"Expected argument {arg_num + 1} for reporter '{reporter_name}', but found end of input",
-                             line_number=current_token.line
-                         ))
-                         current_arg_index = len(tokens)
-                         inferred_type = TYPE_INVALID # Mark as invalid due to missing args
-                         break # Stop parsing args
-
-                     # Parse the argument expression recursively, ignore type for now
-                     arg_result, arg_end_index, _ = self._validate_expression(tokens, current_arg_index, min_precedence=-1)
-                     result.merge(arg_result)
-
-                     if not arg_result.is_valid:
-                         if result.errors:
-                             # Find the last error added by the merge and modify it
-                             for err in reversed(result.errors):
-                                  if f"Invalid argument {arg_num + 1}" not in err.message:
-                                       err.message = f"Invalid argument {arg_num + 1} for '{reporter_name}': {err.message}"
-                                       break
-                         inferred_type = TYPE_INVALID # Mark as invalid due to bad arg
-
-                     # Move to the start of the next potential argument
-                     current_arg_index = arg_end_index
-                     # If an arg was invalid, stop parsing args for this reporter
-                     if inferred_type == TYPE_INVALID:
-                          break
-
-                 # After parsing args, the next_index is where the reporter call ends.
-                 next_index = current_arg_index
-                 # If no errors occurred, infer return type (basic for now)
-                 if inferred_type != TYPE_INVALID:
-                      # TODO: Use REPORTER_INFO for better type inference later
-                      if reporter_name in {'random', 'random-float', 'sin', 'cos', 'tan', 'xcor', 'ycor', 'heading', 'distance', 'towards', 'count', 'length', 'abs'}:
-                           inferred_type = TYPE_NUMBER
-                      elif reporter_name in {'any?'}:
-                           inferred_type = TYPE_BOOLEAN
-                      elif reporter_name in {'item', 'position', 'min', 'max'}: # Can return num/bool/item-type
-                           inferred_type = TYPE_ANY
-                      elif reporter_name in {'in-radius'}:
-                           inferred_type = TYPE_AGENTSET
-                      else:
-                           inferred_type = TYPE_ANY # Default for unknown reporters
-
-        # --- Handle Unexpected Tokens ---
-        else:
+                message = f"Value too small: {violation.text} can reach {violation.bound:g} (minimum allowed: {self.min_value})"
             result.add_error(ValidationError(
-                f"Unexpected token when expecting an expression term or prefix operator: {current_token.type.name} ('{current_token.value}')",
-                line_number=current_token.line, code_snippet=current_token.value
+                message,
+                line_number=violation.line,
+                code_snippet=violation.text,
+                start=violation.start, end=violation.end
             ))
-            next_index = i + 1 # Consume the unexpected token
-            inferred_type = TYPE_INVALID
 
-        return result, next_index, inferred_type
+        return result
 
+    # --- AST Access ---
+    def _analyze_tokens(self, tokens: List[Token]) -> RuleAnalysis:
+        """Parse the significant token list and analyze the AST in one traversal."""
+        program = _AstBuilder(self, tokens).parse_program()
+        return _RuleAnalyzer(self).analyze(program, tokens)
 
-    def _validate_expression(self, tokens: List[Token], start_index: int, min_precedence: int = -1) -> Tuple[ValidationResult, int, str]:
+    def parse(self, code: str) -> ProgramNode:
         """
-        Recursively validates a NetLogo expression using Pratt parsing (Top-Down Operator Precedence).
-        Handles infix operators based on precedence and performs basic type checking.
+        Parse NetLogo code into an AST. Parsing is error-tolerant: tokens that do
+        not fit the grammar become ErrorNodes instead of raising.
 
         Args:
-            tokens: The list of tokens.
-            start_index: The index in the token list where the expression starts.
-            min_precedence: The minimum precedence level for operators to be consumed.
+            code: The NetLogo code to parse
 
         Returns:
-            A tuple containing:
-            - ValidationResult: Indicates if the parsed expression is valid.
-            - int: The index of the token immediately *after* the parsed expression.
-            - str: The inferred type string of the parsed expression.
+            ProgramNode: Root of the AST
         """
-        result = ValidationResult(True)
-        i = start_index
-
-        # 1. Parse the left-hand side (prefix operators, primary terms)
-        left_result, current_index, left_type = self._parse_prefix_or_primary(tokens, i)
-        result.merge(left_result) # Merge validation result immediately
-
-        # If the primary part is invalid or resulted in an invalid type, propagate
-        if not result.is_valid or left_type == TYPE_INVALID:
-            # Ensure current_index is advanced at least by 1 if parsing failed at start
-            current_index = max(current_index, i + 1)
-            return result, current_index, TYPE_INVALID
+        return _AstBuilder(self, self._tokenize_compact(code)).parse_program()
 
-        # 2. Loop while the next token is an infix operator with sufficient precedence
-        while True:
-            if current_index >= len(tokens) or tokens[current_index].type == TokenType.EOF:
-                break # End of input
+    def analyze(self, code: str) -> RuleAnalysis:
+        """
+        Parse NetLogo code and collect the facts behind the checks and the
+        complexity metrics in a single AST traversal.
 
-            operator_token = tokens[current_index]
-            current_precedence = self._get_token_precedence(operator_token)
+        Args:
+            code: The NetLogo code to analyze
 
-            # Stop if token is not an operator or precedence is too low
-            if current_precedence < min_precedence:
-                break
+        Returns:
+            RuleAnalysis: Counts, nesting depths and flagged nodes
+        """
+        return self._analyze_tokens(self._tokenize_compact(code))
 
-            # --- Consume the operator ---
-            current_index += 1 # Move past the operator
-
-            # --- Parse the right-hand side ---
-            # Adjust precedence for right operand based on associativity (assume left for now)
-            next_min_precedence = current_precedence + 1
-            # TODO: Handle right-associativity for '^' if needed.
-
-            right_result, next_index, right_type = self._validate_expression(tokens, current_index, min_precedence=next_min_precedence)
-            result.merge(right_result)
-
-            # If the right side is invalid, propagate the invalid type and stop
-            if not result.is_valid or right_type == TYPE_INVALID:
-                 # Ensure next_index is advanced if right-side parsing failed immediately
-                 next_index = max(next_index, current_index + 1)
-                 return result, next_index, TYPE_INVALID
-
-            # --- Perform Type Checking ---
-            current_op_result_type = TYPE_UNKNOWN # Type of the result of this operation
-            valid_operation = True
-
-            # Define allowed types for operators (simplified)
-            numeric_ops = {TokenType.OPERATOR} # +, -, *, /, ^
-            string_ops = {TokenType.STRING_CONCAT} # ++
-            boolean_ops = {TokenType.LOGICAL} # and, or (not is prefix)
-            comparison_ops = {TokenType.COMPARISON} # =, !=, >, <, >=, <=
-
-            # Types that can be operands for numeric ops
-            allowed_numeric_operands = {TYPE_NUMBER, TYPE_ANY, TYPE_UNKNOWN}
-            # Types that can be operands for string ops (NetLogo coerces numbers/bools)
-            allowed_string_operands = {TYPE_STRING, TYPE_NUMBER, TYPE_BOOLEAN, TYPE_ANY, TYPE_UNKNOWN}
-            # Types that can be operands for boolean ops
-            allowed_boolean_operands = {TYPE_BOOLEAN, TYPE_ANY, TYPE_UNKNOWN}
-            # Types for comparison (very permissive in NetLogo)
-            allowed_comparison_operands = {TYPE_NUMBER, TYPE_STRING, TYPE_BOOLEAN, TYPE_LIST, TYPE_AGENT, TYPE_PATCH, TYPE_LINK, TYPE_ANY, TYPE_UNKNOWN}
-
-            op_type = operator_token.type
-            op_val = operator_token.value.lower() # Use lower for +, -, etc.
-
-            if op_type in numeric_ops:
-                if left_type not in allowed_numeric_operands or right_type not in allowed_numeric_operands:
-                    # Error if definitely incompatible (e.g., STRING + NUMBER)
-                    if TYPE_STRING in (left_type, right_type) or \
-                       TYPE_BOOLEAN in (left_type, right_type) or \
-                       TYPE_LIST in (left_type, right_type): # Add other non-numeric types
-                        result.add_error(ValidationError(
-                            f"Operator '{op_val}' expects numeric operands, but got {left_type} and {right_type}",
-                            line_number=operator_token.line
-                        ))
-                        valid_operation = False
-                # Result is NUMBER unless operands were ANY/UNKNOWN
-                current_op_result_type = TYPE_NUMBER if left_type == TYPE_NUMBER and right_type == TYPE_NUMBER else TYPE_ANY
-
-            elif op_type == TokenType.STRING_CONCAT:
-                 # Check for the specific invalid case: NUMBER ++ NUMBER
-                 if left_type == TYPE_NUMBER and right_type == TYPE_NUMBER:
-                      result.add_error(ValidationError(
-                          f"Operator '++' cannot be used with two number operands. Use 'word' or '+' instead.",
-                          line_number=operator_token.line,
-                          code_snippet=f"... {operator_token.value} ..." # Simple snippet
-                      ))
-                      valid_operation = False
-                 # Check if types are generally disallowed (e.g., AGENTSET ++ LIST)
-                 elif left_type not in allowed_string_operands or right_type not in allowed_string_operands:
-                      result.add_error(ValidationError(
-                          f"Operator '++' has incompatible operand types: {left_type} and {right_type}",
-                          line_number=operator_token.line
-                      ))
-                      valid_operation = False
-                 # Result of ++ is always string
-                 current_op_result_type = TYPE_STRING
-
-            elif op_type in boolean_ops and op_val in {'and', 'or'}:
-                if left_type not in allowed_boolean_operands or right_type not in allowed_boolean_operands:
-                     # Error if definitely incompatible
-                     if TYPE_NUMBER in (left_type, right_type) or \
-                        TYPE_STRING in (left_type, right_type) or \
-                        TYPE_LIST in (left_type, right_type): # Add other non-boolean types
-                         result.add_error(ValidationError(
-                             f"Operator '{op_val}' expects boolean operands, but got {left_type} and {right_type}",
-                             line_number=operator_token.line
-                         ))
-                         valid_operation = False
-                # Result is BOOLEAN unless operands were ANY/UNKNOWN
-                current_op_result_type = TYPE_BOOLEAN if left_type == TYPE_BOOLEAN and right_type == TYPE_BOOLEAN else TYPE_ANY
-
-            elif op_type in comparison_ops:
-                 # Comparisons are generally permissive type-wise in NetLogo
-                 if left_type not in allowed_comparison_operands or right_type not in allowed_comparison_operands:
-                      pass # Allow most comparisons for now
-                 current_op_result_type = TYPE_BOOLEAN # Result is boolean
-            else:
-                 # Should not happen if _get_token_precedence is correct
-                 result.add_error(ValidationError(f"Unhandled operator type: {op_type.name}", line_number=operator_token.line))
-                 valid_operation = False
+    def measure_complexity(self, code: str) -> CodeComplexity:
+        """
+        Measure the complexity of NetLogo code.
 
+        One point each for: movement commands, `if`, `ifelse`/`ifelse-value`,
+        variable assignment, advanced sensing (towards/distance/in-radius),
+        randomness, trigonometry and nested conditionals.
 
-            # --- Update State ---
-            if not valid_operation:
-                 left_type = TYPE_INVALID # Mark the combined expression as invalid
-            else:
-                 # If either operand was ANY/UNKNOWN, the result type might also be uncertain,
-                 # unless the operator guarantees a specific type (like comparisons -> BOOLEAN, ++ -> STRING)
-                 if current_op_result_type not in {TYPE_BOOLEAN, TYPE_STRING}: # Operators with fixed result types
-                      if left_type in {TYPE_ANY, TYPE_UNKNOWN} or right_type in {TYPE_ANY, TYPE_UNKNOWN}:
-                           left_type = TYPE_ANY
-                      else:
-                           left_type = current_op_result_type # Use the determined type (e.g., NUMBER)
-                 else:
-                      left_type = current_op_result_type # Use the fixed result type (BOOLEAN or STRING)
-
-
-            # Update the current index to after the right operand.
-            current_index = next_index
-
-            # If the operation resulted in an invalid type, stop processing further operators at this level
-            if left_type == TYPE_INVALID:
-                 break
-
-        # Loop finished, return the final result, index, and inferred type
-        return result, current_index, left_type
-
-    # --- Control Structure Validators ---
-    def _validate_if_statement(self, tokens: List[Token], start_idx: int) -> Tuple[ValidationResult, int]:
-        """Validate if/ifelse/ifelse-value using tokens and the expression validator."""
-        # Returns: ValidationResult, consumed_token_count
-        result = ValidationResult(True)
-        i = start_idx
-        statement_token = tokens[i]
-        statement_type = statement_token.value.lower()
-
-        # Handle multi-conditional format: (ifelse cond1 [...] cond2 [...] [...])
-        is_multi_conditional = False
-        if i > 0 and tokens[i-1].type == TokenType.LPAREN:
-            is_multi_conditional = True
-            # The multi-conditional validator expects to start *at* the LPAREN
-            return self._validate_multi_conditional(tokens, i - 1, statement_type)
-
-        # --- Standard if/ifelse ---
-        i += 1 # Move past 'if'/'ifelse'
-
-        if i >= len(tokens) or tokens[i].type == TokenType.EOF:
-            result.add_error(ValidationError(f"Incomplete {statement_type} - missing condition", line_number=statement_token.line))
-            return result, i
-
-        # Validate condition expression
-        cond_result, cond_end_i, cond_type = self._validate_expression(tokens, i, min_precedence=-1)
-        result.merge(cond_result)
-
-        # Check condition type (should be boolean)
-        # Allow ANY/UNKNOWN as condition might resolve at runtime
-        if cond_type not in {TYPE_BOOLEAN, TYPE_ANY, TYPE_UNKNOWN, TYPE_INVALID}:
-             result.add_error(ValidationError(
-                 f"{statement_type} expects a boolean condition, but got {cond_type}",
-                 line_number=tokens[i].line # Line where condition starts
-             ))
+        Args:
+            code: The NetLogo code to analyze
 
-        # Attempt recovery even if condition is invalid/wrong type
-        if not cond_result.is_valid or cond_type == TYPE_INVALID:
-             # Try to find the start of the true branch '[' for recovery
-             found_bracket = False
-             temp_i = cond_end_i
-             while temp_i < len(tokens) and tokens[temp_i].type != TokenType.LBRACKET and tokens[temp_i].type != TokenType.EOF:
-                 temp_i += 1
-             if temp_i < len(tokens) and tokens[temp_i].type == TokenType.LBRACKET:
-                 i = temp_i # Recovered position
-                 found_bracket = True
-             else:
-                 i = cond_end_i # Could not recover, proceed from end of invalid condition
-                 # Add error if recovery failed and no bracket found immediately after invalid condition
-                 if i < len(tokens) and tokens[i].type != TokenType.LBRACKET:
-                      result.add_error(ValidationError(f"Expected '[' after invalid condition in {statement_type}", line_number=tokens[i-1].line if i > 0 else statement_token.line))
-
-        else: # Condition was valid
-             i = cond_end_i
-
-        # Expect true branch opening bracket
-        if i >= len(tokens) or tokens[i].type != TokenType.LBRACKET:
-            result.add_error(ValidationError(f"Expected '[' after condition in {statement_type}", line_number=tokens[i-1].line if i > 0 else statement_token.line))
-            # If bracket is missing, we can't reliably parse the rest
-            return result, i
-        else:
-            i += 1 # Move past '['
-            true_branch_start_i = i
-            # Find matching RBRACKET
-            bracket_level = 1
-            while i < len(tokens):
-                if tokens[i].type == TokenType.LBRACKET: bracket_level += 1
-                elif tokens[i].type == TokenType.RBRACKET:
-                    bracket_level -= 1
-                    if bracket_level == 0: break
-                elif tokens[i].type == TokenType.EOF: bracket_level = -1; break
-                i += 1
-
-            if bracket_level != 0:
-                result.add_error(ValidationError(f"Unclosed bracket in {statement_type} true branch", line_number=tokens[true_branch_start_i-1].line))
-                true_branch_end_i = i
-            else:
-                true_branch_end_i = i
-                i += 1 # Move past ']'
-
-            # Validate true branch contents
-            true_branch_tokens = tokens[true_branch_start_i:true_branch_end_i]
-            true_branch_result, _ = self._validate_branch_contents( # Ignore branch type for now
-                 true_branch_tokens,
-                 statement_type,
-                 opening_bracket_line=tokens[true_branch_start_i-1].line
-            )
-            result.merge(true_branch_result)
-
-        # Handle false branch for ifelse/ifelse-value
-        if statement_type in {'ifelse', 'ifelse-value'}:
-            if i >= len(tokens) or tokens[i].type != TokenType.LBRACKET:
-                result.add_error(ValidationError(f"Missing '[' for false branch in {statement_type}", line_number=tokens[i-1].line if i > 0 else statement_token.line))
-                # If bracket is missing, we can't reliably parse the rest
-                return result, i
-            else:
-                i += 1 # Move past '['
-                false_branch_start_i = i
-                bracket_level = 1
-                while i < len(tokens):
-                    if tokens[i].type == TokenType.LBRACKET: bracket_level += 1
-                    elif tokens[i].type == TokenType.RBRACKET:
-                        bracket_level -= 1
-                        if bracket_level == 0: break
-                    elif tokens[i].type == TokenType.EOF: bracket_level = -1; break
-                    i += 1
-
-                if bracket_level != 0:
-                    result.add_error(ValidationError(f"Unclosed bracket in {statement_type} false branch", line_number=tokens[false_branch_start_i-1].line))
-                    false_branch_end_i = i
-                else:
-                    false_branch_end_i = i
-                    i += 1 # Move past ']'
-
-                # Validate false branch contents
-                false_branch_tokens = tokens[false_branch_start_i:false_branch_end_i]
-                false_branch_result, _ = self._validate_branch_contents( # Ignore branch type for now
-                     false_branch_tokens,
-                     statement_type,
-                     opening_bracket_line=tokens[false_branch_start_i-1].line
-                )
-                result.merge(false_branch_result)
+        Returns:
+            CodeComplexity: Enum value representing complexity level
+        """
+        return self.analyze(code).complexity
 
-                # TODO: For ifelse-value, could check if branch types are compatible
+    def validate_and_measure(self, code: str) -> Tuple[ValidationResult, CodeComplexity]:
+        """
+        Validate NetLogo code and measure its complexity from one tokenization and
+        one parse; cache hits return the complexity stored with the result.
+        Equivalent to calling validate() and measure_complexity().
 
-        # Return the result and the number of tokens consumed by the entire if/ifelse statement
-        return result, i - start_idx
+        Args:
+            code: The NetLogo code to check
 
-    def _validate_multi_conditional(self, tokens: List[Token], start_idx: int, statement_type: str) -> Tuple[ValidationResult, int]:
-        """Validate multi-conditional ifelse/ifelse-value using tokens."""
-        # Returns: ValidationResult, consumed_token_count
-        result = ValidationResult(True)
-        i = start_idx # Should start at LPAREN
-        paren_token = tokens[i]
-
-        if paren_token.type != TokenType.LPAREN:
-             result.add_error(ValidationError(f"Expected '(' for multi-conditional {statement_type}", line_number=paren_token.line))
-             return result, i + 1
-
-        i += 1 # Move past '('
-
-        if i >= len(tokens) or tokens[i].type != TokenType.COMMAND or tokens[i].value.lower() != statement_type:
-             result.add_error(ValidationError(f"Expected '{statement_type}' after '('", line_number=paren_token.line))
-             # Attempt recovery by finding RPAREN
-             paren_level = 1
-             while i < len(tokens):
-                 if tokens[i].type == TokenType.LPAREN: paren_level += 1
-                 elif tokens[i].type == TokenType.RPAREN:
-                     paren_level -= 1
-                     if paren_level == 0: break
-                 elif tokens[i].type == TokenType.EOF: break
-                 i += 1
-             return result, i + 1 if i < len(tokens) else i
-        i += 1 # Move past statement type (ifelse or ifelse-value)
-
-        has_processed_at_least_one_pair = False
-        while i < len(tokens):
-            # --- Check for loop termination conditions first ---
-            current_token = tokens[i]
-
-            # 1. End of statement?
-            if current_token.type == TokenType.RPAREN:
-                i += 1 # Consume ')'
-                break # Exit loop
-
-            # 2. Optional final else block?
-            if current_token.type == TokenType.LBRACKET:
-                i += 1 # Consume '['
-                else_branch_start_i = i
-                bracket_level = 1
-                while i < len(tokens):
-                    if tokens[i].type == TokenType.LBRACKET: bracket_level += 1
-                    elif tokens[i].type == TokenType.RBRACKET:
-                        bracket_level -= 1
-                        if bracket_level == 0: break
-                    elif tokens[i].type == TokenType.EOF: bracket_level = -1; break
-                    i += 1
-
-                if bracket_level != 0:
-                    result.add_error(ValidationError(f"Unclosed bracket in {statement_type} else branch", line_number=tokens[else_branch_start_i-1].line))
-                    else_branch_end_i = i
-                else:
-                    else_branch_end_i = i
-                    i += 1 # Move past ']'
-
-                # Validate else branch contents
-                else_branch_tokens = tokens[else_branch_start_i:else_branch_end_i]
-                else_branch_result, _ = self._validate_branch_contents( # Ignore branch type
-                     else_branch_tokens,
-                     statement_type,
-                     opening_bracket_line=tokens[else_branch_start_i-1].line
-                )
-                result.merge(else_branch_result)
+        Returns:
+            Tuple[ValidationResult, CodeComplexity]
+        """
+        if self.cache is not None:
+            key = self._cache_key(code)
+            cached = self.cache.get_with_complexity(key)
+            if cached is not None and cached[1] is not None:
+                return cached
+            # Entries written by validate_many carry no complexity
+            result, analysis = self._validate_and_analyze(code)
+            self.cache.put(key, result, analysis.complexity)
+            return result, analysis.complexity
+
+        result, analysis = self._validate_and_analyze(code)
+        return result, analysis.complexity
+
+class _RuleSyntaxError(Exception):
+    """Carries the first syntax error of a statement out of _SyntaxChecker's recursion."""
+    def __init__(self, error: ValidationError):
+        super().__init__(error.message)
+        self.error = error
+
+    def prefixed(self, prefix: str) -> '_RuleSyntaxError':
+        self.error.message = prefix + self.error.message
+        return self
+
+class _SyntaxChecker:
+    """
+    Syntax and operand-type check of a parsed rule, run on the AST built for the
+    other checks so a validation parses the rule once.
 
-                # After the final else branch, we MUST find the closing parenthesis
-                if i >= len(tokens) or tokens[i].type != TokenType.RPAREN:
-                     result.add_error(ValidationError(f"Expected ')' after final else branch in {statement_type}", line_number=tokens[i-1].line if i > 0 else paren_token.line))
-                     # Don't consume if RPAREN is missing, let the final check handle it
-                else:
-                     i += 1 # Consume ')'
-                break # Exit loop after processing final else
-
-            # --- If not RPAREN or LBRACKET, assume it's a condition-branch pair ---
-            has_processed_at_least_one_pair = True
-
-            # 3. Parse Condition
-            cond_result, cond_end_i, cond_type = self._validate_expression(tokens, i, min_precedence=-1)
-            result.merge(cond_result)
-
-            # Check condition type
-            if cond_type not in {TYPE_BOOLEAN, TYPE_ANY, TYPE_UNKNOWN, TYPE_INVALID}:
-                 result.add_error(ValidationError(
-                     f"{statement_type} expects a boolean condition, but got {cond_type}",
-                     line_number=tokens[i].line
-                 ))
-
-            # If condition is invalid, stop processing this statement
-            if not cond_result.is_valid or cond_type == TYPE_INVALID:
-                 i = cond_end_i # Advance index past the invalid expression
-                 break # Exit the while loop
-
-            # Condition was valid, update index
-            i = cond_end_i
-
-            # 4. Expect and Parse Command Block '[' ... ']'
-            if i >= len(tokens) or tokens[i].type != TokenType.LBRACKET:
-                 result.add_error(ValidationError(f"Expected '[' after condition in {statement_type}", line_number=tokens[i-1].line if i > 0 else paren_token.line))
-                 # If '[' is missing, stop processing this statement
-                 break # Exit the while loop
-            else:
-                 i += 1 # Move past '['
-                 branch_start_i = i
-                 bracket_level = 1
-                 while i < len(tokens):
-                     if tokens[i].type == TokenType.LBRACKET: bracket_level += 1
-                     elif tokens[i].type == TokenType.RBRACKET:
-                         bracket_level -= 1
-                         if bracket_level == 0: break
-                     elif tokens[i].type == TokenType.EOF: bracket_level = -1; break
-                     i += 1
-
-                 if bracket_level != 0:
-                     result.add_error(ValidationError(f"Unclosed bracket in {statement_type} branch", line_number=tokens[branch_start_i-1].line))
-                     branch_end_i = i
-                     # Stop processing if branch is unclosed
-                     break
-                 else:
-                     branch_end_i = i
-                     i += 1 # Move past ']'
-
-                 # Validate condition branch contents
-                 branch_tokens = tokens[branch_start_i:branch_end_i]
-                 branch_result, _ = self._validate_branch_contents( # Ignore branch type
-                      branch_tokens,
-                      statement_type,
-                      opening_bracket_line=tokens[branch_start_i-1].line
-                 )
-                 result.merge(branch_result)
-                 # Loop continues to check for RPAREN, LBRACKET, or next condition
-
-        # --- Post-loop checks ---
-        # Check if the loop exited because it reached the end of tokens unexpectedly
-        if i < len(tokens) and tokens[i].type == TokenType.EOF and (i == 0 or tokens[i-1].type != TokenType.RPAREN):
-             result.add_error(ValidationError(f"Unexpected end of input within multi-conditional {statement_type}", line_number=tokens[i-1].line if i > 0 else paren_token.line))
-        # Check if we ended correctly (the token *before* the current index 'i' should be RPAREN)
-        elif i == 0 or (i > 0 and tokens[i-1].type != TokenType.RPAREN):
-             # Avoid adding duplicate error if already reported missing ')'
-             if not result.errors or "Expected ')'" not in result.errors[-1].message:
-                 line_num = tokens[i-1].line if i > 0 else paren_token.line
-                 result.add_error(ValidationError(f"Expected ')' to end multi-conditional {statement_type}", line_number=line_num))
-        # Check if any condition-branch pairs were processed
-        elif not has_processed_at_least_one_pair and i > 0 and tokens[i-1].type == TokenType.RPAREN: # Ensure it didn't just parse '()'
-             # Check if the token before RPAREN was the statement type
-             if i > 1 and tokens[i-2].type == TokenType.COMMAND and tokens[i-2].value.lower() == statement_type:
-                  result.add_error(ValidationError(f"Multi-conditional {statement_type} must have at least one condition/branch pair or an else branch", line_number=paren_token.line))
-
-
-        # Return the result and the number of tokens consumed by the entire multi-conditional statement
-        return result, i - start_idx
-
-    def _validate_branch_contents(self, tokens: List[Token], statement_type: str, opening_bracket_line: int) -> Tuple[ValidationResult, str]:
+    Statements are checked independently and each reports at most its first
+    error; if/ifelse branches add their own statements' errors. Expression types
+    are inferred bottom-up (number, string, boolean, list, ...; `any` when
+    unknown) and only definite mismatches are errors, e.g. `"a" + 1`.
+    """
+    MOVEMENT_COMMANDS = frozenset({'fd', 'forward', 'bk', 'back', 'rt', 'right', 'lt', 'left'})
+    NUMBER_VARIABLES = frozenset({'xcor', 'ycor', 'heading', 'who', 'energy', 'lifetime', 'food-collected', 'weight'})
+    LIST_VARIABLES = frozenset({'input-resource-distances', 'input-resource-types', 'food-observations', 'poison-observations'})
+    NUMBER_REPORTERS = frozenset({'random', 'random-float', 'sin', 'cos', 'tan', 'xcor', 'ycor', 'heading',
+                                  'distance', 'towards', 'count', 'length', 'abs'})
+    ARITHMETIC_OPERATORS = frozenset({'+', '-', '*', '/', '^'})
+    # Operand types that make an operator's use definitely wrong
+    NOT_NUMERIC = frozenset({TYPE_STRING, TYPE_BOOLEAN, TYPE_LIST})
+    NOT_BOOLEAN = frozenset({TYPE_NUMBER, TYPE_STRING, TYPE_LIST})
+    CONCATENABLE = frozenset({TYPE_STRING, TYPE_NUMBER, TYPE_BOOLEAN, TYPE_ANY, TYPE_UNKNOWN})
+    NUMERIC_ARGUMENTS = frozenset({TYPE_NUMBER, TYPE_ANY, TYPE_UNKNOWN})
+    CONDITIONS = frozenset({TYPE_BOOLEAN, TYPE_ANY, TYPE_UNKNOWN})
+
+    def __init__(self, verifier: NetLogoVerifier, program: ProgramNode, tokens: List[Token]):
+        self.verifier = verifier
+        self.grouped = program.grouped
+        self.unclosed = program.unclosed
+        self.tokens = tokens
+        self._index_of: Optional[Dict[int, int]] = None
+
+    @property
+    def index_of(self) -> Dict[int, int]:
+        """Token index by source offset, built on first use (only errors need it)."""
+        if self._index_of is None:
+            self._index_of = {token.start: index for index, token in enumerate(self.tokens)}
+        return self._index_of
+
+    def check_statements(self, statements: List[AstNode]) -> List[ValidationError]:
+        """Errors of a statement list (the rule, or the body of an if/ifelse branch)."""
+        errors = []
+        for position, node in enumerate(statements):
+            if position == 1 and not errors and not self._is_statement(statements[0]):
+                # A lone expression may stand for the whole rule, but nothing may follow it
+                token = self._first_token(node)
+                errors.append(ValidationError(f"Unexpected token after expression: {token.type.name} ('{token.value}')",
+                                              line_number=token.line))
+                if not self._is_statement(node):
+                    continue
+            errors.extend(self.check_statement(node, first=position == 0))
+        return errors
+
+    def check_statement(self, node: AstNode, first: bool = True) -> List[ValidationError]:
         """
-        Validate the contents of an if/ifelse/ifelse-value branch using tokens.
-        Returns the validation result and the inferred type (for ifelse-value).
+        Errors of one statement. A bare expression is only accepted as the `first`
+        statement; check_statements rejects anything after it.
         """
-        result = ValidationResult(True)
-        branch_start_line = tokens[0].line if tokens else opening_bracket_line
-        branch_type = TYPE_UNKNOWN
-
-        if not tokens:
-            # Empty command blocks are okay. Empty reporter blocks are runtime errors.
-            if statement_type == 'ifelse-value':
-                 branch_type = TYPE_UNKNOWN # Syntactically okay, but type is unknown
+        try:
+            if self._starts_with_parenthesis(node):
+                paren = self._first_token(node)
+                token = self.tokens[self.index_of[paren.start] + 1]
+                raise self._error("Unexpected parenthesis '(' at top level, or invalid start to multi-conditional "
+                                  f"ifelse (found '{token.value}' ({token.type.name}) after '(')", paren.line)
+            if isinstance(node, CommandNode):
+                self._command(node)
+                return []
+            if isinstance(node, ConditionalNode):
+                return self._multi_conditional(node) if node.multi else self._conditional(node)
+            if isinstance(node, ErrorNode) and node.token.type in _AstBuilder.CLOSING_TYPES:
+                raise self._error(f"Unexpected closing token: '{node.token.value}'", node.line)
+            if not first:
+                token = self._first_token(node)
+                raise self._error(f"Unexpected token at top level: {token.type.name} ('{token.value}')", token.line)
+            self._type(node)
+        except _RuleSyntaxError as issue:
+            return [issue.error]
+        return []
+
+    # --- Statements ---
+
+    def _is_statement(self, node: AstNode) -> bool:
+        return isinstance(node, (CommandNode, ConditionalNode)) and id(node) not in self.grouped
+
+    def _command(self, node: CommandNode) -> None:
+        name = node.name
+        for number, arg in enumerate(node.args, 1):
+            if number == 1 and name in {'set', 'let'}:
+                self._assignment_target(name, arg)
+                continue
+            try:
+                arg_type = self._type(arg)
+            except _RuleSyntaxError as issue:
+                raise issue.prefixed(f"Invalid arg {number} for '{name}': ")
+            if name in self.MOVEMENT_COMMANDS and arg_type not in self.NUMERIC_ARGUMENTS:
+                raise self._error(f"Command '{name}' expects arg {number} to be number, but got {arg_type}",
+                                  self._first_token(arg).line)
+        arity = _AstBuilder.COMMAND_ARITY.get(name, 0)
+        if len(node.args) < arity:
+            raise self._error(f"Command '{name}' expects {arity} arg(s), found end of input", node.line)
+
+    def _assignment_target(self, command: str, target: AstNode) -> None:
+        if not isinstance(target, VariableNode) or self._starts_with_parenthesis(target):
+            token = self._first_token(target)
+            raise self._error(f"Expected variable name after '{command}', found {token.type.name}", token.line)
+        if not re.match(r'^[a-zA-Z][\w\-]*$', target.name):
+            written = self.tokens[self.index_of[target.start]].value
+            raise self._error(f"Invalid variable name format: '{written}'", target.line)
+
+    def _conditional(self, node: ConditionalNode) -> List[ValidationError]:
+        kind = node.kind
+        condition, block = node.clauses[0]
+        if isinstance(condition, ErrorNode) and condition.token.type in _AstBuilder.STOP_TYPES:
+            return [ValidationError(f"Incomplete {kind} - missing condition", line_number=node.line)]
+        errors = self._condition(kind, condition)
+        if block is None:
+            errors.append(ValidationError(f"Expected '[' after condition in {kind}", line_number=node.line))
+            return errors
+        errors.extend(self._branch(kind, block))
+        if kind != 'if':
+            if node.else_block is None:
+                errors.append(ValidationError(f"Missing '[' for false branch in {kind}", line_number=block.line))
             else:
-                 branch_type = TYPE_COMMAND_BLOCK # Valid empty command sequence
-            return result, branch_type
-
-        if statement_type == 'ifelse-value':
-            # Expect exactly one valid expression that consumes all tokens
-            expr_result, end_idx, expr_type = self._validate_expression(tokens, 0, min_precedence=-1)
-            result.merge(expr_result)
-            branch_type = expr_type # Type of the branch is the type of the expression
-
-            if not expr_result.is_valid:
-                 # Add context if the error message doesn't already have it
-                 if result.errors and "ifelse-value branch" not in result.errors[-1].message:
-                      # Find the last error added by the merge and modify it
-                      for err in reversed(result.errors):
-                           if "ifelse-value branch" not in err.message:
-                                err.message = f"Invalid expression in ifelse-value branch: {err.message}"
-                                break
-                 branch_type = TYPE_INVALID
-            elif end_idx != len(tokens):
-                 # Expression was valid but didn't consume the whole block
-                 result.add_error(ValidationError(
-                     f"Unexpected token '{tokens[end_idx].value}' after expression in ifelse-value branch. Branch should contain only one expression.",
-                     line_number=tokens[end_idx].line
-                 ))
-                 branch_type = TYPE_INVALID # Mark as invalid due to extra tokens
-            # If valid and consumed all, branch_type remains expr_type.
-        else: # 'if' or 'ifelse' command block validation
-            # Use the main syntax checker for the branch content
-            eof_token = Token(TokenType.EOF, '', tokens[-1].line, tokens[-1].column + 1) if tokens else Token(TokenType.EOF, '', branch_start_line, 1)
-            # Validate the sequence of commands within the block
-            branch_syntax_result = self._check_syntax_tokenized(tokens + [eof_token])
-
-            if not branch_syntax_result.is_valid:
-                 # Add context to errors from the branch validation
-                 for error in branch_syntax_result.errors:
-                      error.message = f"Invalid command sequence in {statement_type} branch (line ~{branch_start_line}): {error.message}"
-                      # Adjust line numbers if possible? Difficult without original code mapping.
-                 result.merge(branch_syntax_result)
-                 branch_type = TYPE_INVALID
-            else:
-                 branch_type = TYPE_COMMAND_BLOCK # Valid command sequence
+                errors.extend(self._branch(kind, node.else_block))
+        return errors
+
+    def _multi_conditional(self, node: ConditionalNode) -> List[ValidationError]:
+        kind = node.kind
+        if not node.clauses and node.else_block is None:
+            return [ValidationError(f"Multi-conditional {kind} must have at least one condition/branch pair "
+                                    "or an else branch", line_number=node.line)]
+        errors = []
+        for condition, block in node.clauses:
+            condition_errors = self._condition(kind, condition)
+            if condition_errors:
+                return errors + condition_errors
+            if block is None:
+                errors.append(ValidationError(f"Expected '[' after condition in {kind}", line_number=condition.line))
+                return errors
+            errors.extend(self._branch(kind, block))
+        if node.else_block is not None:
+            errors.extend(self._branch(kind, node.else_block))
+        if id(node) in self.unclosed:
+            where = "after final else branch in" if node.else_block is not None else "to end multi-conditional"
+            errors.append(ValidationError(f"Expected ')' {where} {kind}", line_number=node.line))
+        return errors
+
+    def _condition(self, kind: str, condition: AstNode) -> List[ValidationError]:
+        try:
+            condition_type = self._type(condition)
+        except _RuleSyntaxError as issue:
+            return [issue.error]
+        if condition_type not in self.CONDITIONS:
+            return [ValidationError(f"{kind} expects a boolean condition, but got {condition_type}",
+                                    line_number=self._first_token(condition).line)]
+        return []
+
+    def _branch(self, kind: str, block: BlockNode) -> List[ValidationError]:
+        if not block.body:
+            return []
+        first = block.body[0]
+        if kind == 'ifelse-value':
+            # Each branch is a single reporter expression
+            try:
+                self._type(first)
+            except _RuleSyntaxError as issue:
+                return [issue.prefixed("Invalid expression in ifelse-value branch: ").error]
+            if len(block.body) > 1:
+                token = self._first_token(block.body[1])
+                return [ValidationError(f"Unexpected token '{token.value}' after expression in ifelse-value branch. "
+                                        "Branch should contain only one expression.", line_number=token.line)]
+            return []
+        errors = self.check_statements(block.body)
+        line = self._first_token(first).line
+        for error in errors:
+            error.message = f"Invalid command sequence in {kind} branch (line ~{line}): {error.message}"
+        return errors
+
+    # --- Expressions ---
+
+    def _type(self, node: AstNode) -> str:
+        """Inferred type of an expression; raises _RuleSyntaxError at its first error."""
+        node_type = self._bare_type(node)
+        if id(node) in self.unclosed and not isinstance(node, ConditionalNode):
+            line = self._first_token(node).line
+            raise self._error(f"Expected ')' to close parenthesis opened on line {line}", line)
+        return node_type
+
+    def _bare_type(self, node: AstNode) -> str:
+        node_type = type(node)
+        if node_type is NumberNode:
+            return TYPE_NUMBER
+        if node_type is StringNode:
+            return TYPE_STRING
+        if node_type is VariableNode:
+            return self._variable_type(node)
+        if node_type is ReporterNode:
+            return self._reporter_type(node)
+        if node_type is BinaryOpNode:
+            return self._operation_type(node)
+        if node_type is UnaryOpNode:
+            self._type(node.operand)
+            return TYPE_BOOLEAN if node.op == 'not' else TYPE_NUMBER
+        if node_type is BlockNode:
+            return TYPE_COMMAND_BLOCK
+        if node_type is ErrorNode and node.token.type in {TokenType.EOF, TokenType.RBRACKET}:
+            raise self._error("Expected expression term or prefix operator, found end of input", node.line)
+        # Stray tokens, and commands or conditionals where a value is expected
+        token = node.token if node_type is ErrorNode else self._first_token(node)
+        if node_type is ConditionalNode and node.multi:
+            token = self.tokens[self.index_of[node.start] + 1]
+        raise self._error("Unexpected token when expecting an expression term or prefix operator: "
+                          f"{token.type.name} ('{token.value}')", token.line, token.value)
+
+    def _variable_type(self, node: VariableNode) -> str:
+        name = node.name
+        if name in self.verifier.allowed_variables:
+            if name in self.NUMBER_VARIABLES:
+                return TYPE_NUMBER
+            return TYPE_LIST if name in self.LIST_VARIABLES else TYPE_ANY
+        arity = self.verifier.REPORTER_ARITY.get(name)
+        if arity == 0:
+            return TYPE_NUMBER if name in self.NUMBER_REPORTERS else TYPE_ANY
+        if arity is not None:
+            raise self._error(f"Reporter '{name}' used without arguments, but expects {arity} argument(s).", node.line)
+        written = self.tokens[self.index_of[node.start]].value
+        raise self._error(f"Unknown or disallowed identifier/variable: '{written}'", node.line, written)
+
+    def _reporter_type(self, node: ReporterNode) -> str:
+        name = node.name
+        if node.variadic:
+            for arg in node.args:
+                try:
+                    self._type(arg)
+                except _RuleSyntaxError as issue:
+                    raise issue.prefixed(f"Invalid argument within '({name} ...)' starting on line {node.line}: ")
+            return TYPE_LIST if name == 'list' else TYPE_STRING
+
+        written = self.tokens[self.index_of[node.start]].value
+        if name in {'list', 'word'}:
+            raise self._error(f"Unsupported syntax: Bare '{name}' reporter found. Use parenthesized '({name} ...)' form.",
+                              node.line, written)
+        arity = self.verifier.REPORTER_ARITY.get(name)
+        if not arity:
+            raise self._error(f"Unknown or disallowed reporter '{written}' used in expression", node.line, written)
+        for number, arg in enumerate(node.args, 1):
+            try:
+                self._type(arg)
+            except _RuleSyntaxError as issue:
+                raise issue.prefixed(f"Invalid argument {number} for '{name}': ")
+        if len(node.args) < arity:
+            raise self._error(f"Expected argument {len(node.args) + 1} for reporter '{name}', but found end of input",
+                              node.line)
+
+        if name in self.NUMBER_REPORTERS:
+            return TYPE_NUMBER
+        if name == 'any?':
+            return TYPE_BOOLEAN
+        return TYPE_AGENTSET if name == 'in-radius' else TYPE_ANY
+
+    def _operation_type(self, node: BinaryOpNode) -> str:
+        op = node.op
+        left = self._type(node.left)
+        right = self._type(node.right)
+        operands = {left, right}
+        if op in self.ARITHMETIC_OPERATORS:
+            if operands & self.NOT_NUMERIC:
+                raise self._error(f"Operator '{op}' expects numeric operands, but got {left} and {right}", node.line)
+            result = TYPE_NUMBER
+        elif op == '++':
+            if left == right == TYPE_NUMBER:
+                raise self._error("Operator '++' cannot be used with two number operands. Use 'word' or '+' instead.",
+                                  node.line, f"... {op} ...")
+            if not operands <= self.CONCATENABLE:
+                raise self._error(f"Operator '++' has incompatible operand types: {left} and {right}", node.line)
+            return TYPE_STRING
+        elif op in {'and', 'or'}:
+            if operands & self.NOT_BOOLEAN:
+                raise self._error(f"Operator '{op}' expects boolean operands, but got {left} and {right}", node.line)
+            result = TYPE_BOOLEAN
+        else:
+            # Comparisons accept any operands
+            return TYPE_BOOLEAN
+        return result if operands == {result} else TYPE_ANY
 
-        return result, branch_type
+    # --- Helpers ---
 
-    def _validate_command(self, tokens: List[Token], start_idx: int) -> Tuple[ValidationResult, int]:
-        """Validate a command and its arguments using tokens."""
-        # Returns: ValidationResult, consumed_token_count
-        result = ValidationResult(True)
-        i = start_idx
-        command_token = tokens[i]
-        command_lower = command_token.value.lower()
-
-        if command_token.type != TokenType.COMMAND or command_lower not in self.allowed_commands:
-             # This case should not be reached if called from _check_syntax_tokenized
-             result.add_error(ValidationError(f"Internal error: _validate_command called with non-command token {command_token.value}", line_number=command_token.line))
-             return result, i + 1
-
-        i += 1 # Move past command
-
-        num_expected_args = 0
-        expected_arg_types = [] # List to hold expected types for each arg
-        if command_lower in {'fd', 'forward', 'bk', 'back', 'rt', 'right', 'lt', 'left'}:
-            num_expected_args = 1
-            expected_arg_types = [TYPE_NUMBER]
-        elif command_lower == 'set':
-            num_expected_args = 2
-            expected_arg_types = [TYPE_ANY, TYPE_ANY] # Variable name (checked separately), value
-        elif command_lower == 'let':
-             num_expected_args = 2
-             expected_arg_types = [TYPE_ANY, TYPE_ANY] # Variable name (checked separately), value
-        elif command_lower == 'stop':
-             num_expected_args = 0
-             expected_arg_types = []
-
-
-        consumed_args = 0
-        arg_start_index = i
-        while consumed_args < num_expected_args:
-            arg_start_index = i # Track start of current argument parse
-            if i >= len(tokens) or tokens[i].type == TokenType.EOF:
-                 result.add_error(ValidationError(f"Command '{command_lower}' expects {num_expected_args} arg(s), found end of input", line_number=command_token.line))
-                 break
-
-            # Special handling for 'set'/'let' variable name (first argument)
-            if command_lower in {'set', 'let'} and consumed_args == 0:
-                 var_token = tokens[i]
-                 if var_token.type != TokenType.IDENTIFIER:
-                      result.add_error(ValidationError(f"Expected variable name after '{command_lower}', found {var_token.type.name}", line_number=var_token.line))
-                 # Basic check for valid identifier format (already done by tokenizer, but good safeguard)
-                 elif not re.match(r'^[a-zA-Z][\w\-]*$', var_token.value):
-                      result.add_error(ValidationError(f"Invalid variable name format: '{var_token.value}'", line_number=var_token.line))
-                 # Check if it's a disallowed primitive name (e.g., cannot 'set fd [...]')
-                 elif var_token.value.lower() in self.allowed_commands or var_token.value.lower() in self.allowed_reporters:
-                      result.add_error(ValidationError(f"Cannot use command/reporter name '{var_token.value}' as a variable", line_number=var_token.line))
-
-                 # Consume only the variable name token
-                 next_i = i + 1
-                 arg_type = TYPE_ANY # Variable name itself doesn't have a type relevant here
+    def _starts_with_parenthesis(self, node: AstNode) -> bool:
+        """True for `(a) + b`, `(a b` and the like; multi-conditionals excluded."""
+        while True:
+            if id(node) in self.grouped or id(node) in self.unclosed and not isinstance(node, ConditionalNode):
+                return True
+            if not isinstance(node, BinaryOpNode):
+                return False
+            node = node.left
+
+    def _first_token(self, node: AstNode) -> Token:
+        """The node's first token, including grouping parentheses written before it."""
+        index = self.index_of[node.start]
+        while index > 0 and self.tokens[index - 1].type is TokenType.LPAREN:
+            index -= 1
+        return self.tokens[index]
+
+    @staticmethod
+    def _error(message: str, line: int, snippet: Optional[str] = None) -> _RuleSyntaxError:
+        return _RuleSyntaxError(ValidationError(message, line_number=line, code_snippet=snippet))
+
+class _SyntaxRecovery:
+    """
+    Statement-by-statement syntax check used by NetLogoVerifier.validate_all.
+
+    Each statement of the AST is checked on its own, as if it were the whole
+    rule, so an error in one statement cannot cascade into the next. For a
+    failing if/ifelse the statements of its blocks are checked recursively and
+    reported instead, when they explain the failure; otherwise the statement's
+    first error is reported with the statement's span.
+    """
+    def __init__(self, checker: _SyntaxChecker, explained: Set[int]):
+        self.checker = checker
+        self.tokens = tokens = checker.tokens
+        self.explained = explained
+        self.index_of = checker.index_of
+        self.closing = {}
+        stack = []
+        for index, token in enumerate(tokens):
+            if token.type is TokenType.LBRACKET:
+                stack.append(index)
+            elif token.type is TokenType.RBRACKET and stack:
+                self.closing[stack.pop()] = index
+
+    def check_statements(self, statements: List[AstNode], end: int, top_level: bool = False) -> List[ValidationError]:
+        errors = []
+        # Bare reporters and blocks right after an explained statement are its
+        # arguments (e.g. `turtles [ die ]` after `ask`), so they are explained too
+        after_explained = False
+        for position, node in enumerate(statements):
+            first = self.index_of[node.start]
+            last = self.index_of[statements[position + 1].start] if position + 1 < len(statements) else end
+            segment = self.tokens[first:last]
+            is_statement = isinstance(node, (CommandNode, ConditionalNode))
+            if not segment or any(token.start in self.explained for token in segment) or \
+               after_explained and not is_statement:
+                after_explained = True
+                continue
+            after_explained = False
+            span = {"start": segment[0].start, "end": segment[-1].start + len(segment[-1].value)}
+
+            if len(statements) > 1 and not is_statement:
+                # A bare reporter is only allowed as the whole rule
+                token = segment[0]
+                where = "at top level" if top_level else "in command block"
+                errors.append(ValidationError(f"Unexpected token {where}: {token.type.name} ('{token.value}')",
+                                              line_number=token.line, code_snippet=token.value, **span))
+                continue
+
+            statement_errors = self.checker.check_statement(node)
+            if not statement_errors:
+                continue
+
+            inner = []
+            if isinstance(node, ConditionalNode) and node.kind != 'ifelse-value':
+                blocks = [block for _, block in node.clauses if block is not None]
+                if node.else_block is not None:
+                    blocks.append(node.else_block)
+                for block in blocks:
+                    opening = self.index_of[block.start]
+                    inner.extend(self.check_statements(block.body, self.closing.get(opening, last)))
+            if inner:
+                errors.extend(inner)
             else:
-                 # Validate the argument expression
-                 arg_result, next_i, arg_type = self._validate_expression(tokens, i, min_precedence=-1)
-                 result.merge(arg_result)
-
-                 # Add context to the error message if invalid
-                 if not arg_result.is_valid:
-                      if result.errors:
-                           # Find the last error added by the merge and modify it
-                           for err in reversed(result.errors):
-                                if f"Invalid arg {consumed_args + 1}" not in err.message:
-                                     err.message = f"Invalid arg {consumed_args + 1} for '{command_lower}': {err.message}"
-                                     break
-
-                 # --- Argument Type Check ---
-                 current_expected_type = expected_arg_types[consumed_args]
-                 # Allow ANY/UNKNOWN/INVALID to pass type check here, focus on definite mismatches
-                 if current_expected_type != TYPE_ANY and \
-                    arg_type not in {current_expected_type, TYPE_ANY, TYPE_UNKNOWN, TYPE_INVALID}:
-                      result.add_error(ValidationError(
-                           f"Command '{command_lower}' expects arg {consumed_args + 1} to be {current_expected_type}, but got {arg_type}",
-                           line_number=tokens[arg_start_index].line # Line where arg starts
-                      ))
-
-            # Update the loop index 'i' to point after the consumed argument
-            i = next_i
-            consumed_args += 1
-
-            # If the argument parsing failed severely and didn't advance the index, break
-            if i == arg_start_index and not result.is_valid:
-                 # Add a generic error if not already present from _validate_expression
-                 if not any(e.line_number == tokens[arg_start_index].line for e in result.errors):
-                      result.add_error(ValidationError(f"Failed to parse argument {consumed_args} for '{command_lower}'", line_number=tokens[i].line))
-                 break
-
-        # Check if too many arguments were provided (if next token isn't EOF or another command/closing bracket)
-        if result.is_valid and i < len(tokens) and tokens[i].type != TokenType.EOF:
-             # Heuristic: If the next token could start another expression or command, assume too many args
-             if self._can_start_expression(tokens[i]) or tokens[i].type in {TokenType.COMMAND, TokenType.LBRACKET, TokenType.LPAREN}:
-                  # This check might be too aggressive, needs refinement.
-                  # Consider context: are we inside brackets?
-                  # For now, only flag if obviously wrong.
-                  # Example: `fd 1 2` -> error
-                  # Example: `fd 1 rt 90` -> okay
-                  # Let's assume for now that if _validate_expression consumed correctly,
-                  # the next token should ideally be EOF or something structural.
-                  # This needs more robust handling based on context (inside block vs top level).
-                  # Temporarily disable this check as it might be too noisy.
-                  # result.add_error(ValidationError(f"Unexpected token '{tokens[i].value}' after arguments for command '{command_lower}'", line_number=tokens[i].line))
-                  pass
-
-
-        # Return the result and the *number of tokens consumed* by this command and its args
-        return result, i - start_idx
-
-    # --- Value Range Validator (Tokenized) ---
-    def _check_value_ranges(self, tokens: List[Token]) -> ValidationResult:
-        """
-        Validate numeric value ranges using the token stream. Should be called after
-        basic syntax validation to ensure tokens are meaningful.
+                error = statement_errors[0]
+                error.start, error.end = span["start"], span["end"]
+                errors.append(error)
+        return errors
 
-        Args:
-            tokens: The list of tokens representing the code.
+class StreamingVerification:
+    """
+    Resumable tokenizer state for verifying code while it is still being generated.
+
+    `feed` tokenizes every lexeme that can no longer change and checks it for
+    problems that no continuation can fix. Only text before the last whitespace
+    character is tokenized, since the tail may still grow (`fo` may become
+    `forward`, `1.` may become `1.5`); the checks are:
+    - unknown tokens
+    - dangerous primitives
+    - closing brackets/parentheses with no matching or a mismatched opener
+
+    The first such problem is returned (and kept in `fatal_error`) so the caller
+    can cancel the request. `finish` runs the full validator on the whole text.
+    """
+    def __init__(self, verifier: NetLogoVerifier):
+        self.verifier = verifier
+        self.fatal_error: Optional[ValidationError] = None
+        self._chunks: List[str] = []
+        self._text = ""
+        self._pos = 0
+        self._line = 1
+        self._line_start = 0
+        self._stack: List[Token] = []
+        self._closing = {TokenType.RPAREN: TokenType.LPAREN, TokenType.RBRACKET: TokenType.LBRACKET}
+
+    @property
+    def text(self) -> str:
+        """All code fed so far."""
+        return self._text
+
+    @property
+    def aborted(self) -> bool:
+        """True once a fatal problem has been found."""
+        return self.fatal_error is not None
+
+    def feed(self, chunk: str) -> Optional[ValidationError]:
+        """
+        Add a chunk of code and check the newly completed tokens.
 
         Returns:
-            ValidationResult with any range violations.
+            The fatal ValidationError if one has been found (now or earlier), else None
         """
-        result = ValidationResult(True)
+        if self.fatal_error is None and chunk:
+            self._text += chunk
+            self._scan(final=False)
+        return self.fatal_error
+
+    def finish(self) -> ValidationResult:
+        """Flush the held-back tail and return the full validation of the streamed code."""
+        if self.fatal_error is None:
+            self._scan(final=True)
+        return self.verifier.validate(self._text)
+
+    def _scan(self, final: bool) -> None:
+        text = self._text
+        # No lexeme spans whitespace except comments and string literals, so
+        # everything ending before the last whitespace character is final
+        safe_end = len(text) if final else max(text.rfind(' '), text.rfind('\t'), text.rfind('\n'))
+        for mo in self.verifier.tokenizer_regex.finditer(text, self._pos):
+            kind = mo.lastgroup
+            value = mo.group()
+            if not final:
+                # A lone quote is most likely a string literal whose closing quote is pending
+                if mo.end() > safe_end or (kind == 'UNKNOWN' and value == '"'):
+                    return
+            self._pos = mo.end()
 
-        for token in tokens:
-            if token.type == TokenType.NUMBER:
-                num_str = token.value
-                try:
-                    value = float(num_str)
-                    # Check against configured limits
-                    if value > self.max_value:
-                        result.add_error(ValidationError(
-                            f"Value too large: {value} (maximum allowed: {self.max_value})",
-                            line_number=token.line,
-                            code_snippet=num_str
-                        ))
-                    if value < self.min_value:
-                        result.add_error(ValidationError(
-                            f"Value too small: {value} (minimum allowed: {self.min_value})",
-                            line_number=token.line,
-                            code_snippet=num_str
-                        ))
-                except ValueError:
-                    # This shouldn't happen if the tokenizer is correct, but safeguard
-                    result.add_error(ValidationError(
-                        f"Invalid numeric token value: {num_str}",
-                        line_number=token.line,
-                        code_snippet=num_str
-                    ))
+            if kind == 'NEWLINE':
+                self._line += 1
+                self._line_start = mo.end()
+                continue
+            if kind in {'WHITESPACE', 'COMMENT'}:
+                continue
+
+            token_type = TokenType[kind]
+            if token_type == TokenType.IDENTIFIER:
+                token_type = self.verifier._classify_identifier(value)
+            token = Token(token_type, value, self._line, mo.start() - self._line_start + 1, mo.start())
+
+            error = self._check_token(token)
+            if error is not None:
+                self.fatal_error = error
+                logger.info(f"Streaming verification aborted: {error}")
+                return
+
+    def _check_token(self, token: Token) -> Optional[ValidationError]:
+        if token.type == TokenType.UNKNOWN:
+            return ValidationError(f"Unknown token: '{token.value}'", line_number=token.line, code_snippet=token.value,
+                                   start=token.start, end=token.start + len(token.value))
+
+        if token.type in {TokenType.COMMAND, TokenType.REPORTER, TokenType.IDENTIFIER} and \
+           token.value.lower() in self.verifier.dangerous_primitives:
+            return ValidationError(f"Dangerous primitive found: {token.value}", line_number=token.line, code_snippet=token.value,
+                                   start=token.start, end=token.start + len(token.value))
+
+        if token.type in {TokenType.LPAREN, TokenType.LBRACKET}:
+            self._stack.append(token)
+        elif token.type in self._closing:
+            if not self._stack:
+                return ValidationError(
+                    f"Unmatched closing bracket/parenthesis: '{token.value}'",
+                    line_number=token.line, code_snippet=token.value,
+                    start=token.start, end=token.start + 1
+                )
+            opening_token = self._stack.pop()
+            if opening_token.type != self._closing[token.type]:
+                return ValidationError(
+                    f"Mismatched bracket/parenthesis: Expected closing for '{opening_token.value}' (line {opening_token.line}) but found '{token.value}'",
+                    line_number=token.line, code_snippet=f"...{opening_token.value}...{token.value}...",
+                    start=opening_token.start, end=token.start + 1
+                )
+        return None
 
-        return result
 
-    def measure_complexity(self, code: str) -> CodeComplexity:
-        """
-        Measure the complexity of NetLogo code.
+# --- Batch Verification Workers ---
+# Module-level so they can be pickled by ProcessPoolExecutor.
 
-        Args:
-            code: The NetLogo code to analyze
+_worker_verifier: Optional[NetLogoVerifier] = None
 
-        Returns:
-            CodeComplexity: Enum value representing complexity level
-        """
-        # Clean the code
-        code = re.sub(self.comment_pattern, '', code)
-        code = code.lower()
-
-        # Count various complexity indicators
-        complexity_score = 0
-
-        # 1. Basic movement commands (+1)
-        if re.search(r'\b(fd|forward|bk|back|rt|right|lt|left)\b', code):
-            complexity_score += 1
-
-        # 2. Conditional statements (+1 per type)
-        if re.search(r'\bif\b', code):
-            complexity_score += 1
-        if re.search(r'\bifelse\b', code):
-            complexity_score += 1
-
-        # 3. Variable usage (+1)
-        if re.search(r'\b(set|let)\b', code):
-            complexity_score += 1
-
-        # 4. Advanced movement (+1)
-        if re.search(r'\b(towards|distance|in-radius)\b', code):
-            complexity_score += 1
-
-        # 5. Random usage (+1)
-        if re.search(r'\b(random|random-float)\b', code):
-            complexity_score += 1
-
-        # 6. Math functions (+1)
-        if re.search(r'\b(sin|cos|tan)\b', code):
-            complexity_score += 1
-
-        # 7. Nested conditionals (+1)
-        if re.search(r'\bif.*\[.*if\b', code) or re.search(r'\bifelse.*\[.*if\b', code):
-            complexity_score += 1
-
-        # Map score to complexity level, capping at the highest level
-        if complexity_score <= 1:
-            return CodeComplexity.SIMPLE
-        elif complexity_score == 2:
-            return CodeComplexity.BASIC
-        elif complexity_score == 3:
-            return CodeComplexity.MODERATE
-        elif complexity_score == 4:
-            return CodeComplexity.ADVANCED
-        elif complexity_score == 5:
-            return CodeComplexity.COMPLEX
-        elif complexity_score == 6:
-            return CodeComplexity.SOPHISTICATED
-        else:
-            return CodeComplexity.EXPERT
+def _init_batch_worker(state: Dict) -> None:
+    """Build the per-process verifier once (compiled tokenizer regex and primitive sets)."""
+    global _worker_verifier
+    _worker_verifier = NetLogoVerifier(state["config"])
+    _worker_verifier.allowed_commands = state["allowed_commands"]
+    _worker_verifier.allowed_reporters = state["allowed_reporters"]
+    _worker_verifier.dangerous_primitives = state["dangerous_primitives"]
+    _worker_verifier.allowed_variables = state["allowed_variables"]
+
+def _validate_batch_chunk(codes: List[str]) -> List[ValidationResult]:
+    """Validate one chunk of rules in a worker process."""
+    return [_worker_verifier._validate_uncached(code) for code in codes]
 
 # Note: The test_verifier() function and its associated test cases
 # have been moved to the separate test_verifier.py file for better organization.
@@ -0,0 +1,299 @@
+"""
+Offline stand-in for the Anthropic client behind `utils.generate_text`.
+
+FakeLLM answers the rule and body prompts in prompts/ without network access,
+so the evolution loop can be benchmarked (mutations/sec, rejection rates,
+concurrency) on a machine without API keys:
+
+- rule prompts (`move(input)`) get a `move` function in <code> tags, a canned
+  rule built from the body's allowed actions, or a template mutation of the
+  <given_python_function>
+- body prompts get a <robot_configuration>, a random connected body of at most
+  MAX_NUM_PARTS parts, or a small mutation of the <given_robot_configuration>
+
+Each answer waits for a sampled latency, fails with FakeLLMError at
+`failure_rate` and is deliberately malformed (missing tags, syntax errors,
+forbidden imports, disconnected bodies, ...) at `malformed_rate`. Answers are
+deterministic per seed, prompt and number of times that prompt has been sent.
+
+Enable it with GRIDARIANS_LLM=fake (see FakeLLM.from_env for the other
+variables) or `utils.use_fake_llm(...)`.
+"""
+
+import ast
+import hashlib
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+# Error messages of the simulated provider failures
+FAILURES = ("429 rate limit exceeded", "500 internal server error", "529 overloaded", "504 gateway timeout")
+
+# Part types and the directions each may face, as checked by utils.check_robot_configuration
+PART_DIRECTIONS = {2: [0, 1, 2, 3], 3: [0, 1], 4: [0, 1, 2, 3], 6: [0]}
+
+# Prompt variables of the action maxima, by action string
+ACTION_LIMIT_PATTERN = re.compile(r'Maximum (\d+) "(\w+)" actions')
+SENSOR_COUNT_PATTERN = re.compile(r"has (?:<num_sensors>)?(\d+)(?:</num_sensors>)? sensors")
+
+
+class FakeLLMError(RuntimeError):
+    """Simulated provider failure (rate limit, overload, timeout)."""
+
+
+def _tagged(prompt: str, tag: str) -> Optional[str]:
+    match = re.search(rf"<{tag}>(.*?)</{tag}>", prompt, re.DOTALL)
+    return match.group(1).strip() if match else None
+
+
+class FakeLLM:
+    """
+    Deterministic prompt -> response stand-in for `utils.generate_text`.
+
+    Public Methods:
+    - generate_text(prompt: str) -> str: Answer a prompt after a sampled latency
+    - from_env() -> FakeLLM: Instance configured from GRIDARIANS_FAKE_* variables
+    """
+
+    def __init__(self, latency: float = 0.5, latency_distribution: str = "lognormal",
+                 latency_sigma: float = 0.5, failure_rate: float = 0.0,
+                 malformed_rate: float = 0.0, seed: int = 0):
+        """
+        Args:
+            latency: Mean seconds per answer (the lower bound is 0)
+            latency_distribution: One of "fixed", "uniform" (0 .. 2 * latency),
+                                  "exponential" or "lognormal" (with `latency_sigma`)
+            latency_sigma: Shape of the lognormal distribution
+            failure_rate: Fraction of calls that raise FakeLLMError
+            malformed_rate: Fraction of answers that should fail verification or parsing
+            seed: Seed of every random choice
+        """
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_distribution} "
+                             f"(expected {', '.join(LATENCY_DISTRIBUTIONS)})")
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.latency_sigma = latency_sigma
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self.stats = {"calls": 0, "failures": 0, "malformed": 0}
+        self._occurrences: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "FakeLLM":
+        """
+        Configure from GRIDARIANS_FAKE_LATENCY, GRIDARIANS_FAKE_LATENCY_DISTRIBUTION,
+        GRIDARIANS_FAKE_FAILURE_RATE, GRIDARIANS_FAKE_MALFORMED_RATE and GRIDARIANS_FAKE_SEED.
+        """
+        return cls(latency=float(os.getenv("GRIDARIANS_FAKE_LATENCY", 0.5)),
+                   latency_distribution=os.getenv("GRIDARIANS_FAKE_LATENCY_DISTRIBUTION", "lognormal"),
+                   failure_rate=float(os.getenv("GRIDARIANS_FAKE_FAILURE_RATE", 0.0)),
+                   malformed_rate=float(os.getenv("GRIDARIANS_FAKE_MALFORMED_RATE", 0.0)),
+                   seed=int(os.getenv("GRIDARIANS_FAKE_SEED", 0)))
+
+    def generate_text(self, prompt: str, stop_at: Optional[str] = None) -> str:
+        text = self._generate(prompt)
+        if stop_at and stop_at in text:
+            # Like an API stop sequence: nothing after the closing tag is generated
+            text = text[:text.index(stop_at) + len(stop_at)]
+        return text
+
+    def _generate(self, prompt: str) -> str:
+        rng = self._rng(prompt)
+        time.sleep(self.sample_latency(rng))
+        with self._lock:
+            self.stats["calls"] += 1
+        if rng.random() < self.failure_rate:
+            with self._lock:
+                self.stats["failures"] += 1
+            raise FakeLLMError(rng.choice(FAILURES))
+        malformed = rng.random() < self.malformed_rate
+        if malformed:
+            with self._lock:
+                self.stats["malformed"] += 1
+
+        if "move(input)" in prompt:
+            return self._rule_response(prompt, rng, malformed)
+        return self._body_response(prompt, rng, malformed)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        if self.latency <= 0:
+            return 0.0
+        if self.latency_distribution == "fixed":
+            return self.latency
+        if self.latency_distribution == "uniform":
+            return rng.uniform(0, 2 * self.latency)
+        if self.latency_distribution == "exponential":
+            return rng.expovariate(1 / self.latency)
+        # Lognormal with mean `latency`
+        return rng.lognormvariate(math.log(self.latency) - self.latency_sigma ** 2 / 2, self.latency_sigma)
+
+    def _rng(self, prompt: str) -> random.Random:
+        """Random source of one answer: the same prompt gets a new answer every time it is sent."""
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        with self._lock:
+            occurrence = self._occurrences.get(digest, 0)
+            self._occurrences[digest] = occurrence + 1
+        return random.Random(f"{self.seed}:{digest}:{occurrence}")
+
+    # --- Rules ---
+
+    def _rule_response(self, prompt: str, rng: random.Random, malformed: bool) -> str:
+        limits = {action: int(count) for count, action in ACTION_LIMIT_PATTERN.findall(prompt)}
+        allowed = [action for action, count in limits.items() if count > 0]
+        given = _tagged(prompt, "given_python_function")
+        rule = self._mutate_rule(given, allowed, rng) if given else None
+        if rule is None:
+            rule = self._canned_rule(allowed, rng)
+        if malformed:
+            return self._malformed_rule(rule, allowed, rng)
+        return f"<code>\n{rule}\n</code>"
+
+    @staticmethod
+    def _canned_rule(allowed: List[str], rng: random.Random) -> str:
+        if not allowed:
+            return "def move(input):\n    return []"
+        near = rng.randint(1, 5)
+        first, second = rng.choice(allowed), rng.choice(allowed)
+        templates = [
+            ("def move(input):\n"
+             "    food = [distance for distance, kind in input if kind == 4]\n"
+             f"    if food and min(food) <= {near}:\n"
+             f"        return [\"{first}\"]\n"
+             f"    return [\"{second}\"]"),
+            ("import random\n\n"
+             "def move(input):\n"
+             f"    return [random.choice({allowed!r})]"),
+            ("def move(input):\n"
+             f"    if any(kind in (2, 3) and distance <= {near} for distance, kind in input):\n"
+             f"        return [\"{first}\"]\n"
+             f"    return [\"{second}\"]"),
+        ]
+        return rng.choice(templates).replace("'", '"')
+
+    @staticmethod
+    def _mutate_rule(rule: str, allowed: List[str], rng: random.Random) -> Optional[str]:
+        """Change one threshold or one action string of a given rule."""
+        numbers = list(re.finditer(r"(?<=[<>=] )\d+", rule))
+        actions = list(re.finditer(r"\"(up|down|left|right|cw|ccw)\"", rule))
+        if actions and allowed and (not numbers or rng.random() < 0.5):
+            match = rng.choice(actions)
+            return f"{rule[:match.start()]}\"{rng.choice(allowed)}\"{rule[match.end():]}"
+        if numbers:
+            match = rng.choice(numbers)
+            value = max(0, int(match.group()) + rng.choice([-2, -1, 1, 2]))
+            return f"{rule[:match.start()]}{value}{rule[match.end():]}"
+        return None
+
+    @staticmethod
+    def _malformed_rule(rule: str, allowed: List[str], rng: random.Random) -> str:
+        kind = rng.choice(["untagged", "syntax", "import", "budget"])
+        if kind == "untagged":
+            return f"Here is the updated function:\n\n{rule}"
+        if kind == "syntax":
+            return f"<code>\n{rule.replace(':', '', 1)}\n</code>"
+        if kind == "import":
+            return f"<code>\nimport os\n\n{rule}\n</code>"
+        flood = ", ".join(f"\"{action}\"" for action in (allowed or ["up"]) * 3)
+        return f"<code>\ndef move(input):\n    return [{flood}]\n</code>"
+
+    # --- Bodies ---
+
+    def _body_response(self, prompt: str, rng: random.Random, malformed: bool) -> str:
+        max_parts = _tagged(prompt, "max_num_parts")
+        max_parts = int(max_parts) if max_parts and max_parts.isdigit() else 8
+        given = _tagged(prompt, "given_robot_configuration")
+        configuration = None
+        if given:
+            try:
+                configuration = self._mutate_body([list(part) for part in ast.literal_eval(given)],
+                                                  max_parts, rng)
+            except (ValueError, SyntaxError, TypeError):
+                configuration = None
+        if configuration is None:
+            configuration = self._random_body(rng.randint(min(3, max_parts), max_parts), rng)
+        if malformed:
+            return self._malformed_body(configuration, rng)
+        return f"<robot_configuration>\n{configuration}\n</robot_configuration>"
+
+    @staticmethod
+    def _free_neighbours(configuration: List[List[int]]) -> List[Tuple[int, int]]:
+        occupied = {(part[0], part[1]) for part in configuration}
+        return sorted({(x + dx, y + dy) for x, y in occupied
+                       for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]} - occupied)
+
+    @classmethod
+    def _random_part(cls, configuration: List[List[int]], rng: random.Random) -> List[int]:
+        x, y = rng.choice(cls._free_neighbours(configuration))
+        part_type = rng.choice(list(PART_DIRECTIONS))
+        return [x, y, part_type, rng.choice(PART_DIRECTIONS[part_type])]
+
+    @classmethod
+    def _random_body(cls, parts: int, rng: random.Random) -> List[List[int]]:
+        configuration = [[0, 0, 1, 0]]
+        while len(configuration) < parts:
+            configuration.append(cls._random_part(configuration, rng))
+        return configuration
+
+    @staticmethod
+    def _connected(configuration: List[List[int]]) -> bool:
+        positions = {(part[0], part[1]) for part in configuration}
+        seen, queue = set(), [(configuration[0][0], configuration[0][1])]
+        while queue:
+            x, y = queue.pop()
+            if (x, y) in seen or (x, y) not in positions:
+                continue
+            seen.add((x, y))
+            queue.extend([(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)])
+        return seen == positions
+
+    @classmethod
+    def _mutate_body(cls, configuration: List[List[int]], max_parts: int,
+                     rng: random.Random) -> Optional[List[List[int]]]:
+        """Add a part, remove a part or change a part's type or direction."""
+        operations = ["change"] if len(configuration) > 1 else []
+        if len(configuration) < max_parts:
+            operations.append("add")
+        removable = [index for index in range(1, len(configuration))
+                     if cls._connected(configuration[:index] + configuration[index + 1:])]
+        if removable:
+            operations.append("remove")
+        if not operations:
+            return None
+
+        operation = rng.choice(operations)
+        if operation == "add":
+            return configuration + [cls._random_part(configuration, rng)]
+        if operation == "remove":
+            index = rng.choice(removable)
+            return configuration[:index] + configuration[index + 1:]
+        index = rng.randrange(1, len(configuration))
+        x, y, current_type, current_direction = configuration[index]
+        replacements = [[x, y, part_type, direction] for part_type, directions in PART_DIRECTIONS.items()
+                        for direction in directions if (part_type, direction) != (current_type, current_direction)]
+        configuration[index] = rng.choice(replacements)
+        return configuration
+
+    @staticmethod
+    def _malformed_body(configuration: List[List[int]], rng: random.Random) -> str:
+        kind = rng.choice(["untagged", "disconnected", "bad_type", "syntax"])
+        if kind == "untagged":
+            return f"The final configuration is {configuration}."
+        if kind == "disconnected":
+            configuration = configuration + [[len(configuration) + 2, 0, 2, 0]]
+        elif kind == "bad_type":
+            # Type 5 is the interaction part of the rule prompts, bodies use 6
+            configuration = configuration[:1] + [[*part[:2], 5, 0] for part in configuration[1:2]] + configuration[2:]
+            if len(configuration) == 1:
+                configuration.append([0, 1, 5, 0])
+        else:
+            return f"<robot_configuration>\n{str(configuration)[:-1]}\n</robot_configuration>"
+        return f"<robot_configuration>\n{configuration}\n</robot_configuration>"
@@ -0,0 +1,1762 @@
+"""
+Static verifier for LLM-generated `move(input)` rules.
+
+The Python counterpart of LEAR's NetLogoVerifier: a rule is parsed with `ast`
+and checked before it is ever executed. Only a whitelist of node types,
+builtins, modules and methods is accepted; imports of other modules, general
+attribute access, `while` loops, loops over iterables without a static bound,
+recursion and action strings outside the body's vocabulary are rejected.
+Every `range()` and every string or list repetition must have a static size,
+nested loops (including the loops of called functions) and the repetitions
+inside them must stay within a total number of iterations, and a loop must
+not double or square a value it carries over, so a rule cannot run or
+allocate without bound.
+
+`analyze_action_budget` bounds, over every execution path, how often `move`
+can return each action, so rules that always exceed a body's allowance are
+discarded and rules that never can skip the runtime `check_actions` count.
+Only action literals are checked statically; strings a rule builds otherwise
+are checked against ACTIONS by `check_actions` on every tick.
+"""
+
+import ast
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+# Action strings understood by check_actions
+ACTIONS = frozenset({"up", "down", "left", "right", "cw", "ccw"})
+
+ALLOWED_NODES = (
+    ast.Module, ast.FunctionDef, ast.arguments, ast.arg, ast.Return, ast.Assign, ast.AugAssign,
+    ast.AnnAssign, ast.If, ast.For, ast.Pass, ast.Break, ast.Continue, ast.Expr, ast.Import, ast.alias,
+    ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.IfExp, ast.Call, ast.keyword, ast.Constant,
+    ast.Name, ast.Attribute, ast.List, ast.Tuple, ast.Dict, ast.Set, ast.Subscript, ast.Slice, ast.Starred,
+    ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp, ast.comprehension,
+    ast.JoinedStr, ast.FormattedValue,
+    ast.Load, ast.Store, ast.boolop, ast.operator, ast.unaryop, ast.cmpop,
+)
+
+ALLOWED_BUILTINS = frozenset({
+    "len", "range", "min", "max", "abs", "sum", "sorted", "reversed", "enumerate", "zip",
+    "list", "tuple", "dict", "set", "int", "float", "bool", "str", "round", "any", "all",
+    "True", "False", "None",
+})
+
+# Modules a rule may import, and the functions it may use from them
+ALLOWED_MODULES = {
+    "random": frozenset({"random", "randint", "choice", "choices", "shuffle", "sample", "uniform"}),
+    "math": frozenset({"sqrt", "floor", "ceil", "sin", "cos", "atan2", "hypot", "pi", "inf"}),
+}
+
+# Container methods a rule may call on its own values
+ALLOWED_METHODS = frozenset({
+    "append", "extend", "insert", "pop", "remove", "count", "index", "copy", "sort", "reverse",
+    "get", "items", "keys", "values",
+})
+
+# Methods that grow a container; a loop must not grow the sequence it iterates over
+GROWING_METHODS = frozenset({"append", "extend", "insert"})
+
+# Nodes whose string literals can end up in the returned action list
+ACTION_SOURCES = (ast.Return, ast.Call, ast.List, ast.Tuple, ast.Set)
+
+# Builtins whose result is no longer than their (bounded) arguments
+BOUNDED_WRAPPERS = frozenset({"enumerate", "zip", "reversed", "sorted", "list", "tuple", "set"})
+
+# Kinds of values the size checks tell apart: numbers, one sensor reading
+# (distance, object_type), the input (a list of readings) and anything else
+NUMBER_KIND, READING_KIND, INPUT_KIND, UNKNOWN_KIND = "number", "reading", "input", "unknown"
+NUMERIC_BUILTINS = frozenset({"len", "int", "float", "round", "abs", "sum", "bool", "any", "all"})
+NUMERIC_RANDOM = frozenset({"random", "randint", "uniform"})
+
+
+def _numeric_kind(*kinds: Optional[str]) -> Optional[str]:
+    """Kind of arithmetic over values of `kinds`: a number unless an operand may not be one."""
+    if any(kind not in (NUMBER_KIND, None) for kind in kinds):
+        return UNKNOWN_KIND
+    return None if None in kinds else NUMBER_KIND
+
+
+def _join_kinds(kinds) -> Optional[str]:
+    """Common kind of several values; None (no value yet) joins as the identity."""
+    kinds = set(kinds) - {None}
+    if not kinds:
+        return None
+    return kinds.pop() if len(kinds) == 1 else UNKNOWN_KIND
+
+
+@dataclass
+class RuleError:
+    """A verification error with its source position."""
+    message: str
+    line: Optional[int] = None
+    column: Optional[int] = None
+
+    def __str__(self) -> str:
+        location = f" at line {self.line}" if self.line is not None else ""
+        return f"ERROR{location}: {self.message}"
+
+
+@dataclass
+class RuleCheck:
+    """Result of verifying a move rule."""
+    is_valid: bool
+    errors: List[RuleError] = field(default_factory=list)
+    tree: Optional[ast.Module] = None
+
+
+class MoveRuleVerifier:
+    """
+    Verifies generated `move(input)` rules without running them.
+
+    Public Methods:
+    - validate(code: str) -> RuleCheck: All errors found in the rule
+    - is_safe(code: str) -> Tuple[bool, str]: (is_safe, message)
+    """
+
+    def __init__(self, max_loop_iterations: int = 10000, max_exponent: int = 16,
+                 max_total_iterations: int = 1000000, max_inputs: int = 64):
+        """
+        Args:
+            max_loop_iterations: Iterations of one loop, and elements of one range() or repetition
+            max_exponent: Largest constant exponent of `**`
+            max_total_iterations: Iterations of nested loops, including those of called functions
+            max_inputs: Sensor readings a rule can be passed (the length of `input`)
+        """
+        self.max_loop_iterations = max_loop_iterations
+        self.max_exponent = max_exponent
+        self.max_total_iterations = max_total_iterations
+        self.max_inputs = max_inputs
+
+    def validate(self, code: str) -> RuleCheck:
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            return RuleCheck(False, [RuleError(f"Syntax error: {e.msg}", e.lineno, e.offset)])
+        except ValueError as e:
+            return RuleCheck(False, [RuleError(f"Syntax error: {e}")])
+
+        checker = _RuleChecker(self)
+        checker.check_module(tree)
+        return RuleCheck(not checker.errors, checker.errors, tree)
+
+    def is_safe(self, code: str) -> Tuple[bool, str]:
+        result = self.validate(code)
+        if not result.is_valid:
+            return False, "\n".join(str(error) for error in result.errors)
+        return True, "Rule appears safe"
+
+
+class _RuleChecker:
+    """One verification pass over a parsed rule."""
+
+    def __init__(self, verifier: MoveRuleVerifier):
+        self.verifier = verifier
+        self.errors: List[RuleError] = []
+        self.modules: Set[str] = set()
+        self.functions: Dict[str, ast.FunctionDef] = {}
+        self.defined: Set[str] = set()
+        self.kinds: Dict[str, str] = {}
+        self.work: Dict[str, float] = {}
+        self.too_long: Set[int] = set()
+        self.growing: Set[int] = set()
+
+    def error(self, node: ast.AST, message: str) -> None:
+        self.errors.append(RuleError(message, getattr(node, "lineno", None), getattr(node, "col_offset", None)))
+
+    def check_module(self, tree: ast.Module) -> None:
+        nodes = list(ast.walk(tree))
+        for node in nodes:
+            if not isinstance(node, ALLOWED_NODES):
+                self.error(node, f"'{type(node).__name__}' is not allowed in a move rule")
+            elif isinstance(node, ast.FunctionDef):
+                self.functions[node.name] = node
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.name not in ALLOWED_MODULES or alias.asname not in (None, alias.name):
+                        self.error(node, f"Import of '{alias.name}' is not allowed")
+                    else:
+                        self.modules.add(alias.name)
+            elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                self.defined.add(node.id)
+            elif isinstance(node, ast.arg):
+                self.defined.add(node.arg)
+        if self.errors:
+            return
+
+        move = self.functions.get("move")
+        if move is None:
+            self.error(tree, "No 'move' function defined")
+        else:
+            args = move.args
+            if (len(args.args) != 1 or args.vararg or args.kwarg or args.kwonlyargs
+                    or args.posonlyargs or args.defaults):
+                self.error(move, "'move' must take exactly one argument (input)")
+        for node in tree.body:
+            docstring = isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+            if not (docstring or isinstance(node, (ast.FunctionDef, ast.Import, ast.Assign))):
+                self.error(node, f"Top-level '{type(node).__name__}' is not allowed; put logic inside move()")
+            elif isinstance(node, ast.Assign) and any(
+                    isinstance(call, ast.Call) and isinstance(call.func, ast.Name) and call.func.id in self.functions
+                    for call in ast.walk(node.value)):
+                self.error(node, "Top-level code must not call the rule's functions; call them from move()")
+
+        self.infer_kinds(nodes)
+        callees = {id(node.func) for node in nodes if isinstance(node, ast.Call)}
+        loop_iterables = {id(node.iter) for node in nodes if isinstance(node, (ast.For, ast.comprehension))}
+        for node in nodes:
+            if isinstance(node, ast.FunctionDef) and node.decorator_list:
+                self.error(node, "Decorators are not allowed")
+            elif isinstance(node, ast.Name):
+                self.check_name(node)
+                if node.id in self.functions and (isinstance(node.ctx, ast.Store) or id(node) not in callees):
+                    # An alias could hide recursion from the call graph
+                    self.error(node, f"Function '{node.id}' may only be called by its name")
+            elif isinstance(node, ast.Attribute):
+                self.check_attribute(node)
+            elif isinstance(node, ast.For):
+                self.check_bounded(node, node.iter, node.body)
+                self.check_growth(node)
+            elif isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+                for generator in node.generators:
+                    self.check_bounded(node, generator.iter, [node])
+            elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+                exponent = node.right
+                if not (isinstance(exponent, ast.Constant) and isinstance(exponent.value, (int, float))
+                        and abs(exponent.value) <= self.verifier.max_exponent):
+                    self.error(node, f"Exponents must be constants up to {self.verifier.max_exponent}")
+            elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult):
+                self.check_repetition(node, node.left, node.right)
+            elif isinstance(node, ast.AugAssign) and isinstance(node.op, ast.Mult):
+                self.check_repetition(node, node.target, node.value)
+            elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range"
+                    and id(node) not in loop_iterables and not self.range_bounded(node)):
+                self.error(node, f"range() needs static bounds up to {self.verifier.max_loop_iterations} elements")
+            if isinstance(node, ACTION_SOURCES):
+                self.check_actions(node)
+        if any(isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in self.functions
+               for node in nodes):
+            self.check_recursion()
+        if not self.errors:
+            # Only without recursion: the work of a function includes the work of its callees
+            for function in self.functions.values():
+                self.function_work(function)
+            for node in tree.body:
+                if not isinstance(node, ast.FunctionDef):
+                    self.nested_work(node, 1)
+
+    def check_name(self, node: ast.Name) -> None:
+        name = node.id
+        if name.startswith("__"):
+            self.error(node, f"Name '{name}' is not allowed")
+        elif isinstance(node.ctx, ast.Load) and not (
+                name in self.defined or name in self.functions or name in self.modules
+                or name in ALLOWED_BUILTINS):
+            self.error(node, f"Unknown or disallowed name '{name}'")
+
+    def check_attribute(self, node: ast.Attribute) -> None:
+        value = node.value
+        if node.attr.startswith("_"):
+            self.error(node, f"Attribute '{node.attr}' is not allowed")
+        elif isinstance(value, ast.Name) and value.id in self.modules and value.id not in self.defined:
+            if node.attr not in ALLOWED_MODULES[value.id]:
+                self.error(node, f"'{value.id}.{node.attr}' is not allowed")
+        elif node.attr not in ALLOWED_METHODS or isinstance(node.ctx, ast.Store):
+            self.error(node, f"Attribute access '.{node.attr}' is not allowed")
+
+    def check_bounded(self, node: ast.AST, iterable: ast.expr, body: List[ast.AST]) -> None:
+        """A loop must iterate over something of static size that the loop itself does not grow."""
+        if not self.is_bounded(iterable):
+            self.error(node, "Loops must iterate over range() with static bounds, the input or a literal")
+            return
+        grown = {name.id for name in ast.walk(iterable) if isinstance(name, ast.Name)}
+        for part in body:
+            for inner in ast.walk(part):
+                if (isinstance(inner, ast.Call) and isinstance(inner.func, ast.Attribute)
+                        and inner.func.attr in GROWING_METHODS and isinstance(inner.func.value, ast.Name)
+                        and inner.func.value.id in grown):
+                    self.error(inner, f"Loop grows '{inner.func.value.id}' while iterating over it")
+                elif (isinstance(inner, ast.AugAssign) and isinstance(inner.target, ast.Name)
+                        and inner.target.id in grown):
+                    self.error(inner, f"Loop grows '{inner.target.id}' while iterating over it")
+
+    def check_growth(self, loop: ast.For) -> None:
+        """
+        A value the loop computes from its own previous value may grow by a bounded
+        amount per iteration, but must not double (`s = s + s`, `a.extend(a)`) or
+        square (`x = x * x`, `x = x ** 2`): a few dozen iterations exhaust memory.
+        """
+        updates: List[Tuple[str, ast.AST, ast.expr]] = []
+        for statement in loop.body:
+            for node in ast.walk(statement):
+                if isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None:
+                    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                    for target in targets:
+                        updates.extend((name, node, value) for name, value in _assignments(target, node.value))
+                elif isinstance(node, ast.AugAssign):
+                    for name, _ in _assignments(node.target, node.value):
+                        updates.append((name, node, ast.BinOp(node.target, node.op, node.value)))
+                elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                        and node.func.attr == "extend" and isinstance(node.func.value, ast.Name) and node.args):
+                    updates.append((node.func.value.id, node, ast.BinOp(node.func.value, ast.Add(), node.args[0])))
+        depends: Dict[str, Set[str]] = {name: set() for name, _, _ in updates}
+        for name, _, value in updates:
+            depends[name] |= {inner.id for inner in ast.walk(value)
+                              if isinstance(inner, ast.Name) and inner.id in depends}
+
+        def carried_over(name: str) -> bool:
+            seen: Set[str] = set()
+            pending = list(depends[name])
+            while pending:
+                current = pending.pop()
+                if current not in seen:
+                    seen.add(current)
+                    pending.extend(depends[current])
+            return name in seen
+
+        carried = {name for name in depends if carried_over(name)}
+        for name, node, value in updates:
+            if name not in carried or id(node) in self.growing:
+                continue
+            kind = self.kinds.get(name)
+            if kind != NUMBER_KIND and self.size_terms(value, carried) >= 2:
+                self.growing.add(id(node))
+                self.error(node, f"'{name}' can double in size on every iteration of this loop")
+            elif kind in (NUMBER_KIND, UNKNOWN_KIND, None) and self.growth_degree(value, carried) >= 2:
+                self.growing.add(id(node))
+                self.error(node, f"'{name}' is multiplied by itself on every iteration of this loop")
+
+    def size_terms(self, node: ast.expr, carried: Set[str]) -> int:
+        """How many loop-carried sequences `node` can concatenate."""
+        if isinstance(node, ast.Name):
+            return int(node.id in carried and self.kinds.get(node.id) != NUMBER_KIND)
+        if isinstance(node, (ast.Constant, ast.Compare)):
+            return 0
+        if isinstance(node, ast.Subscript):
+            return self.size_terms(node.value, carried)
+        if isinstance(node, ast.IfExp):
+            return max(self.size_terms(node.body, carried), self.size_terms(node.orelse, carried))
+        if isinstance(node, ast.BoolOp):
+            return max(self.size_terms(value, carried) for value in node.values)
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            iterated = sum(self.size_terms(generator.iter, carried) for generator in node.generators)
+            if iterated and len(node.generators) > 1:
+                return 2
+            elements = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+            return iterated + sum(self.size_terms(element, carried) for element in elements)
+        if isinstance(node, ast.Call):
+            func = node.func
+            terms = [self.size_terms(arg, carried) for arg in node.args + [k.value for k in node.keywords]]
+            if isinstance(func, ast.Name):
+                if func.id in NUMERIC_BUILTINS:
+                    return 0
+                if func.id in ("min", "max"):
+                    return max(terms, default=0)
+                if func.id in self.functions and sum(terms) and self.combines(func.id):
+                    return 2
+            elif isinstance(func, ast.Attribute):
+                if isinstance(func.value, ast.Name) and func.value.id == "math":
+                    return 0
+                terms.append(self.size_terms(func.value, carried))
+            return sum(terms)
+        return sum(self.size_terms(child, carried) for child in ast.iter_child_nodes(node)
+                   if isinstance(child, ast.expr))
+
+    def growth_degree(self, node: ast.expr, carried: Set[str]) -> float:
+        """Degree of `node` as a polynomial in the loop-carried values."""
+        if isinstance(node, ast.Name):
+            return int(node.id in carried)
+        if isinstance(node, (ast.Constant, ast.Compare)):
+            return 0
+        if isinstance(node, ast.Subscript):
+            return self.growth_degree(node.value, carried)
+        if isinstance(node, ast.BinOp):
+            left, right = self.growth_degree(node.left, carried), self.growth_degree(node.right, carried)
+            if isinstance(node.op, ast.Mult):
+                return left + right
+            if isinstance(node.op, ast.Pow):
+                exponent = node.right
+                if isinstance(exponent, ast.Constant) and isinstance(exponent.value, (int, float)):
+                    return left * max(1, exponent.value)
+                return 2 if left or right else 0
+            if isinstance(node.op, ast.LShift):
+                return 2 if right else left
+            return max(left, right)
+        if isinstance(node, ast.Call):
+            func = node.func
+            degrees = [self.growth_degree(arg, carried) for arg in node.args + [k.value for k in node.keywords]]
+            if isinstance(func, ast.Name):
+                if func.id in ("len", "bool", "any", "all"):
+                    return 0
+                if func.id in self.functions and max(degrees, default=0) and self.combines(func.id):
+                    return 2
+            elif isinstance(func, ast.Attribute):
+                degrees.append(self.growth_degree(func.value, carried))
+            return max(degrees, default=0)
+        return max((self.growth_degree(child, carried) for child in ast.iter_child_nodes(node)
+                    if isinstance(child, ast.expr)), default=0)
+
+    def combines(self, name: str) -> bool:
+        """Whether the rule's function `name` can compute a larger value from its arguments."""
+        return any(isinstance(node, (ast.BinOp, ast.AugAssign, ast.JoinedStr, ast.Call, ast.ListComp,
+                                     ast.SetComp, ast.DictComp, ast.GeneratorExp))
+                   for node in ast.walk(self.functions[name]))
+
+    def is_bounded(self, node: ast.expr) -> bool:
+        if isinstance(node, (ast.Name, ast.Subscript, ast.Constant)):
+            # Every range() and repetition a value can be built from has a static size,
+            # and the loop body is checked for growth
+            return True
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set, ast.Dict, ast.ListComp, ast.GeneratorExp, ast.SetComp)):
+            return True
+        if isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name) and func.id == "range":
+                return self.range_bounded(node)
+            if isinstance(func, ast.Name) and func.id in BOUNDED_WRAPPERS:
+                return all(self.is_bounded(arg) for arg in node.args)
+            if isinstance(func, ast.Attribute) and func.attr in ("items", "keys", "values"):
+                return True
+        return False
+
+    def range_bounded(self, node: ast.Call) -> bool:
+        if node.keywords or not node.args or not all(self.is_static(arg) for arg in node.args):
+            return False
+        return self.range_length(node) <= self.verifier.max_loop_iterations
+
+    def range_length(self, node: ast.Call) -> float:
+        """Upper bound on the length of a range() with static arguments."""
+        constants = [arg.value for arg in node.args if isinstance(arg, ast.Constant)]
+        if len(constants) == len(node.args) and all(isinstance(c, int) for c in constants):
+            try:
+                return len(range(*constants))
+            except (TypeError, ValueError):
+                return 0
+        # range(a) has at most |a| elements, range(a, b[, step]) at most |a| + |b|
+        return sum(self.static_bound(arg) for arg in node.args[:2])
+
+    def is_static(self, node: ast.expr) -> bool:
+        """Constants, len() of a value, and arithmetic/min/max over those."""
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, int) and abs(node.value) <= self.verifier.max_loop_iterations
+        if isinstance(node, ast.UnaryOp):
+            return self.is_static(node.operand)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub, ast.FloorDiv, ast.Mod)):
+            return self.is_static(node.left) and self.is_static(node.right)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id == "len":
+                return True
+            if node.func.id in ("min", "max", "abs"):
+                return all(self.is_static(arg) for arg in node.args)
+        return False
+
+    def static_bound(self, node: ast.expr) -> float:
+        """Upper bound on the magnitude of a static expression (see is_static)."""
+        if isinstance(node, ast.Constant):
+            return abs(node.value)
+        if isinstance(node, ast.UnaryOp):
+            return self.static_bound(node.operand)
+        if isinstance(node, ast.BinOp):
+            left, right = self.static_bound(node.left), self.static_bound(node.right)
+            if isinstance(node.op, ast.FloorDiv):
+                return left
+            if isinstance(node.op, ast.Mod):
+                return min(left, right)
+            return left + right
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id == "len":
+                return self.iteration_bound(node.args[0]) if node.args else 0
+            bounds = [self.static_bound(arg) for arg in node.args]
+            if node.func.id == "min":
+                return min(bounds, default=0)
+            return max(bounds, default=0)
+        return INF
+
+    def iteration_bound(self, node: ast.expr) -> float:
+        """
+        Upper bound on the elements of an iterable. Values the rule holds in names,
+        subscripts or method results count as one loop's worth of elements.
+        """
+        maximum = self.verifier.max_loop_iterations
+        if isinstance(node, ast.Constant):
+            return len(node.value) if isinstance(node.value, str) else maximum
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            return maximum if any(isinstance(e, ast.Starred) for e in node.elts) else len(node.elts)
+        if isinstance(node, ast.Dict):
+            return maximum if None in node.keys else len(node.keys)
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            count = 1
+            for generator in node.generators:
+                count *= self.iteration_bound(generator.iter)
+            return count
+        kind = self.kind(node)
+        if kind == INPUT_KIND:
+            return self.verifier.max_inputs
+        if kind == READING_KIND:
+            return 2
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id == "range":
+                return self.range_length(node) if self.range_bounded(node) else INF
+            if node.func.id in BOUNDED_WRAPPERS and node.args:
+                bounds = [self.iteration_bound(arg) for arg in node.args]
+                return min(bounds) if node.func.id == "zip" else bounds[0]
+        return maximum
+
+    def sequence_length(self, node: ast.expr) -> float:
+        """Upper bound on the length of a string or list that is repeated, INF when unknown."""
+        if isinstance(node, ast.Constant):
+            return len(node.value) if isinstance(node.value, (str, bytes)) else INF
+        if isinstance(node, (ast.List, ast.Tuple)) and not any(isinstance(e, ast.Starred) for e in node.elts):
+            return len(node.elts)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult):
+            for sequence, count in ((node.left, node.right), (node.right, node.left)):
+                if self.kind(count) == NUMBER_KIND and self.is_static(count):
+                    return self.sequence_length(sequence) * self.static_bound(count)
+            return INF
+        kind = self.kind(node)
+        if kind == INPUT_KIND:
+            return self.verifier.max_inputs
+        if kind == READING_KIND:
+            return 2
+        return INF
+
+    def check_repetition(self, node: ast.AST, left: ast.expr, right: ast.expr) -> None:
+        """`*` multiplies numbers, or repeats a string or list of known length a static number of times."""
+        if self.kind(left) == NUMBER_KIND and self.kind(right) == NUMBER_KIND:
+            return
+        limit = self.verifier.max_loop_iterations
+        for sequence, count in ((left, right), (right, left)):
+            if self.kind(count) == NUMBER_KIND and self.is_static(count):
+                if _mul(self.sequence_length(sequence), self.static_bound(count)) <= limit:
+                    return
+        self.error(node, f"'*' must multiply numbers, or repeat a string or list literal a static number "
+                         f"of times up to {limit} elements")
+
+    def repetition_size(self, left: ast.expr, right: ast.expr) -> float:
+        """Elements a `*` builds: none for numbers, INF for a repetition check_repetition rejects."""
+        if self.kind(left) == NUMBER_KIND and self.kind(right) == NUMBER_KIND:
+            return 0
+        return min((_mul(self.sequence_length(sequence), self.static_bound(count))
+                    for sequence, count in ((left, right), (right, left))
+                    if self.kind(count) == NUMBER_KIND and self.is_static(count)), default=INF)
+
+    def kind(self, node: ast.expr) -> Optional[str]:
+        """Kind of value an expression evaluates to (see infer_kinds), None if it is never bound."""
+        if isinstance(node, ast.Constant):
+            return NUMBER_KIND if isinstance(node.value, (int, float)) else UNKNOWN_KIND
+        if isinstance(node, ast.Name):
+            if node.id in ("True", "False"):
+                return NUMBER_KIND
+            return self.kinds.get(node.id)
+        if isinstance(node, ast.BinOp):
+            return _numeric_kind(self.kind(node.left), self.kind(node.right))
+        if isinstance(node, ast.UnaryOp):
+            return NUMBER_KIND if isinstance(node.op, ast.Not) else _numeric_kind(self.kind(node.operand))
+        if isinstance(node, ast.Compare):
+            return NUMBER_KIND
+        if isinstance(node, ast.BoolOp):
+            return _join_kinds(self.kind(value) for value in node.values)
+        if isinstance(node, ast.IfExp):
+            return _join_kinds((self.kind(node.body), self.kind(node.orelse)))
+        if isinstance(node, ast.Subscript) and not isinstance(node.slice, ast.Slice):
+            return self.element_kind(self.kind(node.value))
+        if isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name):
+                if func.id in self.functions:
+                    return self.kinds.get(f"{func.id}()")
+                if func.id in NUMERIC_BUILTINS:
+                    return NUMBER_KIND
+                if func.id in ("min", "max"):
+                    if len(node.args) == 1 and isinstance(node.args[0], (ast.ListComp, ast.GeneratorExp, ast.SetComp)):
+                        return self.kind(node.args[0].elt)
+                    if len(node.args) == 1:
+                        return self.element_kind(self.kind(node.args[0]))
+                    return _join_kinds(self.kind(arg) for arg in node.args)
+            elif isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+                if func.value.id == "math":
+                    return NUMBER_KIND
+                if func.value.id == "random" and func.attr in NUMERIC_RANDOM:
+                    return NUMBER_KIND
+                if func.value.id == "random" and func.attr == "choice" and node.args:
+                    return self.element_kind(self.kind(node.args[0]))
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "math":
+            return NUMBER_KIND
+        return UNKNOWN_KIND
+
+    @staticmethod
+    def element_kind(kind: Optional[str]) -> Optional[str]:
+        return {INPUT_KIND: READING_KIND, READING_KIND: NUMBER_KIND, None: None}.get(kind, UNKNOWN_KIND)
+
+    def iterated_kind(self, node: ast.expr) -> Optional[str]:
+        """Kind of the elements a loop over `node` binds."""
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range":
+            return NUMBER_KIND
+        return self.element_kind(self.kind(node))
+
+    def infer_kinds(self, nodes: List[ast.AST]) -> None:
+        """
+        Kind of every name, joined over all its bindings in the rule (regardless of
+        scope or order), and of every function's return value (under "name()").
+        `input` of move is the list of readings; other parameters take the kinds of
+        the arguments passed to them. Kinds only grow from None (never bound), so
+        the iteration reaches the least solution; without one every name is None.
+        """
+        for _ in range(4 * len(nodes) + 1):
+            bindings: Dict[str, List[Optional[str]]] = {}
+
+            def bind(target: ast.expr, kind: Optional[str]) -> None:
+                if isinstance(target, ast.Name):
+                    bindings.setdefault(target.id, []).append(kind)
+                elif isinstance(target, (ast.Tuple, ast.List)):
+                    element = {READING_KIND: NUMBER_KIND, None: None}.get(kind, UNKNOWN_KIND)
+                    for inner in target.elts:
+                        bind(inner.value if isinstance(inner, ast.Starred) else inner,
+                             UNKNOWN_KIND if isinstance(inner, ast.Starred) else element)
+
+            for node in nodes:
+                if isinstance(node, ast.Assign):
+                    for target in node.targets:
+                        bind(target, self.kind(node.value))
+                elif isinstance(node, ast.AnnAssign) and node.value is not None:
+                    bind(node.target, self.kind(node.value))
+                elif isinstance(node, ast.AugAssign):
+                    bind(node.target, self.kind(ast.BinOp(node.target, node.op, node.value)))
+                elif isinstance(node, (ast.For, ast.comprehension)):
+                    if (isinstance(node.iter, ast.Call) and isinstance(node.iter.func, ast.Name)
+                            and node.iter.func.id == "enumerate" and isinstance(node.target, ast.Tuple)
+                            and len(node.target.elts) == 2 and node.iter.args):
+                        bind(node.target.elts[0], NUMBER_KIND)
+                        bind(node.target.elts[1], self.iterated_kind(node.iter.args[0]))
+                    else:
+                        bind(node.target, self.iterated_kind(node.iter))
+                elif isinstance(node, ast.FunctionDef):
+                    params = node.args.posonlyargs + node.args.args + node.args.kwonlyargs
+                    for param in params:
+                        bindings.setdefault(param.arg, [])
+                    if node.args.vararg or node.args.kwarg:
+                        for param in (node.args.vararg, node.args.kwarg):
+                            if param is not None:
+                                bindings.setdefault(param.arg, []).append(UNKNOWN_KIND)
+                    positional = node.args.posonlyargs + node.args.args
+                    for param, default in zip(positional[len(positional) - len(node.args.defaults):],
+                                              node.args.defaults):
+                        bindings[param.arg].append(self.kind(default))
+                    for param, default in zip(node.args.kwonlyargs, node.args.kw_defaults):
+                        if default is not None:
+                            bindings[param.arg].append(self.kind(default))
+                    if node.name == "move" and node.args.args:
+                        bindings[node.args.args[0].arg].append(INPUT_KIND)
+                    returns = bindings.setdefault(f"{node.name}()", [])
+                    for inner in ast.walk(node):
+                        if isinstance(inner, ast.Return):
+                            returns.append(UNKNOWN_KIND if inner.value is None else self.kind(inner.value))
+                elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                        and node.func.id in self.functions):
+                    function = self.functions[node.func.id].args
+                    positional = function.posonlyargs + function.args
+                    for arg, param in zip(node.args, positional):
+                        bindings.setdefault(param.arg, []).append(
+                            UNKNOWN_KIND if isinstance(arg, ast.Starred) else self.kind(arg))
+                    if any(isinstance(arg, ast.Starred) for arg in node.args) or len(node.args) > len(positional):
+                        for param in positional:
+                            bindings.setdefault(param.arg, []).append(UNKNOWN_KIND)
+                    for keyword in node.keywords:
+                        names = [keyword.arg] if keyword.arg else [p.arg for p in positional + function.kwonlyargs]
+                        for name in names:
+                            bindings.setdefault(name, []).append(self.kind(keyword.value))
+            kinds = {name: kind for name, kind in ((name, _join_kinds(found)) for name, found in bindings.items())
+                     if kind is not None}
+            if kinds == self.kinds:
+                return
+            self.kinds = kinds
+        self.kinds = {}
+
+    def function_work(self, function: ast.FunctionDef) -> float:
+        """Most loop iterations one call of `function` can run, including its callees."""
+        if function.name not in self.work:
+            self.work[function.name] = 0
+            self.work[function.name] = max([self.nested_work(statement, 1) for statement in function.body],
+                                           default=0)
+        return self.work[function.name]
+
+    def nested_work(self, node: ast.AST, factor: float) -> float:
+        """
+        Most loop iterations of `node` run `factor` times; reports loops, ranges and
+        calls that exceed max_total_iterations.
+        """
+        if isinstance(node, ast.FunctionDef):
+            return 0
+        worst = 0
+        if isinstance(node, ast.For):
+            worst = self.iterable_work(node.iter, factor)
+            inner = _mul(factor, self.iteration_bound(node.iter))
+            self.check_work(node, inner)
+            worst = max(worst, inner)
+            for statement in node.body:
+                worst = max(worst, self.nested_work(statement, inner))
+            for statement in node.orelse:
+                worst = max(worst, self.nested_work(statement, factor))
+            return worst
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            inner = factor
+            for generator in node.generators:
+                worst = max(worst, self.iterable_work(generator.iter, inner))
+                inner = _mul(inner, self.iteration_bound(generator.iter))
+                self.check_work(node, inner)
+                worst = max(worst, inner)
+                for condition in generator.ifs:
+                    worst = max(worst, self.nested_work(condition, inner))
+            elements = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+            for element in elements:
+                worst = max(worst, self.nested_work(element, inner))
+            return worst
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id in self.functions:
+                worst = _mul(factor, self.function_work(self.functions[node.func.id]))
+                self.check_work(node, worst, f"Calling '{node.func.id}' here can run")
+            elif node.func.id == "range" and self.range_bounded(node):
+                # Whatever consumes the range (sum(), list(), ...) runs once per element
+                worst = _mul(factor, self.range_length(node))
+                self.check_work(node, worst)
+        elif isinstance(node, (ast.BinOp, ast.AugAssign)) and isinstance(node.op, ast.Mult):
+            # Every element of a repetition is allocated, so it counts like an iteration
+            left = node.left if isinstance(node, ast.BinOp) else node.target
+            worst = _mul(factor, self.repetition_size(left, node.right if isinstance(node, ast.BinOp) else node.value))
+            self.check_work(node, worst, "This repetition can build", "elements")
+        for child in ast.iter_child_nodes(node):
+            worst = max(worst, self.nested_work(child, factor))
+        return worst
+
+    def iterable_work(self, node: ast.expr, factor: float) -> float:
+        """Work of a loop's iterable; the elements of a range() are counted by the loop."""
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range":
+            return max([self.nested_work(arg, factor) for arg in node.args], default=0)
+        return self.nested_work(node, factor)
+
+    def check_work(self, node: ast.AST, work: float, what: str = "This loop can run",
+                   unit: str = "iterations") -> None:
+        limit = self.verifier.max_total_iterations
+        if work > limit and id(node) not in self.too_long:
+            self.too_long.add(id(node))
+            count = "an unbounded number of" if work == INF else f"up to {work:.0f}"
+            self.error(node, f"{what} {count} {unit} with the loops around it ({limit} allowed)")
+
+    def check_actions(self, node: ast.AST) -> None:
+        """String literals that can end up in the action list must be known actions."""
+        candidates: List[ast.expr] = []
+        if isinstance(node, ast.Return) and node.value is not None:
+            candidates.append(node.value)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in GROWING_METHODS:
+            candidates.extend(node.args[-1:])
+        elif isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            candidates.extend(node.elts)
+        for candidate in candidates:
+            if (isinstance(candidate, ast.Constant) and isinstance(candidate.value, str)
+                    and candidate.value not in ACTIONS):
+                self.error(candidate, f"Unknown action '{candidate.value}' (expected one of {', '.join(sorted(ACTIONS))})")
+
+    def check_recursion(self) -> None:
+        """Reject any cycle in the call graph of the rule's own functions."""
+        calls = {
+            name: {call.func.id for call in ast.walk(function)
+                   if isinstance(call, ast.Call) and isinstance(call.func, ast.Name) and call.func.id in self.functions}
+            for name, function in self.functions.items()
+        }
+        visiting: Set[str] = set()
+        done: Set[str] = set()
+
+        def visit(name: str) -> bool:
+            if name in visiting:
+                return True
+            if name in done:
+                return False
+            visiting.add(name)
+            cyclic = any(visit(callee) for callee in calls[name])
+            visiting.discard(name)
+            done.add(name)
+            return cyclic
+
+        for name in self.functions:
+            if name not in done and visit(name):
+                self.error(self.functions[name], f"Recursion through '{name}' is not allowed")
+
+
+def _assignments(target: ast.expr, value: ast.expr) -> List[Tuple[str, ast.expr]]:
+    """(name, value) for each name an assignment updates; an item assignment updates its container."""
+    if isinstance(target, ast.Name):
+        return [(target.id, value)]
+    if isinstance(target, ast.Subscript):
+        return _assignments(target.value, value)
+    if isinstance(target, ast.Starred):
+        return _assignments(target.value, value)
+    if isinstance(target, (ast.Tuple, ast.List)):
+        paired = (isinstance(value, (ast.Tuple, ast.List)) and len(value.elts) == len(target.elts)
+                  and not any(isinstance(e, ast.Starred) for e in target.elts + value.elts))
+        values = value.elts if paired else [value] * len(target.elts)
+        return [found for inner, part in zip(target.elts, values) for found in _assignments(inner, part)]
+    return []
+
+
+# ---------------------------------------------------------------------------
+# Action budget analysis
+# ---------------------------------------------------------------------------
+
+INF = float("inf")
+
+# An abstract list of actions: for each action, the (min, max) number of occurrences
+Bag = Dict[str, Tuple[float, float]]
+EMPTY_BAG: Bag = {action: (0, 0) for action in ACTIONS}
+UNKNOWN_BAG: Bag = {action: (0, INF) for action in ACTIONS}
+
+# Unroll loops this many iterations before widening growing counts to unbounded
+UNROLL_LIMIT = 16
+
+MUTATING_METHODS = frozenset({"append", "extend", "insert", "pop", "remove", "clear", "sort", "reverse"})
+FRESH_BUILDERS = frozenset({"list", "sorted", "tuple", "set", "dict", "range"})
+# Calls whose result refers to (rather than copies) their arguments or receiver
+VIEW_METHODS = frozenset({"items", "keys", "values"})
+LAZY_BUILTINS = frozenset({"enumerate", "zip", "reversed"})
+RANDOM_NUMBERS = frozenset({"random", "randint", "uniform"})
+
+
+class _Value(NamedTuple):
+    """
+    Abstract value of an expression: `bag` bounds the actions it holds when used
+    as a list, `actions` the action strings it can equal, `length` its maximum
+    length and `item` the abstract value of its elements (None when unknown).
+    """
+    bag: Bag
+    actions: FrozenSet[str]
+    length: float
+    item: Optional["_Value"]
+
+
+UNKNOWN = _Value(UNKNOWN_BAG, ACTIONS, INF, None)
+# Element of an empty list; joins as the identity
+NOTHING = _Value(EMPTY_BAG, frozenset(), 0, None)
+NUMBER = _Value(EMPTY_BAG, frozenset(), INF, None)
+CHARACTER = _Value(EMPTY_BAG, frozenset(), 1, None)
+SENSOR = _Value(EMPTY_BAG, frozenset(), 2, NUMBER)
+
+
+class _Unsupported(Exception):
+    """Raised for constructs the budget analysis does not model."""
+
+
+def _bag_add(a: Bag, b: Bag) -> Bag:
+    return {k: (a[k][0] + b[k][0], a[k][1] + b[k][1]) for k in ACTIONS}
+
+
+def _bag_join(a: Bag, b: Bag) -> Bag:
+    return {k: (min(a[k][0], b[k][0]), max(a[k][1], b[k][1])) for k in ACTIONS}
+
+
+def _mul(a: float, b: float) -> float:
+    """Product where 0 * INF is 0 (zero iterations of an unbounded body)."""
+    return 0 if a == 0 or b == 0 else a * b
+
+
+def _bag_scale(bag: Bag, low: float, high: float) -> Bag:
+    return {k: (_mul(lo, low), _mul(hi, high)) for k, (lo, hi) in bag.items()}
+
+
+def _bag_cap(bag: Bag, limit: float) -> Bag:
+    """Bag of a sublist of at most `limit` elements."""
+    return {k: (0, min(hi, limit)) for k, (lo, hi) in bag.items()}
+
+
+def _bag_element(actions: FrozenSet[str]) -> Bag:
+    """Bag of a single element that is one of `actions`."""
+    return {k: (1 if len(actions) == 1 and k in actions else 0, 1 if k in actions else 0) for k in ACTIONS}
+
+
+def _element(value: _Value) -> _Value:
+    return value.item if value.item is not None else UNKNOWN
+
+
+def _join_items(a: Optional[_Value], b: Optional[_Value]) -> Optional[_Value]:
+    if a is NOTHING:
+        return b
+    if b is NOTHING:
+        return a
+    return None if a is None or b is None else _join(a, b)
+
+
+def _join(a: _Value, b: _Value) -> _Value:
+    if a == b:
+        return a
+    item = _join_items(a.item, b.item)
+    return _Value(_bag_join(a.bag, b.bag), a.actions | b.actions, max(a.length, b.length), item)
+
+
+def _sequence(elements: List[_Value]) -> _Value:
+    """A list literal of the given element values."""
+    bag, item = EMPTY_BAG, NOTHING
+    for element in elements:
+        bag = _bag_add(bag, _bag_element(element.actions))
+        item = _join_items(item, element)
+    return _Value(bag, frozenset(), len(elements), item)
+
+
+def _join_states(a: Optional[Dict], b: Optional[Dict]) -> Optional[Dict]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    joined = dict(a)
+    for name, value in b.items():
+        joined[name] = _join(joined[name], value) if name in joined else value
+    return joined
+
+
+def _widen_states(previous: Dict, current: Dict) -> Dict:
+    """Counts that are still growing become unbounded."""
+    widened = dict(current)
+    for name, value in current.items():
+        old = previous.get(name)
+        if old is None or old == value:
+            continue
+        bag = {k: (min(old.bag[k][0], value.bag[k][0]),
+                   old.bag[k][1] if value.bag[k][1] <= old.bag[k][1] else INF) for k in ACTIONS}
+        length = old.length if value.length <= old.length else INF
+        item = old.item if old.item == value.item else None
+        widened[name] = _Value(bag, old.actions | value.actions, length, item)
+    return widened
+
+
+def _scope_nodes(statements: List[ast.stmt]) -> List[ast.AST]:
+    """Nodes of a function body or of the module, without the bodies of the functions defined in it."""
+    nodes, stack = [], list(statements)
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        if not isinstance(node, ast.FunctionDef):
+            stack.extend(ast.iter_child_nodes(node))
+    return nodes
+
+
+class _Scope(NamedTuple):
+    """The nodes of a function (or of the module), the node each one is part of and the names it binds."""
+    nodes: List[ast.AST]
+    parents: Dict[ast.AST, ast.AST]
+    params: List[str]
+    bound: Set[str]
+
+
+class _Flow(NamedTuple):
+    """States leaving a block normally, through `break` and through `continue`."""
+    normal: Optional[Dict]
+    breaks: Optional[Dict]
+    continues: Optional[Dict]
+
+
+class _BudgetAnalyzer:
+    """
+    Abstract interpreter over a parsed rule. Every branch of `if`/`else` and
+    every possible iteration count of a loop is followed, so the bag returned by
+    `move` bounds the action counts of every execution path.
+
+    An object that is changed in place (a list appended to, a dict item set, a
+    name `+=`-ed) must only be reachable through one local name or parameter:
+    it is built fresh (literals, comprehensions, list()/sorted() or arithmetic),
+    never stored in another name or container, never returned by a function it
+    was passed to, and only changed through that name. Functions are defined once
+    at the top level and only called by name. Anything else, including any node
+    or call the interpreter does not model, makes the rule unanalyzable rather
+    than risking an unsound bound.
+    """
+
+    def __init__(self, tree: ast.Module, n_inputs: Optional[int]):
+        self.tree = tree
+        self.functions: Dict[str, ast.FunctionDef] = {}
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef):
+                if node.name in self.functions:
+                    raise _Unsupported(f"{node.name} is defined twice")
+                self.functions[node.name] = node
+        self.input = _Value(EMPTY_BAG, frozenset(), INF if n_inputs is None else n_inputs, SENSOR)
+        self.active: Set[str] = set()
+        self.returns: List[List[Tuple[_Value, Dict]]] = []
+        self.scopes: Dict[Optional[str], _Scope] = {}
+        self.facts: Dict[Tuple[str, Optional[str]], object] = {}
+        self.resolving: Set[Tuple[str, Optional[str]]] = set()
+        self.globals: Dict[str, _Value] = {}
+        self.check_definitions()
+        self.check_scope(None)
+        self.globals = self.block(tree.body, {}).normal or {}
+
+    def move_bounds(self) -> Bag:
+        if "move" not in self.functions:
+            raise _Unsupported("no move function")
+        return self.call("move", [self.input], {}, {})[0].bag
+
+    def call(self, name: str, args: List[_Value], keywords: Dict[str, _Value],
+             caller: Dict) -> Tuple[_Value, Dict[str, _Value]]:
+        """Return value of a rule function and the final values of its parameters."""
+        if name in self.active:
+            raise _Unsupported(f"recursion through {name}")
+        function = self.functions[name]
+        params = [arg.arg for arg in function.args.args]
+        self.check_scope(name)
+
+        state = dict(self.globals)
+        for index, param in enumerate(params):
+            state[param] = args[index] if index < len(args) else keywords.get(param, UNKNOWN)
+        self.active.add(name)
+        self.returns.append([])
+        try:
+            flow = self.block(function.body, state)
+        finally:
+            self.active.discard(name)
+            exits = self.returns.pop()
+        if flow.normal is not None:
+            exits.append((_Value(EMPTY_BAG, frozenset(), 0, None), flow.normal))
+        if not exits:
+            raise _Unsupported(f"{name} never returns")
+
+        result = exits[0][0]
+        for value, _ in exits[1:]:
+            result = _join(result, value)
+        final = {}
+        for param in params:
+            value = exits[0][1][param]
+            for _, exit_state in exits[1:]:
+                value = _join(value, exit_state[param])
+            final[param] = value
+        return result, final
+
+    # Aliasing
+
+    def check_definitions(self) -> None:
+        """Functions take plain parameters, are never rebound and are only called by name (or as `key=`)."""
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.FunctionDef):
+                args = node.args
+                if self.functions.get(node.name) is not node:
+                    raise _Unsupported(f"{node.name} is defined inside another statement")
+                if (args.posonlyargs or args.vararg or args.kwonlyargs or args.kwarg or node.decorator_list
+                        or not all(isinstance(default, ast.Constant) for default in args.defaults)):
+                    raise _Unsupported(f"signature of {node.name}")
+        for name in [None, *self.functions]:
+            scope = self.scope(name)
+            for node in scope.nodes:
+                if not isinstance(node, ast.Name) or node.id not in self.functions:
+                    continue
+                parent = scope.parents.get(node)
+                if isinstance(node.ctx, ast.Store):
+                    raise _Unsupported(f"{node.id} is rebound")
+                if isinstance(parent, ast.Call) and parent.func is node:
+                    if name is None:
+                        raise _Unsupported(f"top-level code calls {node.id}")
+                elif isinstance(parent, ast.keyword) and parent.arg == "key":
+                    # Called by sorted()/min()/max() for ordering only
+                    self.check_scope(node.id)
+                    if self.mutated_params(node.id):
+                        raise _Unsupported(f"{node.id} changes its arguments")
+                else:
+                    raise _Unsupported(f"{node.id} is used as a value")
+
+    def scope(self, name: Optional[str]) -> _Scope:
+        """The scope of a rule function, or of the module when `name` is None."""
+        if name not in self.scopes:
+            function = self.functions.get(name)
+            nodes = _scope_nodes(function.body if function is not None else self.tree.body)
+            parents = {child: node for node in nodes for child in ast.iter_child_nodes(node)}
+            params = [arg.arg for arg in function.args.args] if function is not None else []
+            bound = {node.id for node in nodes if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)}
+            self.scopes[name] = _Scope(nodes, parents, params, bound)
+        return self.scopes[name]
+
+    def resolve(self, fact: str, name: Optional[str], compute):
+        """Memoized fact about a function; needing it while computing it means recursion."""
+        key = (fact, name)
+        if key not in self.facts:
+            if key in self.resolving:
+                raise _Unsupported(f"recursion through {name}")
+            self.resolving.add(key)
+            try:
+                self.facts[key] = compute()
+            finally:
+                self.resolving.discard(key)
+        return self.facts[key]
+
+    def arguments(self, name: str, call: ast.Call) -> List[Tuple[str, ast.expr]]:
+        """(parameter, argument) pairs of a call to a rule function."""
+        if any(isinstance(arg, ast.Starred) for arg in call.args) or any(kw.arg is None for kw in call.keywords):
+            raise _Unsupported(f"unpacked arguments to {name}")
+        params = [arg.arg for arg in self.functions[name].args.args]
+        return list(zip(params, call.args)) + [(kw.arg, kw.value) for kw in call.keywords]
+
+    def changed_in_place(self, nodes: List[ast.AST]) -> Set[str]:
+        """Names whose object the given nodes change in place."""
+        changed = set()
+        for node in nodes:
+            objects: List[ast.expr] = []
+            if isinstance(node, ast.Call):
+                func = node.func
+                if isinstance(func, ast.Attribute) and func.attr in MUTATING_METHODS:
+                    objects.append(func.value)
+                elif isinstance(func, ast.Name) and func.id in self.functions:
+                    mutated = self.mutated_params(func.id)
+                    objects.extend(arg for param, arg in self.arguments(func.id, node)
+                                   if param in mutated and not self.is_fresh(arg))
+            elif isinstance(node, ast.Subscript) and isinstance(node.ctx, ast.Store):
+                objects.append(node.value)
+            elif isinstance(node, ast.AugAssign):
+                target = node.target
+                if isinstance(target, ast.Subscript):
+                    objects.append(target.value)
+                elif not (isinstance(node.value, ast.Constant) and isinstance(node.value.value, (int, float))
+                          and not isinstance(node.op, ast.Mult)):
+                    # `n += 1` rebinds a number; `x += y` may extend a list in place
+                    objects.append(target)
+            for target in objects:
+                if not isinstance(target, ast.Name):
+                    raise _Unsupported("element changed in place")
+                changed.add(target.id)
+        return changed
+
+    def mutated_params(self, name: str) -> FrozenSet[str]:
+        """Parameters of a rule function whose argument it changes in place."""
+        def compute():
+            scope = self.scope(name)
+            return frozenset(self.changed_in_place(scope.nodes) & set(scope.params))
+        return self.resolve("mutated", name, compute)
+
+    def check_scope(self, name: Optional[str]) -> None:
+        """Objects the function (or the module) changes in place are only reachable through one local name."""
+        def compute():
+            scope = self.scope(name)
+            changed = self.changed_in_place(scope.nodes)
+            for node in scope.nodes:
+                if isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None:
+                    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                    for target in targets:
+                        if isinstance(target, ast.Name):
+                            if target.id in changed and not self.is_fresh(node.value):
+                                raise _Unsupported(f"{target.id} may alias another object")
+                        elif (not isinstance(target, ast.Subscript)
+                              and {n.id for n in ast.walk(target) if isinstance(n, ast.Name)} & changed):
+                            raise _Unsupported("name changed in place is bound by unpacking")
+                elif isinstance(node, (ast.For, ast.comprehension)):
+                    if {n.id for n in ast.walk(node.target) if isinstance(n, ast.Name)} & changed:
+                        raise _Unsupported("loop variable is changed in place")
+                elif isinstance(node, ast.Name) and node.id in changed:
+                    if isinstance(node.ctx, ast.Store):
+                        if node.id in scope.params:
+                            raise _Unsupported(f"parameter {node.id} is changed in place and rebound")
+                    elif self.shares(scope, node, node.id, node.id in scope.params):
+                        raise _Unsupported(f"{node.id} is changed in place and shared")
+            outside = changed - scope.bound - set(scope.params)
+            if outside:
+                raise _Unsupported(f"global {', '.join(sorted(outside))} is changed in place")
+            return True
+        self.resolve("checked", name, compute)
+
+    def contained(self, name: str, param: str) -> bool:
+        """Whether the object passed to `param` of a rule function stays unshared (e.g. it is not returned)."""
+        def compute():
+            scope = self.scope(name)
+            return not any(isinstance(node, ast.Name) and node.id == param and isinstance(node.ctx, ast.Load)
+                           and self.shares(scope, node, param, True) for node in scope.nodes)
+        return self.resolve(f"contained {param}", name, compute)
+
+    def fresh_local(self, scope: _Scope, name: str) -> bool:
+        """A local name that only ever holds objects built in the function, and does not share them."""
+        if name in scope.params or name not in scope.bound:
+            return False
+        fresh = set()
+        for node in scope.nodes:
+            if isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None and self.is_fresh(node.value):
+                fresh.update(id(target) for target in (node.targets if isinstance(node, ast.Assign) else [node.target]))
+            elif isinstance(node, ast.AugAssign):
+                fresh.add(id(node.target))
+        return all(id(node) in fresh if isinstance(node.ctx, ast.Store) else not self.shares(scope, node, name, False)
+                   for node in scope.nodes if isinstance(node, ast.Name) and node.id == name)
+
+    def returns_fresh(self, name: str) -> bool:
+        """Whether every object a rule function returns is built during the call."""
+        def compute():
+            scope = self.scope(name)
+            return all(node.value is None or self.is_fresh(node.value)
+                       or isinstance(node.value, ast.Name) and self.fresh_local(scope, node.value.id)
+                       for node in scope.nodes if isinstance(node, ast.Return))
+        return self.resolve("fresh", name, compute)
+
+    def shares(self, scope: _Scope, node: ast.expr, name: str, param: bool) -> bool:
+        """
+        Whether the object `node` (holding `name`) can end up reachable through another
+        name or container, or through the caller when `name` is a parameter, rather
+        than only being read, copied or changed in place.
+        """
+        ancestor = scope.parents.get(node)
+        while ancestor is not None:
+            # A generator reads its variables when it is consumed, not where it is written
+            if isinstance(ancestor, ast.GeneratorExp) and self.shares(scope, ancestor, name, param):
+                return True
+            ancestor = scope.parents.get(ancestor)
+
+        child, parent = node, scope.parents.get(node)
+        while True:
+            through = False
+            if isinstance(parent, ast.Attribute):
+                call = scope.parents.get(parent)
+                if not (parent.attr in VIEW_METHODS and isinstance(call, ast.Call) and call.func is parent):
+                    return False
+                parent = call
+                through = True
+            elif isinstance(parent, (ast.Subscript, ast.Compare, ast.UnaryOp, ast.BinOp, ast.FormattedValue,
+                                     ast.Expr, ast.AugAssign, ast.If, ast.Slice)):
+                return False
+            elif isinstance(parent, (ast.IfExp, ast.BoolOp)):
+                through = child is not getattr(parent, "test", None)
+                if not through:
+                    return False
+            elif isinstance(parent, ast.For):
+                return child is not parent.iter or name in self.changed_in_place(
+                    _scope_nodes(parent.body + parent.orelse))
+            elif isinstance(parent, ast.comprehension):
+                generator = scope.parents.get(parent)
+                if not (child is parent.iter and isinstance(generator, ast.GeneratorExp)):
+                    return False
+                parent = generator
+                through = True
+            elif isinstance(parent, ast.Starred):
+                return not isinstance(scope.parents.get(parent), (ast.List, ast.Tuple, ast.Set))
+            elif isinstance(parent, ast.Return):
+                return param
+            elif isinstance(parent, ast.keyword):
+                verdict = self.argument_shares(scope.parents.get(parent), child, parent.arg)
+                if verdict is not None:
+                    return verdict
+                parent = scope.parents.get(parent)
+                through = True
+            elif isinstance(parent, ast.Call):
+                verdict = self.argument_shares(parent, child, None)
+                if verdict is not None:
+                    return verdict
+                through = True
+            if not through:
+                return True
+            child, parent = parent, scope.parents.get(parent)
+
+    def argument_shares(self, call: ast.Call, arg: ast.expr, keyword: Optional[str]) -> Optional[bool]:
+        """Whether a call shares its argument `arg`; None when it may return it."""
+        func = call.func
+        if arg is func:
+            return True
+        if isinstance(func, ast.Name):
+            if func.id in self.functions:
+                params = [a.arg for a in self.functions[func.id].args.args]
+                index = next((i for i, a in enumerate(call.args) if a is arg), None)
+                if keyword is not None:
+                    param = keyword
+                else:
+                    param = params[index] if index is not None and index < len(params) else None
+                return param is None or not self.contained(func.id, param)
+            if func.id in ("min", "max"):
+                return None if keyword == "default" or (keyword is None and len(call.args) > 1) else False
+            if func.id in LAZY_BUILTINS:
+                return None if keyword is None else False
+            return func.id not in ALLOWED_BUILTINS
+        if isinstance(func, ast.Attribute):
+            if func.attr in ("append", "insert") and call.args and arg is call.args[-1]:
+                return True
+            if func.attr in ("get", "pop") and len(call.args) > 1 and arg is call.args[1]:
+                return None
+            return False
+        return True
+
+    def is_fresh(self, node: ast.expr) -> bool:
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set, ast.Dict, ast.ListComp, ast.SetComp, ast.DictComp,
+                             ast.BinOp, ast.Constant, ast.JoinedStr, ast.Compare, ast.UnaryOp)):
+            return True
+        if isinstance(node, ast.IfExp):
+            return self.is_fresh(node.body) and self.is_fresh(node.orelse)
+        if isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name):
+                if func.id in self.functions:
+                    return self.returns_fresh(func.id)
+                return func.id in FRESH_BUILDERS
+            return isinstance(func, ast.Attribute) and func.attr in ("copy", "sample", "choices", "items", "keys", "values")
+        return False
+
+    # Statements
+
+    def block(self, statements: List[ast.stmt], state: Optional[Dict]) -> _Flow:
+        breaks = continues = None
+        for statement in statements:
+            if state is None:
+                break
+            flow = self.statement(statement, state)
+            state = flow.normal
+            breaks = _join_states(breaks, flow.breaks)
+            continues = _join_states(continues, flow.continues)
+        return _Flow(state, breaks, continues)
+
+    def statement(self, node: ast.stmt, state: Dict) -> _Flow:
+        if isinstance(node, ast.Assign):
+            self.assign(node.targets, self.eval(node.value, state), state)
+        elif isinstance(node, ast.AnnAssign):
+            if node.value is not None:
+                self.assign([node.target], self.eval(node.value, state), state)
+        elif isinstance(node, ast.AugAssign):
+            self.aug_assign(node, state)
+        elif isinstance(node, ast.Expr):
+            self.eval(node.value, state)
+        elif isinstance(node, ast.Return):
+            value = self.eval(node.value, state) if node.value is not None else NOTHING
+            self.returns[-1].append((value, state))
+            return _Flow(None, None, None)
+        elif isinstance(node, ast.If):
+            self.eval(node.test, state)
+            body = self.block(node.body, dict(state))
+            orelse = self.block(node.orelse, dict(state))
+            return _Flow(_join_states(body.normal, orelse.normal), _join_states(body.breaks, orelse.breaks),
+                         _join_states(body.continues, orelse.continues))
+        elif isinstance(node, ast.For):
+            return self.loop(node, state)
+        elif isinstance(node, ast.Break):
+            return _Flow(None, state, None)
+        elif isinstance(node, ast.Continue):
+            return _Flow(None, None, state)
+        elif not isinstance(node, (ast.Pass, ast.FunctionDef, ast.Import)):
+            raise _Unsupported(type(node).__name__)
+        return _Flow(state, None, None)
+
+    def loop(self, node: ast.For, state: Dict) -> _Flow:
+        iterable = self.eval(node.iter, state)
+        low, high = self.iteration_bounds(node.iter, iterable)
+        element = _element(iterable)
+        exits = breaks = None
+        current, previous = state, None
+        iteration = 0
+        while current is not None:
+            if iteration >= UNROLL_LIMIT:
+                if previous is not None:
+                    widened = _widen_states(previous, current)
+                    if widened == previous:
+                        # Fixpoint: `previous` already covers every later iteration,
+                        # including the one the loop exits from
+                        exits = _join_states(exits, previous)
+                        break
+                    current = widened
+                previous = current
+            if iteration >= low:
+                exits = _join_states(exits, current)
+            if iteration >= high:
+                break
+            body_state = dict(current)
+            self.assign([node.target], element, body_state)
+            flow = self.block(node.body, body_state)
+            breaks = _join_states(breaks, flow.breaks)
+            current = _join_states(flow.normal, flow.continues)
+            iteration += 1
+        if node.orelse and exits is not None:
+            orelse = self.block(node.orelse, dict(exits))
+            return _Flow(_join_states(orelse.normal, breaks), orelse.breaks, orelse.continues)
+        return _Flow(_join_states(exits, breaks), None, None)
+
+    def iteration_bounds(self, node: ast.expr, value: _Value) -> Tuple[float, float]:
+        if isinstance(node, (ast.List, ast.Tuple)) and not any(isinstance(e, ast.Starred) for e in node.elts):
+            return len(node.elts), len(node.elts)
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range"
+                and all(isinstance(arg, ast.Constant) and isinstance(arg.value, int) for arg in node.args)):
+            count = len(range(*[arg.value for arg in node.args]))
+            return count, count
+        return 0, value.length
+
+    def assign(self, targets: List[ast.expr], value: _Value, state: Dict) -> None:
+        for target in targets:
+            if isinstance(target, ast.Name):
+                state[target.id] = value
+            elif isinstance(target, (ast.Tuple, ast.List)):
+                element = _element(value)
+                for inner in target.elts:
+                    self.assign([inner.value if isinstance(inner, ast.Starred) else inner],
+                                UNKNOWN if isinstance(inner, ast.Starred) else element, state)
+            elif isinstance(target, ast.Subscript):
+                key = self.eval(target.slice, state)
+                if not isinstance(target.value, ast.Name) or target.value.id not in state:
+                    raise _Unsupported("assignment to an element of an unnamed object")
+                container = state[target.value.id]
+                if isinstance(target.slice, ast.Slice):
+                    # Part of a list replaced by the elements of `value`
+                    bag = {k: (0, hi + value.bag[k][1]) for k, (lo, hi) in container.bag.items()}
+                    state[target.value.id] = _Value(bag, container.actions, container.length + value.length,
+                                                    _join_items(container.item, value.item))
+                else:
+                    # A list element replaced, or a dict entry added: the key and the value may now be
+                    # elements, and the replaced element may have been any action
+                    added = key.actions | value.actions
+                    bag = {k: (max(0, lo - 1), hi + (1 if k in added else 0)) for k, (lo, hi) in container.bag.items()}
+                    item = _join_items(_join_items(container.item, value), key)
+                    state[target.value.id] = _Value(bag, container.actions, container.length + 1, item)
+            else:
+                raise _Unsupported(type(target).__name__)
+
+    def aug_assign(self, node: ast.AugAssign, state: Dict) -> None:
+        value = self.eval(node.value, state)
+        if not isinstance(node.target, ast.Name):
+            # `x[i] += v` changes a list or set element in place unless the element is a number
+            if isinstance(node.op, ast.Mult) or value != NUMBER:
+                raise _Unsupported("element changed in place")
+            self.assign([node.target], NUMBER, state)
+            return
+        current = state.get(node.target.id, self.globals.get(node.target.id, UNKNOWN))
+        if isinstance(node.op, ast.Add):
+            state[node.target.id] = self.concatenate(current, value)
+        elif isinstance(node.op, ast.Mult):
+            state[node.target.id] = self.repeat(current, node.value, value)
+        else:
+            state[node.target.id] = self.combine(current, value)
+
+    # Expressions
+
+    def eval(self, node: ast.expr, state: Dict) -> _Value:
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, str):
+                return _Value(EMPTY_BAG, frozenset({node.value}) & ACTIONS, len(node.value), CHARACTER)
+            return NUMBER
+        if isinstance(node, ast.Name):
+            if node.id in state:
+                return state[node.id]
+            return self.globals.get(node.id, NUMBER if node.id in ALLOWED_BUILTINS else UNKNOWN)
+        if isinstance(node, (ast.List, ast.Tuple)):
+            elements, extra = [], []
+            for element in node.elts:
+                if isinstance(element, ast.Starred):
+                    extra.append(self.eval(element.value, state))
+                else:
+                    elements.append(self.eval(element, state))
+            value = _sequence(elements)
+            for starred in extra:
+                value = self.concatenate(value, starred)
+            return value
+        if isinstance(node, ast.Set):
+            return self.deduplicate(_sequence([self.eval(e, state) for e in node.elts]))
+        if isinstance(node, ast.Dict):
+            entries = list(zip(node.keys, node.values))
+            keys = [self.eval(k, state) for k, _ in entries if k is not None]
+            values = [self.eval(v, state) for k, v in entries if k is not None]
+            bag, length, item = _sequence(keys).bag, len(keys), _sequence(keys + values).item
+            for key, other in entries:
+                if key is None:
+                    # {**other} adds the entries of another dict
+                    other = self.eval(other, state)
+                    bag, length, item = _bag_add(bag, other.bag), length + other.length, _join_items(item, other.item)
+            return _Value(bag, frozenset(), length, item)
+        if isinstance(node, ast.BinOp):
+            left, right = self.eval(node.left, state), self.eval(node.right, state)
+            if isinstance(node.op, ast.Add):
+                return self.concatenate(left, right)
+            if isinstance(node.op, ast.Mult):
+                if isinstance(node.right, ast.Constant) or right == NUMBER:
+                    return self.repeat(left, node.right, right)
+                return self.repeat(right, node.left, left)
+            return self.combine(left, right)
+        if isinstance(node, ast.IfExp):
+            self.eval(node.test, state)
+            body_state, orelse_state = dict(state), dict(state)
+            result = _join(self.eval(node.body, body_state), self.eval(node.orelse, orelse_state))
+            state.update(_join_states(body_state, orelse_state))
+            return result
+        if isinstance(node, ast.BoolOp):
+            result = self.eval(node.values[0], state)
+            for operand in node.values[1:]:
+                # Later operands may not be evaluated
+                operand_state = dict(state)
+                result = _join(result, self.eval(operand, operand_state))
+                state.update(_join_states(state, operand_state))
+            return result
+        if isinstance(node, (ast.Compare, ast.UnaryOp)):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, ast.expr):
+                    self.eval(child, state)
+            return NUMBER
+        if isinstance(node, ast.Subscript):
+            container = self.eval(node.value, state)
+            self.eval(node.slice, state)
+            if isinstance(node.slice, ast.Slice):
+                limit = container.length
+                upper = node.slice.upper
+                if (node.slice.lower is None and node.slice.step is None and isinstance(upper, ast.Constant)
+                        and isinstance(upper.value, int) and upper.value >= 0):
+                    limit = min(limit, upper.value)
+                # A slice of a string may be an action even when the string is not
+                actions = ACTIONS if container.item is CHARACTER or container.item is None else container.actions
+                return _Value(_bag_cap(container.bag, limit), actions, limit, container.item)
+            return _element(container)
+        if isinstance(node, ast.JoinedStr):
+            return _Value(EMPTY_BAG, ACTIONS, INF, CHARACTER)
+        if isinstance(node, ast.FormattedValue):
+            return self.eval(node.value, state)
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+            return self.comprehension(node, state)
+        if isinstance(node, ast.Call):
+            return self.call_expression(node, state)
+        if isinstance(node, ast.Attribute):
+            if node.attr in MUTATING_METHODS:
+                raise _Unsupported(f"reference to .{node.attr}")
+            return NUMBER
+        if isinstance(node, ast.Slice):
+            for part in (node.lower, node.upper, node.step):
+                if part is not None:
+                    self.eval(part, state)
+            return NUMBER
+        raise _Unsupported(type(node).__name__)
+
+    def concatenate(self, left: _Value, right: _Value) -> _Value:
+        strings = left.item is CHARACTER or right.item is CHARACTER or left is UNKNOWN or right is UNKNOWN
+        item = _join_items(left.item, right.item)
+        return _Value(_bag_add(left.bag, right.bag), ACTIONS if strings else frozenset(),
+                      left.length + right.length, item)
+
+    @staticmethod
+    def combine(left: _Value, right: _Value) -> _Value:
+        """Any other operator: a number, or a set, dict or string made of both operands' elements."""
+        if left == NUMBER and right == NUMBER:
+            return NUMBER
+        bag = {k: (0, left.bag[k][1] + right.bag[k][1]) for k in ACTIONS}
+        return _Value(bag, ACTIONS, left.length + right.length, _join_items(left.item, right.item))
+
+    def repeat(self, sequence: _Value, count_node: ast.expr, count: _Value) -> _Value:
+        if isinstance(count_node, ast.Constant) and isinstance(count_node.value, int):
+            times = max(0, count_node.value)
+            return _Value(_bag_scale(sequence.bag, times, times), frozenset(), sequence.length * times, sequence.item)
+        return _Value(_bag_scale(sequence.bag, 0, INF), frozenset(), INF, sequence.item)
+
+    @staticmethod
+    def deduplicate(value: _Value) -> _Value:
+        bag = {k: (min(lo, 1), min(hi, 1)) for k, (lo, hi) in value.bag.items()}
+        return _Value(bag, frozenset(), value.length, value.item)
+
+    def comprehension(self, node: ast.expr, state: Dict) -> _Value:
+        for inner in ast.walk(node):
+            if isinstance(inner, ast.Call) and (
+                    isinstance(inner.func, ast.Attribute) and inner.func.attr in MUTATING_METHODS
+                    or isinstance(inner.func, ast.Name) and inner.func.id in self.functions
+                    and self.mutated_params(inner.func.id)):
+                raise _Unsupported("mutation inside a comprehension")
+        inner = dict(state)
+        count = 1
+        for generator in node.generators:
+            iterable = self.eval(generator.iter, inner)
+            count = _mul(count, self.iteration_bounds(generator.iter, iterable)[1])
+            self.assign([generator.target], _element(iterable), inner)
+            for condition in generator.ifs:
+                self.eval(condition, inner)
+        if isinstance(node, ast.DictComp):
+            element = _join(self.eval(node.key, inner), self.eval(node.value, inner))
+        else:
+            element = self.eval(node.elt, inner)
+        value = _Value(_bag_scale(_bag_element(element.actions), 0, count), frozenset(), count, element)
+        return self.deduplicate(value) if isinstance(node, (ast.SetComp, ast.DictComp)) else value
+
+    def call_expression(self, node: ast.Call, state: Dict) -> _Value:
+        func = node.func
+        if any(isinstance(arg, ast.Starred) for arg in node.args) or any(kw.arg is None for kw in node.keywords):
+            raise _Unsupported("unpacked arguments")
+        args = [self.eval(arg, state) for arg in node.args]
+        keywords = {kw.arg: self.eval(kw.value, state) for kw in node.keywords}
+
+        if isinstance(func, ast.Attribute):
+            receiver = func.value
+            if isinstance(receiver, ast.Name) and receiver.id == "random" and "random" not in state:
+                return self.random_call(func.attr, node, args, keywords)
+            if isinstance(receiver, ast.Name) and receiver.id == "math" and "math" not in state:
+                return NUMBER
+            target = self.eval(receiver, state)
+            result = self.method_call(func.attr, target, args, keywords)
+            if isinstance(receiver, ast.Name) and func.attr in MUTATING_METHODS:
+                state[receiver.id] = self.mutate(func.attr, target, args)
+            return result
+
+        if not isinstance(func, ast.Name):
+            raise _Unsupported("indirect call")
+        name = func.id
+        if name in state:
+            raise _Unsupported(f"call of the variable {name}")
+        if name in self.functions:
+            arguments = self.arguments(name, node)
+            result, final = self.call(name, args, keywords, state)
+            # Objects passed by name may have been changed in place by the callee
+            mutated = self.mutated_params(name)
+            passed = [arg.id for _, arg in arguments if isinstance(arg, ast.Name)]
+            for param, arg in arguments:
+                if param in mutated and isinstance(arg, ast.Name):
+                    if passed.count(arg.id) > 1:
+                        raise _Unsupported(f"{arg.id} is passed to {name} more than once")
+                    state[arg.id] = final[param]
+            return result
+        first = args[0] if args else UNKNOWN
+        if name in ("list", "tuple", "sorted", "reversed"):
+            return _Value(first.bag, frozenset(), first.length, first.item) if args else _sequence([])
+        if name == "set":
+            return self.deduplicate(first) if args else _sequence([])
+        if name == "dict":
+            if keywords:
+                raise _Unsupported("dict() with keywords")
+            # The keys are the first items of the pairs it is given
+            bag = _bag_scale(_bag_element(ACTIONS), 0, first.length)
+            return _Value(bag, frozenset(), first.length, None) if args else _sequence([])
+        if name == "str":
+            return _Value(EMPTY_BAG, first.actions, INF, CHARACTER)
+        if name == "enumerate":
+            return _Value(EMPTY_BAG, frozenset(), first.length, self.pair(NUMBER, _element(first)))
+        if name == "zip":
+            elements = [_element(arg) for arg in args] or [UNKNOWN]
+            item = elements[0]
+            for element in elements[1:]:
+                item = _join(item, element)
+            return _Value(EMPTY_BAG, frozenset(), min(arg.length for arg in args) if args else 0,
+                          self.pair(item, item))
+        if name == "range":
+            return _Value(EMPTY_BAG, frozenset(), self.iteration_bounds(node, NUMBER)[1], NUMBER)
+        if name in ("min", "max"):
+            candidates = [_element(first)] if len(args) == 1 else args
+            result = keywords.get("default", candidates[0] if candidates else UNKNOWN)
+            for candidate in candidates:
+                result = _join(result, candidate)
+            return result
+        if name == "sum" and (len(args) > 1 or keywords):
+            raise _Unsupported("sum() with a start value")
+        if name in ALLOWED_BUILTINS:
+            return NUMBER
+        raise _Unsupported(f"call to {name}")
+
+    @staticmethod
+    def pair(first: _Value, second: _Value) -> _Value:
+        """A 2-tuple, e.g. the elements of enumerate() or dict.items()."""
+        return _sequence([first, second])
+
+    def random_call(self, name: str, node: ast.Call, args: List[_Value], keywords: Dict[str, _Value]) -> _Value:
+        if name == "choice" and args:
+            return _element(args[0])
+        if name == "sample" and args:
+            population = args[0]
+            k_node = node.args[1] if len(node.args) > 1 else next((kw.value for kw in node.keywords if kw.arg == "k"), None)
+            limit = k_node.value if isinstance(k_node, ast.Constant) and isinstance(k_node.value, int) else population.length
+            return _Value(_bag_cap(population.bag, limit), frozenset(), limit, population.item)
+        if name == "choices" and args:
+            k_node = next((kw.value for kw in node.keywords if kw.arg == "k"), None)
+            k = k_node.value if isinstance(k_node, ast.Constant) and isinstance(k_node.value, int) else (
+                1 if k_node is None else INF)
+            element = _element(args[0])
+            return _Value(_bag_scale(_bag_element(element.actions), 0, k), frozenset(), k, element)
+        if name == "shuffle":
+            return NOTHING
+        if name in RANDOM_NUMBERS:
+            return NUMBER
+        raise _Unsupported(f"random.{name}")
+
+    def method_call(self, name: str, target: _Value, args: List[_Value], keywords: Dict[str, _Value]) -> _Value:
+        if name == "copy":
+            return target
+        if name == "pop":
+            return _join(_element(target), args[1]) if len(args) > 1 else _element(target)
+        if name == "get":
+            element = _element(target)
+            return _join(element, args[1]) if len(args) > 1 else _join(element, NUMBER)
+        if name in ("items", "keys", "values"):
+            element = _element(target)
+            item = self.pair(element, element) if name == "items" else element
+            return _Value(_bag_scale(_bag_element(element.actions), 0, target.length), frozenset(), target.length, item)
+        if name in MUTATING_METHODS:
+            return NOTHING
+        if name in ("count", "index"):
+            return NUMBER
+        raise _Unsupported(f".{name}()")
+
+    def mutate(self, name: str, target: _Value, args: List[_Value]) -> _Value:
+        """Value of a list after calling a mutating method on it."""
+        if name in ("append", "insert") and args:
+            added = args[-1]
+            item = _join_items(target.item, added)
+            return _Value(_bag_add(target.bag, _bag_element(added.actions)), target.actions,
+                          target.length + 1, item)
+        if name == "extend" and args:
+            added = args[0]
+            return _Value(_bag_add(target.bag, added.bag), target.actions, target.length + added.length,
+                          _join_items(target.item, added.item))
+        if name in ("pop", "remove"):
+            bag = {k: (max(0, lo - 1), hi) for k, (lo, hi) in target.bag.items()}
+            return _Value(bag, target.actions, target.length, target.item)
+        if name == "clear":
+            return _Value(EMPTY_BAG, target.actions, 0, NOTHING)
+        return target
+
+
+@dataclass
+class ActionBudget:
+    """
+    Bounds on the actions a move rule can return, against a body's allowance.
+
+    `bounds` maps each action to the (min, max) number of times it occurs over
+    every execution path; `allowed` is the body's allowance per action.
+    """
+    bounds: Dict[str, Tuple[float, float]]
+    allowed: Dict[str, int]
+
+    @property
+    def proven_safe(self) -> bool:
+        """No execution path can exceed the budget; the runtime check can be skipped."""
+        return all(self.bounds[action][1] <= self.allowed[action] for action in ACTIONS)
+
+    @property
+    def never_valid(self) -> bool:
+        """Every execution path exceeds the budget for some action."""
+        return any(self.bounds[action][0] > self.allowed[action] for action in ACTIONS)
+
+    def violations(self) -> List[str]:
+        """Actions some execution path can use more often than allowed."""
+        messages = []
+        for action, (low, high) in sorted(self.bounds.items()):
+            allowed = self.allowed[action]
+            if low > allowed:
+                messages.append(f"'{action}' is used at least {int(low)} times, {allowed} allowed")
+            elif high > allowed:
+                count = "an unbounded number of" if high == INF else f"up to {int(high)}"
+                messages.append(f"'{action}' can be used {count} times, {allowed} allowed")
+        return messages
+
+
+@lru_cache(maxsize=1024)
+def _cached_bounds(code: str, n_inputs: Optional[int]) -> Optional[Tuple[Tuple[str, float, float], ...]]:
+    try:
+        bag = _BudgetAnalyzer(ast.parse(code), n_inputs).move_bounds()
+    except (SyntaxError, ValueError, _Unsupported, RecursionError):
+        return None
+    return tuple((action, low, high) for action, (low, high) in sorted(bag.items()))
+
+
+def action_bounds(code: str, n_inputs: Optional[int] = None) -> Optional[Dict[str, Tuple[float, float]]]:
+    """
+    (min, max) count of each action over every execution path of `move`, or
+    None when the rule cannot be analyzed. `n_inputs` is the number of sensor
+    readings passed to move (loops over `input` run at most that many times).
+    """
+    bounds = _cached_bounds(code, n_inputs)
+    return None if bounds is None else {action: (low, high) for action, low, high in bounds}
+
+
+def analyze_action_budget(code: str, allowed_actions: Dict[str, int],
+                          n_inputs: Optional[int] = None) -> Optional[ActionBudget]:
+    """
+    Compare a rule's action bounds with `allowed_actions` as returned by
+    utils.get_allowed_actions ({"N_UP": 2, ...}). None when the rule cannot be analyzed.
+    """
+    bounds = action_bounds(code, n_inputs)
+    if bounds is None:
+        return None
+    return ActionBudget(bounds, {action: allowed_actions[f"N_{action.upper()}"] for action in ACTIONS})
+
+def verify_rule(code: str) -> Tuple[bool, str]:
+    """Check a generated move rule; returns (is_safe, message)."""
+    return _default_verifier.is_safe(code)
+
+
+_default_verifier = MoveRuleVerifier()
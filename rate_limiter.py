@@ -0,0 +1,137 @@
+"""
+Rate limiting of the requests behind `utils.generate_text`.
+
+Anthropic limits requests and tokens per minute. RateLimiter keeps
+generate_text within both with two token buckets (refilled continuously,
+holding at most `burst_seconds` of budget), reserving the prompt plus
+max_tokens before a request and settling with the usage the API reports.
+A 429 (or a 529 "overloaded") waits for the retry-after header, or an
+exponential backoff without one, and sends the request again; server errors
+are retried the same way. The client's own retries are turned off so these
+are not hidden.
+
+This is the single-threaded counterpart of LEAR's RequestScheduler
+(LEAR/src/graph_providers/scheduler.py), built on the same buckets and
+retry rules (LEAR/src/graph_providers/rate_limits.py): NetLogo calls
+generate_text one request at a time, so there is no concurrency to adapt and
+no queue to order.
+
+Enable it for utils.generate_text with GRIDARIANS_RPM and/or GRIDARIANS_TPM
+(see RateLimiter.from_env).
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+LEAR_ROOT = str(Path(__file__).resolve().parent / "LEAR")
+if LEAR_ROOT not in sys.path:
+    sys.path.insert(0, LEAR_ROOT)
+
+from src.graph_providers.rate_limits import (CHARS_PER_TOKEN, TokenBucket, backoff_delay,  # noqa: E402
+                                             is_rate_limit, is_transient, retry_after)
+
+
+class RateLimiter:
+    """
+    Requests and tokens per minute of one API key, shared by every thread of the process.
+
+    Public Methods:
+    - call(request, prompt, max_tokens) -> response: Send `request()` within the limits, retrying 429s
+    - stats() -> Dict: Requests, rate limits, retries and seconds waited
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_retries: int = 5, backoff: float = 1.0, burst_seconds: float = 5.0):
+        """
+        Args:
+            requests_per_minute: Request limit, None for none
+            tokens_per_minute: Token limit (input plus output), None for none
+            max_retries: Times a rate-limited or failed request is sent again
+            backoff: First backoff in seconds without a retry-after header, doubled per attempt
+            burst_seconds: Seconds of budget the buckets hold
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._requests = TokenBucket(requests_per_minute, burst_seconds) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "rate_limited": 0, "retries": 0, "waited_seconds": 0.0}
+
+    @classmethod
+    def from_env(cls) -> Optional["RateLimiter"]:
+        """
+        Limiter from GRIDARIANS_RPM and GRIDARIANS_TPM (None when both are unset),
+        retrying GRIDARIANS_MAX_RETRIES times (default 5).
+        """
+        rpm, tpm = os.getenv("GRIDARIANS_RPM"), os.getenv("GRIDARIANS_TPM")
+        if not rpm and not tpm:
+            return None
+        return cls(requests_per_minute=float(rpm) if rpm else None,
+                   tokens_per_minute=float(tpm) if tpm else None,
+                   max_retries=int(os.getenv("GRIDARIANS_MAX_RETRIES", 5)))
+
+    def _reserve(self, tokens: float) -> None:
+        """Wait until one request and `tokens` fit in the buckets, then take them."""
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = max((bucket.wait_time(amount, now) for bucket, amount in
+                            ((self._requests, 1), (self._tokens, tokens)) if bucket is not None), default=0.0)
+                if wait <= 0:
+                    break
+                self._stats["waited_seconds"] += wait
+                time.sleep(wait)
+            if self._requests is not None:
+                self._requests.take(1, now)
+            if self._tokens is not None:
+                self._tokens.take(tokens, now)
+            self._stats["requests"] += 1
+
+    def _settle(self, reserved: float, used: float) -> None:
+        if self._tokens is not None:
+            with self._lock:
+                self._tokens.give_back(reserved - used)
+
+    def call(self, request: Callable[[], object], prompt: str, max_tokens: int):
+        """
+        Send `request()` (an Anthropic messages.create call) within the limits.
+
+        Args:
+            request: Sends the request and returns the API response
+            prompt: Prompt text, for the token estimate
+            max_tokens: max_tokens of the request, reserved until the usage is known
+
+        Returns:
+            The API response
+        """
+        reserved = len(prompt) // CHARS_PER_TOKEN + 1 + max_tokens
+        for attempt in range(self.max_retries + 1):
+            self._reserve(reserved)
+            try:
+                response = request()
+            except Exception as e:
+                self._settle(reserved, 0)
+                rate_limited = is_rate_limit(e)
+                if attempt == self.max_retries or not (rate_limited or is_transient(e)):
+                    raise
+                delay = retry_after(e) if rate_limited else None
+                if delay is None:
+                    delay = backoff_delay(self.backoff, attempt)
+                with self._lock:
+                    self._stats["rate_limited"] += int(rate_limited)
+                    self._stats["retries"] += 1
+                    self._stats["waited_seconds"] += delay
+                time.sleep(delay)
+                continue
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self._settle(reserved, usage.input_tokens + usage.output_tokens)
+            return response
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, "waited_seconds": round(self._stats["waited_seconds"], 3)}
@@ -0,0 +1,36 @@
+"""
+Persistent SQLite cache of the responses behind `utils.generate_text`.
+
+Re-running an experiment repeats thousands of identical prompts (the same
+init_rule_v1 text for the same body, the same modify prompts). The cache is
+LEAR's ResponseCache (LEAR/src/graph_providers/response_store.py, standard
+library only), keyed by the system message, the user content, the model
+name, the temperature and max_tokens; see there for how `samples_per_key`
+makes replays deterministic and how answers are evicted.
+
+Enable it for utils.generate_text with GRIDARIANS_CACHE=<database file>
+(see cache_from_env).
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+LEAR_ROOT = str(Path(__file__).resolve().parent / "LEAR")
+if LEAR_ROOT not in sys.path:
+    sys.path.insert(0, LEAR_ROOT)
+
+from src.graph_providers.response_store import ResponseCache  # noqa: E402
+
+
+def cache_from_env() -> Optional[ResponseCache]:
+    """
+    Cache at GRIDARIANS_CACHE (None when unset), configured by
+    GRIDARIANS_CACHE_SAMPLES (samples_per_key) and GRIDARIANS_CACHE_MB (max size).
+    """
+    path = os.getenv("GRIDARIANS_CACHE")
+    if not path:
+        return None
+    return ResponseCache(path, samples_per_key=int(os.getenv("GRIDARIANS_CACHE_SAMPLES", 0)),
+                         max_bytes=int(float(os.getenv("GRIDARIANS_CACHE_MB", 256)) * 1024 * 1024))
@@ -0,0 +1,331 @@
+import importlib.util
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add project root directory to path
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from move_verifier import MoveRuleVerifier, action_bounds, analyze_action_budget, verify_rule
+
+HAS_UTILS_DEPS = importlib.util.find_spec("dotenv") is not None
+
+if HAS_UTILS_DEPS:
+    # Answer prompts offline, no API key needed
+    os.environ.setdefault("GRIDARIANS_LLM", "fake")
+    import utils
+
+
+def rule(*lines):
+    return "\n".join(lines)
+
+
+class TestMoveRuleVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.verifier = MoveRuleVerifier()
+
+    def assertRejected(self, code, message):
+        is_safe, errors = self.verifier.is_safe(code)
+        self.assertFalse(is_safe, code)
+        self.assertIn(message, errors)
+
+    def test_accepts_bounded_rules(self):
+        cases = [
+            rule("def move(input):",
+                 "    actions = []",
+                 "    for distance, kind in input:",
+                 "        if kind == 4 and distance < 3:",
+                 "            actions.append('up')",
+                 "    return actions"),
+            rule("def move(input):",
+                 "    speed = 1",
+                 "    for i in range(len(input)):",
+                 "        speed = speed * 2",
+                 "        distance = input[i][0] * speed",
+                 "    return ['up'] * min(2, len(input))"),
+            rule("def move(input):",
+                 "    for i in range(100):",
+                 "        for j in range(100):",
+                 "            pass",
+                 "    return []"),
+            rule("def score(distance, kind):",
+                 "    return distance * kind",
+                 "",
+                 "def move(input):",
+                 "    best = max(score(distance, kind) for distance, kind in input)",
+                 "    return ['up'] if best * 0.5 > 1 else []"),
+            rule("import random",
+                 "",
+                 "def move(input):",
+                 "    return [random.choice(['up', 'cw'])]"),
+        ]
+        for code in cases:
+            with self.subTest(code=code):
+                self.assertEqual(self.verifier.is_safe(code), (True, "Rule appears safe"))
+
+    def test_rejects_unsafe_constructs(self):
+        self.assertRejected(rule("import os", "def move(input):", "    return []"), "Import of 'os'")
+        self.assertRejected(rule("def move(input):", "    while True:", "        pass", "    return []"),
+                            "'While' is not allowed")
+        self.assertRejected(rule("def move(input):", "    return ['jump']"), "Unknown action 'jump'")
+        self.assertRejected(rule("def move(input):", "    return move(input)"), "Recursion through 'move'")
+        self.assertRejected(rule("def move(input):", "    return input.__class__"), "Attribute '__class__'")
+
+    def test_rejects_unbounded_ranges(self):
+        range_bound = "range() needs static bounds up to 10000 elements"
+        self.assertRejected(rule("r = range(10**15)",
+                                 "def move(input):",
+                                 "    for i in r:",
+                                 "        pass",
+                                 "    return []"), range_bound)
+        self.assertRejected(rule("def move(input):", "    total = sum(range(10**16))", "    return []"), range_bound)
+        self.assertRejected(rule("def move(input):", "    total = sum(range(100000))", "    return []"), range_bound)
+
+    def test_rejects_unbounded_repetition(self):
+        repetition = "'*' must multiply numbers, or repeat a string or list literal"
+        self.assertRejected(rule("def move(input):", "    s = 'x' * 10**16", "    return []"), repetition)
+        self.assertRejected(rule("def move(input):", "    n = 10**16", "    s = 'x' * n", "    return []"), repetition)
+        self.assertRejected(rule("def move(input):",
+                                 "    s = 'ab'",
+                                 "    for i in range(60):",
+                                 "        s = s * 2",
+                                 "    return []"), repetition)
+
+    def test_rejects_nested_loops_over_the_total(self):
+        total = "(1000000 allowed)"
+        self.assertRejected(rule("def move(input):",
+                                 "    for i in range(10000):",
+                                 "        for j in range(10000):",
+                                 "            pass",
+                                 "    return []"), total)
+        self.assertRejected(rule("def move(input):",
+                                 "    pairs = [i * j for i in range(5000) for j in range(5000)]",
+                                 "    return []"), total)
+        self.assertRejected(rule("def busy():",
+                                 "    for i in range(10000):",
+                                 "        pass",
+                                 "    return 1",
+                                 "",
+                                 "def move(input):",
+                                 "    for i in range(1000):",
+                                 "        busy()",
+                                 "    return []"), "Calling 'busy' here")
+
+    def test_rejects_values_that_grow_exponentially(self):
+        doubles = "can double in size on every iteration of this loop"
+        self.assertRejected(rule("def move(input):",
+                                 "    x = 2",
+                                 "    for i in range(40):",
+                                 "        x = x ** 16",
+                                 "    return []"), "'x' is multiplied by itself on every iteration of this loop")
+        self.assertRejected(rule("def move(input):",
+                                 "    a = [1]",
+                                 "    for i in range(100):",
+                                 "        a.extend(a)",
+                                 "    return []"), f"'a' {doubles}")
+        self.assertRejected(rule("def move(input):",
+                                 "    s = 'ab'",
+                                 "    for i in range(64):",
+                                 "        s = s + s",
+                                 "    return []"), f"'s' {doubles}")
+        self.assertRejected(rule("def move(input):",
+                                 "    a, b = [1], [2]",
+                                 "    for i in range(90):",
+                                 "        a, b = b, a + b",
+                                 "    return []"), f"'b' {doubles}")
+
+    def test_rejects_large_repetitions_in_loops(self):
+        self.assertRejected(rule("def move(input):",
+                                 "    g = [[0] * 10000 for _ in range(10000)]",
+                                 "    return []"),
+                            "This repetition can build up to 100000000 elements with the loops around it")
+
+    def test_rejects_calls_outside_move(self):
+        self.assertRejected(rule("def f():",
+                                 "    return 1",
+                                 "x = f()",
+                                 "def move(input):",
+                                 "    return []"), "Top-level code must not call the rule's functions")
+        # Recursion through an alias of a function
+        self.assertRejected(rule("def g():",
+                                 "    return f()",
+                                 "f = g",
+                                 "def move(input):",
+                                 "    return g()"), "Function 'g' may only be called by its name")
+
+    def test_verify_rule(self):
+        self.assertTrue(verify_rule("def move(input):\n    return ['up']")[0])
+        self.assertFalse(verify_rule("def move(input):\n    return ['up'] * 10**16")[0])
+
+
+class TestActionBudget(unittest.TestCase):
+
+    def test_bounds(self):
+        code = rule("def move(input):",
+                    "    actions = []",
+                    "    for distance, kind in input:",
+                    "        if kind == 4 and distance < 3:",
+                    "            actions.append('up')",
+                    "    return actions[:2] + ['cw']")
+        bounds = action_bounds(code, n_inputs=3)
+        self.assertEqual((bounds["up"], bounds["cw"], bounds["down"]), ((0, 2), (1, 1), (0, 0)))
+        helper = rule("def add(actions, action):",
+                      "    actions.append(action)",
+                      "",
+                      "def move(input):",
+                      "    actions = []",
+                      "    add(actions, 'up')",
+                      "    add(actions=actions, action='up')",
+                      "    return actions")
+        self.assertEqual(action_bounds(helper)["up"], (2, 2))
+
+    def test_analyze_action_budget(self):
+        allowed = {"N_UP": 1, "N_DOWN": 0, "N_LEFT": 0, "N_RIGHT": 0, "N_CW": 2, "N_CCW": 0}
+        safe = analyze_action_budget(rule("def move(input):",
+                                          "    if input and input[0][1] == 4:",
+                                          "        return ['up', 'cw']",
+                                          "    return ['cw', 'cw']"), allowed, 3)
+        self.assertTrue(safe.proven_safe)
+        self.assertFalse(safe.never_valid)
+        self.assertEqual(safe.violations(), [])
+
+        never = analyze_action_budget(rule("def move(input):", "    return ['up', 'up']"), allowed, 3)
+        self.assertTrue(never.never_valid)
+        self.assertFalse(never.proven_safe)
+        self.assertEqual(never.violations(), ["'up' is used at least 2 times, 1 allowed"])
+
+        # Depends on the input: neither proven safe nor never valid
+        sometimes = analyze_action_budget(rule("def move(input):",
+                                               "    return ['up' for distance, kind in input if kind == 4]"),
+                                          allowed, 3)
+        self.assertFalse(sometimes.proven_safe)
+        self.assertFalse(sometimes.never_valid)
+        self.assertEqual(sometimes.violations(), ["'up' can be used up to 3 times, 1 allowed"])
+
+    def test_no_path_exceeds_the_bounds(self):
+        # Each rule returns two "up"s; it must either be unanalyzable or bounded above by 2
+        counterexamples = {
+            "dict item": rule("def move(input):",
+                              "    d = {}",
+                              "    d['a'] = 'up'",
+                              "    d['b'] = 'up'",
+                              "    return list(d.values())"),
+            "slice": rule("def move(input):",
+                          "    actions = []",
+                          "    actions[0:0] = ['up', 'up']",
+                          "    return actions"),
+            "element": rule("def move(input):",
+                            "    a = [[]]",
+                            "    a[0].append('up')",
+                            "    a[0].append('up')",
+                            "    return a[0]"),
+            "global helper": rule("actions = []",
+                                  "def add():",
+                                  "    actions.append('up')",
+                                  "def move(input):",
+                                  "    add()",
+                                  "    add()",
+                                  "    return actions"),
+            "keyword": rule("def add(l):",
+                            "    l.append('up')",
+                            "def move(input):",
+                            "    a = []",
+                            "    add(l=a)",
+                            "    add(l=a)",
+                            "    return a"),
+            "alias": rule("def move(input):",
+                          "    a = []",
+                          "    b = a",
+                          "    a.append('up')",
+                          "    a.append('up')",
+                          "    return b"),
+            "container": rule("def move(input):",
+                              "    a = []",
+                              "    b = [a]",
+                              "    a.extend(['up', 'up'])",
+                              "    return b[0]"),
+            "returned argument": rule("def same(p):",
+                                      "    return p",
+                                      "def move(input):",
+                                      "    a = []",
+                                      "    b = same(a)",
+                                      "    b.extend(['up', 'up'])",
+                                      "    return a"),
+            "passed twice": rule("def add(x, y):",
+                                 "    x.append('up')",
+                                 "    y.append('up')",
+                                 "def move(input):",
+                                 "    a = []",
+                                 "    add(a, a)",
+                                 "    return a"),
+            "generator": rule("def move(input):",
+                              "    a = []",
+                              "    g = (x for x in a)",
+                              "    a.extend(['up', 'up'])",
+                              "    return list(g)"),
+            "top level": rule("actions = []",
+                              "actions.append('up')",
+                              "actions.append('up')",
+                              "def move(input):",
+                              "    return actions"),
+            "redefined": rule("def move(input):",
+                              "    return []",
+                              "def move(input):",
+                              "    return ['up', 'up']"),
+            "string slice": rule("def move(input):", "    return ['upx'[:2], 'upx'[:2]]"),
+            "set union": rule("def move(input):", "    return list({'up'} | {'x'}) * 2"),
+            "sum": rule("def move(input):", "    return sum([['up'], ['up']], [])"),
+            "dict unpacking": rule("def move(input):", "    return list({**{'up': 1}}) * 2"),
+        }
+        for name, code in counterexamples.items():
+            with self.subTest(name):
+                namespace = {}
+                exec(code, namespace)
+                self.assertEqual(namespace["move"]([(1, 4)]).count("up"), 2)
+                bounds = action_bounds(code, n_inputs=1)
+                if bounds is not None:
+                    self.assertGreaterEqual(bounds["up"][1], 2)
+
+
+@unittest.skipUnless(HAS_UTILS_DEPS, "python-dotenv is not installed")
+class TestInitRule(unittest.TestCase):
+
+    def test_rejected_rule_falls_back(self):
+        body = [[0, 0, 1, 0], [0, 1, 2, 0], [1, 0, 4, 1]]
+        with mock.patch.object(utils, "read_prompt", return_value=""), \
+                mock.patch.object(utils, "get_rule", return_value="def move(input):\n    while True:\n        pass"):
+            rule_code = utils.init_rule(body, 5)
+        self.assertEqual(rule_code, utils.FALLBACK_RULE)
+        self.assertTrue(utils.check_rule(body, rule_code)[0])
+        namespace = {}
+        exec(rule_code, namespace)
+        self.assertEqual(namespace["move"]([(1, 4)]), [])
+
+    def test_unanalyzable_rule_is_counted(self):
+        body = [[0, 0, 1, 0], [0, 1, 2, 1], [1, 0, 4, 1]]  # No propulsion pointing up
+        self.assertEqual(utils.get_allowed_actions(body)["N_UP"], 0)
+        code = rule("def move(input):",
+                    "    d = {}",
+                    "    d['a'] = 'up'",
+                    "    d['b'] = 'up'",
+                    "    return list(d.values())")
+        self.assertFalse(utils.rule_within_budget(body, code))
+        self.assertFalse(utils.check_actions(body, ["up", "up"], code))
+        self.assertTrue(utils.check_actions(body, [], "def move(input):\n    return []"))
+
+    def test_built_action_strings_are_checked(self):
+        body = [[0, 0, 1, 0], [0, 1, 2, 0], [1, 0, 4, 1]]
+        code = rule("def move(input):", "    return list('up')")
+        self.assertTrue(utils.rule_within_budget(body, code))
+        self.assertFalse(utils.check_actions(body, list("up"), code))
+        self.assertFalse(utils.check_actions(body, "up", code))
+        self.assertFalse(utils.check_actions(body, list({"jump": 1}), code))
+        self.assertTrue(utils.check_actions(body, ["up"], code))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,20 +1,68 @@
-import anthropic
 import dotenv
 import os
 import re
 import ast
+from move_verifier import ACTIONS, verify_rule, analyze_action_budget
+from fake_llm import FakeLLM
+from response_cache import cache_from_env
+from rate_limiter import RateLimiter
+
+MODEL = "claude-3-5-haiku-20241022"
+MAX_TOKENS = 8192
+TEMPERATURE = 0.8
+# Rule of a new robot whose generated rule is rejected: it stands still, which fits any body
+FALLBACK_RULE = "def move(input):\n    return []"
 
 dotenv.load_dotenv()
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+# GRIDARIANS_LLM=fake answers prompts offline with fake_llm.FakeLLM, no API key needed
+fake_llm = FakeLLM.from_env() if os.getenv("GRIDARIANS_LLM", "anthropic") == "fake" else None
+# GRIDARIANS_RPM / GRIDARIANS_TPM keep requests within the API limits and retry 429s (see rate_limiter.py)
+rate_limiter = RateLimiter.from_env()
+if fake_llm is None:
+    import anthropic
+    # The rate limiter retries rate limits and server errors itself
+    client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"),
+                                 **({"max_retries": 0} if rate_limiter is not None else {}))
+else:
+    client = None
+# GRIDARIANS_CACHE=<file> replays identical prompts from a SQLite cache (see response_cache.py)
+response_cache = cache_from_env()
+
+def use_fake_llm(**options):
+    # Switch generate_text to an offline FakeLLM (e.g. for benchmarks), see FakeLLM for the options
+    global fake_llm
+    fake_llm = FakeLLM(**options)
+    return fake_llm
 
-def generate_text(prompt):
-    response = client.messages.create(
-        model="claude-3-5-haiku-20241022",
-        max_tokens=8192,
-        temperature=0.8,
-        messages=[{"role": "user", "content": prompt}],
-    )
-    return response.content[0].text
+def generate_text(prompt, stop_at=None):
+    # stop_at: closing tag of the payload; generation stops there instead of
+    # writing an explanation after it (an API stop sequence, so the tag itself
+    # is not returned by the API and is appended again)
+    model = "fake" if fake_llm is not None else MODEL
+    key = None
+    if response_cache is not None:
+        key = response_cache.key("", prompt, model, TEMPERATURE, MAX_TOKENS)
+        cached = response_cache.lookup(key, TEMPERATURE)
+        if cached is not None:
+            return cached
+    if fake_llm is not None:
+        text = fake_llm.generate_text(prompt, stop_at)
+    else:
+        def request():
+            return client.messages.create(
+                model=MODEL,
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+                messages=[{"role": "user", "content": prompt}],
+                **({"stop_sequences": [stop_at]} if stop_at else {}),
+            )
+        response = rate_limiter.call(request, prompt, MAX_TOKENS) if rate_limiter is not None else request()
+        text = response.content[0].text
+        if response.stop_reason == "stop_sequence":
+            text += response.stop_sequence
+    if key is not None:
+        response_cache.store(key, model, TEMPERATURE, text)
+    return text
 
 def read_prompt(prompt_name, vars):
     with open(f"prompts/{prompt_name}.txt", "r") as file:
@@ -28,7 +76,7 @@ def read_prompt(prompt_name, vars):
 
 def get_robot_configuration(prompt):
     # Extract text from <robot_configuration> tag
-    response = generate_text(prompt)
+    response = generate_text(prompt, stop_at="</robot_configuration>")
     pattern = r'<robot_configuration>(.*?)</robot_configuration>'
     match = re.search(pattern, response, re.DOTALL)
     if match:
@@ -145,7 +193,28 @@ def get_allowed_actions(configuration):
                 action_counts["N_CCW"] += 1
     return action_counts
 
-def check_actions(configuration, actions):
+def rule_within_budget(configuration, rule):
+    # True when no execution path of the rule can exceed the body's action budget
+    budget = analyze_action_budget(rule, get_allowed_actions(configuration), get_num_sensors(configuration))
+    return budget is not None and budget.proven_safe
+
+def check_rule(configuration, rule):
+    # Static checks of a generated rule before it is used for this body
+    is_safe, message = verify_rule(rule)
+    if not is_safe:
+        return False, message
+    budget = analyze_action_budget(rule, get_allowed_actions(configuration), get_num_sensors(configuration))
+    if budget is not None and budget.never_valid:
+        return False, "\n".join(budget.violations())
+    return True, message
+
+def check_actions(configuration, actions, rule=None):
+    # Only known action strings, however the rule built them (list("up"), dict keys, ...)
+    if not isinstance(actions, (list, tuple)) or not all(isinstance(a, str) and a in ACTIONS for a in actions):
+        return False
+    # Rules proven to stay within the budget need no per-tick count
+    if rule is not None and rule_within_budget(configuration, rule):
+        return True
     action_counts = get_allowed_actions(configuration)
     # Map action strings to count keys
     action_mapping = {
@@ -171,12 +240,9 @@ def construct_sensor_prompt(configuration):
             sensor_prompt += f"The sensor is at {part[0]}, {part[1]} and is pointing {dir}.\n"
     return sensor_prompt
 
-def init_rule(configuration, sensor_dist):
-    n_actions = get_allowed_actions(configuration)
-    n_sensors = get_num_sensors(configuration)
-    sensor_prompt = construct_sensor_prompt(configuration)
-    prompt = read_prompt("init_rule_v1", {"SENSOR_DIST": sensor_dist, "SENSOR_PROMPT": sensor_prompt, "N_SENSORS": n_sensors, "N_UP": n_actions["N_UP"], "N_DOWN": n_actions["N_DOWN"], "N_RIGHT": n_actions["N_RIGHT"], "N_LEFT": n_actions["N_LEFT"], "N_CW": n_actions["N_CW"], "N_CCW": n_actions["N_CCW"]})
-    response = generate_text(prompt)
+def get_rule(prompt):
+    # Extract the move function from <code> tag
+    response = generate_text(prompt, stop_at="</code>")
     pattern = r'<code>(.*?)</code>'
     match = re.search(pattern, response, re.DOTALL)
     if match:
@@ -184,20 +250,32 @@ def init_rule(configuration, sensor_dist):
     else:
         print("No code found in response")
         return response  # Return full response if tag not found
+
+def init_rule(configuration, sensor_dist):
+    n_actions = get_allowed_actions(configuration)
+    n_sensors = get_num_sensors(configuration)
+    sensor_prompt = construct_sensor_prompt(configuration)
+    prompt = read_prompt("init_rule_v1", {"SENSOR_DIST": sensor_dist, "SENSOR_PROMPT": sensor_prompt, "N_SENSORS": n_sensors, "N_UP": n_actions["N_UP"], "N_DOWN": n_actions["N_DOWN"], "N_RIGHT": n_actions["N_RIGHT"], "N_LEFT": n_actions["N_LEFT"], "N_CW": n_actions["N_CW"], "N_CCW": n_actions["N_CCW"]})
+    rule = get_rule(prompt)
+    is_safe, message = check_rule(configuration, rule)
+    if is_safe:
+        return rule
+    else:
+        print(f"Rejected generated rule:\n{message}")
+        return FALLBACK_RULE
     
 def modify_rule(rule, configuration, sensor_dist):
     n_actions = get_allowed_actions(configuration)
     n_sensors = get_num_sensors(configuration)
     sensor_prompt = construct_sensor_prompt(configuration)
     prompt = read_prompt("modify_rule_v1", {"RULE": rule, "SENSOR_DIST": sensor_dist, "SENSOR_PROMPT": sensor_prompt, "N_SENSORS": n_sensors, "N_UP": n_actions["N_UP"], "N_DOWN": n_actions["N_DOWN"], "N_RIGHT": n_actions["N_RIGHT"], "N_LEFT": n_actions["N_LEFT"], "N_CW": n_actions["N_CW"], "N_CCW": n_actions["N_CCW"]})
-    response = generate_text(prompt)
-    pattern = r'<code>(.*?)</code>'
-    match = re.search(pattern, response, re.DOTALL)
-    if match:
-        return match.group(1).strip()
+    new_rule = get_rule(prompt)
+    is_safe, message = check_rule(configuration, new_rule)
+    if is_safe:
+        return new_rule
     else:
-        print("No code found in response")
-        return response  # Return full response if tag not found
+        print(f"Rejected modified rule:\n{message}")
+        return rule
 
 
 if __name__ == "__main__":